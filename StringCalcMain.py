@@ -2,26 +2,17 @@
 String Calculator for early keyboard instruments.
 """
 import definitions
-import instrument
-
-test_harpsichord = []
-with open(definitions.ROOT_DIR / 'test_data_files/test_harpsichord.csv', 'r') as f:
-    for line in f.readlines():
-        line = line.strip()
-        l, d, c, x = line.split(',')
-        test_harpsichord.append(
-            (c, l, d,x)
-        )
-
-
+from interface import general_functions
+from interface.calculation import NoteArrays
+from interface.schedule_import import read_schedule
 
 if __name__ == '__main__':
-    harpsichord = instrument.Instrument(9, 71, 425)
-    i=0
-    for note in harpsichord.iter_notes():
-        note.set_wire(*test_harpsichord[i])
-        i += 1
-    print(harpsichord)
-
-    instrument.plot_instrument(harpsichord)
-    print(1)
+    schedule = read_schedule(definitions.ROOT_DIR / 'test_data_files/test_harpsichord.csv', first_note=9)
+    for line, reason in schedule.errors:
+        print(f'line {line}: {reason}')
+    harpsichord = NoteArrays(schedule.state(inst_name='test harpsichord', pitch=425))
+    forces = harpsichord.forces()
+    for note_number, length, diameter, force in zip(harpsichord.note_number, harpsichord.length,
+                                                    harpsichord.diameter, forces):
+        print(f'{general_functions.note_number_to_name(int(note_number)):>4} {length:7.1f}mm '
+              f'{diameter:.3f}mm {force:6.2f}kg-f')
@@ -1,7 +1,10 @@
+import os
 from pathlib import Path
 ROOT_DIR = Path(__file__).parent
 WIRE_TYPE_CSV = ROOT_DIR / "interface/standard_wire_types.csv"
 CACHE_MAX_AGE_SEC = 100
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+PROFILE_ON_START = bool(os.environ.get('STRINGCALC_PROFILE'))
 
 note_names = ('A', 'A♯', 'B', 'C', 'C♯', 'D', 'D♯', 'E', 'F', 'F♯', 'G', 'G♯')
 
@@ -0,0 +1,180 @@
+"""
+Overlay of one curve, e.g. tension or diameter, from every design in an archive. \n
+Designs are read one at a time and never kept: each is added to a :class:`StreamingHistogram` per note on a
+log scale, which gives both the percentile envelopes and a density image of every curve, and a fixed size
+reservoir sample of whole curves is kept to draw as a single :class:`LineCollection`. Memory and drawing
+time depend on the number of notes and bins, not on the number of designs. Usage::
+
+    overlay = ArchiveOverlay('force')
+    overlay.add_files(pathlib.Path('archive/').rglob('*.json'))
+    low, median, high = overlay.percentiles((5, 50, 95))
+
+or from a :class:`DesignArchive` without reading any json, ``overlay.add_archive(archive)``.
+"""
+from __future__ import annotations
+
+import json
+import pathlib
+import typing
+
+import numpy
+
+from interface.calculation import NoteArrays, note_columns
+from interface.design_archive import DesignArchive
+from interface.streaming_statistics import StreamingHistogram
+
+# field: (label, column of the notes table in a design archive)
+FIELDS = dict(force=("Tension (kg-f)", 'tension_kgf'), diameter=("Diameter (mm)", 'diameter_mm'),
+              length=("Length (mm)", 'length_mm'), percent_of_break=("% of break", None))
+# log10 range of the histograms of each field, values outside are clipped to the ends
+LOG_RANGE = dict(force=(-2.0, 3.0), diameter=(-2.0, 1.0), length=(0.0, 4.0), percent_of_break=(-1.0, 3.0))
+DEFAULT_NOTE_RANGE = (1, 88)
+DEFAULT_MAX_CURVES = 2000
+DEFAULT_BINS = 2048
+
+# overlays loaded for the 'Archive Overlay' plots, keyed by field
+loaded: dict[str, ArchiveOverlay] = dict()
+
+
+class ArchiveOverlay:
+    """ streaming summary of one field of many designs on a fixed note grid """
+    field: str
+    note_number: numpy.ndarray
+    histogram: StreamingHistogram
+    curves: numpy.ndarray
+    designs: int
+
+    def __init__(self, field: str = 'force', note_range: tuple[int, int] = DEFAULT_NOTE_RANGE,
+                 bins: int = DEFAULT_BINS, max_curves: int = DEFAULT_MAX_CURVES, seed: int | None = 0):
+        """
+        :param field: one of :data:`FIELDS`
+        :param note_range: (lowest, highest) note numbers shown, notes outside are ignored
+        :param bins: histogram bins per note, the percentile resolution is the log range over this
+        :param max_curves: most whole curves kept to draw
+        """
+        if field not in FIELDS:
+            raise ValueError(f'field must be one of {tuple(FIELDS)}')
+        self.field = field
+        self.note_number = numpy.arange(note_range[0], note_range[1] + 1)
+        self.histogram = StreamingHistogram(*LOG_RANGE[field], self.note_number.size, bins)
+        self.curves = numpy.full((max_curves, self.note_number.size), numpy.nan, dtype=numpy.float32)
+        self.designs = 0
+        self._rng = numpy.random.default_rng(seed)
+
+    @property
+    def label(self) -> str:
+        return FIELDS[self.field][0]
+
+    def _row(self, note_number: numpy.ndarray, values: numpy.ndarray) -> numpy.ndarray:
+        """ values of one design on the note grid, nan where the design has no note """
+        row = numpy.full(self.note_number.size, numpy.nan)
+        inside = (note_number >= self.note_number[0]) & (note_number <= self.note_number[-1])
+        row[note_number[inside] - self.note_number[0]] = values[inside]
+        row[~(row > 0)] = numpy.nan
+        return row
+
+    def add_rows(self, rows: numpy.ndarray):
+        """
+        add a chunk of designs already on the note grid
+        :param rows: (designs × notes) array, nan where a design has no note
+        """
+        rows = numpy.asarray(rows, dtype=float).reshape(-1, self.note_number.size)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            self.histogram.add(numpy.log10(rows))
+        # reservoir sampling keeps every design equally likely to be drawn, whatever the order of the files
+        for row in rows:
+            if self.designs < self.curves.shape[0]:
+                self.curves[self.designs] = row
+            else:
+                slot = self._rng.integers(0, self.designs + 1)
+                if slot < self.curves.shape[0]:
+                    self.curves[slot] = row
+            self.designs += 1
+
+    def add(self, data: dict):
+        """ add one design, in the format given by :meth:`Instrument.state_export` """
+        columns = note_columns(data)
+        self.add_rows(self._row(columns['note_number'], columns[self.field]))
+
+    def _values(self, arrays: NoteArrays) -> numpy.ndarray:
+        """ the field of a design read once, calculated without :data:`result_cache.cache` it would only fill """
+        if self.field in ('length', 'diameter'):
+            return getattr(arrays, self.field)
+        force = arrays.forces()
+        return force if self.field == 'force' else arrays.percent_of_break(force)
+
+    def add_files(self, files: typing.Iterable[str | pathlib.Path], chunk_size: int = 256
+                  ) -> list[tuple[str, str]]:
+        """
+        add every design file, reading one at a time
+        :return: list of (file, error) for files that could not be added
+        """
+        errors, chunk = [], []
+        for file in files:
+            try:
+                with open(file, 'r') as f:
+                    arrays = NoteArrays(json.loads(f.read()))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                errors.append((str(file), str(e)))
+                continue
+            chunk.append(self._row(arrays.note_number, self._values(arrays)))
+            if len(chunk) == chunk_size:
+                self.add_rows(numpy.stack(chunk))
+                chunk = []
+        if chunk:
+            self.add_rows(numpy.stack(chunk))
+        return errors
+
+    def add_archive(self, archive: DesignArchive, chunk_size: int = 256):
+        """ add every instrument in an archive from its notes table, see :meth:`DesignArchive.iter_note_values` """
+        column = FIELDS[self.field][1]
+        if column is None:
+            raise ValueError(f'{self.field} is not kept in design archives')
+        chunk = []
+        for _, note_number, values in archive.iter_note_values(column):
+            chunk.append(self._row(note_number, values))
+            if len(chunk) == chunk_size:
+                self.add_rows(numpy.stack(chunk))
+                chunk = []
+        if chunk:
+            self.add_rows(numpy.stack(chunk))
+
+    def percentiles(self, q: typing.Sequence[float] = (5, 50, 95)) -> numpy.ndarray:
+        """ :return: (len(q) × notes) array in the units of the field, nan for notes no design has """
+        return 10 ** self.histogram.percentiles(q)
+
+    def density(self, bins: int = 256) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        histogram of each note merged into fewer bins, for drawing as an image
+        :return: (notes × bins) share of each note's designs in each bin, and the bins + 1 edges in field units
+        """
+        counts = self.histogram.counts
+        merge = max(1, counts.shape[1] // bins)
+        merged = counts[:, :counts.shape[1] // merge * merge].reshape(counts.shape[0], -1, merge).sum(axis=2)
+        total = merged.sum(axis=1, keepdims=True)
+        share = numpy.divide(merged, total, out=numpy.zeros(merged.shape), where=total > 0)
+        edges = self.histogram.lower[0] + numpy.arange(merged.shape[1] + 1) * merge * self.histogram.width[0]
+        return share, 10 ** edges
+
+    def sampled_curves(self) -> numpy.ndarray:
+        """ (curves × notes) array of the designs kept to draw """
+        return self.curves[:min(self.designs, self.curves.shape[0])]
+
+
+def overlay_files(paths: typing.Iterable[str | pathlib.Path], field: str = 'force', **kwargs
+                  ) -> tuple[ArchiveOverlay, list[tuple[str, str]]]:
+    """
+    :param paths: design files, and directories searched for json files
+    :param kwargs: passed to :class:`ArchiveOverlay`
+    :return: (overlay, list of (file, error) for files that could not be added)
+    """
+    def files():
+        for path in map(pathlib.Path, paths):
+            if path.is_dir():
+                yield from sorted(path.rglob('*.json'))
+            else:
+                yield path
+
+    overlay = ArchiveOverlay(field, **kwargs)
+    errors = overlay.add_files(files())
+    return overlay, errors
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import pathlib
+import tkinter as tk
+from tkinter import filedialog as tkFile
+from tkinter import messagebox, ttk
+
+from interface import archive_overlay
+from interface.design_archive import DesignArchive
+from interface.workspace import Workspace
+
+archive_file_types = (
+    ('sqlite archive', '*.sqlite'),
+    ('All files', '*.*')
+)
+
+
+class ArchiveWindow(tk.Toplevel):
+    """ window to search a :class:`DesignArchive` and open its instruments """
+    archive: DesignArchive
+    workspace: Workspace
+
+    def __init__(self, parent, workspace: Workspace, archive: DesignArchive):
+        super(ArchiveWindow, self).__init__(parent)
+        self.title(f"Archive - {archive.file.name}")
+        self.geometry("800x500")
+        self.workspace = workspace
+        self.archive = archive
+
+        self.material = tk.StringVar(self, '')
+        self.min_length = tk.StringVar(self, '')
+        self.max_length = tk.StringVar(self, '')
+
+        header = ttk.Frame(self)
+        header.pack(fill='x', side=tk.TOP)
+        for i, (text, var) in enumerate((("Material", self.material), ("Min Length(mm)", self.min_length),
+                                         ("Max Length(mm)", self.max_length))):
+            ttk.Label(header, text=text).grid(row=0, column=i)
+            _entry = ttk.Entry(header, textvariable=var)
+            _entry.grid(row=1, column=i, sticky=tk.EW)
+            _entry.bind("<Return>", self.search)
+        ttk.Button(header, text="Search", command=self.search).grid(row=0, column=3, rowspan=2, sticky=tk.S)
+        ttk.Button(header, text="Max Tension per Material",
+                   command=self.show_max_tension).grid(row=0, column=4, rowspan=2, sticky=tk.S)
+        ttk.Button(header, text="Add Folder", command=self.add_folder).grid(row=0, column=5, rowspan=2, sticky=tk.S)
+        ttk.Button(header, text="Overlay", command=self.overlay).grid(row=0, column=6, rowspan=2, sticky=tk.S)
+
+        self.table = ttk.Treeview(self, show='headings')
+        self.table.pack(fill='both', expand=True, side=tk.BOTTOM)
+        self.table.bind("<Double-1>", self.open_selected)
+        self.search()
+
+    def _fill_table(self, columns: tuple[str, ...], rows: list[tuple]):
+        self.table.delete(*self.table.get_children())
+        self.table.configure(columns=columns)
+        for col in columns:
+            self.table.heading(col, text=col)
+        for row in rows:
+            self.table.insert('', tk.END, values=row)
+
+    def search(self, *args):
+        """ show instruments matching the search fields, or every instrument when they are empty """
+        try:
+            min_length = float(self.min_length.get()) if self.min_length.get() else None
+            max_length = float(self.max_length.get()) if self.max_length.get() else None
+        except ValueError:
+            messagebox.showerror("Archive", "lengths must be numbers", parent=self)
+            return
+        rows = self.archive.find_instruments(material=self.material.get() or None,
+                                             min_length_mm=min_length, max_length_mm=max_length)
+        self._fill_table(('id', 'path', 'name', 'pitch', 'lowest', 'highest'), rows)
+
+    def show_max_tension(self):
+        rows = [(code, name, f'{tension:.2f}', count)
+                for code, name, tension, count in self.archive.max_tension_per_material()]
+        self._fill_table(('code', 'material', 'max kg-f', 'notes'), rows)
+
+    def add_folder(self):
+        directory = tkFile.askdirectory(title="Add Folder to Archive", parent=self)
+        if not directory:
+            return
+        errors = self.archive.ingest_directory(directory)
+        if errors:
+            messagebox.showwarning("Archive", "\n".join(f'{f_}: {e_}' for f_, e_ in errors[:20]), parent=self)
+        self.search()
+
+    def overlay(self):
+        """ load every instrument in the archive into the 'Archive Overlay' plots """
+        for field in ('force', 'diameter'):
+            overlay = archive_overlay.ArchiveOverlay(field)
+            overlay.add_archive(self.archive)
+            archive_overlay.loaded[field] = overlay
+        self.workspace.instrument.event_generate('<<InstrumentUpdated>>')
+
+    def open_selected(self, *args):
+        """ open the selected instrument in a tab of the main window """
+        selected = self.table.focus()
+        if not selected or self.table.cget('columns')[0] != 'id':
+            return
+        instrument_id = int(self.table.item(selected, 'values')[0])
+        path = pathlib.Path(self.archive.path(instrument_id))
+        try:
+            self.workspace.open(self.archive.document(instrument_id), path if path.exists() else None)
+        except (ValueError, KeyError) as e:
+            messagebox.showerror("Archive", str(e), parent=self)
+
+    def destroy(self):
+        self.archive.close()
+        super(ArchiveWindow, self).destroy()
+
+
+def open_archive(parent, workspace: Workspace) -> ArchiveWindow | None:
+    """ ask for an archive file, created if it does not exist, and show it in an :class:`ArchiveWindow` """
+    file = tkFile.asksaveasfilename(title="Open Archive", filetypes=archive_file_types,
+                                    confirmoverwrite=False, parent=parent)
+    if not file:
+        return None
+    file = pathlib.Path(file)
+    if not file.suffix:
+        file = file.with_suffix('.sqlite')
+    return ArchiveWindow(parent, workspace, DesignArchive(file))
@@ -0,0 +1,407 @@
+"""
+Headless tools for working with saved instrument files, usage::
+
+    python -m interface.batch temperaments my_harpsichord.json
+    python -m interface.batch index archive/ --index designs.npz
+    python -m interface.batch similar my_harpsichord.json --index designs.npz -k 5
+    python -m interface.batch cutlist spinet.json virginal.json --spool 50000 --csv cuts.csv
+    python -m interface.batch pitch surveys/ --criterion stress --target 70 --transpose -2 2
+    python -m interface.batch pareto spinet.json --batches 200 --price 1=12.5 --pick cost --out spinet_cheap.json
+    python -m interface.batch diff spinet_v1.json spinet_v2.json
+    python -m interface.batch diff revisions/
+    python -m interface.batch columns spinet.json --define "mass=pi * diameter ** 2 / 4 * density * count" --csv out.csv
+    python -m interface.batch overlay archive/ --field force --highlight spinet.json --png overlay.png
+    python -m interface.batch raise spinet.json --to 440 --load-step 4 --range C1 B2 430 --order "bass first"
+    python -m interface.batch outliers archive/ designs.sqlite --method ransac --degree 2 --threshold 10
+    python -m interface.batch --cache .stringcalc_cache --cache-age 86400 temperaments archive/*.json
+
+Results are kept in :data:`result_cache.cache`, `--cache` also keeps them on disk between runs.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import sys
+import typing
+
+import numpy
+
+from interface import (archive_overlay, curve_fitting, cut_list, derived_columns, design_diff, general_functions,
+                       key_map, pareto, pitch_inference, pitch_raise, result_cache, visualization_plotting)
+from interface.calculation import NoteArrays, note_columns
+from interface.design_archive import DesignArchive
+from interface.design_index import DesignIndex
+from interface.temperament import Temperament
+
+
+def load_design(file: str | pathlib.Path) -> dict:
+    """ read a saved instrument, in the format given by :meth:`Instrument.state_export` """
+    with open(file, 'r') as f:
+        return json.loads(f.read())
+
+
+def evaluate_temperaments(data: dict, temperaments: typing.Sequence[Temperament] | None = None
+                          ) -> tuple[list[str], NoteArrays, numpy.ndarray, numpy.ndarray]:
+    """
+    evaluate one design in every temperament at once
+    :param data: dict in the format given by :meth:`Instrument.state_export`
+    :param temperaments: temperaments to use, defaults to every registered temperament
+    :return: temperament names, note arrays, frequencies and forces (kg-f) as (temperaments × notes) arrays
+    """
+    temperaments = Temperament.temperament_list() if temperaments is None else list(temperaments)
+    key = result_cache.content_key('temperaments', data,
+                                   temperaments=[(t_.name, t_.cents.tolist()) for t_ in temperaments])
+    return result_cache.cache.get_or_compute(key, lambda: _evaluate_temperaments(data, temperaments))
+
+
+def _evaluate_temperaments(data: dict, temperaments: list[Temperament]
+                           ) -> tuple[list[str], NoteArrays, numpy.ndarray, numpy.ndarray]:
+    arrays = NoteArrays(data)
+    # (temperaments × 12) table indexed by each note's position in the octave
+    table = numpy.stack([t_.offsets(arrays.note_number) - t_.offsets(arrays.reference_note)
+                         for t_ in temperaments])
+    semitones = (arrays.note_number - arrays.reference_note) / 12
+    frequency = arrays.pitch * 2 ** (semitones[numpy.newaxis, :] + table / 1200)
+    force = arrays.forces(frequency)
+    return [t_.name for t_ in temperaments], arrays, frequency, force
+
+
+def _print_temperaments(args: argparse.Namespace):
+    for file in args.files:
+        names, arrays, frequency, force = evaluate_temperaments(load_design(file))
+        print(f'{file} - {arrays.name} - {arrays.pitch}hz')
+        print(f'{"temperament":<20}{"total kg-f":>12}{"min kg-f":>10}{"max kg-f":>10}')
+        for name, row in zip(names, force):
+            print(f'{name:<20}{numpy.nansum(row):>12.2f}{numpy.nanmin(row):>10.2f}{numpy.nanmax(row):>10.2f}')
+
+
+def _update_index(args: argparse.Namespace):
+    index = DesignIndex(args.index)
+    for file, error in index.update_directory(args.directory):
+        print(f'skipped {file}: {error}')
+    index.save()
+    print(f'{len(index)} designs in {args.index}')
+
+
+def _print_similar(args: argparse.Namespace):
+    index = DesignIndex(args.index)
+    for file in args.files:
+        print(file)
+        for match, distance in index.query(load_design(file), args.k):
+            print(f'{distance:>10.4f}  {match}')
+
+
+def _print_cut_list(args: argparse.Namespace):
+    documents = [(str(f_), load_design(f_)) for f_ in args.files]
+    for name, data in documents:
+        if key_map.shares_strings(data):
+            print(f'{name} left out, its split keys share strings', file=sys.stderr)
+    cuts = cut_list.cut_list(documents, args.hitch, args.pin)
+    allocations = cut_list.allocate_spools(cuts, args.spool)
+    print(f'{"material":<10}{"diameter":>10}{"cuts":>7}{"cut m":>10}{"spools":>8}{"waste m":>9}{"waste %":>9}')
+    for material, diameter, count, length, spools, _, waste, percent in cut_list.summary_rows(allocations):
+        print(f'{material:<10}{diameter:>10}{count:>7}{length:>10.2f}{spools:>8}{waste:>9.2f}{percent:>9.1f}')
+    if args.csv:
+        cut_list.write_csv(args.csv, allocations)
+
+
+def _design_files(paths: typing.Iterable[str]) -> typing.Iterator[pathlib.Path]:
+    """ every file given, and every json file within the directories given """
+    for path in map(pathlib.Path, paths):
+        if path.is_dir():
+            yield from sorted(path.rglob('*.json'))
+        else:
+            yield path
+
+
+def _print_pitch(args: argparse.Namespace):
+    pitches = numpy.arange(args.min, args.max + args.step / 2, args.step)
+    transpositions = range(args.transpose[0], args.transpose[1] + 1)
+    note_range = tuple(args.notes) if args.notes else None
+    print(f'{"design":<40}{"pitch":>8}{"transpose":>10}{"90% from":>10}{"to":>8}')
+    for file in _design_files(args.files):
+        try:
+            result = pitch_inference.infer_pitch(NoteArrays(load_design(file)), pitches, transpositions,
+                                                 args.criterion, args.target, note_range=note_range)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f'{str(file):<40} skipped, {e}')
+            continue
+        low, high = result.interval(0.9)
+        print(f'{str(file):<40}{result.best_pitch:>8.1f}{result.best_transposition:>10}{low:>10.1f}{high:>8.1f}')
+
+
+def _price(text: str) -> tuple[str, float]:
+    code, _, price = text.partition('=')
+    return code, float(price)
+
+
+def _print_pareto(args: argparse.Namespace):
+    data = load_design(args.file)
+    problem = pareto.ParetoProblem(data, max_ranges=args.ranges, price_per_kg=dict(args.price))
+    explorer = pareto.ParetoExplorer(problem, batch_size=args.batch_size, workers=args.workers, seed=args.seed)
+    for _ in explorer.run(args.batches):
+        pass
+    archive = explorer.archive
+    if not len(archive):
+        raise SystemExit('no candidates evaluated, use --batches 1 or more')
+    chosen = archive.balanced() if args.pick == 'balanced' else archive.best(args.pick)
+    print(f'{explorer.evaluated} candidates evaluated, {len(archive)} on the front')
+    print(f'{"":>2}{"index":>6}' + ''.join(f'{o_:>12}' for o_ in pareto.OBJECTIVES))
+    order = numpy.argsort(archive.objectives[:, 1], kind='stable')
+    for index in order[:args.show].tolist():
+        print(f'{"*" if index == chosen else "":>2}{index:>6}' + ''.join(
+            f'{v_:>12.4g}' for v_ in archive.objectives[index].tolist()))
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(json.dumps(problem.state(archive.genomes, chosen)))
+
+
+def _print_diff(args: argparse.Namespace):
+    if len(args.paths) == 1 and pathlib.Path(args.paths[0]).is_dir():
+        print(f'{"old":<30}{"new":<30}{"changed":>8}{"added":>7}{"removed":>8}{"pitch":>7}{"max kg-f %":>11}')
+        for old, new, diff in design_diff.diff_history(args.paths[0]):
+            s_ = diff.summary()
+            force = '' if s_['largest_force_change_percent'] is None else s_['largest_force_change_percent']
+            print(f'{old.name:<30}{new.name:<30}{s_["notes_changed"]:>8}{s_["added"]:>7}{s_["removed"]:>8}'
+                  f'{s_["pitch_change"]:>7g}{force:>11}')
+        return
+    if len(args.paths) != 2:
+        raise SystemExit('diff needs two design files or one directory of revisions')
+    diff = design_diff.diff_designs(load_design(args.paths[0]), load_design(args.paths[1]))
+    print(f'{"note":<10}{"status":<9}{"material":>10}{"length":>10}{"diameter":>10}{"count":>7}'
+          f'{"kg-f":>9}{"kg-f %":>8}')
+    for row in diff.rows(not args.all):
+        note, name, status, old_material, new_material = row[:5]
+        material = old_material if old_material == new_material else f'{old_material}>{new_material}'
+        print(f'{f"{note} {name}":<10}{status:<9}{material:>10}{row[7]:>10.4g}{row[10]:>10.4g}{row[13]:>7.4g}'
+              f'{row[16]:>9.4g}{row[17]:>8.2f}')
+
+
+def _definition(text: str) -> tuple[str, str]:
+    name, _, expression = text.partition('=')
+    return name.strip(), expression
+
+
+def _print_columns(args: argparse.Namespace):
+    for file in _design_files(args.files):
+        data = load_design(file)
+        columns = derived_columns.DerivedColumns.from_state(data)
+        for name, expression in args.define:
+            columns.define(name, expression)
+        if not args.csv:
+            derived_columns.write_csv(sys.stdout, data, columns)
+            continue
+        csv_file = pathlib.Path(args.csv)
+        if len(args.files) > 1 or pathlib.Path(args.files[0]).is_dir():
+            csv_file = csv_file.with_name(f'{csv_file.stem}_{file.stem}{csv_file.suffix}')
+        derived_columns.write_csv(csv_file, data, columns)
+
+
+def _print_overlay(args: argparse.Namespace):
+    overlay = archive_overlay.ArchiveOverlay(args.field, max_curves=args.curves)
+    files = []
+    for path in map(pathlib.Path, args.paths):
+        if path.suffix == '.sqlite':
+            archive = DesignArchive(path)
+            try:
+                overlay.add_archive(archive)
+            finally:
+                archive.close()
+        else:
+            files.append(path)
+    for file, error in overlay.add_files(_design_files(files)):
+        print(f'{file} skipped, {error}')
+    low, median, high = overlay.percentiles((5, 50, 95))
+    print(f'{overlay.designs} designs')
+    print(f'{"note":<8}{"5%":>10}{"50%":>10}{"95%":>10}')
+    for i in numpy.flatnonzero(numpy.isfinite(median)).tolist():
+        print(f'{int(overlay.note_number[i]):<8}{low[i]:>10.4g}{median[i]:>10.4g}{high[i]:>10.4g}')
+    if args.png:
+        fig, ax, _ = visualization_plotting.fig_setup(tuple(args.size))
+        highlight = None
+        if args.highlight:
+            columns = note_columns(load_design(args.highlight))
+            highlight = (columns['note_number'], columns[args.field])
+        visualization_plotting.draw_archive_overlay(ax, overlay, args.density, highlight)
+        pathlib.Path(args.png).write_bytes(visualization_plotting.render_png(fig))
+
+
+def _print_raise(args: argparse.Namespace):
+    data = load_design(args.file)
+    name_to_number = general_functions.note_name_to_number
+    ranges = list()
+    for lo_, hi_, t_ in args.range:
+        try:
+            ranges.append(pitch_raise.NoteRange(name_to_number(lo_), name_to_number(hi_), float(t_)))
+        # a name that doesn't start with a note letter has no match, hence the AttributeError
+        except (ValueError, KeyError, AttributeError):
+            raise SystemExit(f'--range takes two note names and a pitch, e.g. C1 B2 430, not {lo_} {hi_} {t_}')
+    try:
+        key_map.require_own_strings(data)
+        plan = pitch_raise.plan_pitch_raise(NoteArrays(data), args.to, ranges, args.order, args.load_step,
+                                            args.break_step, args.max_break, args.max_stages)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f'{"stage":<7}{"raised":<24}{"pitch hz":>16}{"load kg-f":>11}{"step":>9}{"step %":>8}'
+          f'{"max % brk":>10}{"brk step":>9}')
+    for row in plan.summary():
+        pitch = f"{row['lowest_pitch']:.1f}" if row['lowest_pitch'] == row['highest_pitch'] else \
+            f"{row['lowest_pitch']:.1f}-{row['highest_pitch']:.1f}"
+        print(f"{row['stage']:<7}{row['raised']:<24}{pitch:>16}{row['total_load']:>11.1f}{row['load_step']:>9.1f}"
+              f"{row['load_step_percent']:>8.2f}{row['max_percent_of_break']:>10.1f}{row['break_step']:>9.2f}")
+    for stage in args.table:
+        print(f'\nstage {stage}')
+        print(f'{"note":<6}{"name":<6}{"pitch hz":>10}{"kg-f":>9}{"% brk":>8}')
+        for note, name, pitch, force, percent in plan.stage_table(stage):
+            print(f'{note:<6}{name:<6}{pitch:>10.2f}{force:>9.2f}{percent:>8.1f}')
+
+
+def _outlier_designs(paths: typing.Iterable[str]) -> typing.Iterator[tuple[str, typing.Callable[[], dict]]]:
+    """ (label, loader) of every design file, every json file within directories and every design in archives """
+    for path in map(pathlib.Path, paths):
+        if path.suffix != '.sqlite':
+            yield from ((str(f_), lambda f_=f_: load_design(f_)) for f_ in _design_files([str(path)]))
+            continue
+        archive = DesignArchive(path)
+        try:
+            for instrument_id, file, *_ in archive.instruments():
+                yield f'{path}:{file}', lambda i_=instrument_id: archive.document(i_)
+        finally:
+            archive.close()
+
+
+def _print_outliers(args: argparse.Namespace):
+    fit_options = curve_fitting.FitOptions(args.method, args.degree, args.smoothing, args.threshold)
+    print(f'{"design":<40}{"note":>6}{"name":>6}{"value":>10}{"trend":>10}{"dev %":>8}')
+    for label, load in _outlier_designs(args.paths):
+        try:
+            fit = curve_fitting.fit_design(load(), args.field, fit_options)
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            print(f'{label:<40} skipped, {e}')
+            continue
+        deviation = fit.deviation_percent
+        for i in numpy.flatnonzero(fit.outlier).tolist():
+            note = int(fit.note_number[i])
+            print(f'{label:<40}{note:>6}{general_functions.note_number_to_name(note):>6}{fit.value[i]:>10.4g}'
+                  f'{fit.fitted[i]:>10.4g}{deviation[i]:>8.1f}')
+
+
+def main(argv: typing.Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(description="String Calculator batch tools")
+    parser.add_argument('--cache', help="directory to keep results in between runs")
+    parser.add_argument('--cache-age', type=float, default=result_cache.cache.max_age_sec,
+                        help="seconds a cached result is kept")
+    commands = parser.add_subparsers(required=True)
+
+    temperaments = commands.add_parser('temperaments', help="evaluate designs in every temperament")
+    temperaments.add_argument('files', nargs='+')
+    temperaments.set_defaults(func=_print_temperaments)
+
+    index = commands.add_parser('index', help="add new or changed designs in a directory to a similarity index")
+    index.add_argument('directory')
+    index.add_argument('--index', default='designs.npz')
+    index.set_defaults(func=_update_index)
+
+    similar = commands.add_parser('similar', help="find the most similar designs in a similarity index")
+    similar.add_argument('files', nargs='+')
+    similar.add_argument('--index', default='designs.npz')
+    similar.add_argument('-k', type=int, default=5)
+    similar.set_defaults(func=_print_similar)
+
+    cuts = commands.add_parser('cutlist', help="cut list of one or more designs, packed onto shared spools")
+    cuts.add_argument('files', nargs='+')
+    cuts.add_argument('--hitch', type=float, default=cut_list.DEFAULT_HITCH_ALLOWANCE_MM, help="hitch allowance mm")
+    cuts.add_argument('--pin', type=float, default=cut_list.DEFAULT_PIN_ALLOWANCE_MM, help="tuning pin allowance mm")
+    cuts.add_argument('--spool', type=float, default=cut_list.DEFAULT_SPOOL_LENGTH_MM, help="spool length mm")
+    cuts.add_argument('--csv', help="file to write every cut to")
+    cuts.set_defaults(func=_print_cut_list)
+
+    pitch = commands.add_parser('pitch', help="infer the pitch surveyed designs were made for")
+    pitch.add_argument('files', nargs='+', help="design files or directories of design files")
+    pitch.add_argument('--criterion', choices=pitch_inference.CRITERIA, default='stress')
+    pitch.add_argument('--target', type=float, default=None,
+                       help="most plausible percent of break, or tension per wire in kg-f")
+    pitch.add_argument('--min', type=float, default=370.0)
+    pitch.add_argument('--max', type=float, default=500.0)
+    pitch.add_argument('--step', type=float, default=0.5)
+    pitch.add_argument('--transpose', type=int, nargs=2, default=(0, 0), metavar=('LOWEST', 'HIGHEST'),
+                       help="range of transpositions in semitones")
+    pitch.add_argument('--notes', type=int, nargs=2, default=None, metavar=('LOWEST', 'HIGHEST'),
+                       help="only score notes in this range")
+    pitch.set_defaults(func=_print_pitch)
+
+    derived = commands.add_parser('columns', help="every note with its base and derived columns, as csv")
+    derived.add_argument('files', nargs='+', help="design files or directories of design files")
+    derived.add_argument('--define', type=_definition, action='append', default=[], metavar='NAME=EXPRESSION',
+                         help="add or replace a derived column, see interface.derived_columns")
+    derived.add_argument('--csv', help="file to write to, named after each design when there are several")
+    derived.set_defaults(func=_print_columns)
+
+    compare = commands.add_parser('diff', help="changes per note between two designs, or along revisions")
+    compare.add_argument('paths', nargs='+', help="old and new design files, or one directory of revisions")
+    compare.add_argument('--all', action='store_true', help="list unchanged notes as well")
+    compare.set_defaults(func=_print_diff)
+
+    overlay = commands.add_parser('overlay', help="percentiles of a field over many designs, optionally as a png")
+    overlay.add_argument('paths', nargs='+', help="design files, directories of design files or .sqlite archives")
+    overlay.add_argument('--field', choices=tuple(archive_overlay.FIELDS), default='force')
+    overlay.add_argument('--curves', type=int, default=archive_overlay.DEFAULT_MAX_CURVES,
+                         help="most designs drawn as lines")
+    overlay.add_argument('--density', action='store_true', help="draw a density image instead of lines")
+    overlay.add_argument('--highlight', help="design file drawn on top")
+    overlay.add_argument('--png', help="file to draw the overlay to")
+    overlay.add_argument('--size', type=int, nargs=2, default=(1200, 800), metavar=('WIDTH', 'HEIGHT'))
+    overlay.set_defaults(func=_print_overlay)
+
+    front = commands.add_parser('pareto', help="explore schedules of gauges and materials for the scale of a design")
+    front.add_argument('file')
+    front.add_argument('--batches', type=int, default=100)
+    front.add_argument('--batch-size', type=int, default=pareto.DEFAULT_BATCH_SIZE)
+    front.add_argument('--workers', type=int, default=None, help="worker processes, 0 to run in this process")
+    front.add_argument('--seed', type=int, default=None)
+    front.add_argument('--ranges', type=int, default=pareto.DEFAULT_MAX_RANGES, help="most ranges of one gauge")
+    front.add_argument('--price', type=_price, action='append', default=[], metavar='CODE=PRICE',
+                       help="price per kg of a material, 1 when not given")
+    front.add_argument('--pick', choices=('balanced',) + pareto.OBJECTIVES, default='balanced',
+                       help="candidate to write to --out")
+    front.add_argument('--show', type=int, default=20, help="candidates to list, cheapest first")
+    front.add_argument('--out', help="file to write the picked candidate to")
+    front.set_defaults(func=_print_pareto)
+
+    raise_ = commands.add_parser('raise', help="stages raising the pitch of a design within load limits")
+    raise_.add_argument('file')
+    raise_.add_argument('--to', type=float, default=pitch_raise.DEFAULT_TARGET_PITCH, help="target pitch in hz")
+    raise_.add_argument('--range', nargs=3, action='append', default=[], metavar=('LOWEST', 'HIGHEST', 'PITCH'),
+                        help="notes with their own target pitch, e.g. C1 B2 430, may be repeated")
+    raise_.add_argument('--order', choices=pitch_raise.ORDERS, default='together')
+    raise_.add_argument('--load-step', type=float, default=pitch_raise.DEFAULT_MAX_LOAD_STEP,
+                        help="largest increase of the frame load in a stage, percent")
+    raise_.add_argument('--break-step', type=float, default=pitch_raise.DEFAULT_MAX_BREAK_STEP,
+                        help="largest increase in percent of break of a string in a stage")
+    raise_.add_argument('--max-break', type=float, default=pitch_raise.DEFAULT_MAX_PERCENT_OF_BREAK,
+                        help="highest percent of break of any string after the raise")
+    raise_.add_argument('--max-stages', type=int, default=pitch_raise.DEFAULT_MAX_STAGES)
+    raise_.add_argument('--table', type=int, nargs='*', default=[], help="stages to print the tension table of")
+    raise_.set_defaults(func=_print_raise)
+
+    outliers = commands.add_parser('outliers', help="notes far from the trend of their material")
+    outliers.add_argument('paths', nargs='+', help="design files, directories of design files or .sqlite archives")
+    outliers.add_argument('--field', choices=curve_fitting.FIELDS, default='force')
+    outliers.add_argument('--method', choices=curve_fitting.METHODS, default=curve_fitting.DEFAULT_METHOD)
+    outliers.add_argument('--degree', type=int, default=curve_fitting.DEFAULT_DEGREE,
+                          help="degree of the polynomial methods")
+    outliers.add_argument('--smoothing', type=float, default=curve_fitting.DEFAULT_SMOOTHING,
+                          help="smoothing of the spline, larger is smoother")
+    outliers.add_argument('--threshold', type=float, default=curve_fitting.DEFAULT_THRESHOLD_PERCENT,
+                          help="percent from the trend beyond which a note is an outlier")
+    outliers.set_defaults(func=_print_outliers)
+
+    args = parser.parse_args(argv)
+    result_cache.cache.max_age_sec = args.cache_age
+    result_cache.cache.use_directory(args.cache)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
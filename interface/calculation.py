@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import typing
+from math import pi
+
+import numpy
+
+from interface import general_functions, result_cache, wound_strings
+from interface.material_and_measures import WireMaterial
+from interface.temperament import EQUAL, Temperament
+
+# conversion from g-cm/s² (dyne) to kg-f, matches :class:`Force`
+_dyne_to_kg_force = 0.101971621297793 / 100000
+_kg_force_to_newton = 1 / 0.101971621297793
+
+
+def material_code(material_select: str) -> str:
+    """ get the material code from the text of a material selection, '1 Rose Iron' -> '1' """
+    return str(material_select).split(' ')[0]
+
+
+def material_density(material_select: str) -> float:
+    """ density in g/cm³ of a material selection, nan when the material is unknown """
+    material = WireMaterial.get_by_code(material_code(material_select))
+    if material is None:
+        return numpy.nan
+    return material.density.g_cm3()
+
+
+def material_tensile_strength(material_select: str) -> float:
+    """ tensile strength in MPa of a material selection, nan when the material or its strength is unknown """
+    material = WireMaterial.get_by_code(material_code(material_select))
+    if material is None or material.tensile_strength is None:
+        return numpy.nan
+    return material.tensile_strength.mpa()
+
+
+def tensions(frequency: numpy.ndarray, length_mm: numpy.ndarray, diameter_mm: numpy.ndarray,
+             density_g_cm3: numpy.ndarray, wire_count: numpy.ndarray) -> numpy.ndarray:
+    """
+    vectorized version of :meth:`Note.get_force`, `T = πf²L²d²δ` for every string at once
+    :return: tension of each note in kg-f
+    """
+    gcm = pi * frequency ** 2 * (length_mm / 10) ** 2 * (diameter_mm / 10) ** 2 * density_g_cm3
+    return gcm * wire_count * _dyne_to_kg_force
+
+
+def stresses(tension_kg_force: numpy.ndarray, diameter_mm: numpy.ndarray, wire_count: numpy.ndarray
+             ) -> numpy.ndarray:
+    """
+    stress in each wire of a note, tension is shared between `wire_count` wires
+    :return: stress in MPa (N/mm²)
+    """
+    area_mm2 = pi * diameter_mm ** 2 / 4
+    return tension_kg_force * _kg_force_to_newton / (area_mm2 * wire_count)
+
+
+class NoteArrays:
+    """
+    Column arrays of every note in an instrument, built from a :meth:`Instrument.state_export` document,
+    used to calculate the whole compass in single numpy operations without any tk variables
+    """
+    name: str
+    pitch: float
+    temperament: Temperament
+    reference_note: int
+    note_number: numpy.ndarray
+    material: numpy.ndarray
+    length: numpy.ndarray
+    diameter: numpy.ndarray
+    wire_count: numpy.ndarray
+    density: numpy.ndarray
+    tensile_strength: numpy.ndarray
+    wrap_material: numpy.ndarray
+    wrap_diameter: numpy.ndarray
+    wrap_layers: numpy.ndarray
+    wrap_density: numpy.ndarray
+    equivalent_density: numpy.ndarray
+
+    def __init__(self, data: dict):
+        """
+        :param data: dict in the format given by :meth:`Instrument.state_export`
+        """
+        self.name = data.get('inst_name', '')
+        self.pitch = float(data['pitch'])
+        self.temperament = temperament_from_state(data)
+        self.reference_note = general_functions.note_name_to_number(str(data.get('reference_note', 49)))
+
+        notes = sorted(((int(k), n_) for k, n_ in data['notes'].items()), key=lambda kn: kn[0])
+        self.note_number = numpy.array([k for k, _ in notes], dtype=int)
+        self.material = numpy.array([str(n_['_material_select']) for _, n_ in notes], dtype=object)
+        self.length = numpy.array([_float_or_nan(n_['_length']) for _, n_ in notes], dtype=float)
+        self.diameter = numpy.array([_float_or_nan(n_['_diameter']) for _, n_ in notes], dtype=float)
+        self.wire_count = numpy.array([_float_or_nan(n_['_wire_count']) for _, n_ in notes], dtype=float)
+        # a design uses few materials, each is looked up once
+        materials, index = numpy.unique(self.material.astype(str), return_inverse=True)
+        self.density = numpy.array([material_density(m_) for m_ in materials], dtype=float)[index]
+        self.tensile_strength = numpy.array([material_tensile_strength(m_) for m_ in materials], dtype=float)[index]
+
+        # wound strings, see :mod:`interface.wound_strings`
+        self.wrap_layers = numpy.array([int(n_.get('_wrap_layers') or 0) for _, n_ in notes], dtype=int)
+        self.wrap_material = numpy.array([str(n_.get('_wrap_material', '')) for _, n_ in notes], dtype=object)
+        self.wrap_diameter = numpy.array([_float_or_nan(n_.get('_wrap_diameter')) for _, n_ in notes], dtype=float)
+        self.update_wrap_density()
+
+    def update_wrap_density(self):
+        """ recalculate :attr:`equivalent_density` after changing the material or wrap arrays """
+        if not self.wrap_layers.any():
+            # plain wire instruments skip the wound string calculation
+            self.wrap_density = numpy.full(len(self), numpy.nan)
+            self.equivalent_density = self.density
+            return
+        self.wrap_density = numpy.array([material_density(m_) if l_ else numpy.nan
+                                         for m_, l_ in zip(self.wrap_material, self.wrap_layers)], dtype=float)
+        self.equivalent_density = wound_strings.equivalent_density(
+            self.diameter, self.density, self.wrap_diameter, self.wrap_density, self.wrap_layers)
+
+    def __len__(self):
+        return self.note_number.size
+
+    def frequencies(self, temperament: Temperament | None = None, pitch: float | None = None) -> numpy.ndarray:
+        """ frequency of every note in hz, optionally overriding the saved temperament or pitch """
+        temperament = self.temperament if temperament is None else temperament
+        pitch = self.pitch if pitch is None else pitch
+        return temperament.frequencies(self.note_number, pitch, self.reference_note)
+
+    def forces(self, frequency: numpy.ndarray | None = None) -> numpy.ndarray:
+        """ tension of every note in kg-f, frequencies default to :meth:`frequencies` """
+        frequency = self.frequencies() if frequency is None else frequency
+        return tensions(frequency, self.length, self.diameter, self.equivalent_density, self.wire_count)
+
+    def stresses(self, force: numpy.ndarray | None = None) -> numpy.ndarray:
+        """ stress in each wire in MPa, forces (kg-f) default to :meth:`forces` """
+        force = self.forces() if force is None else force
+        return stresses(force, self.diameter, self.wire_count)
+
+    def percent_of_break(self, force: numpy.ndarray | None = None) -> numpy.ndarray:
+        """ stress in each wire as a percentage of the tensile strength of its material """
+        return self.stresses(force) / self.tensile_strength * 100
+
+
+def _float_or_nan(value: typing.Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return numpy.nan
+
+
+def temperament_from_state(data: dict) -> Temperament:
+    """
+    get the temperament saved in a :meth:`Instrument.state_export` document,
+    unknown names with a saved cents table give a temperament of the document's own, which is not registered
+    """
+    name = data.get('temperament', EQUAL.name)
+    try:
+        return Temperament.get_by_name(name)
+    except KeyError:
+        if 'temperament_cents' not in data:
+            raise
+        return Temperament(name, data['temperament_cents'], register=False)
+
+
+# kind of the cached columns, the version is raised whenever columns are added so a cache directory
+# written by an older version is not read back without them
+_note_columns_kind = 'note_columns/2'
+
+
+def note_columns(data: dict) -> dict[str, numpy.ndarray]:
+    """
+    note numbers, material codes, length (mm), diameter (mm), wire count, density (g/cm³, equivalent density
+    of wound strings), tensile strength (MPa), frequency (hz), force (kg-f), stress (MPa) and percent of break
+    of every note,
+    kept in :data:`result_cache.cache` so unchanged designs are not recalculated
+    :param data: dict in the format given by :meth:`Instrument.state_export`
+    """
+    def compute():
+        arrays = NoteArrays(data)
+        frequency = arrays.frequencies()
+        force = arrays.forces(frequency)
+        stress = arrays.stresses(force)
+        return dict(note_number=arrays.note_number,
+                    material=numpy.array([material_code(m_) for m_ in arrays.material], dtype=object),
+                    length=arrays.length, diameter=arrays.diameter, wire_count=arrays.wire_count,
+                    density=arrays.equivalent_density, tensile_strength=arrays.tensile_strength,
+                    frequency=frequency, force=force, stress=stress,
+                    percent_of_break=stress / arrays.tensile_strength * 100)
+
+    return result_cache.cache.get_or_compute(result_cache.content_key(_note_columns_kind, data), compute)
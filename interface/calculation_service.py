@@ -0,0 +1,350 @@
+"""
+Local HTTP/JSON service for other tools that need string tensions without the interface, usage::
+
+    python -m interface.calculation_service --port 8765 --workers 4
+
+Requests and responses are JSON, instruments are in the :meth:`Instrument.state_export` format::
+
+    POST  /calculate        instrument document, returns the results
+    PUT   /designs/<name>   store an instrument document, returns the results
+    PATCH /designs/<name>   update stored fields and notes, e.g. {"pitch": 415, "notes": {"49": {"_diameter": 0.3}}}
+    GET   /designs/<name>   results of a stored instrument
+    GET   /materials        the wire material catalogue
+    GET   /health
+
+Results are columns, one value per note: note_number, frequency (hz), force_kgf, stress_mpa and percent_of_break,
+values that cannot be calculated are null. \n
+Calculations run in a process pool. Requests arriving together are sent to the workers in batches,
+identical requests waiting for a result share one calculation and finished results are kept in
+:data:`result_cache.cache`. Each worker loads the material catalogue of the service once when it starts.
+See testing/service_load_test.py for a load test.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import concurrent.futures
+import copy
+import hashlib
+import http
+import json
+import math
+import os
+import typing
+
+import numpy
+
+from interface import result_cache
+from interface.calculation import NoteArrays
+from interface.material_and_measures import Density, Stress, WireMaterial
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 8 * 1024 * 1024
+# most documents sent to a worker in one call
+MAX_BATCH = 64
+
+
+def _catalogue() -> list[tuple[str, str, float, float | None]]:
+    """ the material catalogue as (code, name, density g/cm³, tensile strength MPa) """
+    return [(m_.code, m_.name, m_.density.g_cm3(),
+             None if m_.tensile_strength is None else m_.tensile_strength.mpa())
+            for m_ in WireMaterial.material_objects()]
+
+
+def _load_catalogue(catalogue: list[tuple[str, str, float, float | None]]):
+    """ process pool initializer, replace the worker's materials with the catalogue of the service """
+    for material in WireMaterial.material_objects():
+        material.delete()
+    for code, name, density, tensile_strength in catalogue:
+        WireMaterial(code, name, Density(g_cm3=density),
+                     None if tensile_strength is None else Stress(mpa=tensile_strength))
+
+
+def _column(values: numpy.ndarray) -> list[float | None]:
+    return [v_ if math.isfinite(v_) else None for v_ in values.tolist()]
+
+
+def calculate_documents(documents: list[dict]) -> list[dict]:
+    """
+    calculate a batch of instruments, run in the worker processes
+    :return: results for each document, or a dict with an `error` message
+    """
+    results = []
+    for data in documents:
+        try:
+            arrays = NoteArrays(data)
+            frequency = arrays.frequencies()
+            force = arrays.forces(frequency)
+            stress = arrays.stresses(force)
+            with numpy.errstate(invalid='ignore', divide='ignore'):
+                percent_of_break = stress / arrays.tensile_strength * 100
+        # AttributeError when the notes are not an object
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            results.append(dict(error=f'{type(e).__name__}: {e}'))
+            continue
+        results.append(dict(name=arrays.name,
+                            pitch=arrays.pitch,
+                            temperament=arrays.temperament.name,
+                            note_number=arrays.note_number.tolist(),
+                            frequency=_column(frequency),
+                            force_kgf=_column(force),
+                            stress_mpa=_column(stress),
+                            percent_of_break=_column(percent_of_break)))
+    return results
+
+
+class RequestError(Exception):
+    """ request that cannot be answered, becomes an error response with `status` """
+
+    def __init__(self, status: http.HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class CalculationBatcher:
+    """
+    Collects the calculations requested during one pass of the event loop and sends them to the
+    process pool in batches, spread over the workers. Requests for a key already waiting for a result
+    share its future instead of starting another calculation.
+    """
+    _pending: list[tuple[str, dict]]
+    _in_flight: dict[str, asyncio.Future]
+
+    def __init__(self, executor: concurrent.futures.Executor, workers: int, max_batch: int = MAX_BATCH):
+        self.executor = executor
+        self.workers = workers
+        self.max_batch = max_batch
+        self._pending = []
+        self._in_flight = dict()
+        self._flush_scheduled = False
+        # workers keep the catalogue they started with
+        self.catalogue_version = WireMaterial.catalogue_version().encode('ascii')
+        self.calculations = 0
+        self.shared = 0
+
+    async def calculate(self, data: dict, body: bytes | None = None) -> dict:
+        """
+        :param data: instrument document
+        :param body: the request body `data` was read from, hashing it is quicker than hashing `data`
+        """
+        if body is None:
+            key = result_cache.content_key('service', data)
+        else:
+            key = hashlib.sha256(b'service' + self.catalogue_version + body).hexdigest()
+        result = result_cache.cache.get(key)
+        if result is not None:
+            return result
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._in_flight[key] = loop.create_future()
+            self._pending.append((key, data))
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                loop.call_soon(self._flush)
+        else:
+            self.shared += 1
+        # shielded, a client disconnecting must not cancel a result other clients are waiting for
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+        size = min(max(math.ceil(len(pending) / self.workers), 1), self.max_batch)
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(pending), size):
+            batch = pending[start:start + size]
+            self.calculations += len(batch)
+            try:
+                future = loop.run_in_executor(self.executor, calculate_documents, [d_ for _, d_ in batch])
+            except RuntimeError as e:
+                # executor shut down or broken
+                self._resolve(batch, None, e)
+                continue
+            future.add_done_callback(lambda f_, batch=batch: self._done(batch, f_))
+
+    def _done(self, batch: list[tuple[str, dict]], future: asyncio.Future):
+        if future.cancelled():
+            self._resolve(batch, None, asyncio.CancelledError())
+        elif future.exception() is not None:
+            self._resolve(batch, None, future.exception())
+        else:
+            self._resolve(batch, future.result(), None)
+
+    def _resolve(self, batch: list[tuple[str, dict]], results: list[dict] | None, error: BaseException | None):
+        for i_, (key, _) in enumerate(batch):
+            future = self._in_flight.pop(key)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+                continue
+            result = results[i_]
+            if 'error' not in result:
+                result_cache.cache.put(key, result)
+            future.set_result(result)
+
+
+class CalculationService:
+    """ asyncio HTTP/1.1 server with keep-alive, see the module documentation for the API """
+    designs: dict[str, dict]
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int | None = None):
+        """
+        :param host: address to listen on, the service has no authentication so keep it local
+        :param port: port to listen on, 0 for any free port
+        :param workers: number of worker processes, defaults to the number of CPUs
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.designs = dict()
+        self.executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self.batcher: CalculationBatcher | None = None
+        self.server: asyncio.Server | None = None
+
+    async def start(self):
+        self.executor = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=_load_catalogue,
+                                                               initargs=(_catalogue(),))
+        # start every worker now so the first requests do not wait for processes to load
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(self.executor, calculate_documents, [])
+                               for _ in range(self.workers)))
+        self.batcher = CalculationBatcher(self.executor, self.workers)
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f'calculation service on http://{self.host}:{self.port} with {self.workers} workers')
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                if length > MAX_BODY_BYTES:
+                    status, payload = http.HTTPStatus.REQUEST_ENTITY_TOO_LARGE, dict(error='request too large')
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self._respond(method, target, body)
+                content = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+                writer.write(f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                             f'Content-Type: application/json\r\n'
+                             f'Content-Length: {len(content)}\r\n'
+                             f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1')
+                             + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, body: bytes) -> tuple[http.HTTPStatus, typing.Any]:
+        try:
+            return http.HTTPStatus.OK, await self._route(method, target.split('?')[0].rstrip('/'), body)
+        except RequestError as e:
+            return e.status, dict(error=str(e))
+        except Exception as e:
+            return http.HTTPStatus.INTERNAL_SERVER_ERROR, dict(error=f'{type(e).__name__}: {e}')
+
+    async def _route(self, method: str, path: str, body: bytes) -> typing.Any:
+        if path == '/health' and method == 'GET':
+            return dict(status='ok', workers=self.workers, designs=len(self.designs),
+                        calculations=self.batcher.calculations, shared=self.batcher.shared)
+        if path == '/materials' and method == 'GET':
+            return [dict(code=c_, name=n_, density_g_cm3=d_, tensile_strength_mpa=t_)
+                    for c_, n_, d_, t_ in _catalogue()]
+        if path == '/calculate' and method == 'POST':
+            return await self._calculate(_json_object(body), body)
+        if path.startswith('/designs/'):
+            name = path[len('/designs/'):]
+            if method == 'PUT':
+                data = _json_object(body)
+                result = await self._calculate(data, body)
+                self.designs[name] = data
+                return result
+            if name not in self.designs:
+                raise RequestError(http.HTTPStatus.NOT_FOUND, f'no design named {name!r}')
+            if method == 'GET':
+                return await self._calculate(self.designs[name])
+            if method == 'PATCH':
+                data = _merge(self.designs[name], _json_object(body))
+                result = await self._calculate(data)
+                self.designs[name] = data
+                return result
+            raise RequestError(http.HTTPStatus.METHOD_NOT_ALLOWED, f'{method} is not supported for designs')
+        raise RequestError(http.HTTPStatus.NOT_FOUND, f'{method} {path} not found')
+
+    async def _calculate(self, data: dict, body: bytes | None = None) -> dict:
+        result = await self.batcher.calculate(data, body)
+        if 'error' in result:
+            raise RequestError(http.HTTPStatus.BAD_REQUEST, result['error'])
+        return result
+
+
+def _json_object(body: bytes) -> dict:
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise RequestError(http.HTTPStatus.BAD_REQUEST, f'invalid json, {e}') from None
+    if not isinstance(data, dict):
+        raise RequestError(http.HTTPStatus.BAD_REQUEST, 'expected a json object')
+    return data
+
+
+def _merge(data: dict, update: dict) -> dict:
+    """ copy of `data` with the instrument fields and note fields in `update` replaced """
+    notes = update.get('notes', {})
+    if not isinstance(notes, dict):
+        raise RequestError(http.HTTPStatus.BAD_REQUEST, 'notes must be an object of notes')
+    data = copy.deepcopy(data)
+    for key, value in update.items():
+        if key != 'notes':
+            data[key] = value
+    for key, fields in notes.items():
+        if not isinstance(fields, dict):
+            raise RequestError(http.HTTPStatus.BAD_REQUEST, f'note {key} must be an object of fields')
+        data.setdefault('notes', {}).setdefault(str(key), {}).update(fields)
+    return data
+
+
+def main(argv: typing.Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(description="String Calculator calculation service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, defaults to the CPU count")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(CalculationService(args.host, args.port, args.workers).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Trend curves of the tension (or diameter) of every note, fitted separately to each run of notes of one material,
+and the notes far from their trend. \n
+A single mis-entered diameter pulls a least squares line towards it, so the default fit is robust:
+
+- ``least squares``, a polynomial of `degree`, the old trend line when the degree is 1
+- ``huber``, the same polynomial refitted with Huber weights, points far from the curve count linearly, not squared
+- ``ransac``, the polynomial through `degree` + 1 notes agreeing with the most other notes, refitted to those notes,
+  every candidate of a segment is solved as one stacked array
+- ``spline``, a smoothing spline on the note grid (a Whittaker smoother, the penalised second difference of
+  neighbouring notes) with Huber weights, for curves no low degree polynomial follows \n
+Notes more than `threshold_percent` from their trend are outliers. :func:`fit_design` is kept in
+:data:`result_cache.cache` by the content of the design, so each version of a design is only fitted once.
+"""
+from __future__ import annotations
+
+import itertools
+import math
+import typing
+
+import numpy
+
+from interface import result_cache
+from interface.calculation import note_columns
+
+METHODS = ('least squares', 'huber', 'ransac', 'spline')
+FIELDS = ('force', 'diameter')
+DEFAULT_METHOD = 'spline'
+DEFAULT_DEGREE = 1
+# weight of the second difference penalty of the spline, larger is smoother
+DEFAULT_SMOOTHING = 20.0
+DEFAULT_THRESHOLD_PERCENT = 15.0
+# residuals beyond this many robust standard deviations are down-weighted by the Huber fits
+HUBER_K = 1.345
+MAX_RANSAC_TRIALS = 2000
+_iterations = 30
+
+
+class FitOptions(typing.NamedTuple):
+    method: str = DEFAULT_METHOD
+    degree: int = DEFAULT_DEGREE
+    smoothing: float = DEFAULT_SMOOTHING
+    threshold_percent: float = DEFAULT_THRESHOLD_PERCENT
+
+
+# used by the plots and the note grid, changed from the Trend menu
+options = FitOptions()
+
+
+class CurveFit:
+    """ the value and trend of every note, in the order of the notes given """
+    note_number: numpy.ndarray
+    value: numpy.ndarray
+    fitted: numpy.ndarray
+    segment: numpy.ndarray
+    options: FitOptions
+
+    def __init__(self, note_number: numpy.ndarray, value: numpy.ndarray, fitted: numpy.ndarray,
+                 segment: numpy.ndarray, fit_options: FitOptions):
+        self.note_number = note_number
+        self.value = value
+        self.fitted = fitted
+        self.segment = segment
+        self.options = fit_options
+
+    @property
+    def deviation_percent(self) -> numpy.ndarray:
+        """ difference of each value from its trend as a percentage of the trend, nan where either is unknown """
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return (self.value - self.fitted) / numpy.abs(self.fitted) * 100
+
+    @property
+    def outlier(self) -> numpy.ndarray:
+        with numpy.errstate(invalid='ignore'):
+            return numpy.abs(self.deviation_percent) > self.options.threshold_percent
+
+    @property
+    def outliers(self) -> numpy.ndarray:
+        """ note numbers of the outliers """
+        return self.note_number[self.outlier]
+
+    def line(self) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """ (x, y) of the trend for drawing, with a gap between segments """
+        breaks = numpy.flatnonzero(numpy.diff(self.segment)) + 1
+        x = numpy.insert(self.note_number.astype(float), breaks, numpy.nan)
+        y = numpy.insert(self.fitted, breaks, numpy.nan)
+        return x, y
+
+
+def segment_ids(material: numpy.ndarray) -> numpy.ndarray:
+    """ number of each run of notes of one material, the runs split by the string change markers of the plots """
+    material = numpy.asarray(material)
+    if not material.size:
+        return numpy.zeros(0, dtype=int)
+    return numpy.concatenate(([0], numpy.cumsum(material[1:] != material[:-1])))
+
+
+def _basis(x: numpy.ndarray, degree: int) -> numpy.ndarray:
+    """ polynomial basis of x scaled to -1..1, so high degrees stay well conditioned """
+    half = (x.max() - x.min()) / 2
+    t = (x - (x.max() + x.min()) / 2) / half if half > 0 else numpy.zeros(x.shape)
+    return numpy.vander(t, degree + 1, increasing=True)
+
+
+def _robust_scale(residual: numpy.ndarray) -> float:
+    """ standard deviation estimated from the median absolute deviation, never 0 """
+    mad = 1.4826 * numpy.median(numpy.abs(residual - numpy.median(residual)))
+    return float(mad) if mad > 0 else float(numpy.mean(numpy.abs(residual))) or 1e-12
+
+
+def _huber_weights(residual: numpy.ndarray, scale: float) -> numpy.ndarray:
+    return 1 / numpy.maximum(numpy.abs(residual) / (HUBER_K * scale), 1)
+
+
+def _converged(refitted: numpy.ndarray, fitted: numpy.ndarray, scale: float) -> bool:
+    """ the curve moved by less than a millionth of the spread of the residuals """
+    return float(numpy.max(numpy.abs(refitted - fitted))) <= 1e-6 * scale
+
+
+def _weighted_polynomial(basis: numpy.ndarray, y: numpy.ndarray, weight: numpy.ndarray) -> numpy.ndarray:
+    weighted = basis.T * weight
+    try:
+        # normal equations of a few coefficients, much quicker than lstsq for the many small fits of a design
+        coefficients = numpy.linalg.solve(weighted @ basis, weighted @ y)
+    except numpy.linalg.LinAlgError:
+        root = numpy.sqrt(weight)
+        coefficients = numpy.linalg.lstsq(basis * root[:, None], y * root, rcond=None)[0]
+    return basis @ coefficients
+
+
+def fit_least_squares(x: numpy.ndarray, y: numpy.ndarray, degree: int = DEFAULT_DEGREE) -> numpy.ndarray:
+    return _weighted_polynomial(_basis(x, degree), y, numpy.ones(y.shape))
+
+
+def fit_huber(x: numpy.ndarray, y: numpy.ndarray, degree: int = DEFAULT_DEGREE) -> numpy.ndarray:
+    """
+    polynomial fitted by iteratively reweighted least squares with Huber weights,
+    the scale of the residuals is estimated once from the least squares fit
+    """
+    basis = _basis(x, degree)
+    fitted = _weighted_polynomial(basis, y, numpy.ones(y.shape))
+    scale = _robust_scale(y - fitted)
+    for _ in range(_iterations):
+        refitted = _weighted_polynomial(basis, y, _huber_weights(y - fitted, scale))
+        converged = _converged(refitted, fitted, scale)
+        fitted = refitted
+        if converged:
+            break
+    return fitted
+
+
+def fit_ransac(x: numpy.ndarray, y: numpy.ndarray, degree: int = DEFAULT_DEGREE,
+               threshold_percent: float = DEFAULT_THRESHOLD_PERCENT, seed: int = 0) -> numpy.ndarray:
+    """
+    the polynomial through `degree` + 1 notes with the most notes within `threshold_percent` of it,
+    refitted by least squares to those notes. Every subset is tried when there are at most
+    :data:`MAX_RANSAC_TRIALS`, otherwise that many random subsets
+    """
+    size = degree + 1
+    basis = _basis(x, degree)
+    if y.size <= size:
+        return _weighted_polynomial(basis, y, numpy.ones(y.shape))
+    if math.comb(y.size, size) <= MAX_RANSAC_TRIALS:
+        subsets = numpy.array(list(itertools.combinations(range(y.size), size)))
+    else:
+        rng = numpy.random.default_rng(seed)
+        subsets = numpy.argsort(rng.random((MAX_RANSAC_TRIALS, y.size)), axis=1)[:, :size]
+    # (trials × size × size) systems solved together, notes have distinct x so none are singular
+    coefficients = numpy.linalg.solve(basis[subsets], y[subsets][..., None])[..., 0]
+    predicted = coefficients @ basis.T
+    residual = numpy.abs(y - predicted)
+    inlier = residual <= threshold_percent / 100 * numpy.abs(predicted)
+    error = numpy.where(inlier, residual ** 2, 0).sum(axis=1)
+    # most inliers, then the smallest error over them
+    best = numpy.lexsort((error, -inlier.sum(axis=1)))[0]
+    return _weighted_polynomial(basis, y, inlier[best].astype(float))
+
+
+def fit_spline(x: numpy.ndarray, y: numpy.ndarray, smoothing: float = DEFAULT_SMOOTHING) -> numpy.ndarray:
+    """
+    smoothing spline on the grid of note numbers with Huber weights, notes missing from the grid are
+    interpolated by the penalty alone
+    """
+    position = numpy.rint(x - x.min()).astype(int)
+    size = int(position.max()) + 1
+    if size < 3:
+        return fit_least_squares(x, y, min(1, y.size - 1))
+    difference = numpy.diff(numpy.eye(size), 2, axis=0)
+    penalty = smoothing * difference.T @ difference
+    target = numpy.zeros(size)
+    target[position] = y
+    grid_weight = numpy.zeros(size)
+    grid_weight[position] = 1.0
+    fitted = numpy.linalg.solve(numpy.diag(grid_weight) + penalty, target * grid_weight)[position]
+    scale = _robust_scale(y - fitted)
+    for _ in range(_iterations):
+        grid_weight[position] = _huber_weights(y - fitted, scale)
+        refitted = numpy.linalg.solve(numpy.diag(grid_weight) + penalty, target * grid_weight)[position]
+        converged = _converged(refitted, fitted, scale)
+        fitted = refitted
+        if converged:
+            break
+    return fitted
+
+
+def fit_curve(note_number: numpy.ndarray, value: numpy.ndarray, segment: numpy.ndarray | None = None,
+              fit_options: FitOptions | None = None) -> CurveFit:
+    """
+    fit each segment on its own
+    :param note_number: note numbers in ascending order
+    :param value: value of each note, nan values are not fitted and have a nan trend
+    :param segment: number of the segment of each note, segments must be runs of neighbouring notes
+    :param fit_options: defaults to :data:`options`
+    """
+    fit_options = options if fit_options is None else fit_options
+    if fit_options.method not in METHODS:
+        raise ValueError(f'method must be one of {", ".join(METHODS)}')
+    note_number = numpy.asarray(note_number)
+    value = numpy.asarray(value, dtype=float)
+    segment = numpy.zeros(note_number.size, dtype=int) if segment is None else numpy.asarray(segment)
+    fitted = numpy.full(value.size, numpy.nan)
+    known = numpy.isfinite(value)
+    breaks = numpy.flatnonzero(numpy.diff(segment)) + 1
+    for members in numpy.split(numpy.arange(value.size), breaks):
+        members = members[known[members]]
+        if not members.size:
+            continue
+        x, y = note_number[members].astype(float), value[members]
+        degree = max(0, min(fit_options.degree, members.size - 1))
+        if fit_options.method == 'least squares':
+            fitted[members] = fit_least_squares(x, y, degree)
+        elif fit_options.method == 'huber':
+            fitted[members] = fit_huber(x, y, degree)
+        elif fit_options.method == 'ransac':
+            fitted[members] = fit_ransac(x, y, degree, fit_options.threshold_percent)
+        else:
+            fitted[members] = fit_spline(x, y, fit_options.smoothing)
+    return CurveFit(note_number, value, fitted, segment, fit_options)
+
+
+def fit_design(data: dict, field: str = 'force', fit_options: FitOptions | None = None) -> CurveFit:
+    """
+    trend of `field` of every note of a design, split where the material changes,
+    kept in :data:`result_cache.cache` so each version of a design is fitted once
+    :param data: dict in the format given by :meth:`Instrument.state_export`
+    :param field: one of :data:`FIELDS`
+    """
+    if field not in FIELDS:
+        raise ValueError(f'field must be one of {", ".join(FIELDS)}')
+    fit_options = options if fit_options is None else fit_options
+
+    def compute():
+        columns = note_columns(data)
+        return fit_curve(columns['note_number'], columns[field], segment_ids(columns['material']), fit_options)
+
+    key = result_cache.content_key('curve_fit', data, field=field, options=fit_options._asdict())
+    return result_cache.cache.get_or_compute(key, compute)
@@ -0,0 +1,196 @@
+"""
+Cut lists for stringing, every wire of every note is cut to its speaking length plus the wire needed
+to reach the hitch pin and to wrap the tuning pin, then packed onto spools of each material and gauge
+with best fit decreasing: cuts are placed longest first on the spool with the least wire left that still fits.
+Cuts of several instruments share spools, so one order can be cut in a single pass. Usage::
+
+    cuts = cut_list([('spinet.json', spinet), ('virginal.json', virginal)])
+    allocations = allocate_spools(cuts, spool_length_mm=50_000)
+    write_csv('cuts.csv', allocations)
+
+Only the core wire of wound strings is listed. Designs whose keys share strings, such as split sharps, are left
+out as the grid has no row for their second strings, see :func:`key_map.shares_strings`.
+"""
+from __future__ import annotations
+
+import bisect
+import csv
+import pathlib
+import typing
+
+import numpy
+
+from interface import general_functions, key_map
+from interface.calculation import NoteArrays, material_code
+
+DEFAULT_HITCH_ALLOWANCE_MM = 60.0
+DEFAULT_PIN_ALLOWANCE_MM = 150.0
+DEFAULT_SPOOL_LENGTH_MM = 100_000.0
+
+# (material code, diameter mm)
+GaugeKey = tuple[str, float]
+
+
+class Cut(typing.NamedTuple):
+    instrument: str
+    note_number: int
+    wire: int
+    material: str
+    diameter_mm: float
+    length_mm: float
+
+
+class Spool:
+    """ a spool of one material and gauge with the cuts taken from it """
+    length_mm: float
+    in_stock: bool
+    cuts: list[Cut]
+
+    def __init__(self, length_mm: float, in_stock: bool = False):
+        """
+        :param in_stock: a part used spool already in stock, rather than a new spool to order
+        """
+        self.length_mm = length_mm
+        self.in_stock = in_stock
+        self.cuts = list()
+        self.remaining_mm = length_mm
+
+    def add(self, cut: Cut):
+        self.cuts.append(cut)
+        self.remaining_mm -= cut.length_mm
+
+
+class GaugeAllocation:
+    """ the spools used for one material and gauge """
+    material: str
+    diameter_mm: float
+    spools: list[Spool]
+
+    def __init__(self, material: str, diameter_mm: float, spools: list[Spool]):
+        self.material = material
+        self.diameter_mm = diameter_mm
+        self.spools = spools
+
+    @property
+    def cut_count(self) -> int:
+        return sum(len(s_.cuts) for s_ in self.spools)
+
+    @property
+    def cut_length_mm(self) -> float:
+        return sum(c_.length_mm for s_ in self.spools for c_ in s_.cuts)
+
+    @property
+    def spool_length_mm(self) -> float:
+        return sum(s_.length_mm for s_ in self.spools)
+
+    @property
+    def new_spools(self) -> int:
+        return sum(not s_.in_stock for s_ in self.spools)
+
+    @property
+    def waste_mm(self) -> float:
+        """ wire left on the spool with the most left is kept, the offcuts left on the other spools are waste """
+        if not self.spools:
+            return 0.0
+        return sum(s_.remaining_mm for s_ in self.spools) - max(s_.remaining_mm for s_ in self.spools)
+
+
+def cut_list(documents: typing.Iterable[tuple[str, dict]],
+             hitch_allowance_mm: float = DEFAULT_HITCH_ALLOWANCE_MM,
+             pin_allowance_mm: float = DEFAULT_PIN_ALLOWANCE_MM) -> list[Cut]:
+    """
+    every wire to cut, notes without a length, diameter or wire count are skipped, as are designs whose keys share
+    strings
+    :param documents: (name, dict in the format given by :meth:`Instrument.state_export`) of each instrument
+    :param hitch_allowance_mm: wire added for the hitch pin end
+    :param pin_allowance_mm: wire added for the tuning pin end
+    """
+    cuts = []
+    for name, data in documents:
+        if key_map.shares_strings(data):
+            continue
+        arrays = NoteArrays(data)
+        valid = numpy.isfinite(arrays.length) & numpy.isfinite(arrays.diameter) & (arrays.wire_count > 0)
+        count = arrays.wire_count[valid].astype(int)
+        # one entry per wire, wire numbers restart at 1 for each note
+        index = numpy.repeat(numpy.flatnonzero(valid), count)
+        wire = numpy.arange(index.size) - numpy.repeat(numpy.cumsum(count) - count, count) + 1
+        length = arrays.length[index] + hitch_allowance_mm + pin_allowance_mm
+        codes = [material_code(m_) for m_ in arrays.material.tolist()]
+        cuts.extend(Cut(name, n_, w_, codes[i_], d_, l_) for i_, n_, w_, d_, l_ in zip(
+            index.tolist(), arrays.note_number[index].tolist(), wire.tolist(),
+            arrays.diameter[index].round(4).tolist(), length.tolist()))
+    return cuts
+
+
+def best_fit_decreasing(cuts: list[Cut], spool_length_mm: float,
+                        stock_mm: typing.Sequence[float] = ()) -> list[Spool]:
+    """
+    pack cuts of one gauge onto spools, new spools are only started when no spool in use or in stock has room
+    :param spool_length_mm: length of a new spool
+    :param stock_mm: lengths of part used spools in stock
+    :raises ValueError: when a cut is longer than a new spool
+    """
+    spools = [Spool(s_, in_stock=True) for s_ in stock_mm]
+    # (remaining, spool index) of every spool, sorted so the tightest fit is found with a binary search
+    remaining = sorted((s_.length_mm, i_) for i_, s_ in enumerate(spools))
+    for cut in sorted(cuts, key=lambda c_: c_.length_mm, reverse=True):
+        position = bisect.bisect_left(remaining, (cut.length_mm, -1))
+        if position == len(remaining):
+            if cut.length_mm > spool_length_mm:
+                raise ValueError(f'{cut.instrument} note {cut.note_number} needs {cut.length_mm:.0f}mm, '
+                                 f'longer than a {spool_length_mm:.0f}mm spool')
+            spools.append(Spool(spool_length_mm))
+            index = len(spools) - 1
+        else:
+            _, index = remaining.pop(position)
+        spools[index].add(cut)
+        bisect.insort(remaining, (spools[index].remaining_mm, index))
+    return [s_ for s_ in spools if s_.cuts]
+
+
+def allocate_spools(cuts: list[Cut], spool_length_mm: float = DEFAULT_SPOOL_LENGTH_MM,
+                    stock: dict[GaugeKey, typing.Sequence[float]] | None = None,
+                    spool_lengths: dict[GaugeKey, float] | None = None) -> list[GaugeAllocation]:
+    """
+    pack the cuts of each material and gauge onto spools, see :func:`best_fit_decreasing`
+    :param spool_length_mm: length of a new spool
+    :param stock: lengths of part used spools in stock for each (material code, diameter)
+    :param spool_lengths: length of a new spool for gauges that differ from `spool_length_mm`
+    :return: allocations sorted by material then diameter
+    """
+    stock = stock or dict()
+    spool_lengths = spool_lengths or dict()
+    groups: dict[GaugeKey, list[Cut]] = dict()
+    for cut in cuts:
+        groups.setdefault((cut.material, cut.diameter_mm), []).append(cut)
+    return [GaugeAllocation(material, diameter, best_fit_decreasing(
+                group, spool_lengths.get((material, diameter), spool_length_mm), stock.get((material, diameter), ())))
+            for (material, diameter), group in sorted(groups.items())]
+
+
+def summary_rows(allocations: list[GaugeAllocation]) -> list[tuple]:
+    """ :return: (material, diameter mm, cuts, cut m, spools, new spools, waste m, waste %) of each gauge """
+    return [(a_.material, a_.diameter_mm, a_.cut_count, round(a_.cut_length_mm / 1000, 2), len(a_.spools),
+             a_.new_spools, round(a_.waste_mm / 1000, 2), round(100 * a_.waste_mm / a_.spool_length_mm, 1))
+            for a_ in allocations]
+
+
+def write_csv(file: str | pathlib.Path | typing.TextIO, allocations: list[GaugeAllocation]):
+    """ write one row per cut, in the order they are cut from each spool """
+    own_file = not hasattr(file, 'write')
+    f = open(file, 'w', newline='') if own_file else file
+    try:
+        writer = csv.writer(f)
+        writer.writerow(('material', 'diameter_mm', 'spool', 'spool_length_mm', 'in_stock',
+                         'instrument', 'note', 'note_name', 'wire', 'cut_length_mm'))
+        for allocation in allocations:
+            for number, spool in enumerate(allocation.spools, 1):
+                for cut in spool.cuts:
+                    writer.writerow((allocation.material, allocation.diameter_mm, number, spool.length_mm,
+                                     int(spool.in_stock), cut.instrument, cut.note_number,
+                                     general_functions.note_number_to_name(cut.note_number), cut.wire,
+                                     round(cut.length_mm, 1)))
+    finally:
+        if own_file:
+            f.close()
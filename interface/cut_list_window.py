@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import pathlib
+import tkinter as tk
+from tkinter import filedialog as tkFile
+from tkinter import messagebox, ttk
+
+from interface import cut_list, key_map
+from interface.workspace import Workspace
+
+csv_file_types = (
+    ('csv files', '*.csv'),
+    ('All files', '*.*')
+)
+
+
+class CutListWindow(tk.Toplevel):
+    """ window summarising the cut list of every instrument open in the workspace """
+    workspace: Workspace
+    allocations: list[cut_list.GaugeAllocation]
+    columns = ('material', 'diameter', 'cuts', 'cut m', 'spools', 'new spools', 'waste m', 'waste %')
+
+    def __init__(self, parent, workspace: Workspace):
+        super(CutListWindow, self).__init__(parent)
+        self.title("Cut List")
+        self.geometry("800x400")
+        self.workspace = workspace
+        self.allocations = list()
+
+        self.hitch_allowance = tk.DoubleVar(self, cut_list.DEFAULT_HITCH_ALLOWANCE_MM)
+        self.pin_allowance = tk.DoubleVar(self, cut_list.DEFAULT_PIN_ALLOWANCE_MM)
+        self.spool_length = tk.DoubleVar(self, cut_list.DEFAULT_SPOOL_LENGTH_MM)
+
+        header = ttk.Frame(self)
+        header.pack(fill='x', side=tk.TOP)
+        for i, (text, var) in enumerate((("Hitch Allowance(mm)", self.hitch_allowance),
+                                         ("Pin Allowance(mm)", self.pin_allowance),
+                                         ("Spool Length(mm)", self.spool_length))):
+            ttk.Label(header, text=text).grid(row=0, column=i)
+            _entry = ttk.Entry(header, textvariable=var)
+            _entry.grid(row=1, column=i, sticky=tk.EW)
+            _entry.bind("<Return>", self.calculate)
+        ttk.Button(header, text="Calculate", command=self.calculate).grid(row=0, column=3, rowspan=2, sticky=tk.S)
+        ttk.Button(header, text="Export CSV", command=self.export).grid(row=0, column=4, rowspan=2, sticky=tk.S)
+
+        self.status = ttk.Label(self, anchor=tk.W)
+        self.status.pack(fill='x', side=tk.TOP)
+        self.table = ttk.Treeview(self, columns=self.columns, show='headings')
+        for col in self.columns:
+            self.table.heading(col, text=col)
+            self.table.column(col, width=80, anchor=tk.E)
+        self.table.pack(fill='both', expand=True, side=tk.BOTTOM)
+        self.calculate()
+
+    def calculate(self, *args):
+        """ pack the cuts of every open instrument onto spools and show the summary """
+        try:
+            self.workspace.save_active()
+            documents = [(d_.title, d_.data) for d_ in self.workspace.documents if d_.data.get('notes')]
+            cuts = cut_list.cut_list(documents, self.hitch_allowance.get(), self.pin_allowance.get())
+            self.allocations = cut_list.allocate_spools(cuts, self.spool_length.get())
+        except (tk.TclError, ValueError, KeyError) as e:
+            messagebox.showerror("Cut List", str(e), parent=self)
+            return
+        self.table.delete(*self.table.get_children())
+        for row in cut_list.summary_rows(self.allocations):
+            self.table.insert('', tk.END, values=row)
+        shared = [t_ for t_, d_ in documents if key_map.shares_strings(d_)]
+        self.status.configure(text=f'{len(cuts)} cuts from {len(documents) - len(shared)} instruments, '
+                                   f'{sum(a_.new_spools for a_ in self.allocations)} new spools'
+                                   + (f', left out {", ".join(shared)} as split keys share strings' if shared else ''))
+
+    def export(self):
+        file = tkFile.asksaveasfilename(title="Export Cut List", filetypes=csv_file_types, parent=self)
+        if not file:
+            return
+        file = pathlib.Path(file)
+        if not file.suffix:
+            file = file.with_suffix('.csv')
+        cut_list.write_csv(file, self.allocations)
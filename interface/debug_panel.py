@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pathlib
+import tkinter as tk
+from tkinter import filedialog as tkFile
+from tkinter import ttk
+
+from interface.profiling import registry
+
+
+class ProfilePanel(tk.Toplevel):
+    """ window showing the hot path timings recorded in :data:`interface.profiling.registry` """
+    refresh_ms = 1000
+    columns = ('count', 'total_ms', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'alloc_kib')
+
+    def __init__(self, parent):
+        super(ProfilePanel, self).__init__(parent)
+        self.title("Profiler")
+        self.geometry("900x300")
+
+        self.enabled = tk.BooleanVar(self, registry.enabled)
+        self.trace_memory = tk.BooleanVar(self, registry.trace_memory)
+
+        header = ttk.Frame(self)
+        header.pack(fill='x', side=tk.TOP)
+        ttk.Checkbutton(header, text="Enabled", variable=self.enabled,
+                        command=self.__toggle).pack(side=tk.LEFT)
+        ttk.Checkbutton(header, text="Trace Memory", variable=self.trace_memory,
+                        command=self.__toggle).pack(side=tk.LEFT)
+        ttk.Button(header, text="Reset", command=self.__reset).pack(side=tk.LEFT)
+        ttk.Button(header, text="Save JSON", command=self.__dump).pack(side=tk.LEFT)
+
+        self.table = ttk.Treeview(self, columns=self.columns)
+        self.table.heading('#0', text='function')
+        self.table.column('#0', width=250)
+        for col in self.columns:
+            self.table.heading(col, text=col)
+            self.table.column(col, width=75, anchor=tk.E)
+        self.table.pack(fill='both', expand=True, side=tk.BOTTOM)
+
+        self.refresh()
+
+    def refresh(self):
+        """ redraw the table, repeats every `refresh_ms` while the panel is open """
+        self.table.delete(*self.table.get_children())
+        for row in registry.summary():
+            values = [row['count']] + [f'{row[col]:.3f}' for col in self.columns[1:]]
+            self.table.insert('', tk.END, text=row['name'], values=values)
+        self._after_id = self.after(self.refresh_ms, self.refresh)
+
+    def destroy(self):
+        self.after_cancel(self._after_id)
+        super(ProfilePanel, self).destroy()
+
+    def __toggle(self):
+        registry.disable()
+        if self.enabled.get():
+            registry.enable(trace_memory=self.trace_memory.get())
+
+    def __reset(self):
+        registry.reset()
+
+    def __dump(self):
+        file = tkFile.asksaveasfilename(title="Save Profile", filetypes=(('json files', '*.json'),))
+        if not file:
+            return
+        file = pathlib.Path(file)
+        if not file.suffix:
+            file = file.with_suffix('.json')
+        registry.dump_json(file)
@@ -0,0 +1,250 @@
+"""
+User defined columns calculated from the fields of every note, e.g. mass per metre or the ratio of each
+tension to the note below. \n
+Expressions are arithmetic over the names in :data:`BASE_COLUMNS`, other derived columns, numbers and the
+functions in :data:`FUNCTIONS`, e.g. ``force / prev(force)``. Each expression is parsed once, checked against
+a whitelist of syntax so nothing but arithmetic can run, and compiled; evaluating it runs the compiled code
+with a numpy array for each name, so the whole compass is one pass of array operations. \n
+Columns are evaluated in dependency order, each column keeps the fingerprint of its inputs and is only
+recomputed when one of them changes. Definitions are saved with the design under ``derived_columns``. Usage::
+
+    columns = DerivedColumns.from_state(data)
+    columns.define('mass', 'pi * diameter ** 2 / 4 * density * count', 'g/m')
+    values = columns.evaluate(data)  # {'mass': array of each note}
+"""
+from __future__ import annotations
+
+import ast
+import csv
+import hashlib
+import pathlib
+import typing
+
+import numpy
+
+from interface import general_functions
+from interface.calculation import note_columns
+
+# name in expressions: key in :func:`note_columns`
+BASE_COLUMNS = dict(note='note_number', frequency='frequency', length='length', diameter='diameter',
+                    count='wire_count', density='density', tensile_strength='tensile_strength', force='force',
+                    stress='stress', percent_of_break='percent_of_break')
+# values that are the same for every note
+SCALARS = ('pitch', 'pi')
+
+
+def _shift(values: numpy.ndarray, offset: int) -> numpy.ndarray:
+    """ value of the note `offset` places higher, nan past either end of the compass """
+    values = numpy.asarray(values, dtype=float)
+    shifted = numpy.full(values.shape, numpy.nan)
+    if offset > 0:
+        shifted[:-offset] = values[offset:]
+    else:
+        shifted[-offset:] = values[:offset]
+    return shifted
+
+
+FUNCTIONS: dict[str, typing.Callable] = dict(
+    sqrt=numpy.sqrt, log=numpy.log, log10=numpy.log10, exp=numpy.exp, abs=numpy.abs, round=numpy.round,
+    min=numpy.minimum, max=numpy.maximum, where=numpy.where,
+    prev=lambda values: _shift(values, -1), next=lambda values: _shift(values, 1))
+
+_allowed_nodes = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+                  ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+                  ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+def parse_expression(expression: str) -> tuple[typing.Any, frozenset[str]]:
+    """
+    check and compile an expression
+    :return: (compiled code, names of the columns it uses)
+    :raises ValueError: for syntax errors and anything other than arithmetic on known names and functions
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f'invalid expression {expression!r}, {e.msg}') from None
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _allowed_nodes):
+            raise ValueError(f'{type(node).__name__} is not allowed in {expression!r}')
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f'only numbers are allowed as constants in {expression!r}')
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ValueError(f'unknown function in {expression!r}, use {", ".join(FUNCTIONS)}')
+        elif isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            names.add(node.id)
+    # numbers are floats so arithmetic on constants alone can not build huge integers
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant):
+            node.value = float(node.value)
+    return compile(tree, f'<{expression}>', 'eval'), frozenset(names)
+
+
+class DerivedColumn:
+    """ a named expression, parsed and compiled once """
+    name: str
+    expression: str
+    unit: str
+    inputs: frozenset[str]
+
+    def __init__(self, name: str, expression: str, unit: str = ''):
+        if not name.isidentifier() or name in BASE_COLUMNS or name in SCALARS or name in FUNCTIONS:
+            raise ValueError(f'{name!r} can not be used as a column name')
+        self.name = name
+        self.expression = expression
+        self.unit = unit
+        self._code, self.inputs = parse_expression(expression)
+
+    @property
+    def title(self) -> str:
+        return f'{self.name}({self.unit})' if self.unit else self.name
+
+    def evaluate(self, namespace: dict[str, typing.Any], size: int) -> numpy.ndarray:
+        try:
+            with numpy.errstate(all='ignore'):
+                values = eval(self._code, {'__builtins__': {}}, namespace)
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise ValueError(f'{self.name} = {self.expression} failed, {e}') from None
+        return numpy.broadcast_to(numpy.asarray(values, dtype=float), (size,)).copy()
+
+    def state_export(self) -> dict:
+        return dict(name=self.name, expression=self.expression, unit=self.unit)
+
+
+def _fingerprint(*parts: typing.Any) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.tobytes() if isinstance(part, numpy.ndarray) else repr(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class DerivedColumns:
+    """ the derived columns of a design, evaluated in dependency order """
+    columns: dict[str, DerivedColumn]
+    evaluations: int
+
+    def __init__(self, columns: typing.Iterable[DerivedColumn] = ()):
+        """ :raises ValueError: see :meth:`order` """
+        # checked together so columns may be listed before the columns they use
+        self.columns = {c_.name: c_ for c_ in columns}
+        self.order()
+        # name: (fingerprint of the inputs, values)
+        self._results: dict[str, tuple[str, numpy.ndarray]] = dict()
+        self.evaluations = 0
+
+    @classmethod
+    def from_state(cls, data: dict) -> DerivedColumns:
+        """ the definitions saved in a :meth:`Instrument.state_export` document """
+        return cls(DerivedColumn(**c_) for c_ in data.get('derived_columns', ()))
+
+    def state_export(self) -> list[dict]:
+        return [c_.state_export() for c_ in self.columns.values()]
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __iter__(self) -> typing.Iterator[DerivedColumn]:
+        return iter(self.columns.values())
+
+    def add(self, column: DerivedColumn):
+        """ add or replace a column, its inputs must be known and must not depend on it """
+        previous = self.columns.get(column.name)
+        self.columns[column.name] = column
+        try:
+            self.order()
+        except ValueError:
+            if previous is None:
+                self.columns.pop(column.name)
+            else:
+                self.columns[column.name] = previous
+            raise
+        self._results.pop(column.name, None)
+
+    def define(self, name: str, expression: str, unit: str = '') -> DerivedColumn:
+        column = DerivedColumn(name, expression, unit)
+        self.add(column)
+        return column
+
+    def remove(self, name: str):
+        """ :raises ValueError: when another column uses this one """
+        users = [c_.name for c_ in self.columns.values() if name in c_.inputs]
+        if users:
+            raise ValueError(f'{name} is used by {", ".join(users)}')
+        self.columns.pop(name)
+        self._results.pop(name, None)
+
+    def order(self) -> list[DerivedColumn]:
+        """
+        columns sorted so each comes after the columns it uses
+        :raises ValueError: for unknown names and circular definitions
+        """
+        ordered: list[DerivedColumn] = []
+        state: dict[str, int] = dict()  # 1 while visiting, 2 once placed
+
+        def visit(column: DerivedColumn, path: tuple[str, ...]):
+            if state.get(column.name) == 2:
+                return
+            if state.get(column.name) == 1:
+                raise ValueError(f'circular definition {" -> ".join(path + (column.name,))}')
+            state[column.name] = 1
+            for name in sorted(column.inputs):
+                if name in self.columns:
+                    visit(self.columns[name], path + (column.name,))
+                elif name not in BASE_COLUMNS and name not in SCALARS:
+                    raise ValueError(f'unknown name {name!r} in {column.name}, use '
+                                     f'{", ".join((*BASE_COLUMNS, *SCALARS, *self.columns))}')
+            state[column.name] = 2
+            ordered.append(column)
+
+        for column in self.columns.values():
+            visit(column, ())
+        return ordered
+
+    def evaluate(self, data: dict, base: dict[str, numpy.ndarray] | None = None) -> dict[str, numpy.ndarray]:
+        """
+        values of every derived column for every note, in the order of :func:`note_columns`
+        :param data: dict in the format given by :meth:`Instrument.state_export`
+        :param base: the result of :func:`note_columns` when already calculated
+        """
+        base = note_columns(data) if base is None else base
+        size = base['note_number'].size
+        namespace: dict[str, typing.Any] = dict(FUNCTIONS, pi=numpy.pi, pitch=float(data['pitch']))
+        fingerprints = dict(pitch=repr(namespace['pitch']), pi='pi')
+        for name, key in BASE_COLUMNS.items():
+            namespace[name] = base[key]
+            fingerprints[name] = _fingerprint(base[key])
+        values = dict()
+        for column in self.order():
+            fingerprint = _fingerprint(column.expression, *(fingerprints[n_] for n_ in sorted(column.inputs)))
+            cached = self._results.get(column.name)
+            if cached is None or cached[0] != fingerprint:
+                self.evaluations += 1
+                cached = (fingerprint, column.evaluate(namespace, size))
+                self._results[column.name] = cached
+            namespace[column.name] = values[column.name] = cached[1]
+            fingerprints[column.name] = fingerprint
+        return {name: values[name] for name in self.columns}
+
+
+def write_csv(file: str | pathlib.Path | typing.TextIO, data: dict, columns: DerivedColumns | None = None):
+    """
+    write one row per note with the base columns and every derived column
+    :param columns: defaults to the columns saved in `data`
+    """
+    columns = DerivedColumns.from_state(data) if columns is None else columns
+    base = note_columns(data)
+    values = columns.evaluate(data, base)
+    own_file = not hasattr(file, 'write')
+    f = open(file, 'w', newline='') if own_file else file
+    try:
+        writer = csv.writer(f)
+        writer.writerow(['note_name', 'material', *BASE_COLUMNS, *(c_.title for c_ in columns)])
+        table = [base[k_].tolist() for k_ in BASE_COLUMNS.values()] + [values[c_.name].tolist() for c_ in columns]
+        for i, row in enumerate(zip(*table)):
+            note = int(base['note_number'][i])
+            writer.writerow([general_functions.note_number_to_name(note), base['material'][i], *row])
+    finally:
+        if own_file:
+            f.close()
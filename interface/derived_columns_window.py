@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import pathlib
+import tkinter as tk
+from tkinter import filedialog as tkFile
+from tkinter import messagebox, ttk
+
+from interface import derived_columns
+from interface.instrument_class import Instrument
+
+csv_file_types = (
+    ('csv files', '*.csv'),
+    ('All files', '*.*')
+)
+
+
+class DerivedColumnsWindow(tk.Toplevel):
+    """ window to define the derived columns of the instrument, see :mod:`interface.derived_columns` """
+    instrument: Instrument
+    columns = ('name', 'expression', 'unit')
+
+    def __init__(self, parent, instrument: Instrument):
+        super(DerivedColumnsWindow, self).__init__(parent)
+        self.title("Derived Columns")
+        self.geometry("700x400")
+        self.instrument = instrument
+
+        self.name = tk.StringVar(self)
+        self.expression = tk.StringVar(self)
+        self.unit = tk.StringVar(self)
+
+        header = ttk.Frame(self)
+        header.pack(fill='x', side=tk.TOP)
+        for i, (text, var, width) in enumerate((("Name", self.name, 12), ("Expression", self.expression, 50),
+                                                ("Unit", self.unit, 8))):
+            ttk.Label(header, text=text).grid(row=0, column=i)
+            _entry = ttk.Entry(header, textvariable=var, width=width)
+            _entry.grid(row=1, column=i, sticky=tk.EW)
+            _entry.bind("<Return>", self.define)
+        header.grid_columnconfigure(1, weight=1)
+        ttk.Button(header, text="Add", command=self.define).grid(row=0, column=3, rowspan=2, sticky=tk.S)
+        ttk.Button(header, text="Remove", command=self.remove).grid(row=0, column=4, rowspan=2, sticky=tk.S)
+        ttk.Button(header, text="Export CSV", command=self.export).grid(row=0, column=5, rowspan=2, sticky=tk.S)
+
+        names = ', '.join((*derived_columns.BASE_COLUMNS, *derived_columns.SCALARS))
+        ttk.Label(self, anchor=tk.W, wraplength=680,
+                  text=f"Names: {names}\nFunctions: {', '.join(derived_columns.FUNCTIONS)}").pack(fill='x')
+        self.table = ttk.Treeview(self, columns=self.columns, show='headings')
+        for col in self.columns:
+            self.table.heading(col, text=col)
+        self.table.column('expression', width=400)
+        self.table.pack(fill='both', expand=True, side=tk.BOTTOM)
+        self.table.bind('<<TreeviewSelect>>', self._on_select)
+        self._fill_table()
+
+    def _fill_table(self):
+        self.table.delete(*self.table.get_children())
+        for column in self.instrument.derived_columns:
+            self.table.insert('', tk.END, iid=column.name, values=(column.name, column.expression, column.unit))
+
+    def _on_select(self, *args):
+        selection = self.table.selection()
+        if selection:
+            column = self.instrument.derived_columns.columns[selection[0]]
+            self.name.set(column.name)
+            self.expression.set(column.expression)
+            self.unit.set(column.unit)
+
+    def _apply(self, change):
+        """ change a copy of the instrument's columns, so a failing change leaves the instrument as it was """
+        columns = derived_columns.DerivedColumns(self.instrument.derived_columns)
+        try:
+            change(columns)
+            columns.evaluate(self.instrument.state_export())
+            self.instrument.set_derived_columns(columns)
+        except (tk.TclError, ValueError, KeyError) as e:
+            messagebox.showerror("Derived Columns", str(e), parent=self)
+            return
+        self._fill_table()
+
+    def define(self, *args):
+        """ add a column, or replace the column with the same name """
+        self._apply(lambda c_: c_.define(self.name.get().strip(), self.expression.get(), self.unit.get().strip()))
+
+    def remove(self):
+        for name in self.table.selection():
+            self._apply(lambda c_: c_.remove(name))
+
+    def export(self):
+        file = tkFile.asksaveasfilename(title="Export Columns", filetypes=csv_file_types, parent=self)
+        if not file:
+            return
+        file = pathlib.Path(file)
+        if not file.suffix:
+            file = file.with_suffix('.csv')
+        derived_columns.write_csv(file, self.instrument.state_export(), self.instrument.derived_columns)
@@ -0,0 +1,254 @@
+"""
+SQLite archive of saved instruments, every note is stored in an indexed table so questions across
+the whole archive are answered without reading each file, usage::
+
+    archive = DesignArchive('archive.sqlite')
+    archive.ingest_directory('designs/')
+    archive.find_instruments(material='brass', min_length_mm=1600)
+    archive.max_tension_per_material()
+"""
+from __future__ import annotations
+
+import json
+import pathlib
+import sqlite3
+import typing
+
+import numpy
+
+from interface import general_functions
+from interface.calculation import NoteArrays, material_code, note_columns
+from interface.material_and_measures import WireMaterial
+
+_schema = """
+CREATE TABLE IF NOT EXISTS instruments (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    name TEXT,
+    pitch REAL,
+    lowest_key INTEGER,
+    highest_key INTEGER,
+    temperament TEXT,
+    mtime REAL,
+    document TEXT
+);
+CREATE TABLE IF NOT EXISTS materials (
+    code TEXT PRIMARY KEY,
+    name TEXT,
+    density_g_cm3 REAL
+);
+CREATE TABLE IF NOT EXISTS notes (
+    instrument_id INTEGER NOT NULL REFERENCES instruments(id) ON DELETE CASCADE,
+    note_number INTEGER NOT NULL,
+    material_code TEXT,
+    length_mm REAL,
+    diameter_mm REAL,
+    wire_count INTEGER,
+    frequency REAL,
+    tension_kgf REAL,
+    wrap_material_code TEXT,
+    wrap_diameter_mm REAL,
+    wrap_layers INTEGER
+);
+CREATE INDEX IF NOT EXISTS notes_instrument ON notes(instrument_id);
+CREATE INDEX IF NOT EXISTS notes_material_length ON notes(material_code, length_mm);
+CREATE INDEX IF NOT EXISTS notes_material_tension ON notes(material_code, tension_kgf);
+CREATE INDEX IF NOT EXISTS notes_number ON notes(note_number);
+"""
+
+_numeric_note_columns = ('length_mm', 'diameter_mm', 'wire_count', 'frequency', 'tension_kgf',
+                         'wrap_diameter_mm', 'wrap_layers')
+
+# columns added to the notes table after the first release, added to older archives when opened
+_added_note_columns = (
+    ('wrap_material_code', 'TEXT'),
+    ('wrap_diameter_mm', 'REAL'),
+    ('wrap_layers', 'INTEGER'),
+)
+
+
+class DesignArchive:
+    """ SQLite database of instruments in the :meth:`Instrument.state_export` format """
+    file: pathlib.Path
+    connection: sqlite3.Connection
+
+    def __init__(self, file: str | pathlib.Path):
+        """
+        :param file: database file, created if it does not exist
+        """
+        self.file = pathlib.Path(file)
+        self.connection = sqlite3.connect(self.file)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        with self.connection:
+            self.connection.executescript(_schema)
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(notes)")}
+            for column, sql_type in _added_note_columns:
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE notes ADD COLUMN {column} {sql_type}")
+            self.update_materials()
+
+    def close(self):
+        self.connection.close()
+
+    def update_materials(self):
+        """ copy the current :class:`WireMaterial` catalogue into the archive, so queries can use names """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO materials (code, name, density_g_cm3) VALUES (?, ?, ?)",
+                [(m_.code, m_.name, m_.density.g_cm3()) for m_ in WireMaterial.material_objects()])
+
+    def ingest(self, documents: typing.Iterable[tuple[str, dict, float]]) -> int:
+        """
+        add or replace instruments in a single transaction
+        :param documents: iterable of (path, state_export dict, modified time)
+        :return: number of instruments added
+        """
+        count = 0
+        with self.connection:
+            for path, data, mtime in documents:
+                self._insert(path, data, mtime)
+                count += 1
+        return count
+
+    def _insert(self, path: str, data: dict, mtime: float):
+        arrays = NoteArrays(data)
+        columns = note_columns(data)
+        frequency, tension = columns['frequency'], columns['force']
+        self.connection.execute("DELETE FROM instruments WHERE path = ?", (path,))
+        cursor = self.connection.execute(
+            "INSERT INTO instruments (path, name, pitch, lowest_key, highest_key, temperament, mtime, document) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, arrays.name, arrays.pitch,
+             general_functions.note_name_to_number(str(data['lowest_key'])),
+             general_functions.note_name_to_number(str(data['highest_key'])),
+             arrays.temperament.name, mtime, json.dumps(data)))
+        instrument_id = cursor.lastrowid
+        self.connection.executemany(
+            "INSERT INTO notes (instrument_id, note_number, material_code, length_mm, diameter_mm, wire_count, "
+            "frequency, tension_kgf, wrap_material_code, wrap_diameter_mm, wrap_layers) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            zip([instrument_id] * len(arrays), arrays.note_number.tolist(),
+                [material_code(m_) for m_ in arrays.material],
+                _nullable(arrays.length), _nullable(arrays.diameter), _nullable(arrays.wire_count),
+                _nullable(frequency), _nullable(tension),
+                [material_code(m_) if l_ else None for m_, l_ in zip(arrays.wrap_material, arrays.wrap_layers)],
+                _nullable(numpy.where(arrays.wrap_layers > 0, arrays.wrap_diameter, numpy.nan)),
+                arrays.wrap_layers.tolist()))
+
+    def ingest_files(self, files: typing.Iterable[str | pathlib.Path]) -> list[tuple[str, str]]:
+        """
+        add new or changed files to the archive in a single transaction, unchanged files are skipped
+        :return: list of (file, error) for files that could not be added
+        """
+        known = dict(self.connection.execute("SELECT path, mtime FROM instruments"))
+        errors = []
+
+        def documents():
+            for file in files:
+                file = pathlib.Path(file).resolve()
+                try:
+                    # files can be deleted after they are listed
+                    mtime = file.stat().st_mtime
+                    if known.get(str(file)) == mtime:
+                        continue
+                    with open(file, 'r') as f:
+                        data = json.loads(f.read())
+                    NoteArrays(data)
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    errors.append((str(file), str(e)))
+                    continue
+                yield str(file), data, mtime
+
+        self.ingest(documents())
+        return errors
+
+    def ingest_directory(self, directory: str | pathlib.Path, pattern: str = '*.json') -> list[tuple[str, str]]:
+        """ :meth:`ingest_files` with every file matching `pattern` within `directory` and its sub folders """
+        return self.ingest_files(pathlib.Path(directory).rglob(pattern))
+
+    def remove(self, path: str):
+        with self.connection:
+            self.connection.execute("DELETE FROM instruments WHERE path = ?", (path,))
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM instruments").fetchone()[0]
+
+    def query(self, sql: str, parameters: typing.Sequence | dict = ()) -> list[tuple]:
+        """ run any read query against the archive tables `instruments`, `notes` and `materials` """
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def instruments(self) -> list[tuple[int, str, str, float, int, int]]:
+        """ :return: list of (id, path, name, pitch, lowest key, highest key) """
+        return self.query("SELECT id, path, name, pitch, lowest_key, highest_key FROM instruments ORDER BY name")
+
+    def find_instruments(self, material: str | None = None, min_length_mm: float | None = None,
+                         max_length_mm: float | None = None, lowest_note: int | None = None,
+                         highest_note: int | None = None) -> list[tuple[int, str, str, float, int, int]]:
+        """
+        find instruments with at least one note matching every given condition,
+        e.g. a brass bass over 1600mm: `find_instruments(material='brass', min_length_mm=1600)`
+        :param material: part of a material name or an exact material code
+        :param min_length_mm: shortest length of the matching note
+        :param max_length_mm: longest length of the matching note
+        :param lowest_note: lowest note number of the matching note
+        :param highest_note: highest note number of the matching note
+        :return: list of (id, path, name, pitch, lowest key, highest key)
+        """
+        conditions, parameters = [], []
+        if material is not None:
+            conditions.append("(m.name LIKE ? OR n.material_code = ?)")
+            parameters.extend((f'%{material}%', material))
+        for sql, value in (("n.length_mm >= ?", min_length_mm), ("n.length_mm <= ?", max_length_mm),
+                           ("n.note_number >= ?", lowest_note), ("n.note_number <= ?", highest_note)):
+            if value is not None:
+                conditions.append(sql)
+                parameters.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.query(
+            "SELECT DISTINCT i.id, i.path, i.name, i.pitch, i.lowest_key, i.highest_key FROM notes n "
+            "JOIN instruments i ON i.id = n.instrument_id "
+            f"LEFT JOIN materials m ON m.code = n.material_code {where} ORDER BY i.name", parameters)
+
+    def max_tension_per_material(self) -> list[tuple[str, str, float, int]]:
+        """ :return: list of (material code, material name, highest tension kg-f, number of notes) """
+        return self.query(
+            "SELECT n.material_code, m.name, MAX(n.tension_kgf), COUNT(*) FROM notes n "
+            "LEFT JOIN materials m ON m.code = n.material_code GROUP BY n.material_code ORDER BY n.material_code")
+
+    def iter_note_values(self, column: str, chunk_size: int = 10_000
+                         ) -> typing.Iterator[tuple[int, numpy.ndarray, numpy.ndarray]]:
+        """
+        stream one column of the notes table, instrument by instrument, without loading every row at once
+        :param column: numeric column of the notes table, e.g. 'tension_kgf'
+        :return: (instrument id, note numbers, values) of each instrument, NULL values are nan
+        """
+        if column not in _numeric_note_columns:
+            raise ValueError(f'column must be one of {_numeric_note_columns}')
+        cursor = self.connection.execute(
+            f"SELECT instrument_id, note_number, {column} FROM notes ORDER BY instrument_id, note_number")
+        current, notes, values = None, [], []
+        while rows := cursor.fetchmany(chunk_size):
+            for instrument_id, note_number, value in rows:
+                if instrument_id != current:
+                    if current is not None:
+                        yield current, numpy.array(notes, dtype=int), numpy.array(values, dtype=float)
+                    current, notes, values = instrument_id, [], []
+                notes.append(note_number)
+                values.append(numpy.nan if value is None else value)
+        if current is not None:
+            yield current, numpy.array(notes, dtype=int), numpy.array(values, dtype=float)
+
+    def document(self, instrument_id: int) -> dict:
+        """ get the saved :meth:`Instrument.state_export` dict of an instrument """
+        row = self.connection.execute("SELECT document FROM instruments WHERE id = ?", (instrument_id,)).fetchone()
+        if row is None:
+            raise KeyError(instrument_id)
+        return json.loads(row[0])
+
+    def path(self, instrument_id: int) -> str:
+        return self.connection.execute("SELECT path FROM instruments WHERE id = ?", (instrument_id,)).fetchone()[0]
+
+
+def _nullable(values: numpy.ndarray) -> list[float | None]:
+    """ convert nan to None so missing values are stored as NULL """
+    return [None if numpy.isnan(v_) else v_ for v_ in values.tolist()]
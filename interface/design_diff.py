@@ -0,0 +1,164 @@
+"""
+Per note comparison of two designs, or of every revision of a design. \n
+Notes are aligned by note number, so designs with different lowest or highest keys compare note for note,
+notes only in one design are listed as added or removed. Tension and percent of break are calculated at each
+design's own pitch and temperament, so a change of pitch shows as a change of tension on every note.
+The columns of each version come from :func:`note_columns`, which keeps them in :data:`result_cache.cache`,
+so each revision in a history is only calculated once however many comparisons it is part of. Usage::
+
+    diff = diff_designs(load_design('spinet_v1.json'), load_design('spinet_v2.json'))
+    for row in diff.rows():
+        ...
+    for old, new, diff in diff_history('revisions/'):
+        print(old, new, diff.summary())
+"""
+from __future__ import annotations
+
+import json
+import pathlib
+import re
+import typing
+
+import numpy
+
+from interface import general_functions
+from interface.calculation import note_columns
+
+FIELDS = ('material', 'length', 'diameter', 'wire_count', 'frequency', 'force', 'percent_of_break')
+NUMERIC_FIELDS = FIELDS[1:]
+# relative change below which a numeric field counts as unchanged, hides float noise from unit conversions
+DEFAULT_RTOL = 1e-6
+
+
+class DesignDiff:
+    """ columns of two designs aligned on the union of their note numbers, nan or '' where a note is missing """
+    note_number: numpy.ndarray
+    in_old: numpy.ndarray
+    in_new: numpy.ndarray
+    old: dict[str, numpy.ndarray]
+    new: dict[str, numpy.ndarray]
+
+    def __init__(self, old: dict[str, numpy.ndarray], new: dict[str, numpy.ndarray],
+                 old_pitch: float = numpy.nan, new_pitch: float = numpy.nan, rtol: float = DEFAULT_RTOL):
+        """
+        :param old: columns of the earlier design, as given by :func:`note_columns`
+        :param new: columns of the later design
+        :param rtol: see :data:`DEFAULT_RTOL`
+        """
+        self.note_number = numpy.union1d(old['note_number'], new['note_number'])
+        self.old_pitch = old_pitch
+        self.new_pitch = new_pitch
+        self.rtol = rtol
+        self.in_old, self.old = self._align(old)
+        self.in_new, self.new = self._align(new)
+
+    def _align(self, columns: dict[str, numpy.ndarray]) -> tuple[numpy.ndarray, dict[str, numpy.ndarray]]:
+        index = numpy.searchsorted(self.note_number, columns['note_number'])
+        present = numpy.zeros(self.note_number.size, dtype=bool)
+        present[index] = True
+        aligned = dict()
+        for field in FIELDS:
+            column = numpy.full(self.note_number.size, '' if field == 'material' else numpy.nan,
+                                dtype=object if field == 'material' else float)
+            column[index] = columns[field]
+            aligned[field] = column
+        return present, aligned
+
+    @property
+    def added(self) -> numpy.ndarray:
+        return self.in_new & ~self.in_old
+
+    @property
+    def removed(self) -> numpy.ndarray:
+        return self.in_old & ~self.in_new
+
+    def delta(self, field: str) -> numpy.ndarray:
+        """ new - old of a numeric field, nan where either design lacks the note or the value """
+        return self.new[field] - self.old[field]
+
+    def relative(self, field: str) -> numpy.ndarray:
+        """ change of a numeric field as a fraction of the old value """
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return self.delta(field) / self.old[field]
+
+    def changed(self, field: str) -> numpy.ndarray:
+        """ notes in both designs where `field` differs, a value appearing or disappearing counts as a change """
+        both = self.in_old & self.in_new
+        if field == 'material':
+            return both & (self.old[field] != self.new[field])
+        old, new = self.old[field], self.new[field]
+        with numpy.errstate(invalid='ignore'):
+            differs = ~numpy.isclose(old, new, rtol=self.rtol, atol=0) & ~(numpy.isnan(old) & numpy.isnan(new))
+        return both & differs
+
+    @property
+    def any_changed(self) -> numpy.ndarray:
+        """ notes with any change, including added and removed notes """
+        return numpy.logical_or.reduce([self.changed(f_) for f_ in FIELDS]) | self.added | self.removed
+
+    def summary(self) -> dict[str, typing.Any]:
+        """ counts of changed notes per field, and the largest change of tension """
+        force = self.relative('force')
+        largest = numpy.nanargmax(numpy.abs(force)) if numpy.isfinite(force).any() else None
+        return dict(notes_changed=int(self.any_changed.sum()), added=int(self.added.sum()),
+                    removed=int(self.removed.sum()), pitch_change=self.new_pitch - self.old_pitch,
+                    **{f_: int(self.changed(f_).sum()) for f_ in ('material', 'length', 'diameter', 'wire_count')},
+                    largest_force_change_percent=None if largest is None else round(100 * float(force[largest]), 2),
+                    largest_force_change_note=None if largest is None else int(self.note_number[largest]))
+
+    def rows(self, only_changed: bool = True) -> list[tuple]:
+        """
+        :return: (note number, note name, status, old material, new material, then old, new and delta of
+            each of length, diameter, wire count and force, then percent change of force) of each note
+        """
+        status = numpy.where(self.added, 'added', numpy.where(self.removed, 'removed', numpy.where(
+            self.any_changed, 'changed', '')))
+        deltas = {f_: self.delta(f_) for f_ in ('length', 'diameter', 'wire_count', 'force')}
+        force_percent = 100 * self.relative('force')
+        rows = []
+        for i in (numpy.flatnonzero(self.any_changed) if only_changed else range(self.note_number.size)):
+            n_ = int(self.note_number[i])
+            row = [n_, general_functions.note_number_to_name(n_), str(status[i]),
+                   self.old['material'][i], self.new['material'][i]]
+            for field in ('length', 'diameter', 'wire_count', 'force'):
+                row.extend((float(self.old[field][i]), float(self.new[field][i]), float(deltas[field][i])))
+            row.append(float(force_percent[i]))
+            rows.append(tuple(row))
+        return rows
+
+
+def diff_designs(old: dict, new: dict, rtol: float = DEFAULT_RTOL) -> DesignDiff:
+    """
+    :param old: earlier design, in the format given by :meth:`Instrument.state_export`
+    :param new: later design
+    """
+    return DesignDiff(note_columns(old), note_columns(new), float(old['pitch']), float(new['pitch']), rtol)
+
+
+def _natural_key(path: pathlib.Path) -> list:
+    """ orders 'v2' before 'v10' """
+    return [int(t_) if t_.isdigit() else t_ for t_ in re.split(r'(\d+)', path.name)]
+
+
+def revision_files(directory: str | pathlib.Path) -> list[pathlib.Path]:
+    """ json files in a directory, in natural order of their names """
+    return sorted(pathlib.Path(directory).glob('*.json'), key=_natural_key)
+
+
+def diff_history(revisions: str | pathlib.Path | typing.Sequence[str | pathlib.Path], rtol: float = DEFAULT_RTOL
+                 ) -> typing.Iterator[tuple[pathlib.Path, pathlib.Path, DesignDiff]]:
+    """
+    compare each revision with the one before it, every file is read and calculated once
+    :param revisions: a directory, see :func:`revision_files`, or revision files in order
+    :return: (old file, new file, diff) of each consecutive pair
+    """
+    if isinstance(revisions, (str, pathlib.Path)):
+        revisions = revision_files(revisions)
+    previous = None
+    for file in map(pathlib.Path, revisions):
+        with open(file, 'r') as f:
+            data = json.loads(f.read())
+        current = (file, note_columns(data), float(data['pitch']))
+        if previous is not None:
+            yield previous[0], file, DesignDiff(previous[1], current[1], previous[2], current[2], rtol)
+        previous = current
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import math
+import pathlib
+import tkinter as tk
+from tkinter import filedialog as tkFile
+from tkinter import messagebox, ttk
+
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+import definitions
+from interface import design_diff
+from interface.visualization_plotting import draw_design_diff
+from interface.workspace import Workspace
+
+
+class DesignDiffWindow(tk.Toplevel):
+    """ window comparing two designs open in the workspace, or saved in files, note by note """
+    workspace: Workspace
+    designs: dict[str, dict]
+    columns = ('note', 'status', 'material', 'length', 'diameter', 'count', 'kg-f', 'kg-f %')
+
+    def __init__(self, parent, workspace: Workspace):
+        super(DesignDiffWindow, self).__init__(parent)
+        self.title("Compare Designs")
+        self.geometry("1000x800")
+        self.workspace = workspace
+        self.designs = dict()
+
+        self.old = tk.StringVar(self)
+        self.new = tk.StringVar(self)
+        self.only_changed = tk.BooleanVar(self, True)
+
+        header = ttk.Frame(self)
+        header.pack(fill='x', side=tk.TOP)
+        self._choices = []
+        for i, (text, var) in enumerate((("Old", self.old), ("New", self.new))):
+            ttk.Label(header, text=text).grid(row=0, column=i)
+            choice = ttk.Combobox(header, textvariable=var, state='readonly', width=30)
+            choice.grid(row=1, column=i, sticky=tk.EW)
+            choice.bind('<<ComboboxSelected>>', self.compare)
+            self._choices.append(choice)
+        ttk.Checkbutton(header, text="Changed notes only", variable=self.only_changed,
+                        command=self.compare).grid(row=1, column=2)
+        ttk.Button(header, text="Add File", command=self.add_file).grid(row=0, column=3, rowspan=2, sticky=tk.S)
+
+        self.status = ttk.Label(self, anchor=tk.W)
+        self.status.pack(fill='x', side=tk.TOP)
+        self.table = ttk.Treeview(self, columns=self.columns, show='headings', height=10)
+        for col in self.columns:
+            self.table.heading(col, text=col)
+            self.table.column(col, width=110, anchor=tk.E)
+        self.table.pack(fill='x', side=tk.TOP)
+        self.figure = Figure()
+        self.canvas = FigureCanvasTkAgg(self.figure, self)
+        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+
+        try:
+            self.workspace.save_active()
+        except (tk.TclError, ValueError, KeyError) as e:
+            # compare the last saved copy of the instrument
+            messagebox.showerror("Compare Designs", str(e), parent=self)
+        for document in self.workspace.documents:
+            self._add_design(document.title, document.data)
+        names = list(self.designs)
+        if names:
+            self.old.set(names[0])
+            self.new.set(names[-1] if len(names) == 1 else names[1])
+        self.compare()
+
+    def _add_design(self, title: str, data: dict) -> str:
+        name = title
+        count = 2
+        while name in self.designs:
+            name = f'{title} ({count})'
+            count += 1
+        self.designs[name] = data
+        for choice in self._choices:
+            choice.configure(values=list(self.designs))
+        return name
+
+    def add_file(self):
+        file = tkFile.askopenfilename(title="Add File", filetypes=definitions.file_types, parent=self)
+        if not file:
+            return
+        with open(file, 'r') as f:
+            data = json.loads(f.read())
+        self.new.set(self._add_design(pathlib.Path(file).stem, data))
+        self.compare()
+
+    def compare(self, *args):
+        old, new = self.designs.get(self.old.get()), self.designs.get(self.new.get())
+        if old is None or new is None:
+            return
+        try:
+            diff = design_diff.diff_designs(old, new)
+        except (ValueError, KeyError, TypeError) as e:
+            messagebox.showerror("Compare Designs", str(e), parent=self)
+            return
+        self.table.delete(*self.table.get_children())
+        for row in diff.rows(self.only_changed.get()):
+            note, name, status, old_material, new_material = row[:5]
+            values = [f'{note} {name}', status, _pair(old_material, new_material)]
+            for i in range(5, 17, 3):
+                values.append(_pair(*(_number(v_) for v_ in row[i:i + 3])))
+            values.append(_number(row[17]))
+            self.table.insert('', tk.END, values=values)
+        summary = diff.summary()
+        pitch = f', pitch {diff.old_pitch:g} -> {diff.new_pitch:g}hz' if summary['pitch_change'] else ''
+        self.status.configure(text=f"{summary['notes_changed']} notes changed, {summary['added']} added, "
+                                   f"{summary['removed']} removed{pitch}")
+        self.figure.clear()
+        draw_design_diff(self.figure, diff)
+        self.canvas.draw_idle()
+
+
+def _number(value: float) -> str:
+    return '' if math.isnan(value) else f'{value:.4g}'
+
+
+def _pair(old: str, new: str, delta: str | None = None) -> str:
+    """ 'old -> new (delta)', or the value alone when it did not change """
+    if old == new:
+        return old
+    text = f'{old} -> {new}'
+    return f'{text} ({delta})' if delta else text
@@ -0,0 +1,305 @@
+"""
+Nearest neighbour search over an archive of saved instruments,
+each design is resampled onto a common note grid so designs with different compasses can be compared
+"""
+from __future__ import annotations
+
+import json
+import pathlib
+import typing
+
+import numpy
+
+from interface import result_cache
+from interface.calculation import NoteArrays, note_columns
+
+# notes used to compare designs, A0 to C8 in steps of a minor third
+note_grid = numpy.arange(1, 89, 3)
+
+
+def design_features(data: dict) -> numpy.ndarray:
+    """
+    resample the length, diameter and tension curves of a design onto `note_grid`,
+    values are compared as logarithms so a 10% difference counts the same in the bass and treble.
+    Outside the compass of the design the curves are held at the value of the lowest or highest note.
+    :param data: dict in the format given by :meth:`Instrument.state_export`
+    :return: 1D feature vector, length, diameter then tension
+    """
+    return result_cache.cache.get_or_compute(result_cache.content_key('design_features', data),
+                                             lambda: _design_features(data))
+
+
+def _design_features(data: dict) -> numpy.ndarray:
+    arrays = NoteArrays(data)
+    curves = (arrays.length, arrays.diameter, note_columns(data)['force'])
+    features = []
+    for curve in curves:
+        valid = numpy.isfinite(curve) & (curve > 0)
+        if not valid.any():
+            raise ValueError(f'design "{arrays.name}" has no complete notes')
+        features.append(numpy.interp(note_grid, arrays.note_number[valid], numpy.log(curve[valid])))
+    return numpy.concatenate(features)
+
+
+class KDTree:
+    """
+    KD-tree stored as flat numpy arrays, nodes split at the median of their widest dimension,
+    leaves are searched with vectorized distance calculations. \n
+    Rows inserted after the tree is built are kept in a pending list searched by brute force, removed rows stay in
+    the tree and are skipped. Both are cheap, and the owner rebuilds once :attr:`staleness` grows.
+    """
+    points: numpy.ndarray
+    order: numpy.ndarray
+    removed: numpy.ndarray
+    pending: numpy.ndarray
+
+    def __init__(self, points: numpy.ndarray, leaf_size: int = 16):
+        """
+        :param points: (n × dimensions) array
+        :param leaf_size: largest number of points in a leaf node
+        """
+        self.points = numpy.asarray(points, dtype=float).reshape(len(points), -1)
+        self.leaf_size = leaf_size
+        self.order = numpy.arange(len(self.points))
+        self.removed = numpy.zeros(len(self.points), dtype=bool)
+        self.pending = numpy.zeros(0, dtype=int)
+        self._build()
+
+    def __len__(self):
+        """ number of rows that are not removed """
+        return int(len(self.points) - self.removed.sum())
+
+    @property
+    def staleness(self) -> float:
+        """ rows inserted or removed since the tree was built, as a share of all rows """
+        return (self.pending.size + int(self.removed.sum())) / max(1, len(self.points))
+
+    def insert(self, points: numpy.ndarray) -> numpy.ndarray:
+        """
+        add rows without rebuilding the tree
+        :param points: (n × dimensions) array
+        :return: row index of each point
+        """
+        points = numpy.asarray(points, dtype=float).reshape(-1, self.points.shape[1])
+        rows = numpy.arange(len(self.points), len(self.points) + len(points))
+        self.points = numpy.concatenate((self.points, points))
+        self.removed = numpy.concatenate((self.removed, numpy.zeros(len(points), dtype=bool)))
+        self.pending = numpy.concatenate((self.pending, rows))
+        return rows
+
+    def remove(self, rows: typing.Sequence[int] | numpy.ndarray):
+        """ skip rows in queries, they are dropped when the owner rebuilds """
+        self.removed[numpy.asarray(rows, dtype=int)] = True
+
+    def _build(self):
+        lo, hi, dim, split, left, right = [0], [len(self.points)], [-1], [0.0], [-1], [-1]
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            n_lo, n_hi = lo[node], hi[node]
+            if n_hi - n_lo <= self.leaf_size:
+                continue
+            idx = self.order[n_lo:n_hi]
+            points = self.points[idx]
+            spread = points.max(axis=0) - points.min(axis=0)
+            n_dim = int(numpy.argmax(spread))
+            if spread[n_dim] == 0:
+                # every point identical, keep as a leaf
+                continue
+            mid = (n_hi - n_lo) // 2
+            self.order[n_lo:n_hi] = idx[numpy.argpartition(points[:, n_dim], mid)]
+            dim[node] = n_dim
+            split[node] = self.points[self.order[n_lo + mid], n_dim]
+            for child_lo, child_hi in ((n_lo, n_lo + mid), (n_lo + mid, n_hi)):
+                lo.append(child_lo)
+                hi.append(child_hi)
+                dim.append(-1)
+                split.append(0.0)
+                left.append(-1)
+                right.append(-1)
+                stack.append(len(lo) - 1)
+            left[node], right[node] = len(lo) - 2, len(lo) - 1
+        self.lo, self.hi = numpy.array(lo), numpy.array(hi)
+        self.dim, self.split = numpy.array(dim), numpy.array(split)
+        self.left, self.right = numpy.array(left), numpy.array(right)
+
+    def query(self, point: numpy.ndarray, k: int = 1) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        find the k nearest points
+        :return: distances and row indices of the nearest points, closest first
+        """
+        point = numpy.asarray(point, dtype=float)
+        k = min(k, len(self))
+        best_d = numpy.full(k, numpy.inf)
+        best_i = numpy.full(k, -1)
+        if k == 0:
+            return best_d, best_i
+        # pending rows first, they are few and tighten the bound for the tree search
+        best_d, best_i = self._nearest(point, self.pending, best_d, best_i)
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= best_d[-1]:
+                continue
+            if self.left[node] < 0:
+                best_d, best_i = self._nearest(point, self.order[self.lo[node]:self.hi[node]], best_d, best_i)
+                continue
+            diff = point[self.dim[node]] - self.split[node]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            # far side is pushed first so the near side is searched first
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        return numpy.sqrt(best_d), best_i
+
+    def _nearest(self, point: numpy.ndarray, idx: numpy.ndarray, best_d: numpy.ndarray, best_i: numpy.ndarray
+                 ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """ merge the rows `idx` that are not removed into the best squared distances found so far """
+        idx = idx[~self.removed[idx]]
+        d2 = ((self.points[idx] - point) ** 2).sum(axis=1)
+        all_d = numpy.concatenate((best_d, d2))
+        all_i = numpy.concatenate((best_i, idx))
+        keep = numpy.argsort(all_d, kind='stable')[:best_d.size]
+        return all_d[keep], all_i[keep]
+
+    def state_export(self) -> dict[str, numpy.ndarray]:
+        return dict(order=self.order, lo=self.lo, hi=self.hi, dim=self.dim, split=self.split,
+                    left=self.left, right=self.right, removed=self.removed, pending=self.pending)
+
+    @classmethod
+    def state_import(cls, points: numpy.ndarray, data: typing.Mapping[str, numpy.ndarray],
+                     leaf_size: int = 16) -> KDTree:
+        tree = cls.__new__(cls)
+        tree.points = points
+        tree.leaf_size = leaf_size
+        for key in ('order', 'lo', 'hi', 'dim', 'split', 'left', 'right'):
+            setattr(tree, key, data[key])
+        # indexes saved before rows could be inserted or removed
+        tree.removed = data['removed'] if 'removed' in data else numpy.zeros(len(points), dtype=bool)
+        tree.pending = data['pending'] if 'pending' in data else numpy.zeros(0, dtype=int)
+        return tree
+
+
+class DesignIndex:
+    """
+    Persistent similarity index of saved instrument files, usage::
+
+        index = DesignIndex('designs.npz')
+        index.update_directory('archive/')
+        index.save()
+        for file, distance in index.query(design, k=5):
+            ...
+
+    Updates insert and remove rows of the KD-tree in place, it is rebuilt when more than
+    :attr:`rebuild_fraction` of its rows changed since it was built.
+    """
+    rebuild_fraction = 0.25
+    file: pathlib.Path
+    # rows of the tree, rows of replaced or deleted files are kept with `live` False until the next rebuild
+    paths: list[str]
+    mtimes: numpy.ndarray
+    features: numpy.ndarray
+    live: numpy.ndarray
+    _tree: KDTree | None
+
+    def __init__(self, file: str | pathlib.Path):
+        """
+        :param file: location of the saved index, loaded if it exists
+        """
+        self.file = pathlib.Path(file)
+        self.paths = []
+        self.mtimes = numpy.zeros(0)
+        self.features = numpy.zeros((0, len(note_grid) * 3))
+        self.live = numpy.zeros(0, dtype=bool)
+        self._tree = None
+        if self.file.exists():
+            self.load()
+
+    def __len__(self):
+        return int(self.live.sum())
+
+    def load(self):
+        with numpy.load(self.file, allow_pickle=False) as data:
+            if data['grid'].tolist() != note_grid.tolist():
+                raise ValueError(f'index {self.file} uses a different note grid, rebuild it')
+            self.paths = data['paths'].tolist()
+            self.mtimes = data['mtimes']
+            self.features = data['features']
+            self.live = data['live'] if 'live' in data else numpy.ones(len(self.paths), dtype=bool)
+            if data['tree_size'] == len(self.paths):
+                self._tree = KDTree.state_import(self.features, data)
+
+    def save(self):
+        tree = self.tree().state_export() if len(self) else dict()
+        numpy.savez(self.file, paths=numpy.array(self.paths, dtype=str), mtimes=self.mtimes,
+                    features=self.features, live=self.live, grid=note_grid,
+                    tree_size=len(self.paths) if tree else -1, **tree)
+
+    def tree(self) -> KDTree:
+        if self._tree is None:
+            self._rebuild()
+        return self._tree
+
+    def _rebuild(self):
+        """ drop the rows of replaced and deleted files and build a balanced tree of the rest """
+        self.paths = [p_ for p_, l_ in zip(self.paths, self.live.tolist()) if l_]
+        self.mtimes, self.features = self.mtimes[self.live], self.features[self.live]
+        self.live = numpy.ones(len(self.paths), dtype=bool)
+        self._tree = KDTree(self.features) if len(self.paths) else None
+
+    def update(self, files: typing.Iterable[str | pathlib.Path]) -> list[tuple[str, str]]:
+        """
+        add new or changed files to the index, unchanged files are not read again
+        and files that no longer exist are removed
+        :return: list of (file, error) for files that could not be indexed
+        """
+        known = {p_: i_ for i_, p_ in enumerate(self.paths) if self.live[i_]}
+        dead = [i_ for p_, i_ in known.items() if not pathlib.Path(p_).exists()]
+        new_paths, new_mtimes, new_features, errors = [], [], [], []
+        for file in files:
+            file = str(pathlib.Path(file).resolve())
+            i_ = known.get(file)
+            try:
+                # files can be deleted after they are listed
+                mtime = pathlib.Path(file).stat().st_mtime
+                if i_ is not None and self.mtimes[i_] == mtime:
+                    continue
+                with open(file, 'r') as f:
+                    features = design_features(json.loads(f.read()))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                errors.append((file, str(e)))
+                continue
+            if i_ is not None:
+                dead.append(i_)
+            new_paths.append(file)
+            new_mtimes.append(mtime)
+            new_features.append(features)
+        if not new_paths and not dead:
+            return errors
+        new_features = numpy.reshape(new_features, (-1, len(note_grid) * 3))
+        self.live[dead] = False
+        self.paths += new_paths
+        self.mtimes = numpy.concatenate((self.mtimes, new_mtimes))
+        self.features = numpy.concatenate((self.features, new_features))
+        self.live = numpy.concatenate((self.live, numpy.ones(len(new_paths), dtype=bool)))
+        if self._tree is not None:
+            self._tree.remove(dead)
+            self._tree.insert(new_features)
+            if self._tree.staleness > self.rebuild_fraction:
+                self._rebuild()
+        return errors
+
+    def update_directory(self, directory: str | pathlib.Path, pattern: str = '*.json') -> list[tuple[str, str]]:
+        """ :meth:`update` with every file matching `pattern` within `directory` and its sub folders """
+        return self.update(pathlib.Path(directory).rglob(pattern))
+
+    def query(self, data: dict, k: int = 5) -> list[tuple[str, float]]:
+        """
+        find the designs most similar to `data`
+        :param data: dict in the format given by :meth:`Instrument.state_export`
+        :param k: number of designs returned
+        :return: list of (file, distance), most similar first
+        """
+        if not len(self):
+            return []
+        distances, rows = self.tree().query(design_features(data), k)
+        return [(self.paths[r_], float(d_)) for d_, r_ in zip(distances, rows)]
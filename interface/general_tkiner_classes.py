@@ -4,16 +4,29 @@ import json
 import pathlib
 import tkinter as tk
 from tkinter import filedialog as tkFile
+from tkinter import messagebox
 from tkinter import ttk
 
 from ttkthemes import ThemedStyle
 
 import definitions
+from interface import curve_fitting
+from interface.archive_window import open_archive
+from interface.cut_list_window import CutListWindow
+from interface.debug_panel import ProfilePanel
+from interface.derived_columns_window import DerivedColumnsWindow
+from interface.design_diff_window import DesignDiffWindow
 from interface.instrument_class import Instrument
+from interface.pareto_window import ParetoWindow
+from interface.profiling import profiled
+from interface.schedule_import import read_schedule, schedule_file_types
+from interface.scheduler import IdleScheduler
 from interface.visualization import PlotFrame
+from interface.workspace import Workspace
 
 
 class TkInterface(tk.Tk):
+    workspace: Workspace
     scroll_area: Scrollable
     instrument: Instrument
     plt: PlotFrame
@@ -35,6 +48,9 @@ class TkInterface(tk.Tk):
         self.instrument = Instrument(self.scroll_area)
         self.instrument.pack(fill='x', expand=0)
         self.plt = PlotFrame(self, self.instrument)
+        # tabs of open instruments, all shown with self.instrument and self.plt
+        self.workspace = Workspace(self, self.instrument)
+        self.workspace.pack(fill='x', expand=False, side=tk.TOP)
 
         # set positions of self.scroll_area & self.plt based on the size of the window
         if self.winfo_width() < self.width_breakpoint:
@@ -46,7 +62,7 @@ class TkInterface(tk.Tk):
         self.bind("<Control-L>", self.__swap_layout)
 
         top = self.winfo_toplevel()
-        menu_bar = Menu(top, self.instrument)
+        menu_bar = Menu(top, self.instrument, self.workspace)
         top['menu'] = menu_bar
 
         style = ThemedStyle(self)
@@ -56,7 +72,7 @@ class TkInterface(tk.Tk):
         if import_file_on_init:
             with open(import_file_on_init, 'r') as f:
                 import_data = json.loads(f.read())
-            self.instrument.state_import(import_data)
+            self.workspace.open(import_data, pathlib.Path(import_file_on_init))
 
     def __forget_packing(self):
         for item in [self.scroll_area, self.plt]:
@@ -79,6 +95,7 @@ class TkInterface(tk.Tk):
             self.plt.pack(fill='both', expand=True, side=tk.BOTTOM)
         finally:
             self._current_layout_ = 0
+            self.event_generate('<<LayoutChanged>>')
 
     def set_horizontal_layout(self):
         """ set the layout to horizontal with the graphing output right of the instrument """
@@ -88,24 +105,36 @@ class TkInterface(tk.Tk):
             self.plt.pack(fill='both', expand=True, side=tk.RIGHT)
         finally:
             self._current_layout_ = 1
+            self.event_generate('<<LayoutChanged>>')
 
 
 class Menu(tk.Menu):
     parent: TkInterface
     instrument: Instrument
+    workspace: Workspace
 
-    def __init__(self, parent: TkInterface, instrument: Instrument):
+    def __init__(self, parent: TkInterface, instrument: Instrument, workspace: Workspace):
         super(Menu, self).__init__(parent)
         self.parent = parent
         self.instrument = instrument
+        self.workspace = workspace
+        self._recorder = None
         self.option_add('*tearOff', False)
         self._add_file_menu()
         self._add_layout_menu()
+        self._add_trend_menu()
+        self._add_debug_menu()
 
     def _add_file_menu(self):
         menu = tk.Menu(self)
         self.add_cascade(label="File", menu=menu)
 
+        menu.add_command(label="New Tab Ctrl+T", command=self.workspace.new_tab)
+        self.parent.bind("<Control-t>", self.workspace.new_tab)
+        self.parent.bind("<Control-T>", self.workspace.new_tab)
+        menu.add_command(label="Close Tab Ctrl+W", command=self.workspace.close_tab)
+        self.parent.bind("<Control-w>", self.workspace.close_tab)
+        self.parent.bind("<Control-W>", self.workspace.close_tab)
         menu.add_command(label="Open Ctrl+O", command=self.__open_handler)
         self.parent.bind("<Control-o>", self.__open_handler)
         self.parent.bind("<Control-O>", self.__open_handler)
@@ -115,6 +144,13 @@ class Menu(tk.Menu):
         menu.add_command(label="Save as Ctrl+Shift+S", command=self.__save_as_handler)
         self.parent.bind("<Control-Shift-s>", self.__save_as_handler)
         self.parent.bind("<Control-Shift-S>", self.__save_as_handler)
+        menu.add_command(label="Import Schedule", command=self.__import_schedule_handler)
+        menu.add_separator()
+        menu.add_command(label="Open Archive", command=lambda: open_archive(self.parent, self.workspace))
+        menu.add_command(label="Cut List", command=lambda: CutListWindow(self.parent, self.workspace))
+        menu.add_command(label="Derived Columns", command=lambda: DerivedColumnsWindow(self.parent, self.instrument))
+        menu.add_command(label="Compare Designs", command=lambda: DesignDiffWindow(self.parent, self.workspace))
+        menu.add_command(label="Pareto Front", command=lambda: ParetoWindow(self.parent, self.workspace))
 
     def _add_layout_menu(self):
         menu = tk.Menu(self)
@@ -122,8 +158,58 @@ class Menu(tk.Menu):
         menu.add_command(label="Vertical Layout", command=self.parent.set_vertical_layout)
         menu.add_command(label="Horizontal Layout", command=self.parent.set_horizontal_layout)
 
+    def _add_trend_menu(self):
+        """ options of the trend of the plots and of the tensions marked in red, see :mod:`interface.curve_fitting` """
+        menu = tk.Menu(self)
+        self.add_cascade(label="Trend", menu=menu)
+        self._trend_method = tk.StringVar(self, curve_fitting.options.method)
+        self._trend_degree = tk.IntVar(self, curve_fitting.options.degree)
+        self._trend_threshold = tk.DoubleVar(self, curve_fitting.options.threshold_percent)
+        for method in curve_fitting.METHODS:
+            menu.add_radiobutton(label=method.capitalize(), value=method, variable=self._trend_method,
+                                 command=self.__set_trend_options)
+        menu.add_separator()
+        for degree, label in ((1, "Linear"), (2, "Quadratic"), (3, "Cubic")):
+            menu.add_radiobutton(label=label, value=degree, variable=self._trend_degree,
+                                 command=self.__set_trend_options)
+        menu.add_separator()
+        for threshold in (5.0, 10.0, 15.0, 25.0):
+            menu.add_radiobutton(label=f"Outliers beyond {threshold:g}%", value=threshold,
+                                 variable=self._trend_threshold, command=self.__set_trend_options)
+
+    def __set_trend_options(self):
+        curve_fitting.options = curve_fitting.options._replace(method=self._trend_method.get(),
+                                                               degree=self._trend_degree.get(),
+                                                               threshold_percent=self._trend_threshold.get())
+        self.instrument.update_outliers()
+        self.instrument.event_generate('<<InstrumentUpdated>>')
+
+    def _add_debug_menu(self):
+        menu = tk.Menu(self)
+        self.add_cascade(label="Debug", menu=menu)
+        menu.add_command(label="Profiler", command=lambda: ProfilePanel(self.parent))
+        menu.add_command(label="Record Session", command=self.__record_session)
+        menu.add_command(label="Stop Recording", command=self.__stop_recording)
+
+    def __record_session(self):
+        """ start recording interactions for :mod:`interface.interaction_replay` """
+        # imported here so `python -m interface.interaction_replay` does not import itself through this module
+        from interface.interaction_replay import InteractionRecorder
+        if self._recorder is None:
+            self._recorder = InteractionRecorder(self.parent)
+        self._recorder.start()
+
+    def __stop_recording(self):
+        if self._recorder is None or not self._recorder.recording:
+            return
+        self._recorder.stop()
+        file = tkFile.asksaveasfilename(title="Save Session", defaultextension='.jsonl',
+                                        filetypes=(("Session", "*.jsonl"),))
+        if file:
+            self._recorder.save(file)
+
     def __open_handler(self, *arg):
-        """ Open a file dialogue, to import previous instance of the program """
+        """ Open a file dialogue, to import previous instance of the program in a new tab """
         file = tkFile.askopenfilename(title="Open File", initialdir="/", filetypes=definitions.file_types)
         if not file:
             return
@@ -132,7 +218,32 @@ class Menu(tk.Menu):
             file = file.with_suffix('.json')
         with open(file, 'r') as f:
             import_data = json.loads(f.read())
-        self.instrument.state_import(import_data)
+        try:
+            self.workspace.open(import_data, file)
+        except (ValueError, KeyError) as e:
+            messagebox.showerror("Open File", f"{file.name} could not be opened, {e}", parent=self.parent)
+
+    def __import_schedule_handler(self, *arg):
+        """ Open a file dialogue, to import a csv or tsv stringing schedule, bad rows are listed afterwards """
+        file = tkFile.askopenfilename(title="Import Schedule", initialdir="/", filetypes=schedule_file_types)
+        if not file:
+            return
+        try:
+            result = read_schedule(file, first_note=self.instrument.get_lowest_key())
+            data = result.state(inst_name=pathlib.Path(file).stem, pitch=self.instrument.pitch.get(),
+                                reference_note=self.instrument.reference_note.get(),
+                                temperament=self.instrument.temperament.get(),
+                                temperament_cents=self.instrument.get_temperament().cents.tolist())
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Import Schedule", str(e), parent=self.parent)
+            return
+        self.workspace.open(data)
+        if result.errors:
+            lines = [f'line {line}: {reason}' for line, reason in result.errors[:20]]
+            if len(result.errors) > 20:
+                lines.append(f'... {len(result.errors) - 20} more')
+            messagebox.showwarning("Import Schedule", f'{len(result.errors)} rows not imported\n' + '\n'.join(lines),
+                                   parent=self.parent)
 
     def __save_handler(self, *arg, force_new_save=False):
         """ Open a file dialogue, to export the current instance of the program """
@@ -148,6 +259,8 @@ class Menu(tk.Menu):
         export_data = self.instrument.state_export()
         with open(file, 'w' if file.exists() else 'x') as f:
             f.write(json.dumps(export_data))
+        self.instrument.file_uri = file
+        self.workspace.save_active()
 
     def __save_as_handler(self, *arg):
         """ call save handler with forced new filename """
@@ -191,12 +304,20 @@ class Scrollable(ttk.Frame):
         super(Scrollable, self).__init__(self.canvas)
         self.window_item = self.canvas.create_window(0, 0, window=self, anchor=tk.NW)
 
+        # <Configure> events are coalesced into a single layout pass per idle cycle
+        self.scheduler = IdleScheduler.of(self.frame)
+        self._canvas_width = None
         self.bind("<Configure>", self.on_configure)
         if bind_mousewheel:
             self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
         self.canvas.bind('<Configure>', self.__fill_canvas)
 
     def on_configure(self, event):
+        """Schedule the scroll region update"""
+        self.scheduler.schedule((id(self), 'scrollregion'), self.update_scrollregion)
+
+    @profiled()
+    def update_scrollregion(self):
         """Set the scroll region to encompass the scrolled frame"""
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
 
@@ -205,6 +326,12 @@ class Scrollable(ttk.Frame):
         self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
 
     def __fill_canvas(self, event):
+        """Schedule enlarging the windows item to the canvas width, only when the width has changed"""
+        if event.width == self._canvas_width:
+            return
+        self._canvas_width = event.width
+        self.scheduler.schedule((id(self), 'fill'), self.__set_window_width)
+
+    def __set_window_width(self):
         """Enlarge the windows item to the canvas width"""
-        canvas_width = event.width
-        self.canvas.itemconfig(self.window_item, width=canvas_width)
+        self.canvas.itemconfig(self.window_item, width=self._canvas_width)
@@ -3,11 +3,25 @@ from __future__ import annotations
 import pathlib
 import tkinter as tk
 import typing
-from math import pi
-from tkinter import ttk
+from tkinter import messagebox, simpledialog, ttk
 
-from interface import general_functions
-from interface.material_and_measures import Distance, Force, WireMaterial
+import numpy
+
+from interface import calculation, curve_fitting, general_functions, reference_calculation
+from interface.derived_columns import DerivedColumns
+from interface.key_map import CHROMATIC, CUSTOM, LAYOUTS, KeyMap
+from interface.material_and_measures import Density, Distance, Force, WireMaterial
+from interface.profiling import profiled
+from interface.scheduler import IdleScheduler
+from interface.temperament import CUSTOM_TEMPERAMENT, EQUAL, Temperament
+
+
+def _number(value: typing.Any, kind: type[int] | type[float]) -> int | float | str:
+    """ `value` as a number, or as the text saved for a blank or unfinished field """
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return '' if value is None else str(value)
 
 
 class Note:
@@ -18,9 +32,14 @@ class Note:
     _length: tk.DoubleVar
     _diameter: tk.DoubleVar
     _wire_count: tk.IntVar
+    _wrap_material: tk.StringVar
+    _wrap_diameter: tk.DoubleVar
+    _wrap_layers: tk.IntVar
     _frequency_var: tk.StringVar
     _frequency_float: float
     _tkk_items: list[ttk.Label | ttk.Combobox | ttk.Entry]
+    _force_label: ttk.Label
+    _derived_items: list[ttk.Label]
     tkk_input_items: list[ttk.Combobox | ttk.Entry]
 
     def __init__(self, instrument: Instrument, std_note: int):
@@ -31,6 +50,7 @@ class Note:
         if not isinstance(std_note, int):
             raise ValueError(std_note)
         _row = std_note * 2 + 10
+        self._row = _row
         self.instrument = instrument
         # Initialize variables
         self._std_note = std_note
@@ -39,9 +59,18 @@ class Note:
         self._material_select = tk.StringVar(instrument, None)
         self._diameter = tk.DoubleVar(instrument, '')
         self._length = tk.DoubleVar(instrument, '')
+        self._wrap_material = tk.StringVar(instrument, '')
+        self._wrap_diameter = tk.DoubleVar(instrument, 0.0)
+        self._wrap_layers = tk.IntVar(instrument, 0)
         self._force = tk.DoubleVar(instrument)
         self._frequency_float = 0
+        self._dirty = True
+        self._outlier = False
         self.calculate_frequency()
+        # inputs changed since the force was last calculated
+        for _v in (self._wire_count, self._material_select, self._diameter, self._length,
+                   self._wrap_material, self._wrap_diameter, self._wrap_layers):
+            _v.trace_add('write', self._mark_dirty)
 
         # set tk items
         _lbl_std_note = ttk.Label(instrument, text=self._std_note, width=6)
@@ -53,10 +82,19 @@ class Note:
         _ent_length = ttk.Entry(instrument, textvariable=self._length)
         _ent_diameter = ttk.Entry(instrument, textvariable=self._diameter)
         _ent_wire_count = ttk.Entry(instrument, textvariable=self._wire_count)
+        _combo_wrap_material = ttk.Combobox(instrument, textvariable=self._wrap_material, width=8,
+                                            postcommand=lambda: _combo_wrap_material.configure(
+                                                values=[''] + WireMaterial.code_name_list()))
+        _ent_wrap_diameter = ttk.Entry(instrument, textvariable=self._wrap_diameter, width=6)
+        _ent_wrap_layers = ttk.Entry(instrument, textvariable=self._wrap_layers, width=4)
         _ent_force = ttk.Label(instrument, textvariable=self._force)
+        self._force_label = _ent_force
+        self._derived_items = list()
         self._tkk_items = [_lbl_std_note, _lbl_str_note, _lbl_frequency,
-                           _ent_length, _combo_material_select, _ent_diameter, _ent_wire_count, _ent_force]
-        self.tkk_input_items = [_ent_length, _combo_material_select, _ent_diameter, _ent_wire_count]
+                           _ent_length, _combo_material_select, _ent_diameter, _ent_wire_count,
+                           _combo_wrap_material, _ent_wrap_diameter, _ent_wrap_layers, _ent_force]
+        self.tkk_input_items = [_ent_length, _combo_material_select, _ent_diameter, _ent_wire_count,
+                                _combo_wrap_material, _ent_wrap_diameter, _ent_wrap_layers]
 
         # set grid positions of items, uses the order set by tkk_input_items list
         for i, _t in enumerate(self._tkk_items):
@@ -64,8 +102,8 @@ class Note:
 
         # bind movement keys to tk input items
         for _n, _t in enumerate(self.tkk_input_items):
-            # bind force calculation on focus loss
-            _t.bind("<FocusOut>", self.update_force, add=True)
+            # bind force calculation on focus loss, coalesced so moving through cells only recalculates on change
+            _t.bind("<FocusOut>", self.schedule_update_force, add=True)
             # bind return to drop a cell down
             _t.bind("<Right>", lambda e, _n=_n: self.instrument.get_next_note_input(self._std_note, _n, 0, 1))
             _t.bind("<Left>", lambda e, _n=_n: self.instrument.get_next_note_input(self._std_note, _n, 0, -1))
@@ -75,7 +113,8 @@ class Note:
             _t.bind("<Down>", lambda e, _n=_n: self.instrument.get_next_note_input(self._std_note, _n, 1))
 
         # highlighter bindings
-        general_functions.bind_highlighting_on_focus(_ent_length, _ent_diameter, _ent_wire_count)
+        general_functions.bind_highlighting_on_focus(_ent_length, _ent_diameter, _ent_wire_count,
+                                                     _ent_wrap_diameter, _ent_wrap_layers)
 
         # add separator above each C
         if std_note % 12 == 4:
@@ -83,13 +122,40 @@ class Note:
             _separator.grid(column=0, columnspan=len(self._tkk_items), row=_row - 1, sticky=tk.NSEW)
 
     def destroy(self):
-        for i_ in self._tkk_items:
+        for i_ in self._tkk_items + self._derived_items:
             i_.destroy()
 
+    def set_derived(self, texts: list[str]):
+        """ show the values of the derived columns after the fixed columns, see :mod:`interface.derived_columns` """
+        while len(self._derived_items) > len(texts):
+            self._derived_items.pop().destroy()
+        for i, text in enumerate(texts):
+            if i == len(self._derived_items):
+                _label = ttk.Label(self.instrument)
+                _label.grid(row=self._row, column=len(self._tkk_items) + i, sticky=tk.EW)
+                self._derived_items.append(_label)
+            self._derived_items[i].configure(text=text)
+
+    def set_outlier(self, outlier: bool):
+        """ show the force in red when it is far from the trend of its material, see :mod:`interface.curve_fitting` """
+        if outlier != self._outlier:
+            self._outlier = outlier
+            self._force_label.configure(foreground='red' if outlier else '')
+
+    @profiled()
     def calculate_frequency(self):
-        """ calculate the _frequency_var of `Note` based the pitch of A1 in the parent :class:`Instrument` """
-        # _frequency_var = 2 ** ((note_number - 49) / 12 ) * (_frequency_var of A1)
-        self._frequency_float = 2 ** ((self.get_std_note_number() - 49) / 12) * self.instrument.get_pitch()
+        """
+        calculate the _frequency_var of `Note` based on the pitch, reference note and temperament
+        of the parent :class:`Instrument`, see :meth:`Instrument.update_frequencies` for the whole compass
+        """
+        instrument = self.instrument
+        self.set_frequency(reference_calculation.note_frequency(
+            instrument.get_temperament(), self.get_std_note_number(), instrument.get_pitch(),
+            instrument.get_reference_note()))
+
+    def set_frequency(self, frequency: float):
+        """ set the frequency of the note in hz, this does not update the force """
+        self._frequency_float = float(frequency)
         self._frequency_var.set(f"{self._frequency_float:>.2f}hz")
 
     def get_std_note_number(self) -> int:
@@ -110,52 +176,89 @@ class Note:
     def get_diameter(self) -> Distance:
         return Distance(mm=self._diameter.get())
 
+    def set_diameter(self, mm: float):
+        """ set the diameter of the wire in mm, this does not update the force """
+        self._diameter.set(round(float(mm), 4))
+
+    def get_wrap_layers(self) -> int:
+        """ number of wrap layers, 0 for a plain wire """
+        return self._wrap_layers.get()
+
+    def get_wrap_type(self) -> WireMaterial | None:
+        return WireMaterial.get_by_code(self._wrap_material.get().split(' ')[0])
+
+    def get_wrap_diameter(self) -> Distance:
+        return Distance(mm=self._wrap_diameter.get())
+
+    def get_equivalent_density(self) -> Density:
+        """
+        density of the wire, wound strings use the density of a solid core with the mass of the
+        whole string, see :mod:`interface.wound_strings`
+        """
+        layers = self.get_wrap_layers()
+        if not layers:
+            return self.get_wire_type().density
+        wrap = self.get_wrap_type()
+        if wrap is None:
+            raise ValueError(f'{self.get_std_note_name()} has {layers} wrap layers but no wrap material')
+        return reference_calculation.equivalent_density(self.get_diameter(), self.get_wire_type().density,
+                                                        self.get_wrap_diameter(), wrap.density, layers)
+
     def get_length(self) -> Distance:
         return Distance(mm=self._length.get())
 
+    @profiled()
     def get_force(self) -> Force:
-        """
-        calculate the tension and _diameter of the wire using methods from \n
-        `sound_from_wire_equation <https://www.school-for-champions.com/science/sound_from_wire_equation.htm>`_ \n
-        --- **f** is the _frequency_var in hertz (Hz) or cycles per second \n
-        --- **L** is the _length of the wire in centimeters (cm) \n
-        --- **d** is the _diameter of the wire in cm \n
-        --- **T** is the tension on the wire in gm-cm/s² \n
-        --- **π** is the Greek letter pi = 3.14 \n
-        --- **δ** is the density of the wire in gm/cm³ (Greek letter small delta) \n
-
-        :return: :class:`Tension` of the string as `T = πf²L²d²δ`
-        """
-        pi_hz = pi * self.get_frequency() ** 2  # πf²
-        le = self.get_length().cm() ** 2  # L²
-        di = self.get_diameter().cm() ** 2  # d²
-        den = self.get_wire_type().density.g_cm3()  # δ
-        gcm = pi_hz * le * di * den
-        return Force(g_cm_s2=gcm * self.get_wire_count())
+        """ tension of all the wires of the note, see :func:`reference_calculation.string_force` """
+        return reference_calculation.string_force(self.get_frequency(), self.get_length(), self.get_diameter(),
+                                                  self.get_equivalent_density(), self.get_wire_count())
+
+    def _mark_dirty(self, *args):
+        self._dirty = True
 
+    def schedule_update_force(self, *args):
+        """ recalculate the force once the event queue is idle, only if an input has changed """
+        if self._dirty:
+            self.instrument.schedule_note_update(self)
+
+    @profiled()
     def update_force(self, *arg):
+        self._dirty = False
         try:
             self._force.set(str(self.get_force()))
-        except ValueError or TypeError:
-            # ValueError is only thrown when missing required data
+        except (ValueError, TypeError, AttributeError, tk.TclError):
+            # missing required data while a row is being filled in, e.g. layers typed before the wrap material
             pass
 
     def state_import(self, data: dict):
-        """ convert dict of input fields to a Note """
-        self._wire_count.set(int(data['_wire_count']))
+        """ convert dict of input fields to a Note, blank or unfinished fields are kept as text """
+        self._wire_count.set(_number(data['_wire_count'], int))
         self._material_select.set(str(data['_material_select']))
-        self._diameter.set(float(data['_diameter']))
-        self._length.set(float(data['_length']))
+        self._diameter.set(_number(data['_diameter'], float))
+        self._length.set(_number(data['_length'], float))
+        self._wrap_material.set(str(data.get('_wrap_material', '')))
+        self._wrap_diameter.set(_number(data.get('_wrap_diameter') or 0, float))
+        self._wrap_layers.set(_number(data.get('_wrap_layers') or 0, int))
 
         self.calculate_frequency()
         self.update_force()
 
-    def state_export(self) -> dict[str, int | str]:
-        """ convert input fields to a dict """
-        return dict(_wire_count=self._wire_count.get(),
+    def _get(self, variable: tk.Variable) -> int | float | str:
+        """ value of an input field, the text as typed while it is blank or not yet a number """
+        try:
+            return variable.get()
+        except tk.TclError:
+            return self.instrument.getvar(str(variable))
+
+    def state_export(self) -> dict[str, int | float | str]:
+        """ convert input fields to a dict, blank fields are exported as '' """
+        return dict(_wire_count=self._get(self._wire_count),
                     _material_select=self._material_select.get(),
-                    _diameter=self._diameter.get(),
-                    _length=self._length.get())
+                    _diameter=self._get(self._diameter),
+                    _length=self._get(self._length),
+                    _wrap_material=self._wrap_material.get(),
+                    _wrap_diameter=self._get(self._wrap_diameter),
+                    _wrap_layers=self._get(self._wrap_layers))
 
     def set_focus_to_input(self, input_pos):
         """ Used for binding <Enter>
@@ -174,6 +277,11 @@ class Instrument(ttk.Frame):
     lowest_key: tk.StringVar
     highest_key: tk.StringVar
     pitch: tk.DoubleVar
+    reference_note: tk.StringVar
+    temperament: tk.StringVar
+    keyboard: tk.StringVar
+    key_map: KeyMap
+    derived_columns: DerivedColumns
     file_uri: pathlib.Path | None
 
     def __init__(self, parent):
@@ -187,24 +295,38 @@ class Instrument(ttk.Frame):
         _lbl_inst_name = ttk.Label(self, text="Instrument Name")
         _lbl_lowest_key = ttk.Label(self, text="Lowest Key")
         _lbl_highest_key = ttk.Label(self, text="Highest Key")
-        _lbl_pitch = ttk.Label(self, text="Pitch of A1 (hz)")
+        _lbl_pitch = ttk.Label(self, text="Pitch (hz)")
+        _lbl_reference_note = ttk.Label(self, text="Pitch of Note")
+        _lbl_temperament = ttk.Label(self, text="Temperament")
+        _lbl_keyboard = ttk.Label(self, text="Keyboard")
         # Labels position
         _lbl_inst_name.grid(row=0, column=0, columnspan=3)
         _lbl_lowest_key.grid(row=0, column=3)
         _lbl_highest_key.grid(row=0, column=4)
         _lbl_pitch.grid(row=0, column=5)
+        _lbl_reference_note.grid(row=0, column=6)
+        _lbl_temperament.grid(row=0, column=7)
+        _lbl_keyboard.grid(row=0, column=8)
 
         # Variables Initialize
         self.inst_name = tk.StringVar(self, 'Instrument')
         self.lowest_key = tk.StringVar(self, '1')
         self.highest_key = tk.StringVar(self, '40')
         self.pitch = tk.DoubleVar(self, 440)
+        self.reference_note = tk.StringVar(self, 'A4')
+        self.temperament = tk.StringVar(self, EQUAL.name)
+        self.keyboard = tk.StringVar(self, CHROMATIC)
 
         # Variables set tk types
         _inst_name = ttk.Entry(self, textvariable=self.inst_name)
         _lowest_key = ttk.Entry(self, textvariable=self.lowest_key)
         _highest_key = ttk.Entry(self, textvariable=self.highest_key)
         _pitch = ttk.Entry(self, textvariable=self.pitch)
+        _reference_note = ttk.Entry(self, textvariable=self.reference_note)
+        _temperament = ttk.Combobox(self, textvariable=self.temperament, state='readonly',
+                                    postcommand=lambda: _temperament.configure(values=self._temperament_names()))
+        _keyboard = ttk.Combobox(self, textvariable=self.keyboard, state='readonly',
+                                 postcommand=lambda: _keyboard.configure(values=self._keyboard_names()))
         _button = ttk.Button(self, text="Update Instrument", command=self.update_notes)
 
         # Variables position
@@ -212,40 +334,184 @@ class Instrument(ttk.Frame):
         _lowest_key.grid(row=1, column=3, sticky=tk.EW)
         _highest_key.grid(row=1, column=4, sticky=tk.EW)
         _pitch.grid(row=1, column=5, sticky=tk.EW)
-        _button.grid(row=0, column=6, rowspan=2, columnspan=3, sticky=tk.S)
+        _reference_note.grid(row=1, column=6, sticky=tk.EW)
+        _temperament.grid(row=1, column=7, sticky=tk.EW)
+        _keyboard.grid(row=1, column=8, sticky=tk.EW)
+        _button.grid(row=0, column=9, rowspan=2, sticky=tk.S)
+
+        # recalculate frequencies without rebuilding notes when the tuning changes
+        for _t in (_pitch, _reference_note):
+            _t.bind("<FocusOut>", self.schedule_update_frequencies, add=True)
+            _t.bind("<Return>", self.schedule_update_frequencies, add=True)
+        _temperament.bind("<<ComboboxSelected>>", self._select_temperament, add=True)
 
         # add heading labels for Notes
         for i, name in enumerate(['Number', 'Name', 'Frequency', 'Length(mm)', 'Material',
-                                  'Diameter(mm)', 'Count', 'Force(kgF)']):
+                                  'Diameter(mm)', 'Count', 'Wrap', 'Wrap(mm)', 'Layers', 'Force(kgF)']):
             ttk.Label(self, text=name, anchor=tk.CENTER).grid(row=2, column=i, sticky=tk.EW)
             self.grid_columnconfigure(i,
                                       weight=1,
-                                      minsize=75 if i in {0, 1, 2, 7} else 50)
+                                      minsize=75 if i in {0, 1, 2, 10} else 50)
 
         # bindings
-        general_functions.bind_highlighting_on_focus(_inst_name, _lowest_key, _highest_key, _pitch)
+        general_functions.bind_highlighting_on_focus(_inst_name, _lowest_key, _highest_key, _pitch, _reference_note)
 
         self.notes = dict()
-
+        # notes in order of note number, aligned with :attr:`KeyMap.note_numbers`
+        self._note_list: list[Note] = list()
+        self.key_map = KeyMap([])
+        # keys of a custom keyboard loaded with a design, used while 'Custom' is selected
+        self._custom_keys = KeyMap([])
+        # the instrument's own cents table, and the temperament to go back to when entering a table is cancelled
+        self._custom_temperament: Temperament | None = None
+        self._selected_temperament = EQUAL
+        self.scheduler = IdleScheduler.of(self)
+        self._dirty_notes: set[Note] = set()
+        self.derived_columns = DerivedColumns()
+        self._derived_headers: list[ttk.Label] = list()
+
+    @profiled()
     def update_notes(self, *args):
         """
-        update the notes shown based on the lowest and highest keys given,
-        destroys notes outside of the given range
+        update the notes shown based on the lowest and highest keys and the keyboard given,
+        destroys notes the keyboard no longer sounds
         """
-        note_numbers = list(range(self.get_lowest_key(), self.get_highest_key() + 1))
-        # add new notes
-        for nt in note_numbers:
-            if nt in self.notes:
-                continue
+        try:
+            self._update_note_rows()
+        except ValueError as e:
+            messagebox.showerror("Update Instrument", str(e), parent=self)
+            return
+        self.update_frequencies()
+
+    def _keyboard_names(self) -> list[str]:
+        return [*LAYOUTS, CUSTOM] if len(self._custom_keys) else list(LAYOUTS)
+
+    def _key_map_from_inputs(self) -> KeyMap:
+        """ :raises ValueError: when the lowest key does not suit the keyboard """
+        lowest, highest = self.get_lowest_key(), self.get_highest_key()
+        if self.keyboard.get() != CUSTOM:
+            return KeyMap.layout(self.keyboard.get(), lowest, highest)
+        keys = self._custom_keys.key_notes
+        return KeyMap(keys[(keys >= lowest) & (keys <= highest)], CUSTOM)
+
+    def _update_note_rows(self):
+        """ add and destroy Notes to match the keyboard, only the notes added or removed by the change are touched """
+        key_map = self._key_map_from_inputs()
+        added, removed = key_map.diff(self.notes)
+        for nt in removed.tolist():
+            self.notes.pop(nt).destroy()
+        for nt in added.tolist():
             self.notes[nt] = Note(self, nt)
-        # delete no longer required Notes
-        for k in list(self.notes.keys()):
-            if k not in set(note_numbers):
-                self.notes[k].destroy()
-                self.notes.pop(k)
-        # update frequencies
-        for k, nt in self.notes.items():
-            nt.calculate_frequency()
+        # kept from lowest to highest note
+        self._note_list = [self.notes[nt] for nt in key_map.note_numbers.tolist()]
+        self.notes = {n_.get_std_note_number(): n_ for n_ in self._note_list}
+        self.key_map = key_map
+
+    def schedule_note_update(self, note: Note):
+        """ mark a note for recalculation, every marked note is updated together once the event queue is idle """
+        self._dirty_notes.add(note)
+        self.scheduler.schedule((id(self), 'notes'), self._update_dirty_notes)
+
+    def _update_dirty_notes(self):
+        dirty, self._dirty_notes = self._dirty_notes, set()
+        for note in dirty:
+            if self.notes.get(note.get_std_note_number()) is note:
+                note.update_force()
+        self._update_from_columns()
+
+    def schedule_update_frequencies(self, *args):
+        """ :meth:`update_frequencies` once the event queue is idle, repeated calls are coalesced """
+        self.scheduler.schedule((id(self), 'frequencies'), self.update_frequencies)
+
+    @profiled()
+    def update_frequencies(self, *args):
+        """
+        recalculate the frequency and force of every note in a single vectorized operation,
+        used when the pitch, reference note or temperament changes as no notes need rebuilding.
+        Generates <<InstrumentUpdated>> so plots can be refreshed
+        """
+        if not self.notes:
+            return
+        try:
+            pitch = self.get_pitch()
+            reference_note = self.get_reference_note()
+        except (tk.TclError, AttributeError):
+            # incomplete pitch or reference note while typing
+            return
+        note_numbers = numpy.fromiter(self.notes.keys(), dtype=int, count=len(self.notes))
+        frequencies = self.get_temperament().frequencies(note_numbers, pitch, reference_note)
+        for note, frequency in zip(self.notes.values(), frequencies):
+            note.set_frequency(frequency)
+            note.update_force()
+        self._update_from_columns()
+        self.event_generate('<<InstrumentUpdated>>')
+
+    def set_derived_columns(self, columns: DerivedColumns):
+        """ replace the derived columns shown after the fixed columns of every note """
+        self.derived_columns = columns
+        self._update_derived_headers()
+        self.update_derived_columns()
+        self.event_generate('<<InstrumentUpdated>>')
+
+    def _update_derived_headers(self):
+        while len(self._derived_headers) > len(self.derived_columns):
+            self._derived_headers.pop().destroy()
+        for i, column in enumerate(self.derived_columns):
+            if i == len(self._derived_headers):
+                _label = ttk.Label(self, anchor=tk.CENTER)
+                _label.grid(row=2, column=11 + i, sticky=tk.EW)
+                self._derived_headers.append(_label)
+            self._derived_headers[i].configure(text=column.title)
+
+    @profiled()
+    def update_derived_columns(self, data: dict | None = None):
+        """
+        evaluate the derived columns over the whole compass, only columns whose inputs changed are recomputed
+        :param data: :meth:`state_export` of the instrument, when the caller has already exported it
+        """
+        if not self.notes:
+            return
+        if not len(self.derived_columns):
+            for note in self.notes.values():
+                note.set_derived([])
+            return
+        try:
+            data = self.state_export() if data is None else data
+            base = calculation.note_columns(data)
+            values = self.derived_columns.evaluate(data, base)
+        except (tk.TclError, ValueError, KeyError):
+            # a pitch being typed, or an expression that fails for this design, shown as a blank column
+            for note in self.notes.values():
+                note.set_derived(['-'] * len(self.derived_columns))
+            return
+        for i, note_number in enumerate(base['note_number'].tolist()):
+            self.notes[note_number].set_derived([f'{values[c_.name][i]:.4g}' for c_ in self.derived_columns])
+
+    def _update_from_columns(self):
+        """ derived columns and outliers after notes were recalculated, from a single export of the instrument """
+        try:
+            data = self.state_export()
+        except tk.TclError:
+            # a pitch being typed
+            return
+        self.update_derived_columns(data)
+        self.update_outliers(data)
+
+    @profiled()
+    def update_outliers(self, data: dict | None = None):
+        """
+        mark the notes whose tension is far from the trend of their material, with the options of the Trend menu
+        :param data: :meth:`state_export` of the instrument, when the caller has already exported it
+        """
+        if not self.notes:
+            return
+        try:
+            fit = curve_fitting.fit_design(self.state_export() if data is None else data, 'force')
+        except (tk.TclError, ValueError, KeyError):
+            # a pitch being typed, the marks are left until the instrument can be fitted again
+            return
+        for note_number, outlier in zip(fit.note_number.tolist(), fit.outlier.tolist()):
+            self.notes[note_number].set_outlier(outlier)
 
     def get_name(self) -> str:
         """ get the given Instrument name as a string """
@@ -255,6 +521,40 @@ class Instrument(ttk.Frame):
         """ get Instrument pitch as a float"""
         return self.pitch.get()
 
+    def get_reference_note(self) -> int:
+        """ get the note tuned to the Instrument pitch as an integer """
+        return general_functions.note_name_to_number(self.reference_note.get())
+
+    def get_temperament(self) -> Temperament:
+        """ get the selected :class:`Temperament`, the instrument's own table when the custom entry is selected """
+        if self._custom_temperament is not None and self.temperament.get() == self._custom_temperament.name:
+            return self._custom_temperament
+        return Temperament.get_by_name(self.temperament.get())
+
+    def _custom_temperament_name(self) -> str:
+        return CUSTOM_TEMPERAMENT if self._custom_temperament is None else self._custom_temperament.name
+
+    def _temperament_names(self) -> list[str]:
+        return [*Temperament.name_list(), self._custom_temperament_name()]
+
+    def _select_temperament(self, *args):
+        """ the custom entry asks for the instrument's cents table, starting from the table last used """
+        if self.temperament.get() == self._custom_temperament_name():
+            start = self._custom_temperament or self._selected_temperament
+            text = simpledialog.askstring("Temperament", "12 offsets in cents from equal temperament, C to B",
+                                          initialvalue=' '.join(f'{c_:g}' for c_ in start.cents), parent=self)
+            if text is None:
+                self.temperament.set(self._selected_temperament.name)
+                return
+            try:
+                self._custom_temperament = Temperament.from_text(self._custom_temperament_name(), text)
+            except ValueError as e:
+                messagebox.showerror("Temperament", str(e), parent=self)
+                self.temperament.set(self._selected_temperament.name)
+                return
+        self._selected_temperament = self.get_temperament()
+        self.schedule_update_frequencies()
+
     def get_lowest_key(self) -> int:
         """ get lowest key as an integer """
         return general_functions.note_name_to_number(self.lowest_key.get())
@@ -269,11 +569,15 @@ class Instrument(ttk.Frame):
         :param function: any function, applied as function(note)
         :param note_number: any note, given as std number (A0=1) or scientific name 'A#2'
         """
-        if isinstance(note_number, str):
-            note_number = general_functions.note_name_to_number(note_number)
-        if note_number not in self.notes.items():
+        try:
+            note = self._note_list[self.key_map.index(note_number)]
+        except KeyError:
             return
-        return function(self.notes[note_number])
+        return function(note)
+
+    def note_at_key(self, position: int) -> Note:
+        """ the Note sounded by a key, keys are numbered from 0 at the lowest key """
+        return self._note_list[self.key_map.key_index[position]]
 
     def apply_to_note_list(self, function: typing.Callable[[Note], None], note_list: list[int | str]):
         """
@@ -306,30 +610,70 @@ class Instrument(ttk.Frame):
         """ get a list of all Notes currently in the Instrument """
         return list(self.notes.values())
 
+    @profiled()
     def state_import(self, data: dict):
         """
         Convert dict of input fields to an Instrument, includes calls for Note fields.
-        This resets all current notes.
+        This resets all current notes, notes missing from `data` are left empty.
+        A keyboard layout that does not fit the compass is replaced with a chromatic keyboard and a warning.
+        :raises ValueError: when the compass is not valid, before any note is changed
         """
+        key_map = self.key_map_from_state(data)
+        if key_map.name != data.get('keyboard', CHROMATIC):
+            messagebox.showwarning("Keyboard", f"{data['keyboard']} does not fit the compass of "
+                                               f"{data['lowest_key']}-{data['highest_key']}, using a chromatic "
+                                               f"keyboard", parent=self)
         for k_, note in self.notes.items():
             note.destroy()
         self.notes = dict()
+        self._note_list = list()
         self.inst_name.set(data['inst_name'])
         self.lowest_key.set(data['lowest_key'])
         self.highest_key.set(data['highest_key'])
         self.pitch.set(float(data['pitch']))
-        self.update_notes()
+        self.reference_note.set(data.get('reference_note', 'A4'))
+        temperament = calculation.temperament_from_state(data)
+        self._custom_temperament = None if temperament.name in Temperament.name_list() else temperament
+        self._selected_temperament = temperament
+        self.temperament.set(temperament.name)
+        self._custom_keys = key_map if key_map.name == CUSTOM else KeyMap([])
+        self.keyboard.set(key_map.name)
+        self.derived_columns = DerivedColumns.from_state(data)
+        self._update_note_rows()
         for key, var in self.notes.items():
-            key = int(key)
-            var.state_import(data['notes'][str(key)])
+            note_data = data['notes'].get(str(key))
+            if note_data is not None:
+                var.state_import(note_data)
+        self._update_derived_headers()
+        self.update_frequencies()
+
+    @staticmethod
+    def key_map_from_state(data: dict) -> KeyMap:
+        """
+        the keyboard of a saved design, chromatic when its layout does not fit the compass,
+        e.g. a short octave that does not start on a C or G
+        :raises ValueError: when the compass itself is not valid
+        """
+        try:
+            return KeyMap.from_state(data)
+        except ValueError:
+            return KeyMap.layout(CHROMATIC, general_functions.note_name_to_number(str(data['lowest_key'])),
+                                 general_functions.note_name_to_number(str(data['highest_key'])))
 
+    @profiled()
     def state_export(self) -> dict:
         """ convert all input fields to a dictionary, this includes all Notes and their inputs"""
-        note_dict = {k: n_.state_export() for k, n_ in self.notes.items()}
+        # keyed by text as in a saved file, so a document kept in memory imports the same as one read back
+        note_dict = {str(k): n_.state_export() for k, n_ in self.notes.items()}
         return dict(inst_name=self.inst_name.get(),
                     lowest_key=self.lowest_key.get(),
                     highest_key=self.highest_key.get(),
                     pitch=self.pitch.get(),
+                    reference_note=self.reference_note.get(),
+                    temperament=self.temperament.get(),
+                    temperament_cents=self.get_temperament().cents.tolist(),
+                    **self.key_map.state_export(),
+                    derived_columns=self.derived_columns.state_export(),
                     notes=note_dict)
 
     def get_next_note_input(self, note_number: int, input_pos: int, note_increment=0, input_increment=0):
@@ -340,18 +684,9 @@ class Instrument(ttk.Frame):
         :param note_increment: number of positions to move vertically - positive moves down
         :param input_increment: number of positions to move horizontally - positive moves right
         """
-        input_count = 4
-        note_number += note_increment
+        input_count = len(self._note_list[0].tkk_input_items)
         input_pos += input_increment
-
-        if input_pos % input_count:
-            note_number += input_pos // input_count
-            input_pos = input_pos % input_count
-
-        if note_number > max(self.notes):
-            note_number = min(self.notes)
-        elif note_number < min(self.notes):
-            note_number = max(self.notes)
-
-        next_note: Note = self.notes.get(note_number)
-        next_note.set_focus_to_input(input_pos)
+        # moving past either end of a row moves to the next or previous note, notes the keyboard skips are passed over
+        steps = note_increment + input_pos // input_count
+        next_note: Note = self.notes[self.key_map.step(note_number, steps)]
+        next_note.set_focus_to_input(input_pos % input_count)
@@ -0,0 +1,330 @@
+"""
+Record a session of the main window and replay it to measure how long the interface takes to respond. \n
+The recorder writes one json object per line: the design and window size at the start, then cell edits,
+navigation keys in the note grid (see :meth:`Instrument.get_next_note_input`), button presses such as the
+plot buttons, and layout swaps. Menu commands and dialogs are not recorded. \n
+Replaying re-drives each event on a fresh :class:`TkInterface` and times it until the event queue and every
+idle callback has run, so the time includes the force updates, plot redraws and layout passes it causes.
+Latency percentiles are reported per kind of event, with the number of widgets before and after. Replays
+need a display, ``--xvfb`` starts a virtual one when Xvfb is installed. Usage::
+
+    python -m interface.interaction_replay generate --notes 88 session_88.jsonl
+    python -m interface.interaction_replay replay session_88.jsonl --xvfb --json report.json
+
+Sessions are recorded from Debug > Record Session.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import time
+import tkinter as tk
+import typing
+from tkinter import ttk
+
+from interface.profiling import CallStats
+
+if typing.TYPE_CHECKING:
+    from interface.general_tkiner_classes import TkInterface
+
+EVENT_TYPES = ('edit', 'navigate', 'invoke', 'layout')
+# keys bound by each note input, with their modifier
+NAVIGATION_KEYS = {('Up', ''), ('Down', ''), ('Left', ''), ('Right', ''), ('Return', ''), ('Return', 'Shift')}
+_shift_mask = 0x0001
+
+
+def widget_count(widget: tk.Misc) -> int:
+    """ number of widgets below and including `widget`, toplevel windows included """
+    return 1 + sum(widget_count(c_) for c_ in widget.winfo_children())
+
+
+class InteractionRecorder:
+    """ records events of a :class:`TkInterface` while :attr:`recording`, see the module docstring for the format """
+    root: TkInterface
+    events: list[dict]
+    recording: bool
+
+    def __init__(self, root: TkInterface):
+        self.root = root
+        self.events = list()
+        self.recording = False
+        self._start = 0.0
+        self._inputs: dict[str, tuple[int, int]] = dict()
+        self._focus_value: dict[str, str] = dict()
+        # the bindings stay for the life of the window, they return straight away when not recording
+        root.bind_all('<FocusIn>', self._on_focus_in, add=True)
+        root.bind_all('<FocusOut>', self._on_focus_out, add=True)
+        root.bind_all('<KeyPress>', self._on_key, add=True)
+        root.bind_all('<ButtonRelease-1>', self._on_release, add=True)
+        root.bind('<<LayoutChanged>>', self._on_layout, add=True)
+
+    def start(self):
+        self.events = [dict(type='start', t=0.0, geometry=self.root.geometry(),
+                            state=self.root.instrument.state_export())]
+        self._start = time.perf_counter()
+        self.recording = True
+
+    def stop(self) -> list[dict]:
+        self.recording = False
+        return self.events
+
+    def save(self, file: str | pathlib.Path):
+        write_session(file, self.events)
+
+    def _add(self, event_type: str, **fields):
+        self.events.append(dict(type=event_type, t=round(time.perf_counter() - self._start, 4), **fields))
+
+    def _note_input(self, widget: typing.Any) -> tuple[int, int] | None:
+        """ (note number, input position) of a note input, the lookup is rebuilt when the notes change """
+        path = str(widget)
+        if path not in self._inputs:
+            self._inputs = {str(w_): (n_, i_) for n_, note in self.root.instrument.notes.items()
+                            for i_, w_ in enumerate(note.tkk_input_items)}
+        return self._inputs.get(path)
+
+    def _on_focus_in(self, event):
+        if self.recording and self._note_input(event.widget) is not None:
+            self._focus_value[str(event.widget)] = event.widget.get()
+
+    def _on_focus_out(self, event):
+        if not self.recording:
+            return
+        position = self._note_input(event.widget)
+        if position is None:
+            return
+        value = event.widget.get()
+        if self._focus_value.pop(str(event.widget), None) != value:
+            self._add('edit', note=position[0], input=position[1], value=value)
+
+    def _on_key(self, event):
+        if not self.recording:
+            return
+        modifier = 'Shift' if event.state & _shift_mask else ''
+        if (event.keysym, modifier) not in NAVIGATION_KEYS:
+            return
+        position = self._note_input(event.widget)
+        if position is None:
+            return
+        # the edit is recorded first, as the focus moves after the value was typed
+        value = event.widget.get()
+        if self._focus_value.get(str(event.widget), value) != value:
+            self._focus_value[str(event.widget)] = value
+            self._add('edit', note=position[0], input=position[1], value=value)
+        self._add('navigate', note=position[0], input=position[1], key=event.keysym, modifier=modifier)
+
+    def _on_release(self, event):
+        if self.recording and isinstance(event.widget, (ttk.Button, ttk.Checkbutton, tk.Button)):
+            self._add('invoke', widget=str(event.widget), text=str(event.widget.cget('text')))
+
+    def _on_layout(self, event):
+        if self.recording:
+            self._add('layout', layout='vertical' if self.root._current_layout_ == 0 else 'horizontal')
+
+
+def write_session(file: str | pathlib.Path, events: typing.Iterable[dict]):
+    with open(file, 'w') as f:
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+
+
+def read_session(file: str | pathlib.Path) -> list[dict]:
+    with open(file, 'r') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    if not events or events[0].get('type') != 'start':
+        raise ValueError(f'{file} does not start with a start event')
+    return events
+
+
+def generate_session(notes: int = 61, lowest_key: int = 16, passes: int = 2) -> list[dict]:
+    """
+    a scripted workshop session, for comparing releases without a recording
+    :param notes: keys on the keyboard, e.g. 61 or 88
+    :param lowest_key: note number of the lowest key
+    :param passes: times every length and diameter is edited, moving down the grid with Return
+    """
+    highest_key = lowest_key + notes - 1
+    state = dict(inst_name=f'{notes} note workflow', lowest_key=str(lowest_key), highest_key=str(highest_key),
+                 pitch=415.0, reference_note='A4', temperament='Equal',
+                 notes={str(n_): dict(_wire_count=1, _material_select='1 Rose Iron', _diameter=0.4,
+                                      _length=round(1700 * 0.95 ** ((n_ - lowest_key) / 1.5) + 120, 1),
+                                      _wrap_material='', _wrap_diameter=0.0, _wrap_layers=0)
+                        for n_ in range(lowest_key, highest_key + 1)})
+    events = [dict(type='start', t=0.0, geometry='1400x900', state=state)]
+    for p_ in range(passes):
+        for input_pos, field in ((0, '_length'), (2, '_diameter')):
+            for n_ in range(lowest_key, highest_key + 1):
+                value = state['notes'][str(n_)][field] * (1 + 0.01 * (p_ + 1))
+                events.append(dict(type='edit', note=n_, input=input_pos, value=f'{value:.4g}'))
+                events.append(dict(type='navigate', note=n_, input=input_pos, key='Return', modifier=''))
+        for n_ in range(highest_key, lowest_key, -1):
+            events.append(dict(type='navigate', note=n_, input=1, key='Up', modifier=''))
+        for text in ('Tension', 'Diameter', 'Tension & Diameter', 'Tolerance'):
+            events.append(dict(type='invoke', widget='', text=text))
+        events.append(dict(type='layout', layout='horizontal' if p_ % 2 == 0 else 'vertical'))
+    return events
+
+
+class InteractionReplay:
+    """ replays a session on a :class:`TkInterface` and times every event """
+    root: TkInterface
+    stats: dict[str, CallStats]
+
+    def __init__(self, root: TkInterface):
+        self.root = root
+        self.stats = {t_: CallStats(t_) for t_ in EVENT_TYPES}
+        self.widgets_before = 0
+        self.widgets_after = 0
+        self.skipped: list[tuple[dict, str]] = list()
+
+    def _settle(self):
+        """ process events until the queue and the idle callbacks are empty """
+        self.root.update()
+
+    def _input(self, event: dict) -> tk.Widget:
+        return self.root.instrument.notes[event['note']].tkk_input_items[event['input']]
+
+    def _button(self, event: dict) -> tk.Widget:
+        """ the recorded widget, or when it no longer exists the first button with the same text """
+        try:
+            if event.get('widget'):
+                return self.root.nametowidget(event['widget'])
+        except KeyError:
+            pass
+        stack = [self.root]
+        while stack:
+            widget = stack.pop()
+            if isinstance(widget, (ttk.Button, tk.Button)) and str(widget.cget('text')) == event['text']:
+                return widget
+            stack.extend(reversed(widget.winfo_children()))
+        raise KeyError(f"no button {event['text']!r}")
+
+    def dispatch(self, event: dict):
+        """ perform one recorded event, without waiting for the work it causes """
+        if event['type'] == 'edit':
+            widget = self._input(event)
+            widget.focus_force()
+            widget.delete(0, tk.END)
+            widget.insert(0, event['value'])
+            widget.event_generate('<FocusOut>')
+        elif event['type'] == 'navigate':
+            widget = self._input(event)
+            widget.focus_force()
+            modifier = f"{event['modifier']}-" if event.get('modifier') else ''
+            widget.event_generate(f"<{modifier}KeyPress-{event['key']}>")
+        elif event['type'] == 'invoke':
+            self._button(event).invoke()
+        elif event['type'] == 'layout':
+            if event['layout'] == 'vertical':
+                self.root.set_vertical_layout()
+            else:
+                self.root.set_horizontal_layout()
+
+    def run(self, events: list[dict], realtime: bool = False):
+        """
+        :param events: a session, see :func:`read_session`
+        :param realtime: wait between events as long as the recording did, otherwise replay back to back
+        """
+        start = events[0]
+        self.root.geometry(start.get('geometry', '1400x900'))
+        self.root.workspace.open(start['state'])
+        self._settle()
+        self.widgets_before = widget_count(self.root)
+        began = time.perf_counter()
+        for event in events[1:]:
+            if event['type'] not in self.stats:
+                continue
+            if realtime:
+                wait = event['t'] - (time.perf_counter() - began)
+                if wait > 0:
+                    time.sleep(wait)
+            t0 = time.perf_counter()
+            try:
+                self.dispatch(event)
+            except (KeyError, IndexError, tk.TclError) as e:
+                self.skipped.append((event, str(e)))
+                continue
+            self._settle()
+            self.stats[event['type']].add(time.perf_counter() - t0)
+        self.widgets_after = widget_count(self.root)
+
+    def report(self) -> dict:
+        return dict(widgets_before=self.widgets_before, widgets_after=self.widgets_after,
+                    skipped=len(self.skipped),
+                    events=[s_.summary() for s_ in self.stats.values() if s_.count])
+
+
+@contextlib.contextmanager
+def virtual_display(size: str = '1920x1080x24', display: str = ':99'):
+    """ run an Xvfb server for the duration of the context, when there is no display already """
+    if os.environ.get('DISPLAY'):
+        yield os.environ['DISPLAY']
+        return
+    if shutil.which('Xvfb') is None:
+        raise SystemExit('no DISPLAY and Xvfb is not installed')
+    process = subprocess.Popen(['Xvfb', display, '-screen', '0', size, '-nolisten', 'tcp'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ['DISPLAY'] = display
+    try:
+        # wait for the server to accept connections
+        for _ in range(50):
+            if pathlib.Path(f'/tmp/.X11-unix/X{display.lstrip(":")}').exists():
+                break
+            time.sleep(0.1)
+        yield display
+    finally:
+        os.environ.pop('DISPLAY', None)
+        process.terminate()
+        process.wait()
+
+
+def _print_report(report: dict):
+    print(f"widgets {report['widgets_before']} before, {report['widgets_after']} after, "
+          f"{report['skipped']} events skipped")
+    print(f'{"event":<10}{"count":>7}{"p50 ms":>9}{"p90 ms":>9}{"p99 ms":>9}{"max ms":>9}{"total ms":>10}')
+    for row in report['events']:
+        print(f"{row['name']:<10}{row['count']:>7}{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+              f"{row['max_ms']:>9.1f}{row['total_ms']:>10.0f}")
+
+
+def main(argv: typing.Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(prog='python -m interface.interaction_replay', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help="write a scripted session")
+    generate.add_argument('file')
+    generate.add_argument('--notes', type=int, default=61)
+    generate.add_argument('--lowest', type=int, default=16, help="note number of the lowest key")
+    generate.add_argument('--passes', type=int, default=2)
+    replay = commands.add_parser('replay', help="replay a session and report the latency of each kind of event")
+    replay.add_argument('file')
+    replay.add_argument('--xvfb', action='store_true', help="start Xvfb when there is no DISPLAY")
+    replay.add_argument('--realtime', action='store_true', help="keep the recorded time between events")
+    replay.add_argument('--json', help="file to write the report to")
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        write_session(args.file, generate_session(args.notes, args.lowest, args.passes))
+        return
+    events = read_session(args.file)
+    with virtual_display() if args.xvfb else contextlib.nullcontext():
+        from interface.general_tkiner_classes import TkInterface
+        root = TkInterface()
+        try:
+            replayer = InteractionReplay(root)
+            replayer.run(events, args.realtime)
+        finally:
+            root.destroy()
+    report = replayer.report()
+    _print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(json.dumps(dict(report, session=str(args.file), created=time.time()), indent=2))
+
+
+if __name__ == '__main__':
+    main()
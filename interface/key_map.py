@@ -0,0 +1,160 @@
+"""
+Map of the physical keys of a keyboard to the notes they sound, for compasses that are not chromatic. \n
+Keys are numbered by position from the lowest key. A short octave leaves out the bass sharps by giving the
+lowest keys other notes, e.g. the E key sounds C. A broken octave splits the bass sharps so both halves
+sound different notes. Split sharps add a second key for a note. \n
+The note grid has one row per note, so both keys of a split note share that note's string, length and gauge,
+where a real instrument has a string for each half-key. Totals over the strings of such a keyboard would leave
+out the second strings, so the cut list, pitch raise and Pareto front leave these designs out, see
+:func:`shares_strings`. \n
+The notes sounded are kept in order of note number, and the indices for looking up a note by number, name or key
+position are built once. Changing the map gives the notes to add and remove as a diff. Usage::
+
+    keys = KeyMap.layout('C/E short octave', general_functions.note_name_to_number('C1'), 64)
+    keys.notes_of_keys([0, 1, 2])  # C1, F1, D1
+    added, removed = keys.diff(KeyMap.layout('Chromatic', 16, 64))
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy
+
+from interface import general_functions
+
+CHROMATIC = 'Chromatic'
+CUSTOM = 'Custom'
+SPLIT_SHARPS = 'Split sharps'
+# semitones above the lowest note sounded by the lowest keys, the keys above carry on chromatically
+_bass_octaves = {'C/E short octave': (0, 5, 2, 7, 4, 9, 10, 11),
+                 'G/B short octave': (0, 5, 2, 7, 4, 9, 10, 11),
+                 'C/E broken octave': (0, 5, 2, 6, 7, 4, 8, 9, 10, 11),
+                 'G/B broken octave': (0, 5, 2, 6, 7, 4, 8, 9, 10, 11)}
+# pitch classes of the lowest note of each layout, C = 0
+_lowest_class = {'C/E short octave': 0, 'G/B short octave': 7, 'C/E broken octave': 0, 'G/B broken octave': 7}
+# pitch classes with two keys, D♯/E♭ and G♯/A♭
+_split_classes = (3, 8)
+LAYOUTS = (CHROMATIC, *_bass_octaves, SPLIT_SHARPS)
+
+
+def shares_strings(data: dict) -> bool:
+    """ whether keys of the keyboard saved in a :meth:`Instrument.state_export` document share a string """
+    name = data.get('keyboard', CHROMATIC)
+    if name == CUSTOM:
+        keys = data.get('keys', [])
+        return len(set(keys)) < len(keys)
+    return name == SPLIT_SHARPS
+
+
+def require_own_strings(data: dict):
+    """ :raises ValueError: when keys share strings, see :func:`shares_strings` """
+    if shares_strings(data):
+        raise ValueError(f"keys of the {data.get('keyboard')} keyboard share strings, "
+                         f"totals would leave out the second string of each")
+
+
+class KeyMap:
+    """ note number sounded by each key, with indices by note number, name and key position """
+    name: str
+    key_notes: numpy.ndarray
+    note_numbers: numpy.ndarray
+    key_index: numpy.ndarray
+
+    def __init__(self, key_notes: typing.Sequence[int], name: str = CUSTOM):
+        """
+        :param key_notes: note number sounded by each key from the lowest key, notes may repeat and need not be in order
+        :param name: name of the layout, one of :data:`LAYOUTS` or :data:`CUSTOM`
+        """
+        self.name = name
+        self.key_notes = numpy.asarray(key_notes, dtype=int).reshape(-1)
+        # notes sounded in order, and the position of each key's note in that order
+        self.note_numbers, self.key_index = numpy.unique(self.key_notes, return_inverse=True)
+        self._note_index = {n_: i_ for i_, n_ in enumerate(self.note_numbers.tolist())}
+        self._name_index = {general_functions.note_number_to_name(n_): i_ for n_, i_ in self._note_index.items()}
+        keys_of: dict[int, list[int]] = {n_: [] for n_ in self._note_index}
+        for position, note in enumerate(self.key_notes.tolist()):
+            keys_of[note].append(position)
+        self._keys_of = {n_: tuple(p_) for n_, p_ in keys_of.items()}
+
+    @classmethod
+    def layout(cls, name: str, lowest: int, highest: int) -> KeyMap:
+        """
+        :param name: one of :data:`LAYOUTS`
+        :param lowest: lowest note sounded, for short and broken octaves a C or G as given by the name
+        :param highest: highest note sounded
+        :raises ValueError: for unknown layouts, or a lowest note the layout does not start on
+        """
+        if highest < lowest:
+            raise ValueError(f'highest note {highest} is below the lowest note {lowest}')
+        chromatic = list(range(lowest, highest + 1))
+        if name == CHROMATIC:
+            return cls(chromatic, name)
+        if name == SPLIT_SHARPS:
+            return cls([k_ for n_ in chromatic for k_ in ((n_, n_) if (n_ - 4) % 12 in _split_classes else (n_,))],
+                       name)
+        if name not in _bass_octaves:
+            raise ValueError(f'unknown keyboard {name!r}, use one of {", ".join(LAYOUTS)}')
+        if (lowest - 4) % 12 != _lowest_class[name]:
+            raise ValueError(f'a {name} starts on {"C" if _lowest_class[name] == 0 else "G"}, '
+                             f'not {general_functions.note_number_to_name(lowest)}')
+        bass = [lowest + s_ for s_ in _bass_octaves[name] if lowest + s_ <= highest]
+        return cls(bass + list(range(lowest + 12, highest + 1)), name)
+
+    @classmethod
+    def from_state(cls, data: dict) -> KeyMap:
+        """ the keyboard saved in a :meth:`Instrument.state_export` document, chromatic when none is saved """
+        name = data.get('keyboard', CHROMATIC)
+        if name == CUSTOM:
+            return cls(data['keys'], CUSTOM)
+        return cls.layout(name, general_functions.note_name_to_number(str(data['lowest_key'])),
+                          general_functions.note_name_to_number(str(data['highest_key'])))
+
+    def state_export(self) -> dict:
+        if self.name == CUSTOM:
+            return dict(keyboard=self.name, keys=self.key_notes.tolist())
+        return dict(keyboard=self.name)
+
+    def __len__(self):
+        """ number of notes sounded, see :attr:`key_count` for the number of keys """
+        return self.note_numbers.size
+
+    def __contains__(self, note_number: int) -> bool:
+        return note_number in self._note_index
+
+    def __eq__(self, other: KeyMap):
+        return isinstance(other, KeyMap) and numpy.array_equal(self.key_notes, other.key_notes)
+
+    @property
+    def key_count(self) -> int:
+        return self.key_notes.size
+
+    def index(self, note: int | str) -> int:
+        """
+        position of a note in :attr:`note_numbers`
+        :param note: standard note number (A0 = 1) or scientific name 'A#2'
+        :raises KeyError: when the keyboard does not sound the note
+        """
+        if isinstance(note, str):
+            return self._name_index[general_functions.note_number_to_name(general_functions.note_name_to_number(note))]
+        return self._note_index[note]
+
+    def keys_of(self, note_number: int) -> tuple[int, ...]:
+        """ positions of every key sounding a note, more than one for split keys, which share the note's string """
+        return self._keys_of[note_number]
+
+    def notes_of_keys(self, positions: typing.Sequence[int] | numpy.ndarray) -> numpy.ndarray:
+        """ note number sounded by each key position """
+        return self.key_notes[numpy.asarray(positions, dtype=int)]
+
+    def step(self, note_number: int, steps: int) -> int:
+        """ the note `steps` places above `note_number` in :attr:`note_numbers`, wrapping around at either end """
+        return int(self.note_numbers[(self.index(note_number) + steps) % self.note_numbers.size])
+
+    def diff(self, previous: KeyMap | typing.Iterable[int]) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        :param previous: the map, or the note numbers, before the change
+        :return: (note numbers added, note numbers removed)
+        """
+        old = previous.note_numbers if isinstance(previous, KeyMap) else numpy.fromiter(previous, dtype=int)
+        return (numpy.setdiff1d(self.note_numbers, old, assume_unique=True),
+                numpy.setdiff1d(old, self.note_numbers, assume_unique=True))
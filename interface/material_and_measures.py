@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import re
 
 import definitions
@@ -7,17 +8,62 @@ import definitions
 _extraction_for_numbers_ = re.compile(r'\d+(?:\.\d*)?')
 
 
+_extraction_for_measures_ = re.compile(r'\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)\s*(.*?)\s*$')
+
+# unit suffixes accepted by each measure, as multiples of the unit stored by the class
+distance_units = {'mm': 1.0, 'cm': 10.0, 'm': 1000.0, 'in': 25.4, 'inch': 25.4, 'inches': 25.4, '"': 25.4}
+force_units = {'n': 1.0, 'newton': 1.0, 'newtons': 1.0, 'dyne': 1e-5,
+               'kg-f': 1 / 0.101971621297793, 'kgf': 1 / 0.101971621297793, 'kg': 1 / 0.101971621297793,
+               'lbf': 4.4482216152605, 'lb-f': 4.4482216152605, 'lb': 4.4482216152605}
+density_units = {'g/cm3': 1.0, 'g/cm³': 1.0, 'gm/cm3': 1.0, 'gm/cm³': 1.0, 'kg/m3': 0.001, 'kg/m³': 0.001}
+stress_units = {'mpa': 1.0, 'n/mm2': 1.0, 'n/mm²': 1.0, 'gpa': 1000.0,
+                'kg-f/mm2': 1 / 0.101971621297793, 'kgf/mm2': 1 / 0.101971621297793,
+                'kg-f/mm²': 1 / 0.101971621297793, 'kgf/mm²': 1 / 0.101971621297793}
+
+
 def extract_numeric(var: str) -> float:
+    """ first number found in a string, any units are ignored, see :func:`extract_measure` """
     var = _extraction_for_numbers_.findall(var)[0]
     return float(var)
 
 
+def split_measure(var: str) -> tuple[float, str]:
+    """
+    split a number with an optional unit suffix, "1.2 m" -> (1.2, 'm'), "12" -> (12.0, '') \n
+    :raises ValueError: when the string does not start with a number
+    """
+    match = _extraction_for_measures_.match(var)
+    if match is None:
+        raise ValueError(f'no number in {var!r}')
+    return float(match.group(1)), normalise_unit(match.group(2))
+
+
+def normalise_unit(unit: str) -> str:
+    """ lower case unit without spaces or trailing full stops, so "Kg F" matches "kgf" """
+    return unit.lower().replace(' ', '').rstrip('.')
+
+
+def extract_measure(var: str, units: dict[str, float], default_unit: str) -> float:
+    """
+    convert a number with an optional unit suffix, "1.2 m" -> 1200.0 with :data:`distance_units`
+    :param var: number followed by an optional unit
+    :param units: accepted units as multiples of the returned unit
+    :param default_unit: unit used when the string has no unit
+    :raises ValueError: when there is no number or the unit is not in `units`
+    """
+    value, unit = split_measure(var)
+    try:
+        return value * units[unit or default_unit]
+    except KeyError:
+        raise ValueError(f'unknown unit {unit!r} in {var!r}') from None
+
+
 class Distance:
     _var: float  # millimeters
 
     def __init__(self, arg=None, mm: float = None, cm: float = None, m: float = None):
         if isinstance(arg, str):
-            self._var = extract_numeric(arg)
+            self._var = extract_measure(arg, distance_units, 'mm')
         elif mm:
             self._var: float = float(mm)
         elif cm:
@@ -48,7 +94,7 @@ class Force:
         kg_m_s2 = newton or kg_m_s2
         g_cm_s2 = dyne or g_cm_s2
         if isinstance(arg, str):
-            self._var = extract_numeric(arg) / 0.101971621297793
+            self._var = extract_measure(arg, force_units, 'kg-f')
         elif kg_m_s2:
             self._var = float(kg_m_s2)
         elif g_cm_s2:
@@ -77,8 +123,8 @@ class Density:
 
     def __init__(self, arg=None, g_cm3: float = None, kg_m3: float = None):
         if isinstance(arg, str):
-            self._var = extract_numeric(arg)
-        if g_cm3:
+            self._var = extract_measure(arg, density_units, 'g/cm3')
+        elif g_cm3:
             self._var: float = float(g_cm3)
         elif kg_m3:
             self._var: float = float(kg_m3) / 1000
@@ -95,6 +141,32 @@ class Density:
         return f'{self._var:.2f}gm/cm³'
 
 
+class Stress:
+    _var: float  # megapascal, N/mm²
+
+    def __init__(self, arg=None, mpa: float = None, n_mm2: float = None, kg_force_mm2: float = None):
+        mpa = mpa or n_mm2
+        if isinstance(arg, str):
+            self._var = extract_measure(arg, stress_units, 'mpa')
+        elif mpa:
+            self._var = float(mpa)
+        elif kg_force_mm2:
+            self._var = float(kg_force_mm2) / 0.101971621297793
+        else:
+            raise ValueError('accepted type not given')
+
+    def mpa(self):
+        return self._var
+
+    def kg_force_mm2(self):
+        return self._var * 0.101971621297793
+
+    n_mm2 = mpa
+
+    def __str__(self):
+        return f'{self._var:.0f}MPa'
+
+
 class WireMaterial:
     """
     WireMaterial used to define
@@ -102,15 +174,17 @@ class WireMaterial:
     _code_dict: dict[str, WireMaterial] = {}
     _name_dict: dict[str, WireMaterial] = {}
 
-    def __init__(self, code: str, name: str, density: Density):
+    def __init__(self, code: str, name: str, density: Density, tensile_strength: Stress | None = None):
         """
         :param code: reference code for wire type
         :param name: full name of wire type
         :param density: density of material in kg/m^2
+        :param tensile_strength: breaking stress of the wire, None when unknown
         """
         self.code = code
         self.name = name
         self.density = density
+        self.tensile_strength = tensile_strength
         self._code_dict[self.code] = self
         self._name_dict[self.name] = self
 
@@ -167,6 +241,19 @@ class WireMaterial:
             ))
         return mat_list
 
+    @classmethod
+    def material_objects(cls) -> list[WireMaterial]:
+        """ return every material currently available """
+        return list(cls._name_dict.values())
+
+    @classmethod
+    def catalogue_version(cls) -> str:
+        """ hash of every material currently available, changes when a material is added, removed or edited """
+        materials = sorted((m_.code, m_.name, m_.density.g_cm3(),
+                            None if m_.tensile_strength is None else m_.tensile_strength.mpa())
+                           for m_ in cls._code_dict.values())
+        return hashlib.sha1(repr(materials).encode('utf-8')).hexdigest()
+
     @classmethod
     def code_name_list(cls) -> list[str]:
         """ return human readable code + name of every material in a list """
@@ -177,5 +264,6 @@ with open(definitions.WIRE_TYPE_CSV, 'r') as f:
     # import standard wire materials
     for line in f.readlines():
         line = line.strip()
-        c, n, d = line.split(',')
-        WireMaterial(c, n, Density(kg_m3=float(d)))
+        # code, name, density kg/m³ (, tensile strength MPa)
+        c, n, d, *t = line.split(',')
+        WireMaterial(c, n, Density(kg_m3=float(d)), Stress(mpa=float(t[0])) if t and t[0] else None)
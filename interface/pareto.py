@@ -0,0 +1,349 @@
+"""
+Multi-objective exploration of stringing schedules for a fixed scale. \n
+A candidate splits the compass into ranges, each strung in one material and gauge, ranges are
+thicker towards the bass. Every objective is minimised and evaluated for a whole batch of candidates
+as (candidates × notes) arrays:
+
+- unevenness, standard deviation of the log of the tension of each wire
+- cost, wire mass in kg times the price per kg of each material
+- stress, highest percent of break of any note
+- changes, number of neighbouring notes with a different material or gauge
+
+Batches mix random candidates with mutations of members of the archive and are evaluated in a process
+pool, the :class:`ParetoArchive` keeps only candidates no other candidate beats in every objective. Usage::
+
+    problem = ParetoProblem(instrument.state_export())
+    explorer = ParetoExplorer(problem)
+    for archive in explorer.run(batches=50):
+        ...  # archive.objectives holds the current front
+    data = problem.state(archive.genome(0))  # for Instrument.state_import
+
+Only plain wires are generated, wrap settings of the design are removed from exported candidates.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import copy
+import os
+import typing
+
+import numpy
+
+from interface import key_map, result_cache
+from interface.calculation import NoteArrays, material_code, stresses, tensions
+from interface.material_and_measures import WireMaterial
+
+OBJECTIVES = ('unevenness', 'cost', 'stress', 'changes')
+DEFAULT_GAUGES_MM = numpy.round(numpy.geomspace(0.15, 1.5, 41), 3)
+DEFAULT_MAX_RANGES = 8
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_ARCHIVE_SIZE = 400
+# share of each batch made by mutating members of the archive
+MUTATION_SHARE = 0.5
+
+# latest (problem, archive) explored for each design, keyed by :func:`front_key`, for the 'Pareto Front' plot
+fronts: dict[str, tuple[ParetoProblem, ParetoArchive]] = dict()
+
+
+class Genome(typing.NamedTuple):
+    """ candidates as arrays, one row per candidate """
+    breaks: numpy.ndarray  # (C × ranges - 1) note index where each range after the first starts, sorted
+    materials: numpy.ndarray  # (C × ranges) index into :attr:`ParetoProblem.materials`
+    gauges: numpy.ndarray  # (C × ranges) index into :attr:`ParetoProblem.gauges`, not increasing
+
+    def __len__(self):
+        return self.breaks.shape[0]
+
+    def take(self, index: numpy.ndarray) -> Genome:
+        return Genome(self.breaks[index], self.materials[index], self.gauges[index])
+
+    @staticmethod
+    def concatenate(genomes: typing.Sequence[Genome]) -> Genome:
+        return Genome(*(numpy.concatenate(parts) for parts in zip(*genomes)))
+
+
+class ParetoProblem:
+    """ the fixed scale of a design and the materials and gauges candidates may use """
+    materials: list[WireMaterial]
+    gauges: numpy.ndarray
+
+    def __init__(self, data: dict, materials: typing.Sequence[WireMaterial] | None = None,
+                 gauges_mm: typing.Sequence[float] = DEFAULT_GAUGES_MM,
+                 price_per_kg: dict[str, float] | None = None,
+                 max_ranges: int = DEFAULT_MAX_RANGES):
+        """
+        :param data: design to restring, in the format given by :meth:`Instrument.state_export`
+        :param materials: materials to use, defaults to the materials with a tensile strength already in the design
+        :param gauges_mm: wire diameters available
+        :param price_per_kg: price of each material code, materials not given cost 1 per kg
+        :param max_ranges: most ranges of one material and gauge
+        :raises ValueError: for designs whose keys share strings, the cost would leave out their second strings
+        """
+        key_map.require_own_strings(data)
+        self.data = data
+        arrays = NoteArrays(data)
+        valid = numpy.isfinite(arrays.length) & (arrays.wire_count > 0)
+        if not valid.any():
+            raise ValueError(f'design "{arrays.name}" has no notes with a length and wire count')
+        self.note_number = arrays.note_number[valid]
+        self.length = arrays.length[valid]
+        self.wire_count = arrays.wire_count[valid]
+        self.frequency = arrays.frequencies()[valid]
+        if materials is None:
+            codes = dict.fromkeys(material_code(m_) for m_ in arrays.material[valid])
+            materials = [m_ for m_ in map(WireMaterial.get_by_code, codes)
+                         if m_ is not None and m_.tensile_strength is not None]
+        if not materials:
+            raise ValueError('no materials with a tensile strength to choose from')
+        self.materials = list(materials)
+        self.gauges = numpy.sort(numpy.asarray(gauges_mm, dtype=float))
+        price_per_kg = price_per_kg or dict()
+        self.density = numpy.array([m_.density.g_cm3() for m_ in self.materials])
+        self.tensile_strength = numpy.array([m_.tensile_strength.mpa() for m_ in self.materials])
+        self.price = numpy.array([price_per_kg.get(m_.code, 1.0) for m_ in self.materials])
+        self.max_ranges = max(1, min(max_ranges, self.note_number.size))
+
+    @property
+    def notes(self) -> int:
+        return self.note_number.size
+
+    def random(self, count: int, rng: numpy.random.Generator) -> Genome:
+        """ random candidates, gauges are sorted so ranges get thinner towards the treble """
+        ranges = self.max_ranges
+        breaks = numpy.sort(rng.integers(1, self.notes, size=(count, ranges - 1)), axis=1) if self.notes > 1 \
+            else numpy.zeros((count, ranges - 1), dtype=int)
+        materials = rng.integers(0, len(self.materials), size=(count, ranges))
+        gauges = -numpy.sort(-rng.integers(0, self.gauges.size, size=(count, ranges)), axis=1)
+        return Genome(breaks, materials, gauges)
+
+    def mutate(self, parents: Genome, rng: numpy.random.Generator) -> Genome:
+        """ change one break, material or gauge of each parent """
+        breaks, materials, gauges = (a_.copy() for a_ in parents)
+        count, ranges = materials.shape
+        rows = numpy.arange(count)
+        kind = rng.integers(0, 3, size=count)
+        column = rng.integers(0, ranges, size=count)
+        step = rng.choice((-1, 1), size=count)
+
+        move = (kind == 0) & (ranges > 1)
+        if move.any():
+            b_col = numpy.minimum(column[move], ranges - 2)
+            shift = step[move] * rng.integers(1, 4, size=move.sum())
+            breaks[rows[move], b_col] = numpy.clip(breaks[rows[move], b_col] + shift, 1, max(self.notes - 1, 1))
+            breaks.sort(axis=1)
+        swap = kind == 1
+        materials[rows[swap], column[swap]] = rng.integers(0, len(self.materials), size=swap.sum())
+        gauge = kind == 2
+        gauges[rows[gauge], column[gauge]] = numpy.clip(gauges[rows[gauge], column[gauge]] + step[gauge],
+                                                        0, self.gauges.size - 1)
+        gauges = -numpy.sort(-gauges, axis=1)
+        return Genome(breaks, materials, gauges)
+
+    def expand(self, genome: Genome) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """ :return: (candidates × notes) material index and diameter of every note """
+        note_index = numpy.arange(self.notes)
+        # range of each note, counting the breaks at or before it
+        note_range = (genome.breaks[:, numpy.newaxis, :] <= note_index[numpy.newaxis, :, numpy.newaxis]).sum(axis=2)
+        material = numpy.take_along_axis(genome.materials, note_range, axis=1)
+        diameter = self.gauges[numpy.take_along_axis(genome.gauges, note_range, axis=1)]
+        return material, diameter
+
+    def evaluate(self, genome: Genome) -> numpy.ndarray:
+        """ :return: (candidates × objectives) values of :data:`OBJECTIVES` """
+        material, diameter = self.expand(genome)
+        density = self.density[material]
+        force = tensions(self.frequency, self.length, diameter, density, self.wire_count)
+        percent_of_break = stresses(force, diameter, self.wire_count) / self.tensile_strength[material] * 100
+        unevenness = numpy.log(force / self.wire_count).std(axis=1)
+        # mm × mm² × g/cm³ is mg
+        mass_kg = self.length * self.wire_count * numpy.pi * diameter ** 2 / 4 * density / 1e6
+        cost = (mass_kg * self.price[material]).sum(axis=1)
+        changes = ((material[:, 1:] != material[:, :-1]) | (diameter[:, 1:] != diameter[:, :-1])).sum(axis=1)
+        return numpy.column_stack((unevenness, cost, percent_of_break.max(axis=1), changes))
+
+    def state(self, genome: Genome, index: int = 0) -> dict:
+        """ the design with candidate `index` of `genome`, in the format used by :meth:`Instrument.state_import` """
+        material, diameter = self.expand(genome.take(numpy.array([index])))
+        data = copy.deepcopy(self.data)
+        for note_number, m_, d_ in zip(self.note_number.tolist(), material[0].tolist(), diameter[0].tolist()):
+            note = data['notes'][str(note_number)]
+            note['_material_select'] = f'{self.materials[m_].code} {self.materials[m_].name}'
+            note['_diameter'] = d_
+            note['_wrap_material'], note['_wrap_diameter'], note['_wrap_layers'] = '', 0.0, 0
+        return data
+
+
+def non_dominated(objectives: numpy.ndarray, chunk_size: int = 256) -> numpy.ndarray:
+    """
+    :param objectives: (points × objectives) values to minimise
+    :return: boolean mask of the points no other point dominates, duplicate points are all kept
+    """
+    keep = numpy.ones(objectives.shape[0], dtype=bool)
+    for start in range(0, objectives.shape[0], chunk_size):
+        block = objectives[start:start + chunk_size]
+        # (others × block × objectives) comparisons, chunked to bound memory
+        no_worse = (objectives[:, numpy.newaxis, :] <= block[numpy.newaxis]).all(axis=2)
+        better = (objectives[:, numpy.newaxis, :] < block[numpy.newaxis]).any(axis=2)
+        keep[start:start + chunk_size] = ~(no_worse & better).any(axis=0)
+    return keep
+
+
+def crowding_distance(objectives: numpy.ndarray) -> numpy.ndarray:
+    """ NSGA-II crowding distance, points at the ends of each objective are infinitely far """
+    count = objectives.shape[0]
+    distance = numpy.zeros(count)
+    if count < 3:
+        return numpy.full(count, numpy.inf)
+    for column in objectives.T:
+        order = numpy.argsort(column, kind='stable')
+        span = column[order[-1]] - column[order[0]]
+        distance[order[[0, -1]]] = numpy.inf
+        if span > 0:
+            distance[order[1:-1]] += (column[order[2:]] - column[order[:-2]]) / span
+    return distance
+
+
+class ParetoArchive:
+    """ non-dominated candidates found so far, pruned by crowding distance when over `max_size` """
+    objectives: numpy.ndarray
+    genomes: Genome | None
+
+    def __init__(self, max_size: int = DEFAULT_ARCHIVE_SIZE):
+        self.max_size = max_size
+        self.objectives = numpy.empty((0, len(OBJECTIVES)))
+        self.genomes = None
+
+    def __len__(self):
+        return self.objectives.shape[0]
+
+    def balanced(self) -> int:
+        """ index of the candidate nearest the ideal point, with each objective scaled to the range of the front """
+        low, high = self.objectives.min(axis=0), self.objectives.max(axis=0)
+        scaled = (self.objectives - low) / numpy.where(high > low, high - low, 1)
+        return int(numpy.argmin(numpy.linalg.norm(scaled, axis=1)))
+
+    def best(self, objective: str) -> int:
+        """ index of the candidate with the lowest value of one of :data:`OBJECTIVES` """
+        return int(numpy.argmin(self.objectives[:, OBJECTIVES.index(objective)]))
+
+    def genome(self, index: int) -> Genome:
+        return self.genomes.take(numpy.array([index]))
+
+    def add(self, objectives: numpy.ndarray, genomes: Genome) -> int:
+        """
+        merge a batch into the archive
+        :return: number of the batch's candidates that entered the archive
+        """
+        valid = numpy.isfinite(objectives).all(axis=1)
+        objectives, genomes = objectives[valid], genomes.take(valid)
+        # filter the batch on its own first, then compare the survivors with the archive
+        keep = non_dominated(objectives)
+        objectives, genomes = objectives[keep], genomes.take(keep)
+        merged = numpy.concatenate((self.objectives, objectives))
+        merged_genomes = genomes if self.genomes is None else Genome.concatenate((self.genomes, genomes))
+        keep = non_dominated(merged)
+        # candidates with equal objectives usually string the same, only the first of them is kept
+        _, first = numpy.unique(merged, axis=0, return_index=True)
+        keep &= numpy.isin(numpy.arange(merged.shape[0]), first)
+        added = int(keep[len(self):].sum())
+        merged, merged_genomes = merged[keep], merged_genomes.take(keep)
+        if merged.shape[0] > self.max_size:
+            # scale objectives to comparable ranges before measuring crowding
+            span = merged.max(axis=0) - merged.min(axis=0)
+            crowding = crowding_distance((merged - merged.min(axis=0)) / numpy.where(span > 0, span, 1))
+            keep = numpy.sort(numpy.argsort(-crowding, kind='stable')[:self.max_size])
+            merged, merged_genomes = merged[keep], merged_genomes.take(keep)
+        self.objectives, self.genomes = merged, merged_genomes
+        return added
+
+
+def evaluate_batch(problem: ParetoProblem, seed: int, size: int, parents: Genome | None
+                   ) -> tuple[Genome, numpy.ndarray]:
+    """ generate and evaluate one batch, run in the worker processes """
+    rng = numpy.random.default_rng(seed)
+    parts = []
+    if parents is not None and len(parents):
+        mutations = int(size * MUTATION_SHARE)
+        parts.append(problem.mutate(parents.take(rng.integers(0, len(parents), size=mutations)), rng))
+        size -= mutations
+    parts.append(problem.random(size, rng))
+    genome = Genome.concatenate(parts)
+    return genome, problem.evaluate(genome)
+
+
+class ParetoExplorer:
+    """ runs batches in a process pool and merges each result into :attr:`archive` as it finishes """
+    archive: ParetoArchive
+
+    def __init__(self, problem: ParetoProblem, batch_size: int = DEFAULT_BATCH_SIZE,
+                 archive_size: int = DEFAULT_ARCHIVE_SIZE, workers: int | None = None, seed: int | None = None):
+        """
+        :param workers: worker processes, 0 to evaluate in this process
+        :param seed: random seed for repeatable runs with one worker
+        """
+        self.problem = problem
+        self.batch_size = batch_size
+        self.archive = ParetoArchive(archive_size)
+        self.workers = workers
+        self.seeds = numpy.random.SeedSequence(seed)
+        self.evaluated = 0
+
+    def _submit(self, executor: concurrent.futures.Executor | None) -> concurrent.futures.Future | tuple:
+        seed = int(self.seeds.spawn(1)[0].generate_state(1)[0])
+        if executor is None:
+            return evaluate_batch(self.problem, seed, self.batch_size, self.archive.genomes)
+        return executor.submit(evaluate_batch, self.problem, seed, self.batch_size, self.archive.genomes)
+
+    def _merge(self, genome: Genome, objectives: numpy.ndarray):
+        self.evaluated += len(genome)
+        self.archive.add(objectives, genome)
+
+    def run(self, batches: int, should_stop: typing.Callable[[], bool] = lambda: False
+            ) -> typing.Iterator[ParetoArchive]:
+        """
+        evaluate `batches` batches, yielding the archive after each one is merged
+        :param should_stop: checked after each batch, return True to stop early
+        """
+        if self.workers == 0:
+            for _ in range(batches):
+                self._merge(*self._submit(None))
+                yield self.archive
+                if should_stop():
+                    return
+            return
+        # the default of ProcessPoolExecutor when no worker count is given
+        workers = self.workers or os.cpu_count() or 1
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            # keep two batches per worker queued so workers never wait for the archive to merge
+            in_flight = {self._submit(executor) for _ in range(min(batches, 2 * workers))}
+            submitted = len(in_flight)
+            while in_flight:
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    self._merge(*future.result())
+                    yield self.archive
+                if should_stop():
+                    for future in in_flight:
+                        future.cancel()
+                    return
+                while submitted < batches and len(in_flight) < 2 * workers:
+                    in_flight.add(self._submit(executor))
+                    submitted += 1
+
+
+def front_key(data: dict) -> str:
+    """ key of the latest (problem, archive) explored for a design in :data:`fronts` """
+    return result_cache.content_key('pareto_front', data)
+
+
+def explore(data: dict, batches: int = 20, workers: int | None = 0, seed: int | None = 0, **kwargs
+            ) -> tuple[ParetoProblem, ParetoArchive]:
+    """
+    run an exploration to the end
+    :param kwargs: passed to :class:`ParetoProblem`
+    :return: (problem, archive of the front)
+    """
+    explorer = ParetoExplorer(ParetoProblem(data, **kwargs), workers=workers, seed=seed)
+    for _ in explorer.run(batches):
+        pass
+    return explorer.problem, explorer.archive
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import json
+import pathlib
+import queue
+import threading
+import tkinter as tk
+from tkinter import filedialog as tkFile
+from tkinter import messagebox, ttk
+
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+import numpy
+
+import definitions
+from interface import pareto
+from interface.visualization_plotting import draw_pareto_front
+from interface.workspace import Workspace
+
+# ms between checks for a new front from the exploration thread
+POLL_MS = 200
+
+
+class ParetoWindow(tk.Toplevel):
+    """
+    window streaming the Pareto front of the active instrument while candidates are evaluated in a process pool,
+    the selected candidate can be opened in a new tab or exported
+    """
+    workspace: Workspace
+    problem: pareto.ParetoProblem | None
+    archive: pareto.ParetoArchive | None
+    columns = ('unevenness', 'cost', '% of break', 'changes')
+
+    def __init__(self, parent, workspace: Workspace):
+        super(ParetoWindow, self).__init__(parent)
+        self.title("Pareto Front")
+        self.geometry("1000x700")
+        self.workspace = workspace
+        self.problem = None
+        self.archive = None
+        self._data: dict | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._fronts: queue.Queue = queue.Queue()
+        self._after_id: str | None = None
+
+        self.batches = tk.IntVar(self, 200)
+        self.max_ranges = tk.IntVar(self, pareto.DEFAULT_MAX_RANGES)
+
+        header = ttk.Frame(self)
+        header.pack(fill='x', side=tk.TOP)
+        for i, (text, var) in enumerate((("Batches", self.batches), ("Ranges", self.max_ranges))):
+            ttk.Label(header, text=text).grid(row=0, column=i)
+            ttk.Entry(header, textvariable=var, width=8).grid(row=1, column=i, sticky=tk.EW)
+        for i, (text, command) in enumerate((("Start", self.start), ("Stop", self.stop),
+                                             ("Open in Tab", self.open_selected), ("Export", self.export)), 2):
+            ttk.Button(header, text=text, command=command).grid(row=0, column=i, rowspan=2, sticky=tk.S)
+
+        self.status = ttk.Label(self, anchor=tk.W)
+        self.status.pack(fill='x', side=tk.TOP)
+        self.table = ttk.Treeview(self, columns=self.columns, show='headings', height=8)
+        for col in self.columns:
+            self.table.heading(col, text=col)
+            self.table.column(col, width=80, anchor=tk.E)
+        self.table.pack(fill='x', side=tk.BOTTOM)
+        self.table.bind('<<TreeviewSelect>>', lambda *args: self._draw())
+
+        self.figure = Figure()
+        self.canvas = FigureCanvasTkAgg(self.figure, self)
+        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.canvas.mpl_connect('pick_event', self._on_pick)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.start()
+
+    def start(self):
+        """ explore the active instrument, a running exploration is stopped first """
+        self.stop()
+        try:
+            self.workspace.save_active()
+            self._data = self.workspace.active.data
+            self.problem = pareto.ParetoProblem(self._data, max_ranges=self.max_ranges.get())
+            batches = self.batches.get()
+        except (tk.TclError, ValueError, KeyError) as e:
+            messagebox.showerror("Pareto Front", str(e), parent=self)
+            return
+        explorer = pareto.ParetoExplorer(self.problem)
+        # the poll of the stopped exploration would drain the new queue
+        self._cancel_poll()
+        self._stop = threading.Event()
+        self._fronts = queue.Queue()
+        self._thread = threading.Thread(target=self._explore, args=(explorer, batches, self._stop, self._fronts),
+                                        daemon=True)
+        self._thread.start()
+        self._after_id = self.after(POLL_MS, self._poll)
+
+    def stop(self):
+        self._stop.set()
+
+    def _cancel_poll(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+
+    def close(self):
+        self.stop()
+        self._cancel_poll()
+        self.destroy()
+
+    @staticmethod
+    def _explore(explorer: pareto.ParetoExplorer, batches: int, stop: threading.Event, fronts: queue.Queue):
+        """ runs in a thread, the archive is copied for the window since the explorer keeps changing it """
+        try:
+            for archive in explorer.run(batches, should_stop=stop.is_set):
+                snapshot = pareto.ParetoArchive(archive.max_size)
+                snapshot.objectives, snapshot.genomes = archive.objectives.copy(), archive.genomes
+                fronts.put((snapshot, explorer.evaluated))
+        finally:
+            fronts.put(None)
+
+    def _poll(self):
+        self._after_id = None
+        if not self.winfo_exists():
+            return
+        latest, finished = None, False
+        while True:
+            try:
+                item = self._fronts.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+            else:
+                latest = item
+        if latest is not None:
+            index = self._selected()
+            previous = None if index is None else self.archive.objectives[index]
+            self.archive, evaluated = latest
+            # the plot type shows the last front explored for this design
+            pareto.fronts[pareto.front_key(self._data)] = (self.problem, self.archive)
+            self._fill_table(previous)
+            self.status.configure(text=f'{evaluated} candidates evaluated, {len(self.archive)} on the front'
+                                       + ('' if finished else '...'))
+        if not finished:
+            self._after_id = self.after(POLL_MS, self._poll)
+        elif latest is not None:
+            # redraw plots showing the front
+            self.workspace.instrument.event_generate('<<InstrumentUpdated>>')
+
+    def _fill_table(self, previous: numpy.ndarray | None):
+        """ :param previous: objectives of the candidate selected before the archive changed """
+        self.table.delete(*self.table.get_children())
+        for i, row in enumerate(self.archive.objectives.tolist()):
+            self.table.insert('', tk.END, iid=str(i), values=(round(row[0], 4), round(row[1], 4),
+                                                              round(row[2], 1), int(row[3])))
+        # indices change as the archive changes, follow the selected candidate by its objectives
+        same = numpy.flatnonzero((self.archive.objectives == previous).all(axis=1)) if previous is not None else []
+        if len(same):
+            self.table.selection_set(str(same[0]))
+        else:
+            self._draw()
+
+    def _selected(self) -> int | None:
+        selection = self.table.selection()
+        return int(selection[0]) if selection else None
+
+    def _draw(self):
+        self.figure.clear()
+        if self.archive is not None:
+            draw_pareto_front(self.figure.add_subplot(), self.archive, self._selected())
+        self.canvas.draw_idle()
+
+    def _on_pick(self, event):
+        if len(event.ind):
+            index = str(event.ind[0])
+            self.table.selection_set(index)
+            self.table.see(index)
+
+    def _selected_state(self) -> dict | None:
+        index = self._selected()
+        if index is None or self.archive is None:
+            messagebox.showinfo("Pareto Front", "Select a candidate first", parent=self)
+            return None
+        data = self.problem.state(self.archive.genomes, index)
+        data['inst_name'] = f"{data.get('inst_name') or 'Instrument'} candidate {index}"
+        return data
+
+    def open_selected(self):
+        data = self._selected_state()
+        if data is not None:
+            self.workspace.open(data)
+
+    def export(self):
+        data = self._selected_state()
+        if data is None:
+            return
+        file = tkFile.asksaveasfilename(title="Export Candidate", filetypes=definitions.file_types, parent=self)
+        if not file:
+            return
+        file = pathlib.Path(file)
+        if not file.suffix:
+            file = file.with_suffix('.json')
+        with open(file, 'w') as f:
+            f.write(json.dumps(data))
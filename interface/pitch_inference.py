@@ -0,0 +1,120 @@
+"""
+Infer the pitch a surveyed instrument was designed for from its lengths, diameters and materials. \n
+Every candidate pitch, and optionally every transposition of the keyboard, is scored against a plausible
+stress or tension for each note, as one (pitches × transpositions × notes) array. Stress in a plain wire is
+independent of its diameter (σ ∝ f²L²δ), so the stress criterion only relies on the scale and materials;
+the tension criterion also uses the diameters. \n
+Each note's value is scored as a log-normal around the target, notes stressed past their breaking point
+are penalised heavily. Notes of one instrument are not independent measurements, so the score is the mean
+per note and the confidence curve is a relative likelihood over the grid rather than a calibrated probability.
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy
+
+from interface.calculation import NoteArrays, stresses, tensions
+
+CRITERIA = ('stress', 'tension')
+DEFAULT_PITCHES = numpy.arange(370.0, 500.01, 0.5)
+DEFAULT_TARGET_PERCENT_OF_BREAK = 70.0
+DEFAULT_TARGET_TENSION_KGF = 7.0
+# spread of plausible values as a standard deviation of the natural log
+DEFAULT_SPREAD = dict(stress=0.25, tension=0.5)
+# notes past their breaking stress score as a one sided log-normal this narrow
+BREAK_SPREAD = 0.02
+# scale of the confidence curve, a difference of 1/CONFIDENCE_SHARPNESS in mean score is a factor of e
+CONFIDENCE_SHARPNESS = 10.0
+
+
+class PitchInference:
+    """ scores of every candidate, rows follow `pitches` and columns follow `transpositions` """
+    pitches: numpy.ndarray
+    transpositions: numpy.ndarray
+    score: numpy.ndarray
+    confidence: numpy.ndarray
+
+    def __init__(self, pitches: numpy.ndarray, transpositions: numpy.ndarray, score: numpy.ndarray):
+        self.pitches = pitches
+        self.transpositions = transpositions
+        self.score = score
+        relative = numpy.exp(CONFIDENCE_SHARPNESS * (score - numpy.nanmax(score)))
+        self.confidence = numpy.nan_to_num(relative) / numpy.nansum(relative)
+
+    @property
+    def best(self) -> tuple[float, int]:
+        """ (pitch hz, transposition semitones) with the highest score """
+        p_, t_ = numpy.unravel_index(numpy.nanargmax(self.score), self.score.shape)
+        return float(self.pitches[p_]), int(self.transpositions[t_])
+
+    @property
+    def best_pitch(self) -> float:
+        return self.best[0]
+
+    @property
+    def best_transposition(self) -> int:
+        return self.best[1]
+
+    @property
+    def pitch_confidence(self) -> numpy.ndarray:
+        """ confidence of each pitch, summed over the transpositions """
+        return self.confidence.sum(axis=1)
+
+    def interval(self, mass: float = 0.9) -> tuple[float, float]:
+        """ narrowest range of pitches holding `mass` of the confidence """
+        confidence = self.pitch_confidence
+        order = numpy.argsort(confidence)[::-1]
+        count = int(numpy.searchsorted(numpy.cumsum(confidence[order]), mass)) + 1
+        chosen = self.pitches[order[:count]]
+        return float(chosen.min()), float(chosen.max())
+
+
+def infer_pitch(arrays: NoteArrays,
+                pitches: typing.Sequence[float] = DEFAULT_PITCHES,
+                transpositions: typing.Sequence[int] = (0,),
+                criterion: str = 'stress',
+                target: float | None = None,
+                spread: float | None = None,
+                note_range: tuple[int, int] | None = None) -> PitchInference:
+    """
+    score every candidate pitch and transposition
+    :param arrays: surveyed instrument, its pitch is ignored, its temperament and reference note are used
+    :param pitches: candidate frequencies of the reference note in hz
+    :param transpositions: candidate shifts of the keyboard in semitones, +1 when each key sounds a semitone higher
+    :param criterion: 'stress' to score percent of break, or 'tension' to score the tension of each wire in kg-f
+    :param target: most plausible percent of break or tension, defaults to the module constants
+    :param spread: standard deviation of the log of plausible values, defaults to :data:`DEFAULT_SPREAD`
+    :param note_range: (lowest, highest) note numbers to score, e.g. only the treble, None for all notes
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f'criterion must be one of {CRITERIA}')
+    if target is None:
+        target = DEFAULT_TARGET_PERCENT_OF_BREAK if criterion == 'stress' else DEFAULT_TARGET_TENSION_KGF
+    spread = DEFAULT_SPREAD[criterion] if spread is None else spread
+    pitches = numpy.asarray(pitches, dtype=float)
+    transpositions = numpy.asarray(transpositions, dtype=int)
+
+    use = numpy.ones(len(arrays), dtype=bool)
+    if note_range is not None:
+        use = (arrays.note_number >= note_range[0]) & (arrays.note_number <= note_range[1])
+    note_number = arrays.note_number[use]
+    # (transpositions × notes) frequency at a pitch of 1hz, scaled by each candidate pitch below
+    ratio = numpy.stack([arrays.temperament.frequencies(note_number + t_, 1.0, arrays.reference_note)
+                         for t_ in transpositions])
+    frequency = pitches[:, numpy.newaxis, numpy.newaxis] * ratio[numpy.newaxis]
+    force = tensions(frequency, arrays.length[use], arrays.diameter[use], arrays.equivalent_density[use],
+                     arrays.wire_count[use])
+    stress = stresses(force, arrays.diameter[use], arrays.wire_count[use])
+    percent_of_break = stress / arrays.tensile_strength[use] * 100
+
+    value = percent_of_break if criterion == 'stress' else force / arrays.wire_count[use]
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        z = (numpy.log(value) - numpy.log(target)) / spread
+        broken = numpy.maximum(numpy.log(percent_of_break / 100), 0) / BREAK_SPREAD
+    note_score = -z ** 2 / 2 - numpy.where(numpy.isnan(broken), 0, broken) ** 2 / 2
+    valid = numpy.isfinite(note_score)
+    if not valid.any():
+        raise ValueError(f'design "{arrays.name}" has no notes that can be scored by {criterion}')
+    score = numpy.where(valid, note_score, 0).sum(axis=2) / numpy.maximum(valid.sum(axis=2), 1)
+    return PitchInference(pitches, transpositions, score)
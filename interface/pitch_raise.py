@@ -0,0 +1,203 @@
+"""
+Plan raising the pitch of an instrument in stages, e.g. from 415 to 440hz, so no stage adds too much load to the
+frame or takes any string too close to breaking. \n
+Tension is proportional to f², so a stage only changes tension through the square of each note's pitch. Splitting
+a raise into n stages of equal steps in f² gives every stage the same load increase and every string the same
+step in percent of break. That uses the fewest stages of any schedule, so the search only has to find the smallest
+n that meets the limits. All stage counts of all note ranges are tested as one (ranges × stage counts) array. \n
+Ranges may have their own target pitch, e.g. to leave a bass that will be restrung at its old pitch. Ranges may
+also be raised one after another, bass or treble first. This follows the way a technician works through the
+keyboard, at the cost of more stages. Usage::
+
+    plan = plan_pitch_raise(NoteArrays(data), 440, max_load_step=4)
+    for row in plan.summary():
+        print(row['stage'], row['total_load'], row['max_percent_of_break'])
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy
+
+from interface import general_functions
+from interface.calculation import NoteArrays
+
+ORDERS = ('together', 'bass first', 'treble first')
+DEFAULT_TARGET_PITCH = 440.0
+# percent of the load on the frame before the raise
+DEFAULT_MAX_LOAD_STEP = 5.0
+# percentage points of break added to any string in one stage
+DEFAULT_MAX_BREAK_STEP = 5.0
+DEFAULT_MAX_PERCENT_OF_BREAK = 90.0
+DEFAULT_MAX_STAGES = 100
+
+
+class NoteRange(typing.NamedTuple):
+    """ notes from `lowest` to `highest`, including both, raised to `target` hz """
+    lowest: int
+    highest: int
+    target: float
+
+
+class PitchRaisePlan:
+    """ each note's pitch, tension and percent of break before the raise (row 0) and after every stage """
+    note_number: numpy.ndarray
+    pitch: numpy.ndarray
+    force: numpy.ndarray
+    percent_of_break: numpy.ndarray
+    raised: list[str]
+
+    def __init__(self, note_number: numpy.ndarray, pitch: numpy.ndarray, force: numpy.ndarray,
+                 percent_of_break: numpy.ndarray, raised: list[str]):
+        """
+        :param pitch: (stages + 1 × notes) pitch of the instrument each note is tuned for, hz
+        :param force: (stages + 1 × notes) tension in kg-f
+        :param percent_of_break: (stages + 1 × notes) stress as a percentage of the tensile strength
+        :param raised: description of the notes raised by each stage
+        """
+        self.note_number = note_number
+        self.pitch = pitch
+        self.force = force
+        self.percent_of_break = percent_of_break
+        self.raised = raised
+
+    @property
+    def stages(self) -> int:
+        return self.pitch.shape[0] - 1
+
+    @property
+    def total_load(self) -> numpy.ndarray:
+        """ load on the frame in kg-f before the raise and after each stage """
+        return numpy.nansum(self.force, axis=1)
+
+    @property
+    def load_step(self) -> numpy.ndarray:
+        """ change of the load on the frame in each stage, kg-f """
+        return numpy.diff(self.total_load)
+
+    @property
+    def break_step(self) -> numpy.ndarray:
+        """ largest change in percent of break of any string in each stage """
+        with numpy.errstate(invalid='ignore'):
+            return _nanmax(numpy.diff(self.percent_of_break, axis=0), axis=1)
+
+    def summary(self) -> list[dict[str, typing.Any]]:
+        """ one row for the start and for each stage """
+        rows = []
+        total, step = self.total_load, numpy.concatenate(([0.0], self.load_step))
+        break_step = numpy.concatenate(([0.0], self.break_step))
+        for s_ in range(self.stages + 1):
+            rows.append(dict(stage=s_, raised=self.raised[s_ - 1] if s_ else '',
+                             lowest_pitch=float(self.pitch[s_].min()), highest_pitch=float(self.pitch[s_].max()),
+                             total_load=float(total[s_]), load_step=float(step[s_]),
+                             load_step_percent=float(step[s_] / total[0] * 100),
+                             max_percent_of_break=float(_nanmax(self.percent_of_break[s_])),
+                             break_step=float(break_step[s_])))
+        return rows
+
+    def stage_table(self, stage: int) -> list[tuple[int, str, float, float, float]]:
+        """ (note number, name, pitch hz, kg-f, % of break) of every note after `stage`, 0 is before the raise """
+        return [(n_, general_functions.note_number_to_name(n_), p_, f_, b_) for n_, p_, f_, b_ in zip(
+            self.note_number.tolist(), self.pitch[stage].tolist(), self.force[stage].tolist(),
+            self.percent_of_break[stage].tolist())]
+
+
+def _nanmax(values: numpy.ndarray, axis: int | None = None) -> numpy.ndarray | float:
+    """ max ignoring nan, nan where every value is nan """
+    filled = numpy.where(numpy.isnan(values), -numpy.inf, values)
+    result = numpy.max(filled, axis=axis, initial=-numpy.inf)
+    return numpy.where(numpy.isinf(result), numpy.nan, result)
+
+
+def stage_counts(load_increase: numpy.ndarray, break_increase: numpy.ndarray, max_load_step: float,
+                 max_break_step: float, max_stages: int = DEFAULT_MAX_STAGES) -> numpy.ndarray:
+    """
+    fewest equal stages in f² meeting both limits, for each group of notes
+    :param load_increase: total increase of tension of each group, in the units of `max_load_step`
+    :param break_increase: largest increase in percent of break of any string in each group
+    :raises ValueError: when a group needs more than `max_stages`
+    """
+    counts = numpy.arange(1, max_stages + 1)
+    load = numpy.maximum(numpy.nan_to_num(numpy.asarray(load_increase, dtype=float)), 0)[:, None]
+    strain = numpy.maximum(numpy.nan_to_num(numpy.asarray(break_increase, dtype=float)), 0)[:, None]
+    feasible = (load / counts <= max_load_step) & (strain / counts <= max_break_step)
+    if not feasible[:, -1].all():
+        raise ValueError(f'the raise needs more than {max_stages} stages, allow larger steps or more stages')
+    return counts[numpy.argmax(feasible, axis=1)]
+
+
+def plan_pitch_raise(arrays: NoteArrays,
+                     target: float = DEFAULT_TARGET_PITCH,
+                     ranges: typing.Sequence[NoteRange] = (),
+                     order: str = 'together',
+                     max_load_step: float = DEFAULT_MAX_LOAD_STEP,
+                     max_break_step: float = DEFAULT_MAX_BREAK_STEP,
+                     max_percent_of_break: float = DEFAULT_MAX_PERCENT_OF_BREAK,
+                     max_stages: int = DEFAULT_MAX_STAGES) -> PitchRaisePlan:
+    """
+    :param arrays: the instrument at its current pitch
+    :param target: pitch in hz of notes outside every range
+    :param ranges: notes with their own target, later ranges take precedence where ranges overlap
+    :param order: one of :data:`ORDERS`, 'together' raises every note in each stage, otherwise
+        each range, and then the notes outside the ranges, is raised in turn from the bass or from the treble
+    :param max_load_step: largest increase of the load on the frame in a stage, percent of the load before the raise
+    :param max_break_step: largest increase in percent of break of a string in a stage
+    :param max_percent_of_break: no string may end above this
+    :param max_stages: the most stages of each group of notes
+    :raises ValueError: when a string would end above `max_percent_of_break` or the limits need too many stages
+    """
+    if order not in ORDERS:
+        raise ValueError(f'order must be one of {", ".join(ORDERS)}')
+    start = arrays.pitch
+    note_number = arrays.note_number
+    group = numpy.full(note_number.size, -1)
+    targets = numpy.full(note_number.size, float(target))
+    for i_, note_range in enumerate(ranges):
+        inside = (note_number >= note_range.lowest) & (note_number <= note_range.highest)
+        group[inside] = i_
+        targets[inside] = note_range.target
+
+    force = arrays.forces()
+    percent_of_break = arrays.percent_of_break(force)
+    # every stage moves f² of its notes an equal step, tension and stress follow f²
+    squared = (targets / start) ** 2 - 1
+    final_break = percent_of_break * (1 + squared)
+    over = final_break > max_percent_of_break
+    if over.any():
+        notes = ', '.join(general_functions.note_number_to_name(n_) for n_ in note_number[over].tolist())
+        raise ValueError(f'{notes} would end above {max_percent_of_break:g}% of break')
+
+    if order == 'together':
+        members = [numpy.ones(note_number.size, dtype=bool)]
+        names = ['all notes']
+    else:
+        members, names = [], []
+        for g_ in numpy.unique(group).tolist():
+            members.append(group == g_)
+            notes = note_number[group == g_]
+            names.append(f'{general_functions.note_number_to_name(int(notes.min()))}-'
+                         f'{general_functions.note_number_to_name(int(notes.max()))}')
+        # bass first starts with the group holding the lowest note
+        lowest = [int(note_number[m_].min()) for m_ in members]
+        sequence = sorted(range(len(members)), key=lambda i_: lowest[i_], reverse=order == 'treble first')
+        members, names = [members[i_] for i_ in sequence], [names[i_] for i_ in sequence]
+    members = numpy.array(members)
+
+    total = numpy.nansum(force)
+    load_increase = numpy.nansum(numpy.where(members, force * squared, 0), axis=1) / total * 100
+    with numpy.errstate(invalid='ignore'):
+        break_increase = _nanmax(numpy.where(members, percent_of_break * squared, numpy.nan), axis=1)
+    counts = stage_counts(load_increase, break_increase, max_load_step, max_break_step, max_stages)
+
+    # share of each note's f² step done after each stage, one column of stages per group in turn
+    progress = numpy.zeros((1 + int(counts.sum()), note_number.size))
+    raised = []
+    row = 0
+    for mask, count, name in zip(members, counts.tolist(), names):
+        steps = numpy.arange(1, count + 1) / count
+        progress[row + 1:row + count + 1] = progress[row]
+        progress[row + 1:row + count + 1, mask] = steps[:, None]
+        raised += [f'{name} {k_}/{count}' for k_ in range(1, count + 1)]
+        row += count
+    factor = 1 + progress * squared
+    return PitchRaisePlan(note_number, start * numpy.sqrt(factor), force * factor, percent_of_break * factor, raised)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import numpy
+from matplotlib.backend_bases import MouseEvent
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from interface import curve_fitting
+from interface.instrument_class import Note
+from interface.profiling import profiled
+from interface.visualization_plotting import PlotCache
+
+
+class PlotInteractor:
+    """
+    Hover inspection and drag editing of the points of an editable plot, see `_editable` in
+    :mod:`interface.visualization_plotting`. Redraws only blit the changed artists over a saved background.
+    """
+    pick_radius_px = 8
+
+    def __init__(self, canvas: FigureCanvasTkAgg, cache: PlotCache):
+        self.canvas = canvas
+        self.cache = cache
+        self.ax = cache.ax
+        self.notes: list[Note] = list(cache.notes)
+        self.x = numpy.asarray(cache.x, dtype=float)
+        self.y = numpy.asarray(cache.y, dtype=float)
+        # notes sorted by number for lookups with searchsorted
+        self._order = numpy.argsort(self.x, kind='stable')
+        self._sorted_x = self.x[self._order]
+
+        self._background = None
+        self._drag_index: int | None = None
+        self._hover_index: int | None = None
+        self.label = self.ax.annotate('', xy=(0, 0), xytext=(12, 12), textcoords='offset points',
+                                      bbox=dict(boxstyle='round', fc='white', alpha=0.9),
+                                      fontsize='small', visible=False, animated=True)
+        self._connections = [
+            canvas.mpl_connect('draw_event', self._on_draw),
+            canvas.mpl_connect('motion_notify_event', self._on_motion),
+            canvas.mpl_connect('button_press_event', self._on_press),
+            canvas.mpl_connect('button_release_event', self._on_release),
+        ]
+
+    def disconnect(self):
+        for cid in self._connections:
+            self.canvas.mpl_disconnect(cid)
+
+    def nearest_point(self, event: MouseEvent) -> int | None:
+        """ index of the point under the mouse, found with a binary search on the note numbers """
+        if event.inaxes is None or event.xdata is None:
+            return None
+        i = int(numpy.searchsorted(self._sorted_x, event.xdata))
+        candidates = self._order[max(i - 1, 0):i + 1]
+        if not candidates.size:
+            return None
+        points = self.ax.transData.transform(numpy.column_stack((self.x[candidates], self.y[candidates])))
+        distance = numpy.hypot(points[:, 0] - event.x, points[:, 1] - event.y)
+        best = int(numpy.argmin(distance))
+        if distance[best] > self.pick_radius_px:
+            return None
+        return int(candidates[best])
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        """ restore the background then draw and blit the animated artists """
+        if self._background is None:
+            return
+        self.canvas.restore_region(self._background)
+        if self._drag_index is not None:
+            self.ax.draw_artist(self.cache.scatter)
+            self.ax.draw_artist(self.cache.poly_line)
+            self.ax.draw_artist(self.cache.outlier_ring)
+        self.ax.draw_artist(self.label)
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def _show_label(self, index: int | None):
+        self._hover_index = index
+        if index is None:
+            self.label.set_visible(False)
+            return
+        note = self.notes[index]
+        try:
+            force = f'{note.get_force().kg_force():.2f}kg-f'
+        except (ValueError, TypeError, AttributeError):
+            force = '-'
+        self.label.xy = (self.x[index], self.y[index])
+        self.label.set_text(f'{note.get_std_note_number()} {note.get_std_note_name()} '
+                            f'{note.get_frequency():.2f}hz\n'
+                            f'length {note.get_length().mm():g}mm\n'
+                            f'{note.state_export()["_material_select"]}\n'
+                            f'diameter {note.get_diameter().mm():g}mm x{note.get_wire_count()}\n'
+                            f'{force}')
+        self.label.set_visible(True)
+
+    @profiled()
+    def _on_motion(self, event: MouseEvent):
+        if self._drag_index is not None:
+            if event.inaxes is self.ax and event.ydata is not None and event.ydata > 0:
+                self._move_point(self._drag_index, event.ydata)
+                self._show_label(self._drag_index)
+                self._draw_animated()
+            return
+        index = self.nearest_point(event)
+        if index != self._hover_index:
+            self._show_label(index)
+            self._draw_animated()
+
+    def _on_press(self, event: MouseEvent):
+        if event.button != 1:
+            return
+        index = self.nearest_point(event)
+        if index is None:
+            return
+        self._drag_index = index
+        # redraw once without the dragged artists, they are then blitted over this background
+        self.cache.scatter.set_animated(True)
+        self.cache.poly_line.set_animated(True)
+        self.cache.outlier_ring.set_animated(True)
+        self.canvas.draw()
+
+    def _on_release(self, event: MouseEvent):
+        if self._drag_index is None:
+            return
+        self._drag_index = None
+        self.cache.scatter.set_animated(False)
+        self.cache.poly_line.set_animated(False)
+        self.cache.outlier_ring.set_animated(False)
+        self.canvas.draw_idle()
+
+    def _move_point(self, index: int, value: float):
+        """ set the diameter of the note so its plotted value becomes `value` """
+        note = self.notes[index]
+        if self.cache.editable == 'diameter':
+            note.set_diameter(value)
+        elif self.cache.editable == 'force':
+            # tension scales with d², so the diameter for a target tension is d * sqrt(T_target / T)
+            current = self.y[index]
+            if current <= 0:
+                return
+            note.set_diameter(note.get_diameter().mm() * (value / current) ** 0.5)
+        note.update_force()
+        # the plotted value of the solved diameter, for wound strings tension does not scale exactly with d²
+        self.y[index] = note.get_force().kg_force() if self.cache.editable == 'force' else note.get_diameter().mm()
+        self.cache.scatter.set_offsets(numpy.column_stack((self.x, self.y)))
+        # refit the dragged note's trend with the options the plot was drawn with
+        fit = curve_fitting.fit_curve(self.x, self.y, self.cache.segment, self.cache.fit_options)
+        self.cache.poly_line.set_data(*fit.line())
+        self.cache.outlier_ring.set_offsets(numpy.column_stack((self.x[fit.outlier], self.y[fit.outlier])))
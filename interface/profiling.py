@@ -0,0 +1,148 @@
+"""
+Opt-in timing of the hot paths, enable with the environment variable ``STRINGCALC_PROFILE=1``,
+from the Debug menu, or with::
+
+    from interface.profiling import registry
+    registry.enable(trace_memory=True)
+    ...
+    registry.dump_json('profile.json')
+"""
+from __future__ import annotations
+
+import collections
+import functools
+import json
+import pathlib
+import time
+import tracemalloc
+import typing
+
+import numpy
+
+import definitions
+
+_func_type = typing.TypeVar('_func_type', bound=typing.Callable)
+
+
+class CallStats:
+    """ timing and allocation record for a single instrumented function """
+    _samples: collections.deque[float]
+
+    def __init__(self, name: str, sample_size: int = 4096):
+        """
+        :param name: name shown in reports
+        :param sample_size: number of recent calls kept for percentiles
+        """
+        self.name = name
+        self.count = 0
+        self.total_sec = 0.0
+        self.max_sec = 0.0
+        self.alloc_bytes = 0
+        self._samples = collections.deque(maxlen=sample_size)
+
+    def add(self, duration_sec: float, alloc_bytes: int = 0):
+        self.count += 1
+        self.total_sec += duration_sec
+        self.max_sec = max(self.max_sec, duration_sec)
+        self.alloc_bytes += alloc_bytes
+        self._samples.append(duration_sec)
+
+    def summary(self) -> dict[str, str | int | float]:
+        """ summary of the recorded calls, times in milliseconds """
+        p50, p90, p99 = numpy.percentile(self._samples, (50, 90, 99)) * 1000 if self._samples else (0, 0, 0)
+        return dict(name=self.name,
+                    count=self.count,
+                    total_ms=self.total_sec * 1000,
+                    mean_ms=self.total_sec * 1000 / self.count if self.count else 0.0,
+                    p50_ms=float(p50),
+                    p90_ms=float(p90),
+                    p99_ms=float(p99),
+                    max_ms=self.max_sec * 1000,
+                    alloc_kib=self.alloc_bytes / 1024)
+
+
+class ProfileRegistry:
+    """ in-process registry of :class:`CallStats`, shared by every function wrapped with :func:`profiled` """
+    enabled: bool
+    trace_memory: bool
+    stats: dict[str, CallStats]
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.stats = dict()
+        self._started_tracemalloc = False
+
+    def enable(self, trace_memory: bool = False):
+        """
+        start recording calls
+        :param trace_memory: also record allocation deltas with tracemalloc, this slows every call
+        """
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.enabled = True
+
+    def disable(self):
+        """ stop recording calls, recorded stats are kept """
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.trace_memory = False
+
+    def reset(self):
+        """ remove all recorded stats """
+        self.stats = dict()
+
+    def record(self, name: str, duration_sec: float, alloc_bytes: int = 0):
+        try:
+            stats = self.stats[name]
+        except KeyError:
+            stats = self.stats[name] = CallStats(name)
+        stats.add(duration_sec, alloc_bytes)
+
+    def summary(self) -> list[dict[str, str | int | float]]:
+        """ summary of every instrumented function, slowest total time first """
+        return sorted((s_.summary() for s_ in self.stats.values()), key=lambda s_: s_['total_ms'], reverse=True)
+
+    def dump_json(self, file: str | pathlib.Path):
+        """ write :meth:`summary` to a json file """
+        with open(file, 'w') as f:
+            f.write(json.dumps(dict(created=time.time(),
+                                    trace_memory=self.trace_memory,
+                                    functions=self.summary()), indent=2))
+
+
+registry = ProfileRegistry()
+if definitions.PROFILE_ON_START:
+    registry.enable()
+
+
+def profiled(name: str | None = None) -> typing.Callable[[_func_type], _func_type]:
+    """
+    Decorator recording each call of the function in :data:`registry`,
+    when the registry is disabled the only cost is a single attribute check
+    :param name: name shown in reports, defaults to the qualified function name
+    """
+
+    def decorator(func: _func_type) -> _func_type:
+        label = func.__qualname__ if name is None else name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            alloc_start = tracemalloc.get_traced_memory()[0] if registry.trace_memory else 0
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                alloc = tracemalloc.get_traced_memory()[0] - alloc_start if registry.trace_memory else 0
+                registry.record(label, duration, alloc)
+
+        return wrapper
+
+    return decorator
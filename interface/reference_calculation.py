@@ -0,0 +1,113 @@
+"""
+Scalar reference calculation of every note, one note at a time in plain python through :class:`Distance`,
+:class:`Force`, :class:`Density` and :class:`Stress`. \n
+:class:`Note` uses these functions for its own frequency and force, and they are kept as the oracle
+the faster paths are checked against: :class:`calculation.NoteArrays`, the cached :func:`calculation.note_columns`
+and arrays edited in place. They do not share any numpy code with those paths, so a change to either side
+shows up as a difference, see ``testing/differential.py``.
+"""
+from __future__ import annotations
+
+import math
+
+import numpy
+
+from interface import general_functions
+from interface.calculation import material_code, temperament_from_state
+from interface.material_and_measures import Density, Distance, Force, Stress, WireMaterial
+from interface.temperament import Temperament
+
+# index of C in standard note numbers, note number 4 = C0
+_c_offset = 4
+
+
+def note_frequency(temperament: Temperament, note_number: int, pitch: float, reference_note: int = 49) -> float:
+    """
+    frequency of one note in hz, the reference note is tuned to exactly `pitch` \n
+    f = pitch * 2 ** ((n - ref) / 12 + (cents[n] - cents[ref]) / 1200)
+    """
+    cents = float(temperament.cents[(note_number - _c_offset) % 12]) - float(
+        temperament.cents[(reference_note - _c_offset) % 12])
+    return pitch * 2 ** ((note_number - reference_note) / 12 + cents / 1200)
+
+
+def equivalent_density(diameter: Distance, core_density: Density, wrap_diameter: Distance | None = None,
+                       wrap_density: Density | None = None, layers: int = 0) -> Density:
+    """
+    density of a solid wire with the core diameter and the mass per unit length of the wound string,
+    see :mod:`interface.wound_strings` for the derivation
+    """
+    if not layers:
+        return core_density
+    d, w = diameter.cm(), wrap_diameter.cm()
+    mass = math.pi * d ** 2 / 4 * core_density.g_cm3()
+    for i in range(1, layers + 1):
+        # each turn of layer i advances w along the string and wraps a diameter of d + 2(i - 1)w
+        mass += wrap_density.g_cm3() * math.pi * w ** 2 / 4 * math.pi * (d + (2 * i - 1) * w) / w
+    return Density(g_cm3=mass / (math.pi * d ** 2 / 4))
+
+
+def string_force(frequency: float, length: Distance, diameter: Distance, density: Density, wire_count: int
+                 ) -> Force:
+    """
+    calculate the tension of the wire using methods from \n
+    `sound_from_wire_equation <https://www.school-for-champions.com/science/sound_from_wire_equation.htm>`_ \n
+    --- **f** is the frequency in hertz (Hz) or cycles per second \n
+    --- **L** is the length of the wire in centimeters (cm) \n
+    --- **d** is the diameter of the wire in cm \n
+    --- **T** is the tension on the wire in gm-cm/s² \n
+    --- **π** is the Greek letter pi = 3.14 \n
+    --- **δ** is the density of the wire in gm/cm³ (Greek letter small delta),
+    the equivalent density for wound strings \n
+
+    :return: :class:`Force` of all `wire_count` wires as `T = πf²L²d²δ` each
+    """
+    pi_hz = math.pi * frequency ** 2  # πf²
+    le = length.cm() ** 2  # L²
+    di = diameter.cm() ** 2  # d²
+    den = density.g_cm3()  # δ
+    gcm = pi_hz * le * di * den
+    return Force(g_cm_s2=gcm * wire_count)
+
+
+def wire_stress(force: Force, diameter: Distance, wire_count: int) -> Stress:
+    """ stress in each of `wire_count` wires sharing `force` """
+    return Stress(n_mm2=force.newton() / (math.pi * diameter.mm() ** 2 / 4 * wire_count))
+
+
+def reference_columns(data: dict) -> dict[str, numpy.ndarray]:
+    """
+    the columns of :func:`calculation.note_columns` calculated one note at a time,
+    nan where a note can not be calculated, e.g. an unknown material or a zero length
+    :param data: dict in the format given by :meth:`Instrument.state_export`
+    """
+    temperament = temperament_from_state(data)
+    pitch = float(data['pitch'])
+    reference_note = general_functions.note_name_to_number(str(data.get('reference_note', 49)))
+    rows = []
+    for key in sorted(data['notes'], key=int):
+        note = data['notes'][key]
+        note_number = int(key)
+        frequency = note_frequency(temperament, note_number, pitch, reference_note)
+        row = dict(note_number=note_number, frequency=frequency, density=math.nan, force=math.nan,
+                   stress=math.nan, percent_of_break=math.nan)
+        try:
+            material = WireMaterial.get_by_code(material_code(note['_material_select']))
+            diameter = Distance(mm=float(note['_diameter']))
+            wire_count = int(note['_wire_count'])
+            layers = int(note.get('_wrap_layers') or 0)
+            wrap = WireMaterial.get_by_code(material_code(note.get('_wrap_material', ''))) if layers else None
+            density = equivalent_density(diameter, material.density, layers and Distance(
+                mm=float(note['_wrap_diameter'])), layers and wrap.density, layers)
+            row['density'] = density.g_cm3()
+            force = string_force(frequency, Distance(mm=float(note['_length'])), diameter, density, wire_count)
+            row['force'] = force.kg_force()
+            stress = wire_stress(force, diameter, wire_count)
+            row['stress'] = stress.mpa()
+            if material.tensile_strength is not None:
+                row['percent_of_break'] = stress.mpa() / material.tensile_strength.mpa() * 100
+        except (ValueError, TypeError, AttributeError, ZeroDivisionError):
+            pass
+        rows.append(row)
+    return {k_: numpy.array([r_[k_] for r_ in rows], dtype=int if k_ == 'note_number' else float)
+            for k_ in ('note_number', 'frequency', 'density', 'force', 'stress', 'percent_of_break')}
@@ -0,0 +1,201 @@
+"""
+Content addressed cache for the results of expensive calculations, usage::
+
+    key = content_key('tolerance', instrument.state_export(), samples=100_000)
+    result = cache.get_or_compute(key, lambda: tolerance_analysis(...))
+
+Keys are a hash of the instrument data, the parameters and the :class:`WireMaterial` catalogue,
+so editing a note, the pitch or a material gives a new key and stale results are never returned.
+Entries are kept in memory in least recently used order and optionally as pickle files in a directory,
+both expire after `max_age_sec` and are bounded by `max_bytes`.
+Cached values are shared, callers must not modify them.
+"""
+from __future__ import annotations
+
+import collections
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import tempfile
+import time
+import typing
+
+import definitions
+from interface.material_and_measures import WireMaterial
+
+_missing = object()
+
+
+def content_key(kind: str, data: dict, **parameters) -> str:
+    """
+    hash identifying a result
+    :param kind: name of the calculation, so different results of the same data get different keys
+    :param data: dict in the format given by :meth:`Instrument.state_export`
+    :param parameters: any other values the result depends on, must be json serialisable
+    """
+    text = json.dumps((kind, data, parameters, WireMaterial.catalogue_version()),
+                      sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class CacheEntry(typing.NamedTuple):
+    created: float
+    size: int
+    value: typing.Any
+
+
+class ResultCache:
+    """ LRU cache of results in memory, with an optional directory for results kept between runs """
+    max_age_sec: float
+    max_bytes: int
+    directory: pathlib.Path | None
+    _entries: collections.OrderedDict[str, CacheEntry]
+
+    def __init__(self, max_age_sec: float = definitions.CACHE_MAX_AGE_SEC,
+                 max_bytes: int = definitions.CACHE_MAX_BYTES,
+                 directory: str | pathlib.Path | None = None):
+        """
+        :param max_age_sec: entries older than this are discarded
+        :param max_bytes: limit of the pickled size of the entries, in memory and on disk separately
+        :param directory: folder for pickle files, None to only keep results in memory
+        """
+        self.max_age_sec = max_age_sec
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._disk_bytes: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self.use_directory(directory)
+
+    def use_directory(self, directory: str | pathlib.Path | None):
+        """ start or stop keeping results on disk """
+        self.directory = None if directory is None else pathlib.Path(directory)
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._disk_bytes = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str):
+        return self.get(key, _missing) is not _missing
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        """ get a result from memory, or disk when a directory is used, `default` if missing or expired """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._expired(entry.created):
+                self._discard(key)
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+        value = self._disk_get(key)
+        if value is _missing:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: typing.Any):
+        """ store a result, evicting the least recently used entries when over :attr:`max_bytes` """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._memory_put(key, value, len(data), time.time())
+        if self.directory is not None:
+            self._disk_put(key, data)
+
+    def get_or_compute(self, key: str, compute: typing.Callable[[], typing.Any]) -> typing.Any:
+        """ get a result, calling `compute` and storing its return value when it is not cached """
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """ remove every entry from memory and disk """
+        self._entries.clear()
+        self._bytes = 0
+        if self.directory is not None:
+            for file in self.directory.glob('*.pickle'):
+                file.unlink(missing_ok=True)
+            self._disk_bytes = 0
+
+    def _expired(self, created: float) -> bool:
+        return time.time() - created > self.max_age_sec
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _memory_put(self, key: str, value: typing.Any, size: int, created: float):
+        if key in self._entries:
+            self._discard(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = CacheEntry(created, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+
+    def _file(self, key: str) -> pathlib.Path:
+        return self.directory / f'{key}.pickle'
+
+    def _disk_get(self, key: str) -> typing.Any:
+        if self.directory is None:
+            return _missing
+        file = self._file(key)
+        try:
+            stat = file.stat()
+            if self._expired(stat.st_mtime):
+                file.unlink(missing_ok=True)
+                return _missing
+            data = file.read_bytes()
+            value = pickle.loads(data)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return _missing
+        self._memory_put(key, value, len(data), stat.st_mtime)
+        return value
+
+    def _disk_put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        # write to a temporary file first so other processes never read part of an entry
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, self._file(key))
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(f_.stat().st_size for f_ in self.directory.glob('*.pickle'))
+        else:
+            self._disk_bytes += len(data)
+        if self._disk_bytes > self.max_bytes:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """ remove expired files, then the oldest files until the directory is within :attr:`max_bytes` """
+        files = []
+        for file in self.directory.glob('*.pickle'):
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            if self._expired(stat.st_mtime):
+                file.unlink(missing_ok=True)
+            else:
+                files.append((stat.st_mtime, stat.st_size, file))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, file in files:
+            if total <= self.max_bytes:
+                break
+            file.unlink(missing_ok=True)
+            total -= size
+        self._disk_bytes = total
+
+
+# shared by the interface and the batch tools, see :meth:`ResultCache.use_directory`
+cache = ResultCache()
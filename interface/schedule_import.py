@@ -0,0 +1,264 @@
+"""
+Streaming importer for stringing schedules in csv or tsv files, usage::
+
+    result = read_schedule('survey.csv', column_map={'note': 'Key', 'length': 'Scale', 'diameter': 'Gauge'})
+    for line, reason in result.errors:
+        ...
+    instrument.state_import(result.state(inst_name='Survey', pitch=415))
+
+Values may carry units, "1.2 m", "47 in", "0.4mm", notes may be numbers or names, "49", "A4", "C♯3".
+Rows are parsed in chunks, each column of a chunk is split into numbers and units with a single regular
+expression and converted with one multiplication per unit, bad rows are reported without stopping the import.
+"""
+from __future__ import annotations
+
+import csv
+import itertools
+import pathlib
+import re
+import typing
+
+import numpy
+
+from interface import general_functions
+from interface.material_and_measures import WireMaterial, distance_units, normalise_unit
+
+schedule_file_types = [('Schedules', '*.csv *.tsv *.txt'), ('All files', '*.*')]
+fields = ('note', 'length', 'diameter', 'material', 'count', 'wrap_material', 'wrap_diameter', 'wrap_layers')
+# column order used when a file has no header and no column map is given, matches test_data_files
+default_column_order = ('length', 'diameter', 'material', 'count')
+# header names recognised for each field, compared in lower case
+header_aliases = {
+    'note': ('note', 'key', 'note name', 'note number', 'notes'),
+    'length': ('length', 'length(mm)', 'scale', 'speaking length', 'string length', 'l'),
+    'diameter': ('diameter', 'diameter(mm)', 'gauge', 'dia', 'wire diameter', 'd'),
+    'material': ('material', 'wire', 'wire material', 'metal'),
+    'count': ('count', 'strings', 'choirs', 'wire count', 'number of strings'),
+    'wrap_material': ('wrap', 'wrap material'),
+    'wrap_diameter': ('wrap diameter', 'wrap(mm)'),
+    'wrap_layers': ('layers', 'wrap layers'),
+}
+_count_units = {'': 1.0, 'x': 1.0}
+_measure_lines_ = re.compile(r'^[ \t]*([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)?[ \t]*(.*?)[ \t]*$', re.M)
+
+
+def parse_measures(values: typing.Sequence[str], units: dict[str, float], default_unit: str
+                   ) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    vectorized :func:`extract_measure` for a column of values
+    :return: converted values and a boolean array marking values that could not be read
+    """
+    text = '\n'.join(v_.replace('\n', ' ') for v_ in values)
+    matches = _measure_lines_.findall(text)
+    numbers = numpy.array([n_ or 'nan' for n_, _ in matches], dtype=float)
+    unit_names, inverse = numpy.unique([normalise_unit(u_) or default_unit for _, u_ in matches],
+                                       return_inverse=True)
+    factors = numpy.array([units.get(u_, numpy.nan) for u_ in unit_names.tolist()])
+    converted = numbers * factors[inverse.reshape(-1)]
+    return converted, ~numpy.isfinite(converted)
+
+
+def _parse_unique(values: typing.Sequence[str], parser: typing.Callable[[str], typing.Any]
+                  ) -> tuple[list, numpy.ndarray]:
+    """ apply `parser` once to each distinct value, values that raise are marked bad """
+    unique, inverse = numpy.unique(numpy.asarray(values, dtype=str), return_inverse=True)
+    parsed, bad = [], []
+    for value in unique.tolist():
+        try:
+            parsed.append(parser(value))
+            bad.append(False)
+        except (ValueError, AttributeError, KeyError, IndexError):
+            parsed.append(None)
+            bad.append(True)
+    inverse = inverse.reshape(-1)
+    return [parsed[i_] for i_ in inverse], numpy.array(bad, dtype=bool)[inverse]
+
+
+def material_from_text(text: str) -> str:
+    """
+    find a material by code, "code name", name or a part of a name that matches only one material,
+    returned in the format used by the material selection
+    :raises KeyError: when no material or more than one material matches
+    """
+    text = text.strip()
+    material = WireMaterial.get_by_code(text.split(' ')[0]) if text else None
+    if material is None:
+        names = {m_.name.lower(): m_ for m_ in WireMaterial.material_objects()}
+        material = names.get(text.lower())
+    if material is None:
+        matches = [m_ for name, m_ in names.items() if text.lower() in name] if text else []
+        if len(matches) != 1:
+            raise KeyError(text)
+        material = matches[0]
+    return f'{material.code} {material.name}'
+
+
+class ImportResult:
+    """ notes read from a schedule, in the format used by :meth:`Note.state_export` """
+    notes: dict[int, dict]
+    errors: list[tuple[int, str]]
+    rows: int
+
+    def __init__(self):
+        self.notes = dict()
+        self.errors = list()
+        self.rows = 0
+
+    def state(self, inst_name: str = 'Instrument', pitch: float = 440.0, **kwargs) -> dict:
+        """
+        convert to the format used by :meth:`Instrument.state_import`
+        :param kwargs: any other instrument fields, e.g. temperament or reference_note
+        """
+        if not self.notes:
+            raise ValueError('no notes were imported')
+        return dict(inst_name=inst_name,
+                    lowest_key=str(min(self.notes)),
+                    highest_key=str(max(self.notes)),
+                    pitch=pitch,
+                    notes={str(k_): n_ for k_, n_ in sorted(self.notes.items())},
+                    **kwargs)
+
+
+class ScheduleImporter:
+    """ reads csv/tsv stringing schedules in chunks, see the module documentation """
+    column_map: dict[str, str | int] | None
+
+    def __init__(self, column_map: dict[str, str | int] | None = None, delimiter: str | None = None,
+                 has_header: bool | None = None, first_note: int = 1, chunk_size: int = 5000,
+                 length_unit: str = 'mm', diameter_unit: str = 'mm'):
+        """
+        :param column_map: field name from :data:`fields` to column header or column index,
+            None to find columns from the header, or use :data:`default_column_order` without a header
+        :param delimiter: column delimiter, None to detect comma, tab or semicolon
+        :param has_header: None to treat the first row as a header when it has no numbers
+        :param first_note: note number of the first row, used when there is no note column
+        :param chunk_size: number of rows parsed at once
+        :param length_unit: unit of lengths without a unit suffix
+        :param diameter_unit: unit of diameters without a unit suffix
+        """
+        unknown = set(column_map or ()) - set(fields)
+        if unknown:
+            raise ValueError(f'unknown fields in column map {sorted(unknown)}')
+        self.column_map = column_map
+        self.delimiter = delimiter
+        self.has_header = has_header
+        self.first_note = first_note
+        self.chunk_size = chunk_size
+        self.length_unit = length_unit
+        self.diameter_unit = diameter_unit
+
+    def read(self, file: str | pathlib.Path) -> ImportResult:
+        result = ImportResult()
+        with open(file, 'r', newline='', encoding='utf-8-sig') as f:
+            sample = f.read(8192)
+            f.seek(0)
+            reader = csv.reader(f, delimiter=self.delimiter or self._sniff_delimiter(sample))
+            rows = ((reader.line_num, row) for row in reader if any(c_.strip() for c_ in row))
+            first = next(rows, None)
+            if first is None:
+                return result
+            header = first[1] if self._is_header(first[1]) else None
+            columns = self._columns(header)
+            if header is None:
+                rows = itertools.chain([first], rows)
+            row_index = 0
+            while True:
+                chunk = list(itertools.islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self._read_chunk(chunk, columns, row_index, result)
+                row_index += len(chunk)
+        result.rows = row_index
+        return result
+
+    @staticmethod
+    def _sniff_delimiter(sample: str) -> str:
+        try:
+            return csv.Sniffer().sniff(sample, delimiters=',\t;').delimiter
+        except csv.Error:
+            return ','
+
+    def _is_header(self, row: list[str]) -> bool:
+        if self.has_header is not None:
+            return self.has_header
+        return not any(re.match(r'\s*[-+]?\.?\d', c_) for c_ in row)
+
+    def _columns(self, header: list[str] | None) -> dict[str, int]:
+        """ column index of each field found """
+        if self.column_map is None:
+            if header is None:
+                return {field: i_ for i_, field in enumerate(default_column_order)}
+            names = [h_.strip().lower() for h_ in header]
+            columns = dict()
+            for field, aliases in header_aliases.items():
+                for i_, name in enumerate(names):
+                    if name in aliases:
+                        columns[field] = i_
+                        break
+        else:
+            columns = dict()
+            names = [h_.strip().lower() for h_ in header] if header is not None else []
+            for field, column in self.column_map.items():
+                if isinstance(column, int):
+                    columns[field] = column
+                elif column.strip().lower() in names:
+                    columns[field] = names.index(column.strip().lower())
+                else:
+                    raise ValueError(f'column {column!r} for {field} not found in the header')
+        missing = {'length', 'diameter', 'material'} - set(columns)
+        if missing:
+            raise ValueError(f'no column found for {sorted(missing)}')
+        return columns
+
+    def _read_chunk(self, chunk: list[tuple[int, list[str]]], columns: dict[str, int], row_index: int,
+                    result: ImportResult):
+        lines = [line for line, _ in chunk]
+
+        def column(field: str, default: str = '') -> list[str]:
+            i_ = columns.get(field)
+            if i_ is None:
+                return [default] * len(chunk)
+            return [row[i_] if i_ < len(row) else '' for _, row in chunk]
+
+        bad: dict[str, numpy.ndarray] = dict()
+        if 'note' in columns:
+            notes, bad['note'] = _parse_unique(column('note'), general_functions.note_name_to_number)
+        else:
+            notes = list(range(self.first_note + row_index, self.first_note + row_index + len(chunk)))
+        length, bad['length'] = parse_measures(column('length'), distance_units, self.length_unit)
+        diameter, bad['diameter'] = parse_measures(column('diameter'), distance_units, self.diameter_unit)
+        count, bad['count'] = parse_measures(column('count', '1'), _count_units, '')
+        bad['count'] |= count != numpy.round(count)
+        materials, bad['material'] = _parse_unique(column('material'), material_from_text)
+
+        wrap_layers, bad['wrap_layers'] = parse_measures(column('wrap_layers', '0'), _count_units, '')
+        wound = wrap_layers > 0
+        wrap_diameter, wrap_diameter_bad = parse_measures(column('wrap_diameter', '0'), distance_units,
+                                                          self.diameter_unit)
+        bad['wrap_diameter'] = wrap_diameter_bad & wound
+        wrap_materials, wrap_material_bad = _parse_unique(column('wrap_material'), material_from_text)
+        bad['wrap_material'] = wrap_material_bad & wound
+
+        any_bad = numpy.zeros(len(chunk), dtype=bool)
+        for field_bad in bad.values():
+            any_bad |= field_bad
+        for i_ in numpy.flatnonzero(any_bad).tolist():
+            reasons = [field for field, field_bad in bad.items() if field_bad[i_]]
+            result.errors.append((lines[i_], f'could not read {", ".join(reasons)}'))
+
+        for i_ in numpy.flatnonzero(~any_bad).tolist():
+            note = notes[i_]
+            if note in result.notes:
+                result.errors.append((lines[i_], f'note {note} repeated, this row replaces the earlier one'))
+            result.notes[note] = dict(_wire_count=int(count[i_]),
+                                      _material_select=materials[i_],
+                                      _diameter=float(diameter[i_]),
+                                      _length=float(length[i_]),
+                                      _wrap_material=wrap_materials[i_] if wound[i_] else '',
+                                      _wrap_diameter=float(wrap_diameter[i_]) if wound[i_] else 0.0,
+                                      _wrap_layers=int(wrap_layers[i_]))
+
+
+def read_schedule(file: str | pathlib.Path, **kwargs) -> ImportResult:
+    """ read a schedule with a :class:`ScheduleImporter`, `kwargs` are passed to the importer """
+    return ScheduleImporter(**kwargs).read(file)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sys
+import tkinter as tk
+import typing
+
+
+class IdleScheduler:
+    """
+    Coalesces callbacks so each runs at most once per idle cycle, scheduling the same key
+    again before the cycle runs replaces the waiting callback instead of adding another. Usage::
+
+        scheduler = IdleScheduler.of(widget)
+        scheduler.schedule((id(self), 'layout'), self._update_layout)
+    """
+    root: tk.Misc
+    _pending: dict[typing.Hashable, typing.Callable[[], typing.Any]]
+    _after_id: str | None
+
+    def __init__(self, root: tk.Misc):
+        """
+        :param root: widget used to call `after_idle`, normally the Tk root
+        """
+        self.root = root
+        self._pending = dict()
+        self._after_id = None
+
+    @classmethod
+    def of(cls, widget: tk.Misc) -> IdleScheduler:
+        """ get the scheduler shared by every widget of the same Tk root, created on first use """
+        root = widget.nametowidget('.')
+        scheduler = getattr(root, '_idle_scheduler', None)
+        if scheduler is None:
+            scheduler = root._idle_scheduler = cls(root)
+        return scheduler
+
+    def schedule(self, key: typing.Hashable, callback: typing.Callable[[], typing.Any]):
+        """
+        run `callback` once the event queue is idle
+        :param key: identifies the work, a waiting callback with the same key is replaced
+        :param callback: function called without arguments
+        """
+        self._pending[key] = callback
+        if self._after_id is None:
+            self._after_id = self.root.after_idle(self._run)
+
+    def is_pending(self, key: typing.Hashable) -> bool:
+        return key in self._pending
+
+    def cancel(self, key: typing.Hashable):
+        self._pending.pop(key, None)
+
+    def flush(self):
+        """ run every waiting callback now """
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._run()
+
+    def _run(self):
+        pending, self._pending = self._pending, dict()
+        self._after_id = None
+        for callback in pending.values():
+            # an error in one callback is reported like any Tk callback error, the rest of the batch still runs
+            try:
+                callback()
+            except Exception:
+                self.root._root().report_callback_exception(*sys.exc_info())
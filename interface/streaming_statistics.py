@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import typing
+
+import numpy
+
+
+class StreamingHistogram:
+    """
+    Fixed bin histograms for many series at once, filled chunk by chunk so percentiles
+    can be estimated without keeping every sample in memory
+    """
+    counts: numpy.ndarray
+    lower: numpy.ndarray
+    upper: numpy.ndarray
+
+    def __init__(self, lower: numpy.ndarray | float, upper: numpy.ndarray | float, series: int, bins: int = 2048):
+        """
+        :param lower: lowest value of each series, or one value for every series, smaller values are clipped
+        :param upper: highest value of each series, or one value for every series, larger values are clipped
+        :param series: number of series, e.g. notes
+        :param bins: number of bins per series
+        """
+        self.series = series
+        self.bins = bins
+        self.lower = numpy.broadcast_to(numpy.asarray(lower, dtype=float), (series,)).copy()
+        self.upper = numpy.broadcast_to(numpy.asarray(upper, dtype=float), (series,)).copy()
+        # a single possible value still needs a bin width
+        single = self.upper == self.lower
+        self.upper[single] += numpy.abs(self.lower[single]) * 1e-9 + 1e-12
+        self.width = (self.upper - self.lower) / bins
+        # series without a usable range are kept valid, they will only receive nan samples
+        unusable = ~(self.width > 0)
+        self.width[unusable] = 1.0
+        self.lower[unusable] = 0.0
+        self.counts = numpy.zeros((series, bins), dtype=numpy.int64)
+        self._offset = numpy.arange(series) * bins
+
+    def add(self, values: numpy.ndarray):
+        """
+        add a chunk of samples, nan values are ignored
+        :param values: (samples × series) array
+        """
+        values = numpy.asarray(values, dtype=float).reshape(-1, self.series)
+        valid = numpy.isfinite(values)
+        scaled = (values - self.lower) / self.width
+        scaled[~valid] = 0
+        numpy.clip(scaled, 0, self.bins - 1, out=scaled)
+        idx = scaled.astype(numpy.int64) + self._offset
+        self.counts += numpy.bincount(idx[valid], minlength=self.series * self.bins
+                                      ).reshape(self.series, self.bins)
+
+    def total(self) -> numpy.ndarray:
+        """ number of samples added to each series """
+        return self.counts.sum(axis=1)
+
+    def percentiles(self, q: typing.Sequence[float]) -> numpy.ndarray:
+        """
+        estimate percentiles by linear interpolation within bins
+        :param q: percentiles between 0 and 100
+        :return: (len(q) × series) array, nan for series without samples
+        """
+        cumulative = numpy.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1]
+        result = numpy.full((len(q), self.series), numpy.nan)
+        rows = numpy.arange(self.series)
+        for i, q_ in enumerate(q):
+            target = total * q_ / 100
+            # first bin reaching the target in each series
+            bin_i = (cumulative < target[:, numpy.newaxis]).sum(axis=1)
+            bin_i = numpy.minimum(bin_i, self.bins - 1)
+            before = numpy.where(bin_i > 0, cumulative[rows, bin_i - 1], 0)
+            in_bin = self.counts[rows, bin_i]
+            fraction = numpy.divide(target - before, in_bin, out=numpy.zeros(self.series), where=in_bin > 0)
+            result[i] = self.lower + (bin_i + fraction) * self.width
+        result[:, total == 0] = numpy.nan
+        return result
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import typing
+
+import numpy
+
+# index of C in `definitions.note_names` based note numbers, note number 4 = C0
+_c_offset = 4
+# name of a table entered for one instrument, such tables are not registered
+CUSTOM_TEMPERAMENT = 'Custom'
+
+
+class Temperament:
+    """
+    A tuning system stored as a 12 entry table of cent offsets from equal temperament,
+    the table is ordered C, C♯, D, D♯, E, F, F♯, G, G♯, A, A♯, B as temperaments are usually published
+    """
+    _name_dict: dict[str, Temperament] = {}
+
+    def __init__(self, name: str, cents: typing.Sequence[float], register=True):
+        """
+        :param name: name used to select the temperament
+        :param cents: 12 offsets in cents from equal temperament, starting from C
+        :param register: make the temperament available through :meth:`get_by_name`
+        """
+        cents = numpy.asarray(cents, dtype=float)
+        if cents.shape != (12,):
+            raise ValueError(f'temperament requires 12 cent offsets, {cents.size} given')
+        self.name = name
+        self.cents = cents
+        if register:
+            self._name_dict[self.name] = self
+
+    def __str__(self):
+        return self.name
+
+    def offsets(self, note_numbers: numpy.ndarray | int) -> numpy.ndarray | float:
+        """
+        get the cent offset from equal temperament for each note number
+        :param note_numbers: standard note numbers, A0 = 1, C0 = 4, A4 = 49
+        """
+        return self.cents[(numpy.asarray(note_numbers) - _c_offset) % 12]
+
+    def frequencies(self, note_numbers: numpy.ndarray | typing.Sequence[int], pitch: float,
+                    reference_note: int = 49) -> numpy.ndarray:
+        """
+        calculate the frequency of every note in one operation,
+        the reference note is always tuned to exactly `pitch` \n
+        f = pitch * 2 ** ((n - ref) / 12 + (cents[n] - cents[ref]) / 1200)
+
+        :param note_numbers: standard note numbers, A0 = 1, C0 = 4, A4 = 49
+        :param pitch: frequency of the reference note in hz
+        :param reference_note: standard note number tuned to `pitch`
+        """
+        note_numbers = numpy.asarray(note_numbers, dtype=int)
+        semitones = (note_numbers - reference_note) / 12
+        cents = (self.offsets(note_numbers) - self.offsets(reference_note)) / 1200
+        return pitch * 2 ** (semitones + cents)
+
+    def frequency(self, note_number: int, pitch: float, reference_note: int = 49) -> float:
+        """ scalar version of :meth:`frequencies` """
+        return float(self.frequencies([note_number], pitch, reference_note)[0])
+
+    @classmethod
+    def from_text(cls, name: str, text: str) -> Temperament:
+        """
+        an unregistered temperament from cents separated by spaces or commas
+        :raises ValueError: when `text` is not 12 numbers
+        """
+        return cls(name, [float(c_) for c_ in text.replace(',', ' ').split()], register=False)
+
+    @classmethod
+    def get_by_name(cls, name: str) -> Temperament:
+        """
+        get :class:`Temperament` item by name \n
+        :param name: given name for a temperament
+        """
+        return cls._name_dict[name]
+
+    @classmethod
+    def name_list(cls) -> list[str]:
+        """ return the name of every registered temperament in a list """
+        return list(cls._name_dict)
+
+    @classmethod
+    def temperament_list(cls) -> list[Temperament]:
+        """ return every registered temperament in a list """
+        return list(cls._name_dict.values())
+
+
+def regular_temperament(name: str, fifth_offset: float, flats: int = 3) -> Temperament:
+    """
+    build a temperament where every fifth in the chain is tempered by the same amount,
+    such as the meantone family \n
+    :param name: name used to select the temperament
+    :param fifth_offset: size of each fifth compared to an equal tempered fifth, in cents
+    :param flats: number of fifths below C in the chain, 3 gives E♭ to G♯
+    """
+    cents = numpy.zeros(12)
+    for step in range(-flats, 12 - flats):
+        cents[(step * 7) % 12] = step * fifth_offset
+    return Temperament(name, cents)
+
+
+# size of the syntonic comma, and of a pure fifth compared to an equal tempered fifth, in cents
+_syntonic_comma = 21.5063
+_pure_fifth = 1.955
+
+EQUAL = Temperament('Equal', [0.0] * 12)
+regular_temperament('Meantone 1/4 comma', _pure_fifth - _syntonic_comma / 4)
+regular_temperament('Meantone 1/5 comma', _pure_fifth - _syntonic_comma / 5)
+regular_temperament('Meantone 1/6 comma', _pure_fifth - _syntonic_comma / 6)
+Temperament('Werckmeister III', [0.0, -9.8, -7.8, -5.9, -9.8, -2.0, -11.7, -3.9, -7.8, -11.7, -3.9, -7.8])
+Temperament('Kirnberger III', [0.0, -9.8, -6.8, -5.9, -13.7, -2.0, -9.8, -3.4, -7.8, -10.3, -3.9, -11.7])
+Temperament('Vallotti', [0.0, -5.9, -3.9, -2.0, -7.8, 2.0, -7.8, -2.0, -3.9, -5.9, 0.0, -9.8])
@@ -0,0 +1,98 @@
+"""
+Monte Carlo analysis of the effect of manufacturing tolerances on the tension of each string,
+diameter and length errors are absolute (mm), density errors are relative
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy
+
+from interface.calculation import NoteArrays
+from interface.streaming_statistics import StreamingHistogram
+
+DEFAULT_SAMPLES = 100_000
+DEFAULT_DIAMETER_SD_MM = 0.005
+DEFAULT_LENGTH_SD_MM = 1.0
+DEFAULT_DENSITY_SD = 0.005
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class ToleranceResult:
+    """ percentiles of the tension and percent of break of each note, rows follow `percentiles` """
+    note_number: numpy.ndarray
+    nominal_force: numpy.ndarray
+    nominal_percent_of_break: numpy.ndarray
+    force: numpy.ndarray
+    percent_of_break: numpy.ndarray
+
+    def __init__(self, arrays: NoteArrays, percentiles: tuple[float, ...], samples: int,
+                 nominal_force: numpy.ndarray, nominal_percent_of_break: numpy.ndarray,
+                 force: numpy.ndarray, percent_of_break: numpy.ndarray):
+        self.note_number = arrays.note_number
+        self.percentiles = percentiles
+        self.samples = samples
+        self.nominal_force = nominal_force
+        self.nominal_percent_of_break = nominal_percent_of_break
+        self.force = force
+        self.percent_of_break = percent_of_break
+
+    def force_percentile(self, q: float) -> numpy.ndarray:
+        return self.force[self.percentiles.index(q)]
+
+    def percent_of_break_percentile(self, q: float) -> numpy.ndarray:
+        return self.percent_of_break[self.percentiles.index(q)]
+
+
+def tolerance_analysis(arrays: NoteArrays,
+                       samples: int = DEFAULT_SAMPLES,
+                       diameter_sd_mm: float = DEFAULT_DIAMETER_SD_MM,
+                       length_sd_mm: float = DEFAULT_LENGTH_SD_MM,
+                       density_sd: float = DEFAULT_DENSITY_SD,
+                       percentiles: typing.Sequence[float] = DEFAULT_PERCENTILES,
+                       chunk_size: int = 10_000,
+                       seed: int | None = None) -> ToleranceResult:
+    """
+    sample normally distributed diameter, length and density errors for every note,
+    the samples are processed as (chunk_size × notes) arrays so memory use does not grow with `samples`. \n
+    Tension scales with d²L²δ, stress with L²δ as the wire area also scales with d².
+
+    :param arrays: instrument to analyse
+    :param samples: number of samples for each note
+    :param diameter_sd_mm: standard deviation of the wire diameter
+    :param length_sd_mm: standard deviation of the speaking length
+    :param density_sd: standard deviation of the density as a fraction of the density
+    :param percentiles: percentiles reported, between 0 and 100
+    :param chunk_size: number of samples processed at once
+    :param seed: random seed for repeatable results
+    """
+    rng = numpy.random.default_rng(seed)
+    percentiles = tuple(percentiles)
+    nominal_force = arrays.forces()
+    nominal_break = arrays.percent_of_break(nominal_force)
+    notes = len(arrays)
+
+    # relative standard deviation of each factor, used to bound the histograms
+    d_rel = diameter_sd_mm / arrays.diameter
+    l_rel = length_sd_mm / arrays.length
+    force_sd = numpy.sqrt((2 * d_rel) ** 2 + (2 * l_rel) ** 2 + density_sd ** 2)
+    stress_sd = numpy.sqrt((2 * l_rel) ** 2 + density_sd ** 2)
+    force_hist = StreamingHistogram(numpy.maximum(1 - 8 * force_sd, 0), 1 + 8 * force_sd, notes)
+    stress_hist = StreamingHistogram(numpy.maximum(1 - 8 * stress_sd, 0), 1 + 8 * stress_sd, notes)
+
+    remaining = samples
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        remaining -= n
+        length_ratio = 1 + rng.standard_normal((n, notes)) * l_rel
+        length_ratio *= length_ratio
+        length_ratio *= 1 + rng.standard_normal((n, notes)) * density_sd
+        stress_hist.add(length_ratio)
+        diameter_ratio = 1 + rng.standard_normal((n, notes)) * d_rel
+        diameter_ratio *= diameter_ratio
+        length_ratio *= diameter_ratio
+        force_hist.add(length_ratio)
+
+    force = force_hist.percentiles(percentiles) * nominal_force
+    percent_of_break = stress_hist.percentiles(percentiles) * nominal_break
+    return ToleranceResult(arrays, percentiles, samples, nominal_force, nominal_break, force, percent_of_break)
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+import base64
+import concurrent.futures
+import os
 import tkinter as tk
+import typing
 from tkinter import ttk
 
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from interface import result_cache
 from interface.instrument_class import Instrument
-from interface.visualization_plotting import plot_type_dict, plot_func_type
+from interface.plot_interaction import PlotInteractor
+from interface.scheduler import IdleScheduler
+from interface.visualization_plotting import (plot_func_type, plot_result_dict, plot_state_dict, plot_type_dict,
+                                             render_png)
+
+# draws gallery thumbnails, shared by every gallery
+_render_executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                                         thread_name_prefix='thumbnail')
 
 
 class PlotFrame(ttk.Frame):
@@ -20,10 +32,14 @@ class PlotFrame(ttk.Frame):
         # plot body for all plots to be placed - also the creator of said plots
         self.plot_body = PlotBody(self, self.instrument)
         self.plot_body.pack(fill='both', expand=True, side="bottom")
+        self.instrument.bind('<<InstrumentUpdated>>', lambda e: self.plot_body.refresh_plot(), add=True)
 
     def create_plot(self, name: str):
         self.plot_body.new_plot(name)
 
+    def show_gallery(self):
+        self.plot_body.show_gallery()
+
 
 class PlotHeader(ttk.Frame):
     def __init__(self, parent: PlotFrame):
@@ -36,24 +52,181 @@ class PlotHeader(ttk.Frame):
             button = ttk.Button(self, text=key,
                                 command=lambda key=key: self.parent.create_plot(key))
             button.grid(row=n // max_cols, column=n % max_cols)
+        n = len(plot_type_dict)
+        button = ttk.Button(self, text="Gallery", command=self.parent.show_gallery)
+        button.grid(row=n // max_cols, column=n % max_cols)
 
 
 class PlotBody(ttk.Frame):
-    plot: tk.Canvas
+    plot: tk.Widget
+    plot_name: str | None
+    interactor: PlotInteractor | None
+    gallery: PlotGallery | None
 
     def __init__(self, parent, instrument: Instrument):
         super(PlotBody, self).__init__(parent)
         self.instrument = instrument
         self.plots: dict[str: tk.Canvas] = dict()
+        self.plot_name = None
+        self.interactor = None
+        self.gallery = None
 
-    def new_plot(self, name='Tension'):
+    def refresh_plot(self):
+        """ rebuild the plot currently shown, if any """
+        if self.gallery is not None:
+            self.gallery.refresh()
+        elif self.plot_name is not None:
+            self.new_plot(self.plot_name)
+
+    def _clear(self):
         try:
             self.plot.destroy()
         except AttributeError:
             pass
 
+        if self.interactor is not None:
+            self.interactor.disconnect()
+            self.interactor = None
+        self.gallery = None
+
+    def show_gallery(self):
+        """ replace the current plot with thumbnails of every plot type """
+        self._clear()
+        self.gallery = PlotGallery(self, self.instrument, self.new_plot)
+        self.gallery.pack(fill='both', expand=True, side="top")
+        self.plot = self.gallery
+        self.plot_name = None
+
+    def new_plot(self, name='Tension'):
+        self._clear()
+
         fig: plot_func_type = plot_type_dict[name](self.instrument, (1920, 800))
         canvas = FigureCanvasTkAgg(fig, self)
+        if getattr(fig, 'plot_cache', None) is not None:
+            self.interactor = PlotInteractor(canvas, fig.plot_cache)
+        canvas.draw()
         widget = canvas.get_tk_widget()
         widget.pack(fill='x', expand=True, side="top")
         self.plot = widget
+        self.plot_name = name
+
+
+class PlotGallery(ttk.Frame):
+    """
+    Thumbnails of every plot in :data:`plot_type_dict`, clicking one opens the full plot.
+    Figures read the note widgets so they are built on the Tk thread, one per idle callback. Worker threads
+    compute the slow results in :data:`plot_result_dict` before a figure is built, and draw the figures to png.
+    Images are kept in :data:`result_cache.cache` under a hash of the instrument and the state in
+    :data:`plot_state_dict`, so thumbnails are only drawn again when either changes.
+    """
+    columns = 2
+    thumbnail_width_px = 480
+    figure_size_px = (1200, 500)
+    poll_ms = 30
+    buttons: dict[str, ttk.Button]
+    images: dict[str, tk.PhotoImage]
+
+    def __init__(self, parent, instrument: Instrument, open_plot: typing.Callable[[str], typing.Any]):
+        """
+        :param open_plot: called with the name of a clicked thumbnail
+        """
+        super(PlotGallery, self).__init__(parent)
+        self.instrument = instrument
+        self.scheduler = IdleScheduler.of(self)
+        self.buttons = dict()
+        self.images = dict()
+        # key of the image shown and of the image being drawn for each plot
+        self._shown: dict[str, str] = dict()
+        self._rendering: dict[str, tuple[str, concurrent.futures.Future]] = dict()
+        # key of the image, key of the result and the result being computed for each plot
+        self._computing: dict[str, tuple[str, str, concurrent.futures.Future]] = dict()
+        self._after_id: str | None = None
+
+        for n, name in enumerate(plot_type_dict.keys()):
+            button = ttk.Button(self, text=f'{name}\nrendering', compound='top',
+                                command=lambda name=name: open_plot(name))
+            button.grid(row=n // self.columns, column=n % self.columns, padx=2, pady=2, sticky=tk.NSEW)
+            self.buttons[name] = button
+        self.refresh()
+
+    def refresh(self):
+        """ draw thumbnails that do not match the current data """
+        data = self.instrument.state_export()
+        for name in plot_type_dict.keys():
+            state = plot_state_dict[name](data) if name in plot_state_dict else None
+            key = result_cache.content_key('thumbnail', data, plot=name, width=self.thumbnail_width_px, state=state)
+            if key in (self._shown.get(name), self._rendering.get(name, (None,))[0],
+                       self._computing.get(name, (None,))[0]):
+                continue
+            png = result_cache.cache.get(key)
+            if png is not None:
+                self._show(name, key, png)
+                continue
+            self._computing.pop(name, None)
+            if name in plot_result_dict:
+                result_key, compute = plot_result_dict[name](data)
+                if result_key not in result_cache.cache:
+                    self.scheduler.cancel((id(self), 'thumbnail', name))
+                    self._computing[name] = (key, result_key, _render_executor.submit(compute))
+                    self._start_poll()
+                    continue
+            self._schedule_build(name, key)
+
+    def _schedule_build(self, name: str, key: str):
+        self.scheduler.schedule((id(self), 'thumbnail', name), lambda: self._build(name, key))
+
+    def _start_poll(self):
+        if self._after_id is None:
+            self._after_id = self.after(self.poll_ms, self._poll)
+
+    def _build(self, name: str, key: str):
+        if not self.winfo_exists():
+            return
+        try:
+            fig = plot_type_dict[name](self.instrument, self.figure_size_px)
+        except Exception as e:
+            # shown on the thumbnail of the plot that failed, the other thumbnails carry on
+            self.buttons[name].configure(text=f'{name}\n{type(e).__name__}: {e}')
+            return
+        scale = self.thumbnail_width_px / self.figure_size_px[0]
+        self._rendering[name] = (key, _render_executor.submit(render_png, fig, scale))
+        self._start_poll()
+
+    def _poll(self):
+        """ build the figures of computed results and show finished thumbnails, Tk is only used from this thread """
+        self._after_id = None
+        for name, (key, result_key, future) in list(self._computing.items()):
+            if not future.done():
+                continue
+            del self._computing[name]
+            # a failed result is computed again when building, so the plot shows its own error
+            if future.exception() is None:
+                result_cache.cache.put(result_key, future.result())
+            self._schedule_build(name, key)
+        for name, (key, future) in list(self._rendering.items()):
+            if not future.done():
+                continue
+            del self._rendering[name]
+            try:
+                png = future.result()
+            except Exception as e:
+                self.buttons[name].configure(text=f'{name}\n{e}')
+                continue
+            result_cache.cache.put(key, png)
+            self._show(name, key, png)
+        if self._rendering or self._computing:
+            self._after_id = self.after(self.poll_ms, self._poll)
+
+    def _show(self, name: str, key: str, png: bytes):
+        image = tk.PhotoImage(master=self, data=base64.b64encode(png))
+        self.images[name] = image
+        self.buttons[name].configure(image=image, text=name)
+        self._shown[name] = key
+
+    def destroy(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        for name in plot_type_dict.keys():
+            self.scheduler.cancel((id(self), 'thumbnail', name))
+        super(PlotGallery, self).destroy()
@@ -1,17 +1,29 @@
+import io
 import typing
 
 import matplotlib
 import numpy
-from matplotlib import cm as matplotlib_cm
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PathCollection
 from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 
+from interface import (archive_overlay, curve_fitting, derived_columns, design_diff, key_map, pareto,
+                       pitch_inference, pitch_raise, result_cache, tolerance)
+from interface.calculation import NoteArrays, note_columns
 from interface.instrument_class import Instrument, Note
+from interface.profiling import profiled
 
 matplotlib.use('TkAgg')
 
 plot_func_type = typing.Callable[[Instrument, typing.Optional[tuple[int, int]]], Figure]
 plot_type_dict: dict[str:plot_func_type] = dict()
+# state other than the design that a plot reads, from the exported design, part of the gallery's thumbnail keys
+plot_state_dict: dict[str, typing.Callable[[dict], typing.Any]] = dict()
+# slow result a plot gets from result_cache.cache, as (key, compute) for the exported design,
+# the gallery computes it on a worker thread before building the figure
+plot_result_dict: dict[str, typing.Callable[[dict], tuple[str, typing.Callable[[], typing.Any]]]] = dict()
 marker = 'd'
 
 
@@ -44,8 +56,18 @@ class PlotCache:
         self._m = list()
         self._x_tick_mark = list()
         self._x_tick_name = list()
+        self._notes = list()
         self.colour_map: str = colour_map
         self._val_dict = dict()
+        # set by plotters that allow editing by dragging points, see :class:`PlotInteractor`
+        self.editable: str | None = None
+        self.ax: Axes | None = None
+        self.scatter: PathCollection | None = None
+        self.poly_line: Line2D | None = None
+        self.outlier_ring: PathCollection | None = None
+        # material segment of each note and the options of the trend, so it can be refitted while dragging
+        self.segment: numpy.ndarray | None = None
+        self.fit_options: curve_fitting.FitOptions | None = None
 
     @property
     def x(self) -> list:
@@ -76,10 +98,10 @@ class PlotCache:
         self._val_dict = dict.fromkeys(self._c)
         colour_count = len(self._val_dict)
         try:
-            cmap = matplotlib_cm.get_cmap(self.colour_map)
-        except ValueError:
+            cmap = matplotlib.colormaps[self.colour_map]
+        except KeyError:
             print(f"Error in cmap name, no cmap '{self.colour_map}' available, using 'viridis'")
-            cmap = matplotlib_cm.get_cmap("viridis")
+            cmap = matplotlib.colormaps["viridis"]
         self._val_dict = {key: cmap(1 / colour_count * val) for val, key in enumerate(list(self._val_dict))}
         return [self._val_dict[val] for val in self._c]
 
@@ -91,12 +113,6 @@ class PlotCache:
     def colour_dict(self) -> dict:
         return self._val_dict
 
-    @property
-    def poly_fit(self) -> numpy.ndarray:
-        _fit = numpy.polyfit(self._x, self._y, 1)
-        _poly = numpy.poly1d(_fit)
-        return _poly(self._x)
-
     @property
     def x_tick_mark(self) -> list:
         return self._x_tick_mark
@@ -113,14 +129,16 @@ class PlotCache:
     def x_tick_name(self, value):
         self._x_tick_name.append(value)
 
-    def get_note_colour(self, note: Note):
-        return self._val_dict[note.get_wire_type().name]
+    @property
+    def notes(self) -> list[Note]:
+        return self._notes
 
+    @notes.setter
+    def notes(self, value: Note):
+        self._notes.append(value)
 
-def poly_fit(x: list[float], y: list[int | float]) -> numpy.ndarray:
-    z = numpy.polyfit(x, y, 1)
-    p = numpy.poly1d(z)
-    return p(x)
+    def get_note_colour(self, note: Note):
+        return self._val_dict[note.get_wire_type().name]
 
 
 def fig_setup(fig_size_px=(1200, 800)) -> tuple[Figure, Axes, PlotCache]:
@@ -135,12 +153,13 @@ def fig_setup(fig_size_px=(1200, 800)) -> tuple[Figure, Axes, PlotCache]:
     return fig, ax, cache
 
 
-def _scatter(ax: Axes, cache: PlotCache, z=False, m: str | None = None, colour: str | tuple | None = None, **kwargs):
-    ax.scatter(x=cache.x,
-               y=cache.z if z else cache.y,
-               c=cache.c if colour is None else colour,
-               marker=marker if m is None else m,
-               **kwargs)
+def _scatter(ax: Axes, cache: PlotCache, z=False, m: str | None = None, colour: str | tuple | None = None,
+             **kwargs) -> PathCollection:
+    return ax.scatter(x=cache.x,
+                      y=cache.z if z else cache.y,
+                      c=cache.c if colour is None else colour,
+                      marker=marker if m is None else m,
+                      **kwargs)
 
 
 def _bar(ax: Axes, cache: PlotCache, z=False, colour: str | tuple | None = None, **kwargs):
@@ -158,8 +177,37 @@ def _plot(ax: Axes, cache: PlotCache, z=False, m: str | None = None, colour: str
             **kwargs)
 
 
-def _poly(ax: Axes, cache: PlotCache, **kwargs):
-    ax.plot(cache.x, cache.poly_fit, '-k', linewidth=0.5, **kwargs)
+def _trend(ax: Axes, cache: PlotCache, fit: curve_fitting.CurveFit, **kwargs) -> Line2D:
+    """ the trend of each material segment, with the notes far from it ringed in red """
+    cache.segment = fit.segment
+    cache.fit_options = fit.options
+    outlier = fit.outlier
+    cache.outlier_ring = ax.scatter(fit.note_number[outlier], fit.value[outlier], s=120, facecolors='none',
+                                    edgecolors='red', linewidths=1.5, zorder=kwargs.get('zorder', 2) + 1)
+    return ax.plot(*fit.line(), '-k', linewidth=0.5, **kwargs)[0]
+
+
+def _editable(fig: Figure, ax: Axes, cache: PlotCache, field: str, scatter: PathCollection, poly_line: Line2D):
+    """
+    mark the scatter of a plot as editable, points can then be dragged by :class:`PlotInteractor`
+    :param field: 'force' or 'diameter', the value plotted on the y axis
+    """
+    cache.editable = field
+    cache.ax = ax
+    cache.scatter = scatter
+    cache.poly_line = poly_line
+    fig.plot_cache = cache
+
+
+def render_png(fig: Figure, scale: float = 1.0) -> bytes:
+    """
+    draw a figure to png with the Agg renderer, safe to call from worker threads as it does not use Tk
+    :param scale: size of the image relative to the figure size
+    """
+    FigureCanvasAgg(fig)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=fig.dpi * scale, facecolor=fig.get_facecolor())
+    return buffer.getvalue()
 
 
 def _ticks(ax: Axes, cache: PlotCache):
@@ -202,6 +250,7 @@ def _string_change_markers(ax: Axes, instrument: Instrument, p_cache: PlotCache
                     color=annotate_colour)
 
 
+@profiled()
 def plotter_tension(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
     fig, ax, cache = fig_setup(fig_size_px)
 
@@ -210,13 +259,15 @@ def plotter_tension(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
         cache.x = x
         cache.y = note.get_force().kg_force()
         cache.c = note.get_wire_type().name
+        cache.notes = note
         if x % 12 in {4}:
             cache.x_tick_mark = x
             cache.x_tick_name = note.get_std_note_name()
 
     # ax.scatter(x=cache.x, y=cache.y, c=cache.c, marker=marker)
-    _scatter(ax, cache)
-    _poly(ax, cache)
+    scatter = _scatter(ax, cache)
+    poly_line = _trend(ax, cache, curve_fitting.fit_design(instrument.state_export(), 'force'))
+    _editable(fig, ax, cache, 'force', scatter, poly_line)
     _ticks(ax, cache)
 
     _string_change_markers(ax, instrument, cache)
@@ -230,6 +281,15 @@ def plotter_tension(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
 plot_type_dict['Tension'] = plotter_tension
 
 
+def _fit_state(data: dict) -> dict:
+    """ the trend and outlier rings follow the options of the Trend menu """
+    return curve_fitting.options._asdict()
+
+
+plot_state_dict['Tension'] = _fit_state
+
+
+@profiled()
 def plotter_tension_diameter(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
     fig, ax, cache = fig_setup(fig_size_px)
 
@@ -246,7 +306,7 @@ def plotter_tension_diameter(instrument: Instrument, fig_size_px=(1200, 800)) ->
     ax2 = ax.twinx()
     _scatter(ax2, cache, True, m='.', zorder=2)
     _scatter(ax, cache, colour="Black", zorder=1)
-    _poly(ax, cache, zorder=3)
+    _trend(ax, cache, curve_fitting.fit_design(instrument.state_export(), 'force'), zorder=3)
     _ticks(ax, cache)
 
     _string_change_markers(ax, instrument)
@@ -258,8 +318,10 @@ def plotter_tension_diameter(instrument: Instrument, fig_size_px=(1200, 800)) ->
 
 
 plot_type_dict['Tension & Diameter'] = plotter_tension_diameter
+plot_state_dict['Tension & Diameter'] = _fit_state
 
 
+@profiled()
 def plotter_string_diameter(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
     fig, ax, cache = fig_setup(fig_size_px)
 
@@ -268,12 +330,14 @@ def plotter_string_diameter(instrument: Instrument, fig_size_px=(1200, 800)) ->
         cache.x = x
         cache.y = note.get_diameter().mm()
         cache.c = note.get_force().kg_force()
+        cache.notes = note
         if x % 12 in {1, 4, 8, 11}:
             cache.x_tick_mark = x
             cache.x_tick_name = note.get_std_note_name()
 
-    _scatter(ax, cache)
-    _poly(ax, cache)
+    scatter = _scatter(ax, cache)
+    poly_line = _trend(ax, cache, curve_fitting.fit_design(instrument.state_export(), 'diameter'))
+    _editable(fig, ax, cache, 'diameter', scatter, poly_line)
     _ticks(ax, cache)
 
     _string_change_markers(ax, instrument)
@@ -285,3 +349,259 @@ def plotter_string_diameter(instrument: Instrument, fig_size_px=(1200, 800)) ->
 
 
 plot_type_dict['Diameter'] = plotter_string_diameter
+plot_state_dict['Diameter'] = _fit_state
+
+
+def _tolerance_result(data: dict) -> tuple[str, typing.Callable[[], tolerance.ToleranceResult]]:
+    return result_cache.content_key('tolerance', data), lambda: tolerance.tolerance_analysis(NoteArrays(data))
+
+
+@profiled()
+def plotter_tolerance(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
+    fig, ax, cache = fig_setup(fig_size_px)
+    result = result_cache.cache.get_or_compute(*_tolerance_result(instrument.state_export()))
+
+    for note in instrument.iter_notes():
+        x = note.get_std_note_number()
+        if x % 12 in {4}:
+            cache.x_tick_mark = x
+            cache.x_tick_name = note.get_std_note_name()
+
+    x = result.note_number
+    ax.fill_between(x, result.force_percentile(5), result.force_percentile(95), color="lightsteelblue", step='mid')
+    ax.fill_between(x, result.force_percentile(25), result.force_percentile(75), color="steelblue", step='mid')
+    ax.scatter(x, result.force_percentile(50), c="Black", marker=marker, zorder=2)
+    ax2 = ax.twinx()
+    ax2.plot(x, result.percent_of_break_percentile(95), '-r', linewidth=0.5, drawstyle='steps-mid')
+    _ticks(ax, cache)
+
+    _string_change_markers(ax, instrument)
+    ax.set_ylim(bottom=0)
+    ax2.set_ylim(bottom=0)
+    _axis_callouts(ax, x="Kg-f 5-95%", y="Note", x2="% of break 95%")
+
+    return fig
+
+
+plot_type_dict['Tolerance'] = plotter_tolerance
+plot_result_dict['Tolerance'] = _tolerance_result
+
+
+def _pitch_inference_result(data: dict) -> tuple[str, typing.Callable[[], pitch_inference.PitchInference]]:
+    return result_cache.content_key('pitch_inference', data), lambda: pitch_inference.infer_pitch(NoteArrays(data))
+
+
+@profiled()
+def plotter_pitch_inference(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
+    fig, ax, cache = fig_setup(fig_size_px)
+    result = result_cache.cache.get_or_compute(*_pitch_inference_result(instrument.state_export()))
+    low, high = result.interval(0.9)
+    ax.axvspan(low, high, color="lightsteelblue")
+    ax.plot(result.pitches, result.pitch_confidence, '-k', linewidth=1)
+    ax.axvline(result.best_pitch, color="Black", linestyle='--', linewidth=0.5)
+    ax.axvline(instrument.get_pitch(), color="red", linewidth=0.5)
+    ax.annotate(f'{result.best_pitch:g}hz, 90% {low:g}-{high:g}hz', xy=(result.best_pitch, 0),
+                xytext=(5, 5), textcoords='offset points')
+    ax.set_ylim(bottom=0)
+    ax.set_xlabel("Pitch (hz)")
+    ax.set_ylabel("Confidence")
+    return fig
+
+
+plot_type_dict['Pitch Inference'] = plotter_pitch_inference
+plot_result_dict['Pitch Inference'] = _pitch_inference_result
+
+
+def draw_pitch_raise(ax: Axes, plan: pitch_raise.PitchRaisePlan, max_percent_of_break: float | None = None):
+    """ tension of every note before the raise and after each stage, with the percent of break at the end """
+    colours = matplotlib.colormaps['viridis'](numpy.linspace(0, 1, plan.stages + 1))
+    for s_, row in enumerate(plan.summary()):
+        label = f"{row['total_load']:.0f}kg-f" + (f", {row['raised']}" if s_ else ", before")
+        ax.plot(plan.note_number, plan.force[s_], color=colours[s_], linewidth=0.5 if 0 < s_ < plan.stages else 1,
+                drawstyle='steps-mid', label=label)
+    ax2 = ax.twinx()
+    ax2.plot(plan.note_number, plan.percent_of_break[-1], '-r', linewidth=0.5, drawstyle='steps-mid')
+    if max_percent_of_break is not None:
+        ax2.axhline(max_percent_of_break, color="red", linestyle='--', linewidth=0.5)
+    ax.set_ylim(bottom=0)
+    ax2.set_ylim(bottom=0)
+    ax.set_xlabel("Note")
+    ax.set_ylabel("Kg-f")
+    ax2.set_ylabel("% of break after the raise")
+    ax.legend(loc='upper right', fontsize='small')
+
+
+def _pitch_raise_result(data: dict) -> tuple[str, typing.Callable[[], pitch_raise.PitchRaisePlan]]:
+    def compute() -> pitch_raise.PitchRaisePlan:
+        key_map.require_own_strings(data)
+        # strings ending past the limit are drawn against the dashed line rather than refusing to plan
+        return pitch_raise.plan_pitch_raise(NoteArrays(data), max_percent_of_break=numpy.inf)
+
+    return result_cache.content_key('pitch_raise', data), compute
+
+
+@profiled()
+def plotter_pitch_raise(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
+    """ stages raising the instrument to :data:`pitch_raise.DEFAULT_TARGET_PITCH` with the default limits """
+    fig, ax, cache = fig_setup(fig_size_px)
+    try:
+        plan = result_cache.cache.get_or_compute(*_pitch_raise_result(instrument.state_export()))
+    except ValueError as e:
+        ax.text(0.5, 0.5, str(e), ha='center', va='center', transform=ax.transAxes)
+        return fig
+    draw_pitch_raise(ax, plan, pitch_raise.DEFAULT_MAX_PERCENT_OF_BREAK)
+    return fig
+
+
+plot_type_dict['Pitch Raise'] = plotter_pitch_raise
+plot_result_dict['Pitch Raise'] = _pitch_raise_result
+
+
+def draw_pareto_front(ax: Axes, archive: pareto.ParetoArchive, highlight: int | None = None) -> PathCollection | None:
+    """ cost against unevenness of every candidate on the front, coloured by stress and sized by gauge changes """
+    if not len(archive):
+        return None
+    unevenness, cost, stress, changes = archive.objectives.T
+    scatter = ax.scatter(cost, unevenness, c=stress, s=10 + 4 * changes, cmap='viridis', marker=marker, picker=True)
+    if highlight is not None:
+        ax.scatter(cost[highlight], unevenness[highlight], s=120, facecolors='none', edgecolors='red')
+    ax.figure.colorbar(scatter, ax=ax, label="% of break")
+    ax.set_xlabel("Wire cost")
+    ax.set_ylabel("Tension unevenness (sd of log kg-f)")
+    return scatter
+
+
+@profiled()
+def plotter_pareto_front(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
+    """ the front streamed by the Pareto window for this design, exploring is too slow to start from a plot """
+    fig, ax, cache = fig_setup(fig_size_px)
+    front = pareto.fronts.get(pareto.front_key(instrument.state_export()))
+    if front is None or not len(front[1]):
+        ax.text(0.5, 0.5, "No front yet, open File > Pareto Front",
+                ha='center', va='center', transform=ax.transAxes)
+        return fig
+    draw_pareto_front(ax, front[1])
+    return fig
+
+
+plot_type_dict['Pareto Front'] = plotter_pareto_front
+
+
+def _pareto_front_state(data: dict) -> list | None:
+    front = pareto.fronts.get(pareto.front_key(data))
+    return None if front is None else front[1].objectives.tolist()
+
+
+plot_state_dict['Pareto Front'] = _pareto_front_state
+
+
+def draw_design_diff(fig: Figure, diff: design_diff.DesignDiff):
+    """ percent change of tension above, of length and diameter below, notes only in one design are shaded """
+    ax, ax2 = fig.subplots(2, 1, sharex=True)
+    x = diff.note_number
+    force = 100 * diff.relative('force')
+    ax.bar(x, numpy.nan_to_num(force), color=numpy.where(force > 0, 'tab:red', 'tab:blue'))
+    material = diff.changed('material')
+    ax.scatter(x[material], numpy.nan_to_num(force[material]), c="Black", marker=marker, zorder=2,
+               label="material changed")
+    ax2.step(x, 100 * diff.relative('length'), where='mid', label="length")
+    ax2.step(x, 100 * diff.relative('diameter'), where='mid', label="diameter")
+    for a_ in (ax, ax2):
+        a_.axhline(0, color="Black", linewidth=0.5)
+        for mask, colour in ((diff.added, 'palegreen'), (diff.removed, 'mistyrose')):
+            for n_ in x[mask]:
+                a_.axvspan(n_ - 0.5, n_ + 0.5, color=colour, zorder=0)
+    ax.set_ylabel("Tension change %")
+    ax2.set_ylabel("Change %")
+    ax2.set_xlabel("Note")
+    if material.any():
+        ax.legend(loc='upper right')
+    ax2.legend(loc='upper right')
+
+
+@profiled()
+def plotter_derived_columns(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
+    """ every derived column against the note number, one axes each """
+    fig, ax, cache = fig_setup(fig_size_px)
+    data = instrument.state_export()
+    columns = derived_columns.DerivedColumns.from_state(data)
+    if not len(columns):
+        ax.text(0.5, 0.5, "No derived columns, add them from the Derived Columns window",
+                ha='center', va='center', transform=ax.transAxes)
+        return fig
+    base = note_columns(data)
+    values = columns.evaluate(data, base)
+    fig.delaxes(ax)
+    axes = fig.subplots(len(columns), 1, sharex=True, squeeze=False)[:, 0]
+    for a_, column in zip(axes, columns):
+        a_.set_facecolor("darkgrey")
+        a_.plot(base['note_number'], values[column.name], '-k', marker=marker, markersize=3, linewidth=0.5)
+        a_.set_ylabel(column.title)
+    axes[-1].set_xlabel("Note")
+    return fig
+
+
+plot_type_dict['Derived Columns'] = plotter_derived_columns
+
+
+def draw_archive_overlay(ax: Axes, overlay: archive_overlay.ArchiveOverlay, density: bool = False,
+                         highlight: tuple[numpy.ndarray, numpy.ndarray] | None = None):
+    """
+    every design of an overlay as one :class:`LineCollection`, or as a density image, under its 5-95% envelope
+    and median, with an optional (note numbers, values) curve drawn on top
+    """
+    x = overlay.note_number
+    if density:
+        share, edges = overlay.density()
+        # empty bins are left clear so the background shows
+        ax.pcolormesh(numpy.append(x - 0.5, x[-1] + 0.5), edges, numpy.ma.masked_equal(share.T, 0), cmap='Greys',
+                      shading='flat', rasterized=True)
+    else:
+        curves = overlay.sampled_curves()
+        segments = numpy.stack((numpy.broadcast_to(x, curves.shape), curves), axis=2)
+        # one alpha for every line, the overlap shows where designs agree
+        alpha = min(1.0, max(0.02, 20 / max(len(curves), 1)))
+        ax.add_collection(LineCollection(segments, colors='black', linewidths=0.5, alpha=alpha, rasterized=True))
+    low, median, high = overlay.percentiles((5, 50, 95))
+    ax.fill_between(x, low, high, color="lightsteelblue", alpha=0.5, step='mid', label="5-95%")
+    ax.plot(x, median, '-b', linewidth=1, drawstyle='steps-mid', label="median")
+    if highlight is not None:
+        ax.plot(*highlight, '-r', marker=marker, markersize=3, linewidth=1, label="this design")
+    ax.set_yscale('log')
+    finite = numpy.isfinite(low) & numpy.isfinite(high)
+    if finite.any():
+        ax.set_xlim(x[finite][0] - 1, x[finite][-1] + 1)
+        ax.set_ylim(low[finite].min() / 1.5, high[finite].max() * 1.5)
+    ax.set_xlabel(f"Note, {overlay.designs} designs")
+    ax.set_ylabel(overlay.label)
+    ax.legend(loc='upper right')
+
+
+def _plotter_archive_overlay(field: str) -> plot_func_type:
+    @profiled(f'plotter_archive_overlay_{field}')
+    def plotter(instrument: Instrument, fig_size_px=(1200, 800)) -> Figure:
+        fig, ax, cache = fig_setup(fig_size_px)
+        overlay = archive_overlay.loaded.get(field)
+        if overlay is None or not overlay.designs:
+            ax.text(0.5, 0.5, "No archive loaded, use Overlay in the archive window",
+                    ha='center', va='center', transform=ax.transAxes)
+            return fig
+        columns = note_columns(instrument.state_export())
+        draw_archive_overlay(ax, overlay, highlight=(columns['note_number'], columns[field]))
+        return fig
+
+    return plotter
+
+
+def _archive_overlay_state(field: str) -> typing.Callable[[dict], typing.Any]:
+    def state(data: dict) -> tuple[int, int] | None:
+        overlay = archive_overlay.loaded.get(field)
+        return None if overlay is None else (id(overlay), overlay.designs)
+
+    return state
+
+
+plot_type_dict['Archive Overlay Tension'] = _plotter_archive_overlay('force')
+plot_type_dict['Archive Overlay Diameter'] = _plotter_archive_overlay('diameter')
+plot_state_dict['Archive Overlay Tension'] = _archive_overlay_state('force')
+plot_state_dict['Archive Overlay Diameter'] = _archive_overlay_state('diameter')
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import pathlib
+from tkinter import ttk
+
+from interface.instrument_class import Instrument
+
+
+class WorkspaceDocument:
+    """ an open instrument kept as data only, in the :meth:`Instrument.state_export` format """
+    data: dict
+    file_uri: pathlib.Path | None
+
+    def __init__(self, data: dict, file_uri: pathlib.Path | None = None):
+        self.data = data
+        self.file_uri = file_uri
+
+    @property
+    def title(self) -> str:
+        if self.file_uri is not None:
+            return self.file_uri.stem
+        return self.data.get('inst_name') or 'Instrument'
+
+
+class Workspace(ttk.Frame):
+    """
+    Tabs of open instruments sharing one :class:`Instrument` widget, and with it one set of note rows,
+    one plot frame and the :class:`WireMaterial` catalogue. Only the selected tab has widgets,
+    switching tab saves the shown instrument to its :class:`WorkspaceDocument` and imports the next one,
+    so memory grows with the number of notes open and not with the number of widgets per tab.
+    """
+    instrument: Instrument
+    documents: list[WorkspaceDocument]
+    notebook: ttk.Notebook
+
+    def __init__(self, parent, instrument: Instrument):
+        super(Workspace, self).__init__(parent)
+        self.instrument = instrument
+        self.documents = list()
+        self._active: WorkspaceDocument | None = None
+        # state of a new instrument, used for new tabs
+        self._blank = instrument.state_export()
+
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(fill='x', expand=False)
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
+        self.instrument.inst_name.trace_add('write', lambda *args: self._update_title())
+
+        # the first tab added is selected straight away, it is made active first so it is not imported
+        self._active = WorkspaceDocument(dict(self._blank))
+        self.add_document(self._active, select=False)
+
+    @property
+    def active(self) -> WorkspaceDocument:
+        """ the document shown, its data is only current after :meth:`save_active` """
+        return self._active
+
+    def add_document(self, document: WorkspaceDocument, select: bool = True):
+        """ open a document in a new tab """
+        self.documents.append(document)
+        # tabs are only used as a tab bar, the instrument is shown outside the notebook
+        self.notebook.add(ttk.Frame(self.notebook, height=0), text=document.title)
+        if select:
+            self.notebook.select(len(self.documents) - 1)
+
+    def new_tab(self, *args):
+        self.add_document(WorkspaceDocument(dict(self._blank)))
+
+    def open(self, data: dict, file_uri: pathlib.Path | None = None):
+        """
+        open an instrument in a new tab, or in the current tab when it is an unchanged new instrument
+        :raises ValueError: when the compass of `data` is not valid, before any tab changes
+        """
+        self.instrument.key_map_from_state(data)
+        if self._active is not None and self._is_unused(self._active):
+            self._active.data = data
+            self._active.file_uri = file_uri
+            self._show(self._active)
+            self._update_title()
+        else:
+            self.add_document(WorkspaceDocument(data, file_uri))
+
+    def close_tab(self, *args):
+        """ close the current tab, the last tab is replaced with a new instrument """
+        index = self.documents.index(self._active)
+        self.documents.pop(index)
+        self._active = None
+        if not self.documents:
+            self._active = WorkspaceDocument(dict(self._blank))
+            self.add_document(self._active, select=False)
+            self._show(self._active)
+        # removing the selected tab selects another and generates <<NotebookTabChanged>>
+        self.notebook.forget(index)
+        if self._active is None:
+            self._on_tab_changed()
+        self._update_title()
+
+    def save_active(self):
+        """ copy the shown instrument into its document """
+        if self._active is not None:
+            self._active.data = self.instrument.state_export()
+            self._active.file_uri = self.instrument.file_uri
+            self._update_title()
+
+    def _is_unused(self, document: WorkspaceDocument) -> bool:
+        return document.file_uri is None and self.instrument.file_uri is None \
+            and self.instrument.state_export() == self._blank
+
+    def _on_tab_changed(self, *args):
+        index = self.notebook.index('current')
+        document = self.documents[index]
+        if document is self._active:
+            return
+        self.save_active()
+        self._active = document
+        self._show(document)
+
+    def _show(self, document: WorkspaceDocument):
+        self.instrument.state_import(document.data)
+        self.instrument.file_uri = document.file_uri
+
+    def _update_title(self):
+        if self._active is None or not self.documents:
+            return
+        title = self._active.file_uri.stem if self._active.file_uri is not None else \
+            self.instrument.inst_name.get() or 'Instrument'
+        self.notebook.tab(self.documents.index(self._active), text=title)
@@ -0,0 +1,48 @@
+"""
+Wound strings, a solid core with close wound layers of wrap wire. \n
+The core is the material and diameter of the :class:`Note`, wrap layers add mass but no strength,
+so the string is treated as a solid core with an equivalent density. \n
+Each turn of wrap wire of diameter w around a diameter D advances w along the string and has a length of π(D + w),
+the mass per unit length of a layer is then δw·(πw²/4)·π(D + w)/w = δw·π²·w·(D + w)/4.
+Layer i sits on D = d + 2(i - 1)w, so n layers add δw·π²·w·(n·d + n²·w)/4.
+"""
+from __future__ import annotations
+
+from math import pi
+
+import numpy
+
+
+def mass_per_length(core_diameter_mm: numpy.ndarray, core_density: numpy.ndarray,
+                    wrap_diameter_mm: numpy.ndarray, wrap_density: numpy.ndarray,
+                    layers: numpy.ndarray) -> numpy.ndarray:
+    """
+    mass per unit length of wound strings, works on scalars or arrays of notes
+    :param core_diameter_mm: core wire diameter
+    :param core_density: core density in g/cm³
+    :param wrap_diameter_mm: wrap wire diameter
+    :param wrap_density: wrap density in g/cm³
+    :param layers: number of wrap layers, 0 for a plain wire
+    :return: mass per unit length in g/cm
+    """
+    d = numpy.asarray(core_diameter_mm) / 10
+    w = numpy.asarray(wrap_diameter_mm) / 10
+    n = numpy.asarray(layers)
+    core = pi * d ** 2 / 4 * core_density
+    wrap = numpy.where(n > 0, pi ** 2 * w * (n * d + n ** 2 * w) / 4 * wrap_density, 0.0)
+    return core + wrap
+
+
+def equivalent_density(core_diameter_mm: numpy.ndarray, core_density: numpy.ndarray,
+                       wrap_diameter_mm: numpy.ndarray, wrap_density: numpy.ndarray,
+                       layers: numpy.ndarray) -> numpy.ndarray:
+    """
+    density of a solid wire with the core diameter and the mass per unit length of the wound string,
+    plain wires (0 layers) keep the core density
+    :return: density in g/cm³
+    """
+    layers = numpy.asarray(layers)
+    core_area = pi * (numpy.asarray(core_diameter_mm) / 10) ** 2 / 4
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        wound = mass_per_length(core_diameter_mm, core_density, wrap_diameter_mm, wrap_density, layers) / core_area
+    return numpy.where(layers > 0, wound, core_density)
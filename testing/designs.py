@@ -0,0 +1,35 @@
+"""
+Designs for the tests, in the format given by :meth:`Instrument.state_export`. Usage::
+
+    data = design(20, 39, length=lambda n: 1500 - 20 * n)
+    data = design(10, 70, material=lambda n: '2' if n < 30 else '1', keyboard='Split sharps')
+
+Each note field is either one value for every note or a function of the note number.
+"""
+from __future__ import annotations
+
+import typing
+
+Profile = typing.Union[float, str, typing.Callable[[int], typing.Union[float, str]]]
+
+
+def _at(profile: Profile, note_number: int) -> float | str:
+    return profile(note_number) if callable(profile) else profile
+
+
+def design(low: int = 20, high: int = 39, length: Profile | None = None, diameter: Profile = 0.4,
+           material: Profile = '1', wire_count: Profile = 1, pitch: float = 415, name: str = 'spinet',
+           **fields) -> dict:
+    """
+    one plain string for each note from `low` to `high`, including both
+    :param length: mm, by default 1000mm at `low` getting 5% shorter each note
+    :param diameter: mm
+    :param material: value of the material combobox, the code is enough
+    :param fields: other fields of the design, e.g. keyboard or temperament
+    """
+    if length is None:
+        def length(n_: int) -> float:
+            return 1000 * 0.95 ** (n_ - low)
+    notes = {str(n_): dict(_wire_count=_at(wire_count, n_), _material_select=_at(material, n_),
+                           _diameter=_at(diameter, n_), _length=_at(length, n_)) for n_ in range(low, high + 1)}
+    return dict(inst_name=name, lowest_key=str(low), highest_key=str(high), pitch=pitch, notes=notes, **fields)
@@ -0,0 +1,190 @@
+"""
+Differential check of the calculation paths against :mod:`interface.reference_calculation`, usage::
+
+    python -m testing.differential --designs 500 --seed 1
+
+Random instruments of random compass, pitch, temperament, reference note, materials, wound strings and
+dimensions are calculated with the scalar reference, :class:`NoteArrays`, :func:`note_columns` before and after
+it is cached, and :class:`NoteArrays` edited in place one note at a time. Every path must agree with the
+reference within `--rtol`, the throughput of each path is reported side by side.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import random
+import time
+import typing
+
+import numpy
+
+from interface import result_cache
+from interface.calculation import NoteArrays, material_density, material_tensile_strength, note_columns
+from interface.material_and_measures import WireMaterial
+from interface.reference_calculation import reference_columns
+from interface.temperament import Temperament
+
+COLUMNS = ('frequency', 'density', 'force', 'stress', 'percent_of_break')
+PATHS = ('reference', 'vectorized', 'uncached', 'cached', 'incremental')
+DEFAULT_RTOL = 1e-9
+
+
+def random_note(rng: random.Random, materials: list[str], position: float) -> dict:
+    """ one note, `position` runs from 0 at the lowest key to 1 at the highest """
+    layers = rng.choice((0, 0, 0, 1, 2)) if position < 0.3 else 0
+    return dict(_wire_count=rng.choice((1, 1, 1, 2, 3)), _material_select=rng.choice(materials),
+                _diameter=round(rng.uniform(0.15, 1.6), 3), _length=round(rng.uniform(40, 2400), 1),
+                _wrap_material=rng.choice(materials) if layers else '',
+                _wrap_diameter=round(rng.uniform(0.08, 0.6), 3) if layers else 0.0, _wrap_layers=layers)
+
+
+def random_design(rng: random.Random) -> dict:
+    """ an instrument of random compass, pitch and tuning, some notes may use a material that is not known """
+    materials = [f'{c_} {n_}' for c_, n_, _ in WireMaterial.material_list()]
+    lowest = rng.randint(-8, 60)
+    highest = lowest + rng.randint(0, 87)
+    unknown = rng.random() < 0.1
+    notes = dict()
+    for n_ in range(lowest, highest + 1):
+        note = random_note(rng, materials, (n_ - lowest) / max(1, highest - lowest))
+        if unknown and rng.random() < 0.05:
+            note['_material_select'] = '999 unknown'
+        notes[str(n_)] = note
+    temperament = rng.choice(list(Temperament._name_dict.values()))
+    return dict(inst_name='random', lowest_key=str(lowest), highest_key=str(highest),
+                pitch=round(rng.uniform(380, 466), 2), reference_note=rng.choice(('A4', 'C4', 'D4', 'A3')),
+                temperament=temperament.name, temperament_cents=temperament.cents.tolist(), notes=notes)
+
+
+def _vectorized(data: dict) -> dict[str, numpy.ndarray]:
+    arrays = NoteArrays(data)
+    frequency = arrays.frequencies()
+    force = arrays.forces(frequency)
+    return dict(frequency=frequency, density=arrays.equivalent_density, force=force,
+                stress=arrays.stresses(force), percent_of_break=arrays.percent_of_break(force))
+
+
+def _incremental(data: dict, edits: list[tuple[int, dict]]) -> dict[str, numpy.ndarray]:
+    """ apply each edit to the arrays of `data` in place, the way a design search changes one note at a time """
+    arrays = NoteArrays(data)
+    for index, note in edits:
+        arrays.material[index] = note['_material_select']
+        arrays.density[index] = material_density(note['_material_select'])
+        arrays.tensile_strength[index] = material_tensile_strength(note['_material_select'])
+        arrays.length[index] = note['_length']
+        arrays.diameter[index] = note['_diameter']
+        arrays.wire_count[index] = note['_wire_count']
+        arrays.wrap_material[index] = note['_wrap_material']
+        arrays.wrap_diameter[index] = note['_wrap_diameter']
+        arrays.wrap_layers[index] = note['_wrap_layers']
+        arrays.update_wrap_density()
+    force = arrays.forces()
+    return dict(frequency=arrays.frequencies(), density=arrays.equivalent_density, force=force,
+                stress=arrays.stresses(force), percent_of_break=arrays.percent_of_break(force))
+
+
+def random_edits(rng: random.Random, data: dict, count: int) -> tuple[dict, list[tuple[int, dict]]]:
+    """ :return: (`data` with `count` random notes replaced, list of (note index, new note)) """
+    edited = copy.deepcopy(data)
+    keys = sorted(edited['notes'], key=int)
+    materials = [f'{c_} {n_}' for c_, n_, _ in WireMaterial.material_list()]
+    edits = []
+    for _ in range(count):
+        index = rng.randrange(len(keys))
+        note = random_note(rng, materials, index / max(1, len(keys) - 1))
+        edited['notes'][keys[index]] = note
+        edits.append((index, note))
+    return edited, edits
+
+
+def mismatches(expected: dict[str, numpy.ndarray], actual: typing.Mapping[str, numpy.ndarray],
+               rtol: float = DEFAULT_RTOL) -> list[str]:
+    """ columns where `actual` differs from `expected` by more than `rtol`, or is nan in different notes """
+    failed = []
+    for column in COLUMNS:
+        a, b = numpy.asarray(expected[column], dtype=float), numpy.asarray(actual[column], dtype=float)
+        if a.shape != b.shape or not numpy.allclose(a, b, rtol=rtol, atol=0, equal_nan=True):
+            failed.append(column)
+    return failed
+
+
+def check(data: dict, rng: random.Random, rtol: float = DEFAULT_RTOL, edits: int = 4
+          ) -> tuple[dict[str, list[str]], dict[str, float]]:
+    """
+    calculate one design with every path
+    :return: ({path: columns that disagree with the reference}, {path: seconds taken})
+    """
+    timings = dict()
+    t0 = time.perf_counter()
+    expected = reference_columns(data)
+    timings['reference'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = dict(vectorized=_vectorized(data))
+    timings['vectorized'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    results['uncached'] = note_columns(data)
+    timings['uncached'] = time.perf_counter() - t0
+    # an equal copy, so the cache is found by content and not by the identity of `data`
+    same = copy.deepcopy(data)
+    t0 = time.perf_counter()
+    results['cached'] = note_columns(same)
+    timings['cached'] = time.perf_counter() - t0
+
+    failed = {path: mismatches(expected, result, rtol) for path, result in results.items()}
+    if not numpy.array_equal(results['uncached']['note_number'], expected['note_number']):
+        failed['uncached'].append('note_number')
+
+    edited, changes = random_edits(rng, data, edits)
+    t0 = time.perf_counter()
+    incremental = _incremental(data, changes)
+    timings['incremental'] = time.perf_counter() - t0
+    failed['incremental'] = mismatches(reference_columns(edited), incremental, rtol)
+    # an edited design must not be answered with the cached result of the original
+    failed['cached'] += [f'edited {c_}' for c_ in mismatches(reference_columns(edited), note_columns(edited), rtol)]
+    return {p_: f_ for p_, f_ in failed.items() if f_}, timings
+
+
+def run(designs: int = 200, seed: int = 0, rtol: float = DEFAULT_RTOL) -> tuple[list[tuple[dict, dict]], dict]:
+    """
+    check `designs` random designs, the result cache is cleared first
+    :return: (list of (design, failures) for designs that disagree, report of the throughput of each path)
+    """
+    rng = random.Random(seed)
+    result_cache.cache.clear()
+    failures = []
+    seconds = dict.fromkeys(PATHS, 0.0)
+    notes = 0
+    for _ in range(designs):
+        data = random_design(rng)
+        notes += len(data['notes'])
+        failed, timings = check(data, rng, rtol)
+        if failed:
+            failures.append((data, failed))
+        for path, t_ in timings.items():
+            seconds[path] += t_
+    report = dict(designs=designs, notes=notes, failures=len(failures),
+                  paths=[dict(path=p_, seconds=seconds[p_], designs_per_sec=designs / seconds[p_] if seconds[p_] else 0,
+                              notes_per_sec=notes / seconds[p_] if seconds[p_] else 0) for p_ in PATHS])
+    return failures, report
+
+
+def main(argv: typing.Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--designs', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rtol', type=float, default=DEFAULT_RTOL)
+    args = parser.parse_args(argv)
+
+    failures, report = run(args.designs, args.seed, args.rtol)
+    print(f"{report['designs']} designs, {report['notes']} notes, {report['failures']} disagree with the reference")
+    print(f'{"path":<12}{"seconds":>10}{"designs/s":>12}{"notes/s":>12}')
+    for row in report['paths']:
+        print(f"{row['path']:<12}{row['seconds']:>10.3f}{row['designs_per_sec']:>12.0f}{row['notes_per_sec']:>12.0f}")
+    for data, failed in failures[:10]:
+        print(f"{data['lowest_key']}-{data['highest_key']} {data['temperament']} {data['pitch']}hz: {failed}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Load test for :mod:`interface.calculation_service`, usage::
+
+    python -m testing.service_load_test --start --clients 200 --requests 20
+    python -m testing.service_load_test --port 8765 --clients 500 --duplicates 0.5
+
+Each client keeps one connection open and sends its requests one after another, designs are the
+test harpsichord with random diameters, `--duplicates` is the fraction of requests repeating an earlier design.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import typing
+
+import numpy
+
+import definitions
+from interface.calculation_service import DEFAULT_HOST, DEFAULT_PORT, CalculationService
+from interface.schedule_import import read_schedule
+
+
+def designs(count: int, duplicates: float, seed: int = 0) -> list[bytes]:
+    """ request bodies, the test harpsichord with every diameter changed by up to ±5% """
+    rng = random.Random(seed)
+    base = read_schedule(definitions.ROOT_DIR / 'test_data_files/test_harpsichord.csv', first_note=9).state(pitch=415)
+    bodies = []
+    for i_ in range(count):
+        if bodies and rng.random() < duplicates:
+            bodies.append(rng.choice(bodies))
+            continue
+        data = json.loads(json.dumps(base))
+        for note in data['notes'].values():
+            note['_diameter'] = round(note['_diameter'] * rng.uniform(0.95, 1.05), 4)
+        data['inst_name'] = f'load test {i_}'
+        bodies.append(json.dumps(data).encode('utf-8'))
+    return bodies
+
+
+async def client(host: str, port: int, bodies: typing.Iterable[bytes], latencies: list[float], errors: list[str]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            writer.write(b'POST /calculate HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                         + f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+            await writer.drain()
+            status = (await reader.readline()).split()[1]
+            length = 0
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            content = await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if status != b'200':
+                errors.append(content.decode('utf-8'))
+    finally:
+        writer.close()
+
+
+async def run(args: argparse.Namespace):
+    service = None
+    if args.start:
+        service = CalculationService(args.host, 0, args.workers)
+        await service.start()
+        args.port = service.port
+    bodies = designs(args.clients * args.requests, args.duplicates)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, bodies[c_::args.clients], latencies, errors)
+                           for c_ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    if service is not None:
+        await service.stop()
+
+    ms = numpy.array(latencies) * 1000
+    print(f'{len(latencies)} requests from {args.clients} clients in {elapsed:.2f}s, '
+          f'{len(latencies) / elapsed:.0f} requests/s, {len(errors)} errors')
+    for q, value in zip((50, 90, 99, 99.9), numpy.percentile(ms, (50, 90, 99, 99.9))):
+        print(f'p{q:<5} {value:8.2f}ms')
+    print(f'max    {ms.max():8.2f}ms')
+    for error in errors[:5]:
+        print(error)
+
+
+def main(argv: typing.Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(description="calculation service load test")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--start', action='store_true', help="start a service in this process on a free port")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes of a started service")
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=20, help="requests sent by each client")
+    parser.add_argument('--duplicates', type=float, default=0.2)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
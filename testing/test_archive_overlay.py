@@ -0,0 +1,54 @@
+import json
+import pathlib
+import tempfile
+import unittest
+
+import numpy
+
+from interface.archive_overlay import ArchiveOverlay
+from interface.design_archive import DesignArchive
+from testing import designs
+
+
+def design(scale: float, low: int = 30) -> dict:
+    return designs.design(low, low + 19, length=lambda n: (2000 - 20 * n) * scale, diameter=0.3)
+
+
+class ArchiveOverlayTestCase(unittest.TestCase):
+    def test_percentiles_and_reservoir(self):
+        rng = numpy.random.default_rng(0)
+        rows = numpy.exp(rng.normal(2, 0.3, size=(5000, 88)))
+        rows[:, :10] = numpy.nan
+        overlay = ArchiveOverlay('force', max_curves=100)
+        overlay.add_rows(rows)
+        expected = numpy.percentile(rows[:, 10:], (5, 50, 95), axis=0)
+        numpy.testing.assert_allclose(overlay.percentiles((5, 50, 95))[:, 10:], expected, rtol=0.01)
+        self.assertTrue(numpy.isnan(overlay.percentiles((50,))[0, :10]).all())
+        self.assertEqual(overlay.designs, 5000)
+        self.assertEqual(overlay.sampled_curves().shape, (100, 88))
+        share, edges = overlay.density(256)
+        self.assertEqual(edges.size, share.shape[1] + 1)
+        numpy.testing.assert_allclose(share[10:].sum(axis=1), 1)
+
+    def test_files_and_archive_agree(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = []
+            for i, scale in enumerate(numpy.linspace(0.8, 1.2, 30)):
+                files.append(pathlib.Path(directory) / f'design_{i}.json')
+                files[-1].write_text(json.dumps(design(float(scale), low=30 + i % 3)))
+            from_files = ArchiveOverlay('force')
+            self.assertEqual(from_files.add_files(files), [])
+            archive = DesignArchive(pathlib.Path(directory) / 'archive.sqlite')
+            try:
+                archive.ingest_files(files)
+                from_archive = ArchiveOverlay('force')
+                from_archive.add_archive(archive)
+            finally:
+                archive.close()
+        self.assertEqual(from_archive.designs, 30)
+        numpy.testing.assert_allclose(from_files.percentiles(), from_archive.percentiles(), equal_nan=True)
+        self.assertEqual(numpy.isfinite(from_files.percentiles()[1]).sum(), 22)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import unittest
+
+import numpy
+
+from interface.calculation import note_columns
+from interface.calculation_service import CalculationService
+from testing import designs
+
+
+def design(pitch: float = 415) -> dict:
+    return designs.design(20, 39, length=lambda n: 1500 - n * 20, pitch=pitch, name='test')
+
+
+async def request(port: int, method: str, path: str, data: dict | None = None) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'' if data is None else json.dumps(data).encode('utf-8')
+    writer.write(f'{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode()
+                 + body)
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+
+class CalculationServiceTestCase(unittest.TestCase):
+    def test_requests(self):
+        async def run():
+            service = CalculationService(port=0, workers=1)
+            await service.start()
+            try:
+                results = await asyncio.gather(*(request(service.port, 'POST', '/calculate', design())
+                                                 for _ in range(20)))
+                status, stored = await request(service.port, 'PUT', '/designs/test', design())
+                patched = await request(service.port, 'PATCH', '/designs/test', dict(pitch=440))
+                bad_patches = [await request(service.port, 'PATCH', '/designs/test', dict(notes=notes))
+                               for notes in ([1, 2], 3, {'20': 0.5})]
+                missing = await request(service.port, 'GET', '/designs/unknown')
+                invalid = await request(service.port, 'POST', '/calculate', dict(pitch=415))
+                notes_list = await request(service.port, 'POST', '/calculate', dict(design(), notes=[1, 2]))
+            finally:
+                await service.stop()
+            return results, stored, patched, bad_patches, missing, invalid, notes_list
+
+        results, stored, patched, bad_patches, missing, invalid, notes_list = asyncio.run(run())
+        expected = note_columns(design())
+        for status, result in results:
+            self.assertEqual(status, 200)
+            numpy.testing.assert_allclose(result['force_kgf'], expected['force'])
+        self.assertEqual(stored['pitch'], 415)
+        self.assertEqual(patched[0], 200)
+        numpy.testing.assert_allclose(patched[1]['force_kgf'], note_columns(design(440))['force'])
+        self.assertEqual([s_ for s_, _ in bad_patches], [400, 400, 400])
+        self.assertEqual(missing[0], 404)
+        self.assertEqual(invalid[0], 400)
+        self.assertEqual(notes_list[0], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import copy
+import unittest
+
+import numpy
+
+from interface import result_cache
+from interface.curve_fitting import METHODS, FitOptions, fit_curve, fit_design, segment_ids
+from testing import designs
+
+
+def design(low: int = 10, high: int = 70) -> dict:
+    """ brass in the bass and iron above, with an even tension profile in each """
+    return designs.design(low, high, material=lambda n: '2' if n < 30 else '1')
+
+
+class CurveFittingTestCase(unittest.TestCase):
+    def test_segments(self):
+        numpy.testing.assert_array_equal(segment_ids(numpy.array([2, 2, 1, 1, 1, 2])), [0, 0, 1, 1, 1, 2])
+        fit = fit_design(design(), fit_options=FitOptions(method='least squares'))
+        self.assertEqual(fit.segment.max(), 1)
+        x, y = fit.line()
+        # a gap in the trend where the material changes
+        self.assertEqual(numpy.isnan(y).sum(), 1)
+        self.assertEqual(x.size, fit.note_number.size + 1)
+
+    def test_outlier_found_by_every_method(self):
+        data = design()
+        data['notes']['40']['_diameter'] = 0.56
+        for method in METHODS:
+            with self.subTest(method=method):
+                fit = fit_design(data, fit_options=FitOptions(method=method, degree=2))
+                self.assertIn(40, fit.outliers.tolist())
+                self.assertLess(fit.outlier.sum(), 3)
+
+    def test_robust_trend(self):
+        x = numpy.arange(20.0)
+        y = 10 + 0.5 * x
+        y[7] = 40
+        least_squares = fit_curve(x, y, fit_options=FitOptions(method='least squares'))
+        for method in ('huber', 'ransac'):
+            with self.subTest(method=method):
+                fit = fit_curve(x, y, fit_options=FitOptions(method=method))
+                self.assertEqual(fit.outliers.tolist(), [7])
+                error = numpy.abs(numpy.delete(fit.fitted - (10 + 0.5 * x), 7)).max()
+                self.assertLess(error, numpy.abs(numpy.delete(least_squares.fitted - (10 + 0.5 * x), 7)).max())
+
+    def test_cached_by_content(self):
+        result_cache.cache.clear()
+        data = design()
+        fit = fit_design(data)
+        self.assertIs(fit_design(copy.deepcopy(data)), fit)
+        data['notes']['40']['_diameter'] = 0.5
+        self.assertIsNot(fit_design(data), fit)
+        with self.assertRaises(ValueError):
+            fit_design(data, fit_options=FitOptions(method='cubic'))
+
+
+if __name__ == '__main__':
+    unittest.main()
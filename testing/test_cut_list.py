@@ -0,0 +1,44 @@
+import unittest
+
+from interface.cut_list import Cut, allocate_spools, best_fit_decreasing, cut_list
+from testing import designs
+
+
+def design(name: str, count: int = 2) -> dict:
+    data = designs.design(20, 40, length=lambda n: 1500 - n * 20, wire_count=count, name=name)
+    # the highest note is not filled in
+    data['notes']['40'].update(_wire_count=1, _diameter='', _length='')
+    return data
+
+
+class CutListTestCase(unittest.TestCase):
+    def test_cuts_per_wire(self):
+        cuts = cut_list([('a', design('a', 2)), ('b', design('b', 1))], hitch_allowance_mm=10, pin_allowance_mm=20)
+        self.assertEqual(len(cuts), 60)
+        first = [c_ for c_ in cuts if c_.instrument == 'a' and c_.note_number == 20]
+        self.assertEqual([c_.wire for c_ in first], [1, 2])
+        self.assertEqual(first[0].length_mm, 1500 - 400 + 30)
+        # the second string of each split key has no row, so the design is left out
+        split = dict(design('c', 1), keyboard='Split sharps')
+        self.assertEqual(len(cut_list([('a', design('a', 2)), ('c', split)])), 40)
+
+    def test_best_fit_decreasing(self):
+        cuts = [Cut('a', n_, 1, '1', 0.4, length) for n_, length in enumerate((60, 50, 40, 30, 20))]
+        spools = best_fit_decreasing(cuts, spool_length_mm=100)
+        self.assertEqual(sorted(sum(c_.length_mm for c_ in s_.cuts) for s_ in spools), [100, 100])
+        # a part used spool in stock is used before a new spool is started
+        spools = best_fit_decreasing(cuts[4:], spool_length_mm=100, stock_mm=(25,))
+        self.assertEqual([s_.in_stock for s_ in spools], [True])
+        with self.assertRaises(ValueError):
+            best_fit_decreasing(cuts, spool_length_mm=55)
+
+    def test_instruments_share_spools(self):
+        cuts = cut_list([('a', design('a')), ('b', design('b'))])
+        allocations = allocate_spools(cuts, spool_length_mm=100_000)
+        self.assertEqual(len(allocations), 1)
+        self.assertEqual(len(allocations[0].spools), 1)
+        self.assertEqual({c_.instrument for c_ in allocations[0].spools[0].cuts}, {'a', 'b'})
+
+
+if __name__ == '__main__':
+    unittest.main()
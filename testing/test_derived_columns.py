@@ -0,0 +1,67 @@
+import io
+import unittest
+
+import numpy
+
+from interface.calculation import note_columns
+from interface.derived_columns import DerivedColumns, parse_expression, write_csv
+from testing import designs
+
+
+def design() -> dict:
+    return designs.design(30, 49, length=lambda n: 2000 - 20 * n, diameter=0.3, wire_count=2)
+
+
+class DerivedColumnsTestCase(unittest.TestCase):
+    def test_evaluate(self):
+        data = design()
+        base = note_columns(data)
+        # defined before the column it uses
+        columns = DerivedColumns.from_state(dict(derived_columns=[
+            dict(name='mass_ratio', expression='mass / prev(mass)', unit=''),
+            dict(name='mass', expression='pi * diameter ** 2 / 4 * density * count', unit='g/m')]))
+        columns.define('per_metre', 'force / length * 1000', 'kg-f/m')
+        values = columns.evaluate(data)
+        numpy.testing.assert_allclose(values['mass'], numpy.pi * 0.09 / 4 * base['density'] * 2)
+        self.assertTrue(numpy.isnan(values['mass_ratio'][0]))
+        numpy.testing.assert_allclose(values['mass_ratio'][1:], 1)
+        numpy.testing.assert_allclose(values['per_metre'], base['force'] / base['length'] * 1000)
+
+    def test_only_changed_inputs_are_recomputed(self):
+        data = design()
+        columns = DerivedColumns()
+        columns.define('mass', 'pi * diameter ** 2 / 4 * density * count')
+        columns.define('ratio', 'force / prev(force)')
+        columns.evaluate(data)
+        columns.evaluate(data)
+        self.assertEqual(columns.evaluations, 2)
+        data['notes']['35']['_length'] = 1000
+        columns.evaluate(data)
+        self.assertEqual(columns.evaluations, 3)
+
+    def test_rejects_unsafe_and_circular_definitions(self):
+        for expression in ('__import__("os")', 'force.real', 'force[0]', 'lambda: 1', '"text"', '(force'):
+            with self.assertRaises(ValueError):
+                parse_expression(expression)
+        columns = DerivedColumns()
+        columns.define('a', 'force * 2')
+        columns.define('b', 'a + 1')
+        with self.assertRaises(ValueError):
+            columns.define('a', 'b')
+        with self.assertRaises(ValueError):
+            columns.define('c', 'unknown')
+        with self.assertRaises(ValueError):
+            columns.remove('a')
+        self.assertEqual(columns.columns['a'].expression, 'force * 2')
+
+    def test_csv(self):
+        data = dict(design(), derived_columns=[dict(name='double', expression='force * 2', unit='kg-f')])
+        f = io.StringIO()
+        write_csv(f, data)
+        lines = f.getvalue().splitlines()
+        self.assertEqual(len(lines), 21)
+        self.assertTrue(lines[0].endswith(',double(kg-f)'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import os
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+
+import numpy
+
+from interface.calculation import note_columns
+from interface.design_archive import DesignArchive
+from testing import designs
+
+
+def design(name: str, bass_material: str, bass_length: float) -> dict:
+    """ notes below 30 of `bass_material` with the lowest note `bass_length` long, iron above """
+    return designs.design(20, 49, length=lambda n: bass_length * 0.95 ** (n - 20),
+                          material=lambda n: bass_material if n < 30 else '1', name=name)
+
+
+class DesignArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = pathlib.Path(directory.name)
+        self.designs = dict(long_brass=design('long brass', '2', 1700), short_brass=design('short brass', '2', 1200),
+                            iron=design('iron', '1', 1800))
+        for name, data in self.designs.items():
+            self._write(name, data)
+
+    def _write(self, name: str, data: dict, mtime: float = 1000.0):
+        file = self.directory / f'{name}.json'
+        file.write_text(json.dumps(data))
+        os.utime(file, (mtime, mtime))
+
+    def _archive(self, file: str = 'archive.sqlite') -> DesignArchive:
+        archive = DesignArchive(self.directory / file)
+        self.addCleanup(archive.close)
+        return archive
+
+    def test_ingest_and_skip_unchanged(self):
+        archive = self._archive()
+        self.assertEqual(archive.ingest_directory(self.directory), [])
+        self.assertEqual(len(archive), 3)
+        ids = {path: id_ for id_, path, *_ in archive.instruments()}
+        self.assertEqual(len(archive.query("SELECT * FROM notes")), 90)
+        self.assertEqual(archive.document(ids[str((self.directory / 'iron.json').resolve())]), self.designs['iron'])
+
+        # unchanged files are not inserted again, a changed file replaces its row
+        self._write('iron', design('iron', '1', 1750), mtime=2000.0)
+        archive.ingest_directory(self.directory)
+        again = {path: id_ for id_, path, *_ in archive.instruments()}
+        self.assertEqual(len(archive), 3)
+        self.assertEqual(len(archive.query("SELECT * FROM notes")), 90)
+        for name in ('long_brass', 'short_brass'):
+            path = str((self.directory / f'{name}.json').resolve())
+            self.assertEqual(again[path], ids[path])
+        iron = str((self.directory / 'iron.json').resolve())
+        self.assertEqual(archive.document(again[iron]), design('iron', '1', 1750))
+
+    def test_bad_file_reported(self):
+        (self.directory / 'bad.json').write_text('{"inst_name": "bad"}')
+        errors = self._archive().ingest_directory(self.directory)
+        self.assertEqual([pathlib.Path(f_).name for f_, _ in errors], ['bad.json'])
+
+    def test_vanished_file_reported(self):
+        archive = self._archive()
+        errors = archive.ingest_files([self.directory / 'gone.json', self.directory / 'iron.json'])
+        self.assertEqual([pathlib.Path(f_).name for f_, _ in errors], ['gone.json'])
+        # the rest of the batch is still added
+        self.assertEqual(len(archive), 1)
+
+    def test_queries(self):
+        archive = self._archive()
+        archive.ingest_directory(self.directory)
+        found = archive.find_instruments(material='brass', min_length_mm=1600)
+        self.assertEqual([name for _, _, name, *_ in found], ['long brass'])
+        self.assertEqual(len(archive.find_instruments(material='2')), 2)
+        self.assertEqual(len(archive.find_instruments(min_length_mm=1600)), 2)
+
+        rows = {code: (tension, count) for code, _, tension, count in archive.max_tension_per_material()}
+        for code in ('1', '2'):
+            expected = max(numpy.nanmax(c_['force'][c_['material'] == code])
+                           for c_ in map(note_columns, self.designs.values()) if (c_['material'] == code).any())
+            self.assertAlmostEqual(rows[code][0], expected)
+        self.assertEqual(rows['2'][1], 20)
+        self.assertEqual(rows['1'][1], 70)
+
+    def test_older_schema_migrated(self):
+        file = self.directory / 'old.sqlite'
+        connection = sqlite3.connect(file)
+        connection.executescript("""
+            CREATE TABLE instruments (id INTEGER PRIMARY KEY, path TEXT UNIQUE, name TEXT, pitch REAL,
+                lowest_key INTEGER, highest_key INTEGER, temperament TEXT, mtime REAL, document TEXT);
+            CREATE TABLE notes (instrument_id INTEGER NOT NULL REFERENCES instruments(id) ON DELETE CASCADE,
+                note_number INTEGER NOT NULL, material_code TEXT, length_mm REAL, diameter_mm REAL,
+                wire_count INTEGER, frequency REAL, tension_kgf REAL);
+            INSERT INTO instruments (id, path, name) VALUES (1, 'old.json', 'old');
+            INSERT INTO notes (instrument_id, note_number, material_code, length_mm) VALUES (1, 20, '1', 900);
+        """)
+        connection.commit()
+        connection.close()
+
+        archive = self._archive('old.sqlite')
+        columns = {row[1] for row in archive.query("PRAGMA table_info(notes)")}
+        self.assertTrue({'wrap_material_code', 'wrap_diameter_mm', 'wrap_layers'} <= columns)
+        self.assertEqual(archive.query("SELECT note_number, wrap_layers FROM notes"), [(20, None)])
+        self.assertEqual(archive.ingest_directory(self.directory), [])
+        self.assertEqual(len(archive), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
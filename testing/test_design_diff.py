@@ -0,0 +1,51 @@
+import copy
+import json
+import pathlib
+import tempfile
+import unittest
+
+import numpy
+
+from interface.design_diff import diff_designs, diff_history
+from testing import designs
+
+
+def design(low: int, high: int, pitch: float = 415) -> dict:
+    return designs.design(low, high, length=lambda n: 2000 - 20 * n, diameter=0.3, pitch=pitch)
+
+
+class DesignDiffTestCase(unittest.TestCase):
+    def test_aligns_different_ranges(self):
+        old, new = design(30, 60), design(32, 62)
+        new['notes']['40']['_diameter'] = 0.33
+        new['notes']['41']['_material_select'] = '2'
+        diff = diff_designs(old, new)
+        self.assertEqual(diff.note_number.tolist(), list(range(30, 63)))
+        self.assertEqual(diff.note_number[diff.removed].tolist(), [30, 31])
+        self.assertEqual(diff.note_number[diff.added].tolist(), [61, 62])
+        self.assertEqual(diff.note_number[diff.changed('diameter')].tolist(), [40])
+        self.assertEqual(diff.note_number[diff.changed('material')].tolist(), [41])
+        # tension scales with the square of the diameter
+        self.assertAlmostEqual(diff.relative('force')[diff.note_number == 40][0], 1.1 ** 2 - 1)
+        self.assertEqual([r_[0] for r_ in diff.rows()], [30, 31, 40, 41, 61, 62])
+
+    def test_pitch_change_changes_every_tension(self):
+        diff = diff_designs(design(30, 60), design(30, 60, pitch=440))
+        self.assertTrue(diff.changed('force').all())
+        self.assertFalse(diff.changed('length').any())
+        numpy.testing.assert_allclose(diff.relative('force'), (440 / 415) ** 2 - 1)
+
+    def test_history(self):
+        with tempfile.TemporaryDirectory() as directory:
+            data = design(30, 60)
+            for version in (1, 2, 10):
+                data = copy.deepcopy(data)
+                data['notes'][str(30 + version)]['_length'] += 1
+                (pathlib.Path(directory) / f'spinet_v{version}.json').write_text(json.dumps(data))
+            history = [(old.name, new.name, diff.summary()['notes_changed'])
+                       for old, new, diff in diff_history(directory)]
+        self.assertEqual(history, [('spinet_v1.json', 'spinet_v2.json', 1), ('spinet_v2.json', 'spinet_v10.json', 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
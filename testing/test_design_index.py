@@ -0,0 +1,113 @@
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+
+import numpy
+
+from interface.design_index import DesignIndex, KDTree
+from testing import designs
+
+
+def design(scale: float, low: int = 20, high: int = 60) -> dict:
+    return designs.design(low, high, length=lambda n: scale * 1500 * 0.95 ** (n - low),
+                          diameter=lambda n: 0.3 + 0.002 * (high - n), name=f'design {scale}')
+
+
+def brute_force(points: numpy.ndarray, point: numpy.ndarray, k: int, skip=()) -> numpy.ndarray:
+    distance = numpy.linalg.norm(points - point, axis=1)
+    distance[list(skip)] = numpy.inf
+    return numpy.sort(distance)[:k]
+
+
+class KDTreeTestCase(unittest.TestCase):
+    def test_query_matches_brute_force(self):
+        rng = numpy.random.default_rng(0)
+        points = rng.normal(size=(500, 6))
+        tree = KDTree(points, leaf_size=8)
+        for point in rng.normal(size=(20, 6)):
+            distances, rows = tree.query(point, k=7)
+            numpy.testing.assert_allclose(distances, brute_force(points, point, 7))
+            numpy.testing.assert_allclose(numpy.linalg.norm(points[rows] - point, axis=1), distances)
+
+    def test_insert_and_remove(self):
+        rng = numpy.random.default_rng(1)
+        points = rng.normal(size=(300, 4))
+        tree = KDTree(points[:200])
+        tree.insert(points[200:])
+        removed = rng.choice(300, 40, replace=False)
+        tree.remove(removed)
+        self.assertEqual(len(tree), 260)
+        self.assertAlmostEqual(tree.staleness, 140 / 300)
+        for point in rng.normal(size=(20, 4)):
+            distances, rows = tree.query(point, k=5)
+            numpy.testing.assert_allclose(distances, brute_force(points, point, 5, removed))
+            self.assertFalse(numpy.isin(rows, removed).any())
+
+
+class DesignIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = pathlib.Path(directory.name)
+
+    def _write(self, name: str, scale: float) -> pathlib.Path:
+        file = self.directory / name
+        file.write_text(json.dumps(design(scale)))
+        # a distinct modified time, so a rewrite within the same clock tick is still seen as a change
+        os.utime(file, (scale * 1000, scale * 1000))
+        return file
+
+    def test_update_replace_remove(self):
+        for i in range(12):
+            self._write(f'{i}.json', 1 + i / 10)
+        index = DesignIndex(self.directory / 'index.npz')
+        self.assertEqual(index.update_directory(self.directory), [])
+        self.assertEqual(len(index), 12)
+        self.assertEqual(pathlib.Path(index.query(design(1.3), k=1)[0][0]).name, '3.json')
+
+        tree = index.tree()
+        # one replaced and one deleted file change the tree in place
+        self._write('3.json', 2.5)
+        (self.directory / '0.json').unlink()
+        index.update_directory(self.directory)
+        self.assertIs(index.tree(), tree)
+        self.assertEqual(len(index), 11)
+        self.assertEqual(pathlib.Path(index.query(design(2.5), k=1)[0][0]).name, '3.json')
+        self.assertNotIn('0.json', [pathlib.Path(f_).name for f_, _ in index.query(design(1.0), k=11)])
+
+        # more than a quarter of the rows changed, the tree is rebuilt without the removed rows
+        for i in range(1, 5):
+            self._write(f'{i}.json', 3 + i / 10)
+        index.update_directory(self.directory)
+        self.assertIsNot(index.tree(), tree)
+        self.assertEqual(len(index.paths), 11)
+
+    def test_file_deleted_after_listing(self):
+        self._write('0.json', 1.0)
+        index = DesignIndex(self.directory / 'index.npz')
+        errors = index.update([self.directory / '0.json', self.directory / 'gone.json'])
+        self.assertEqual([pathlib.Path(f_).name for f_, _ in errors], ['gone.json'])
+        self.assertEqual(len(index), 1)
+
+    def test_save_and_load(self):
+        for i in range(6):
+            self._write(f'{i}.json', 1 + i / 10)
+        index = DesignIndex(self.directory / 'index.npz')
+        index.update_directory(self.directory)
+        index.tree()
+        self._write('5.json', 2.0)
+        index.update_directory(self.directory)
+        index.save()
+
+        loaded = DesignIndex(self.directory / 'index.npz')
+        self.assertEqual(len(loaded), 6)
+        self.assertEqual(loaded.query(design(1.2), k=3), index.query(design(1.2), k=3))
+        # nothing changed on disk, so nothing is read again
+        self.assertEqual(loaded.update_directory(self.directory), [])
+        self.assertEqual(loaded.paths, index.paths)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import pathlib
+import tempfile
+import unittest
+
+from interface.interaction_replay import (InteractionRecorder, InteractionReplay, generate_session, read_session,
+                                         write_session)
+
+
+class InteractionReplayTestCase(unittest.TestCase):
+    def test_generated_session_covers_every_note(self):
+        events = generate_session(notes=88, lowest_key=1, passes=1)
+        self.assertEqual(events[0]['type'], 'start')
+        self.assertEqual(len(events[0]['state']['notes']), 88)
+        edited = {e_['note'] for e_ in events if e_['type'] == 'edit'}
+        self.assertEqual(edited, set(range(1, 89)))
+        self.assertEqual(sum(e_['type'] == 'layout' for e_ in events), 1)
+
+    def test_round_trip(self):
+        events = generate_session(notes=61)
+        with tempfile.TemporaryDirectory() as directory:
+            file = pathlib.Path(directory, 'session.jsonl')
+            write_session(file, events)
+            self.assertEqual(read_session(file), events)
+            write_session(file, events[1:])
+            with self.assertRaises(ValueError):
+                read_session(file)
+
+    @unittest.skipUnless(os.environ.get('DISPLAY'), "needs a display")
+    def test_replay(self):
+        from interface.general_tkiner_classes import TkInterface
+        root = TkInterface()
+        try:
+            # recording starts from a new instrument, whose rows are blank
+            recorder = InteractionRecorder(root)
+            recorder.start()
+            self.assertEqual(recorder.stop()[0]['type'], 'start')
+            replayer = InteractionReplay(root)
+            replayer.run(generate_session(notes=61, passes=1))
+        finally:
+            root.destroy()
+        report = replayer.report()
+        self.assertEqual(report['skipped'], 0)
+        self.assertTrue(report['events'])
+        self.assertGreater(report['widgets_after'], 0)
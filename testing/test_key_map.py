@@ -0,0 +1,72 @@
+import os
+import unittest
+from unittest import mock
+
+from interface.general_functions import note_name_to_number
+from interface.instrument_class import Instrument
+from interface.key_map import KeyMap, require_own_strings, shares_strings
+from testing import designs
+
+
+class KeyMapTestCase(unittest.TestCase):
+    def test_short_octave(self):
+        keys = KeyMap.layout('C/E short octave', note_name_to_number('C1'), note_name_to_number('C2'))
+        # the E, F♯ and G♯ keys sound C, D and E, the bass sharps are not sounded
+        self.assertEqual(keys.notes_of_keys([0, 2, 4]).tolist(), [16, 18, 20])
+        self.assertEqual(keys.note_numbers.tolist(), [16, 18, 20, 21, 23, 25, 26, 27, 28])
+        self.assertNotIn(17, keys)
+        self.assertEqual(keys.index('F1'), 3)
+        self.assertEqual(keys.step(28, 1), 16)
+        added, removed = keys.diff(KeyMap.layout('Chromatic', 16, 28))
+        self.assertEqual(added.tolist(), [])
+        self.assertEqual(removed.tolist(), [17, 19, 22, 24])
+        with self.assertRaises(ValueError):
+            KeyMap.layout('C/E short octave', note_name_to_number('D1'), 40)
+
+    def test_split_keys_share_a_note(self):
+        keys = KeyMap.layout('Split sharps', 28, 40)
+        self.assertEqual(keys.key_count, len(keys) + 2)
+        self.assertEqual(keys.keys_of(31), (3, 4))
+        self.assertEqual(keys.key_index[3], keys.key_index[4])
+        self.assertTrue(shares_strings(dict(keyboard='Split sharps')))
+        self.assertTrue(shares_strings(KeyMap([16, 18, 18]).state_export()))
+        self.assertFalse(shares_strings(KeyMap([16, 18, 17]).state_export()))
+        self.assertFalse(shares_strings(dict()))
+        with self.assertRaises(ValueError):
+            require_own_strings(dict(keyboard='Split sharps'))
+
+    def test_state(self):
+        keys = KeyMap([16, 21, 18, 18], 'Custom')
+        self.assertEqual(KeyMap.from_state(dict(keys.state_export())), keys)
+        chromatic = KeyMap.from_state(dict(lowest_key='C1', highest_key='16'))
+        self.assertEqual(chromatic.note_numbers.tolist(), [16])
+        self.assertEqual(chromatic.state_export(), dict(keyboard='Chromatic'))
+
+    def test_saved_layout_not_fitting_compass(self):
+        # a short octave saved with a compass starting on D falls back to chromatic
+        keys = Instrument.key_map_from_state(dict(keyboard='C/E short octave', lowest_key='D1', highest_key='C2'))
+        self.assertEqual(keys.name, 'Chromatic')
+        self.assertEqual(keys.note_numbers.tolist(), list(range(18, 29)))
+        with self.assertRaises(ValueError):
+            Instrument.key_map_from_state(dict(keyboard='Chromatic', lowest_key='C2', highest_key='C1'))
+
+    @unittest.skipUnless(os.environ.get('DISPLAY'), "needs a display")
+    def test_import_keeps_notes_on_bad_compass(self):
+        import tkinter as tk
+        root = tk.Tk()
+        self.addCleanup(root.destroy)
+        instrument = Instrument(root)
+        data = dict(designs.design(18, 28, length=900), lowest_key='D1', highest_key='C2')
+        with mock.patch('interface.instrument_class.messagebox.showwarning') as warning:
+            instrument.state_import(dict(data, keyboard='C/E short octave'))
+        warning.assert_called_once()
+        self.assertEqual(instrument.keyboard.get(), 'Chromatic')
+        self.assertEqual(len(instrument.notes), 11)
+        with self.assertRaises(ValueError):
+            instrument.state_import(dict(data, lowest_key='C2', highest_key='C1'))
+        self.assertEqual(len(instrument.notes), 11)
+        self.assertEqual(instrument.inst_name.get(), 'spinet')
+
+
+if __name__ == '__main__':
+    unittest.main()
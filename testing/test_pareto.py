@@ -0,0 +1,63 @@
+import unittest
+
+import numpy
+
+from interface import pareto, result_cache
+from interface.calculation import NoteArrays
+from interface.pareto import ParetoArchive, ParetoExplorer, ParetoProblem, non_dominated
+from interface.visualization_plotting import plotter_pareto_front
+from testing import designs
+
+
+def design() -> dict:
+    return designs.design(30, 69, length=lambda n: 1800 * 0.95 ** (n - 30) + 150, diameter=0.3)
+
+
+class ParetoTestCase(unittest.TestCase):
+    def test_non_dominated(self):
+        points = numpy.array([[1, 4], [2, 2], [4, 1], [3, 3], [2, 2], [5, 5]], dtype=float)
+        self.assertEqual(non_dominated(points, chunk_size=2).tolist(), [True, True, True, False, True, False])
+
+    def test_archive_matches_brute_force(self):
+        problem = ParetoProblem(design())
+        rng = numpy.random.default_rng(3)
+        archive = ParetoArchive(max_size=10_000)
+        batches = [problem.random(200, rng) for _ in range(4)]
+        for genome in batches:
+            archive.add(problem.evaluate(genome), genome)
+        everything = numpy.unique(numpy.concatenate([problem.evaluate(g_) for g_ in batches]), axis=0)
+        front = everything[non_dominated(everything)]
+        self.assertEqual(sorted(map(tuple, archive.objectives.tolist())), sorted(map(tuple, front.tolist())))
+
+    def test_exported_candidate(self):
+        data = design()
+        explorer = ParetoExplorer(ParetoProblem(data), batch_size=100, workers=0, seed=1)
+        for archive in explorer.run(5):
+            pass
+        self.assertEqual(explorer.evaluated, 500)
+        index = archive.best('cost')
+        arrays = NoteArrays(explorer.problem.state(archive.genomes, index))
+        self.assertEqual(arrays.length.tolist(), NoteArrays(data).length.tolist())
+        # gauges never get thicker towards the treble
+        self.assertTrue((numpy.diff(arrays.diameter) <= 0).all())
+        self.assertAlmostEqual(arrays.percent_of_break().max(), archive.objectives[index, 2])
+
+    def test_plotted_front_outlives_the_cache(self):
+        data = design()
+
+        class Design:
+            @staticmethod
+            def state_export() -> dict:
+                return data
+
+        self.assertEqual(len(plotter_pareto_front(Design()).axes[0].texts), 1)
+        pareto.fronts[pareto.front_key(data)] = pareto.explore(data, batches=2)
+        result_cache.cache.clear()
+        fig = plotter_pareto_front(Design())
+        self.assertEqual(len(fig.axes[0].texts), 0)
+        self.assertEqual(len(fig.axes[0].collections), 1)
+        pareto.fronts.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+import numpy
+
+from interface.calculation import NoteArrays
+from interface.pitch_inference import infer_pitch
+from testing import designs
+
+
+def design_at(pitch: float, percent_of_break: float) -> dict:
+    """ a design with every note at `percent_of_break` when tuned to `pitch` """
+    data = designs.design(30, 69, length=1000.0, diameter=0.3, wire_count=2, pitch=pitch, name='survey')
+    arrays = NoteArrays(data)
+    # stress scales with L², so scale each length onto the target
+    scale = numpy.sqrt(percent_of_break / arrays.percent_of_break())
+    for key, s_ in zip(arrays.note_number.tolist(), scale.tolist()):
+        data['notes'][str(key)]['_length'] = 1000.0 * s_
+    data['pitch'] = 440
+    return data
+
+
+class PitchInferenceTestCase(unittest.TestCase):
+    def test_recovers_design_pitch(self):
+        result = infer_pitch(NoteArrays(design_at(415, 70)), target=70)
+        self.assertAlmostEqual(result.best_pitch, 415, delta=0.5)
+        low, high = result.interval(0.9)
+        self.assertLess(low, 415)
+        self.assertGreater(high, 415)
+        self.assertAlmostEqual(result.confidence.sum(), 1)
+
+    def test_transposition(self):
+        # a keyboard transposed down a semitone at 440hz
+        data = design_at(440 * 2 ** (-1 / 12), 70)
+        result = infer_pitch(NoteArrays(data), pitches=[420.0, 440.0], transpositions=(-1, 0, 1), target=70)
+        self.assertEqual(result.best, (440.0, -1))
+
+
+if __name__ == '__main__':
+    unittest.main()
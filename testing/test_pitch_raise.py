@@ -0,0 +1,59 @@
+import json
+import pathlib
+import tempfile
+import unittest
+
+import numpy
+
+from interface import batch
+from interface.calculation import NoteArrays
+from interface.pitch_raise import NoteRange, plan_pitch_raise, stage_counts
+from testing import designs
+
+
+def design(low: int = 10, high: int = 70, pitch: float = 415) -> dict:
+    return designs.design(low, high, pitch=pitch)
+
+
+class PitchRaiseTestCase(unittest.TestCase):
+    def test_stages_meet_limits(self):
+        arrays = NoteArrays(design())
+        plan = plan_pitch_raise(arrays, 440, max_load_step=4, max_break_step=3, max_percent_of_break=100)
+        self.assertAlmostEqual(plan.pitch[-1].min(), 440)
+        numpy.testing.assert_allclose(plan.force[-1], arrays.forces(arrays.frequencies(pitch=440)))
+        self.assertTrue((plan.load_step / plan.total_load[0] * 100 <= 4 + 1e-9).all())
+        self.assertTrue((plan.break_step <= 3 + 1e-9).all())
+        # one stage fewer breaks a limit
+        load_increase = (plan.total_load[-1] - plan.total_load[0]) / plan.total_load[0] * 100
+        break_increase = numpy.max(plan.percent_of_break[-1] - plan.percent_of_break[0])
+        self.assertTrue(load_increase / (plan.stages - 1) > 4 or break_increase / (plan.stages - 1) > 3)
+
+    def test_ranges_in_turn(self):
+        plan = plan_pitch_raise(NoteArrays(design()), 440, [NoteRange(10, 30, 430)], order='bass first',
+                                max_percent_of_break=100)
+        self.assertTrue(plan.raised[0].startswith('F♯0-'))
+        self.assertAlmostEqual(plan.pitch[-1, 0], 430)
+        self.assertAlmostEqual(plan.pitch[-1, -1], 440)
+        # the treble does not move while the bass is raised
+        first_treble_stage = next(i_ for i_, r_ in enumerate(plan.raised) if not r_.startswith('F♯0-')) + 1
+        self.assertTrue((plan.pitch[:first_treble_stage, -1] == 415).all())
+
+    def test_limits(self):
+        with self.assertRaises(ValueError):
+            plan_pitch_raise(NoteArrays(design()), 440, max_percent_of_break=10)
+        self.assertEqual(stage_counts(numpy.array([10.0, 0.0]), numpy.array([1.0, 0.0]), 4, 5).tolist(), [3, 1])
+        with self.assertRaises(ValueError):
+            stage_counts(numpy.array([100.0]), numpy.array([1.0]), 1, 5, max_stages=10)
+
+    def test_batch_errors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file = pathlib.Path(directory, 'spinet.json')
+            file.write_text(json.dumps(design()))
+            with self.assertRaisesRegex(SystemExit, 'H1'):
+                batch.main(['raise', str(file), '--range', 'H1', 'B2', '430'])
+            with self.assertRaisesRegex(SystemExit, 'stages'):
+                batch.main(['raise', str(file), '--max-stages', '1', '--load-step', '0.1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
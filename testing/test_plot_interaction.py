@@ -0,0 +1,85 @@
+import types
+import unittest
+
+import numpy
+from matplotlib.backend_bases import MouseEvent
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from interface import curve_fitting
+from interface.material_and_measures import Distance
+from interface.plot_interaction import PlotInteractor
+from interface.visualization_plotting import _editable, _scatter, _trend, fig_setup
+
+
+class FakeNote:
+    """ the parts of :class:`Note` the interactor uses, a wound string whose tension is not quite ∝ d² """
+
+    def __init__(self, number: int, diameter: float):
+        self.number = number
+        self.diameter = diameter
+        self.update_force()
+
+    def set_diameter(self, mm: float):
+        self.diameter = round(mm, 4)
+
+    def get_diameter(self) -> Distance:
+        return Distance(mm=self.diameter)
+
+    def get_force(self) -> types.SimpleNamespace:
+        return types.SimpleNamespace(kg_force=lambda: self.force)
+
+    def update_force(self):
+        self.force = 10 * self.diameter ** 2 + 1
+
+
+def interactor(field: str) -> tuple[PlotInteractor, list[FakeNote]]:
+    fig, ax, cache = fig_setup((600, 400))
+    notes = [FakeNote(n_, 0.4 + 0.01 * i_) for i_, n_ in enumerate(range(30, 40))]
+    for note in notes:
+        cache.x = note.number
+        cache.y = note.force if field == 'force' else note.diameter
+        cache.c = 'iron'
+        cache.notes = note
+    scatter = _scatter(ax, cache)
+    fit = curve_fitting.fit_curve(numpy.array(cache.x), numpy.array(cache.y))
+    _editable(fig, ax, cache, field, scatter, _trend(ax, cache, fit))
+    ax.set_ylim(bottom=0)
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    return PlotInteractor(canvas, cache), notes
+
+
+def event_at(plot: PlotInteractor, x: float, y: float, offset_px: float = 0) -> MouseEvent:
+    px, py = plot.ax.transData.transform((x, y))
+    return MouseEvent('motion_notify_event', plot.canvas, px + offset_px, py)
+
+
+class PlotInteractorTestCase(unittest.TestCase):
+    def test_nearest_point(self):
+        plot, _ = interactor('diameter')
+        self.assertEqual(plot.nearest_point(event_at(plot, 33, plot.y[3])), 3)
+        self.assertEqual(plot.nearest_point(event_at(plot, 33, plot.y[3], offset_px=5)), 3)
+        self.assertIsNone(plot.nearest_point(event_at(plot, 33, plot.y[3], offset_px=40)))
+
+    def test_drag_sets_diameter(self):
+        plot, notes = interactor('diameter')
+        plot._move_point(2, 0.90001)
+        self.assertEqual(notes[2].diameter, 0.9)
+        # the point is drawn at the diameter set, not where it was dropped
+        self.assertEqual(plot.cache.scatter.get_offsets()[2].tolist(), [32, 0.9])
+        # the trend is refitted and the dragged note is ringed as an outlier
+        self.assertEqual(plot.cache.outlier_ring.get_offsets().tolist(), [[32, 0.9]])
+
+    def test_drag_tension_solves_diameter(self):
+        plot, notes = interactor('force')
+        target = 2 * notes[4].force
+        plot._move_point(4, target)
+        # solved as if tension scaled with d², doubling it scales the diameter by √2
+        self.assertEqual(notes[4].diameter, round(0.44 * 2 ** 0.5, 4))
+        self.assertNotAlmostEqual(notes[4].force, target)
+        self.assertEqual(plot.y[4], notes[4].force)
+        self.assertEqual(plot.cache.scatter.get_offsets()[4].tolist(), [34, notes[4].force])
+
+
+if __name__ == '__main__':
+    unittest.main()
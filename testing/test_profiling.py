@@ -0,0 +1,97 @@
+import json
+import pathlib
+import tempfile
+import tracemalloc
+import unittest
+
+from interface.profiling import CallStats, profiled, registry
+
+
+@profiled()
+def _square(x: int) -> int:
+    return x * x
+
+
+@profiled('named')
+def _allocate(size: int) -> list:
+    return [0] * size
+
+
+@profiled()
+def _fail():
+    raise ValueError('failed')
+
+
+class ProfilingTestCase(unittest.TestCase):
+    def setUp(self):
+        registry.disable()
+        registry.reset()
+        self.addCleanup(registry.reset)
+        self.addCleanup(registry.disable)
+
+    def test_disabled_records_nothing(self):
+        self.assertEqual(_square(3), 9)
+        self.assertEqual(registry.stats, {})
+        self.assertEqual(_square.__name__, '_square')
+
+    def test_calls_recorded(self):
+        registry.enable()
+        for i in range(10):
+            _square(i)
+        _allocate(10)
+        with self.assertRaises(ValueError):
+            _fail()
+        self.assertEqual(registry.stats['_square'].count, 10)
+        self.assertEqual(registry.stats['named'].count, 1)
+        # calls that raise are still timed
+        self.assertEqual(registry.stats['_fail'].count, 1)
+        self.assertEqual({s_['name'] for s_ in registry.summary()}, {'_square', 'named', '_fail'})
+        registry.disable()
+        _square(1)
+        self.assertEqual(registry.stats['_square'].count, 10)
+
+    def test_percentiles(self):
+        stats = CallStats('test')
+        self.assertEqual(stats.summary()['p50_ms'], 0)
+        for ms in range(1, 101):
+            stats.add(ms / 1000)
+        summary = stats.summary()
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['mean_ms'], 50.5)
+        self.assertAlmostEqual(summary['p50_ms'], 50.5)
+        self.assertAlmostEqual(summary['p90_ms'], 90.1)
+        self.assertAlmostEqual(summary['p99_ms'], 99.01)
+        self.assertAlmostEqual(summary['max_ms'], 100)
+        # only the most recent calls are kept for percentiles, totals cover every call
+        recent = CallStats('recent', sample_size=10)
+        for ms in range(1, 101):
+            recent.add(ms / 1000)
+        self.assertAlmostEqual(recent.summary()['p50_ms'], 95.5)
+        self.assertAlmostEqual(recent.summary()['total_ms'], 5050)
+
+    def test_trace_memory(self):
+        if tracemalloc.is_tracing():
+            self.skipTest("tracemalloc already started outside the registry")
+        registry.enable(trace_memory=True)
+        self.assertTrue(tracemalloc.is_tracing())
+        _allocate(100_000)
+        self.assertGreater(registry.stats['named'].alloc_bytes, 0)
+        registry.disable()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertFalse(registry.trace_memory)
+
+    def test_dump_json(self):
+        registry.enable()
+        _square(2)
+        _square(3)
+        with tempfile.TemporaryDirectory() as directory:
+            file = pathlib.Path(directory, 'profile.json')
+            registry.dump_json(file)
+            data = json.loads(file.read_text())
+        self.assertFalse(data['trace_memory'])
+        self.assertEqual(data['functions'][0]['name'], '_square')
+        self.assertEqual(data['functions'][0]['count'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
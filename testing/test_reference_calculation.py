@@ -0,0 +1,43 @@
+import os
+import random
+import unittest
+
+import numpy
+
+from interface.calculation import note_columns
+from interface.reference_calculation import reference_columns
+from testing.differential import random_design, run
+
+
+class ReferenceCalculationTestCase(unittest.TestCase):
+    def test_random_designs_agree(self):
+        failures, report = run(designs=60, seed=3)
+        self.assertEqual(failures, [])
+        self.assertGreater(report['notes'], 0)
+
+    def test_unknown_material_is_nan(self):
+        data = random_design(random.Random(0))
+        key = sorted(data['notes'], key=int)[0]
+        data['notes'][key]['_material_select'] = '999 unknown'
+        expected, actual = reference_columns(data), note_columns(data)
+        self.assertTrue(numpy.isnan(expected['force'][0]))
+        numpy.testing.assert_allclose(actual['force'], expected['force'], rtol=1e-9)
+
+    @unittest.skipUnless(os.environ.get('DISPLAY'), "needs a display")
+    def test_instrument_notes_agree(self):
+        import tkinter as tk
+        from interface.instrument_class import Instrument
+        root = tk.Tk()
+        try:
+            instrument = Instrument(root)
+            data = random_design(random.Random(1))
+            instrument.state_import(data)
+            expected = reference_columns(instrument.state_export())
+            forces = [n_.get_force().kg_force() for n_ in instrument.notes.values()]
+            numpy.testing.assert_allclose(forces, expected['force'], rtol=1e-9)
+        finally:
+            root.destroy()
+
+
+if __name__ == '__main__':
+    unittest.main()
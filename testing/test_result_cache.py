@@ -0,0 +1,60 @@
+import tempfile
+import time
+import unittest
+
+import numpy
+
+from interface import result_cache
+from interface.calculation import note_columns
+from interface.material_and_measures import Density, WireMaterial
+from interface.result_cache import ResultCache, content_key
+from testing import designs
+
+
+def design(pitch: float = 415) -> dict:
+    return designs.design(20, 39, length=lambda n: 1500 - n * 20, pitch=pitch, name='test')
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def test_key_follows_content(self):
+        self.assertEqual(content_key('force', design()), content_key('force', design()))
+        self.assertNotEqual(content_key('force', design()), content_key('force', design(pitch=440)))
+        self.assertNotEqual(content_key('force', design()), content_key('stress', design()))
+        before = content_key('force', design())
+        material = WireMaterial('test-material', 'test material', Density(g_cm3=1))
+        self.addCleanup(material.delete)
+        self.assertNotEqual(before, content_key('force', design()))
+
+    def test_old_note_columns_not_read(self):
+        # columns cached by a version before material, length, diameter and density were added
+        result_cache.cache.clear()
+        self.addCleanup(result_cache.cache.clear)
+        result_cache.cache.put(content_key('note_columns', design()), dict(note_number=numpy.arange(20, 40)))
+        self.assertIn('material', note_columns(design()))
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_bytes=3000)
+        for key in 'abc':
+            cache.put(key, numpy.zeros(100))
+        cache.get('a')
+        cache.put('d', numpy.zeros(100))
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('d', cache)
+
+    def test_expiry_and_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory=directory)
+            calls = []
+            value = cache.get_or_compute('key', lambda: calls.append(1) or numpy.arange(5))
+            # a new cache, as in a later run, reads the result from disk
+            reopened = ResultCache(directory=directory)
+            numpy.testing.assert_array_equal(reopened.get_or_compute('key', lambda: calls.append(1)), value)
+            self.assertEqual(len(calls), 1)
+            reopened.max_age_sec = 0
+            time.sleep(0.01)
+            self.assertIsNone(reopened.get('key'))
+
+
+if __name__ == '__main__':
+    unittest.main()
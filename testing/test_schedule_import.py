@@ -0,0 +1,55 @@
+import pathlib
+import tempfile
+import unittest
+
+import definitions
+from interface.calculation import NoteArrays
+from interface.material_and_measures import Distance, Force
+from interface.schedule_import import read_schedule
+
+
+class ScheduleImportTestCase(unittest.TestCase):
+    def write(self, text: str, suffix: str = '.csv') -> pathlib.Path:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        file = pathlib.Path(directory.name) / f'schedule{suffix}'
+        file.write_text(text, encoding='utf-8')
+        return file
+
+    def test_units(self):
+        self.assertAlmostEqual(Distance('1.2 m').mm(), 1200)
+        self.assertAlmostEqual(Distance('2in').mm(), 50.8)
+        self.assertAlmostEqual(Force('10 N').kg_force(), 1.0197, places=4)
+        with self.assertRaises(ValueError):
+            Distance('3 furlong')
+
+    def test_test_harpsichord(self):
+        result = read_schedule(definitions.ROOT_DIR / 'test_data_files/test_harpsichord.csv', first_note=9,
+                               chunk_size=10)
+        self.assertEqual(result.errors, [])
+        self.assertEqual(sorted(result.notes), list(range(9, 72)))
+        self.assertEqual(result.notes[9]['_length'], 1699)
+        arrays = NoteArrays(result.state(pitch=425))
+        self.assertEqual(len(arrays), 63)
+
+    def test_mapped_columns_and_bad_rows(self):
+        file = self.write('Key\tScale\tGauge\tWire\tStrings\n'
+                          'A4\t47 in\t0.4mm\tRed brass\t2\n'
+                          '50\t1.2 m\tthick\t3\t1\n'
+                          '51\t30 cm\t.3\t3\t1.5\n'
+                          '52\t300\t.3\tunobtainium\t1\n'
+                          '53\t300\t0.3\t1\t1\n'
+                          '53\t310\t0.3\t1\t1\n', suffix='.tsv')
+        result = read_schedule(file, column_map={'note': 'Key', 'length': 'Scale', 'diameter': 'Gauge',
+                                                 'material': 'Wire', 'count': 'Strings'})
+        self.assertEqual(sorted(result.notes), [49, 53])
+        self.assertAlmostEqual(result.notes[49]['_length'], 1193.8)
+        self.assertEqual(result.notes[49]['_material_select'], '3 Rose red brass')
+        self.assertEqual(result.notes[53]['_length'], 310)
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5, 7])
+        self.assertIn('diameter', result.errors[0][1])
+        self.assertIn('count', result.errors[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
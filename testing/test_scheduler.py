@@ -0,0 +1,48 @@
+import tkinter as tk
+import unittest
+
+from interface.scheduler import IdleScheduler
+
+
+class IdleSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        # an interpreter without a display is enough for after_idle
+        self.root = tk.Tcl()
+        self.errors = []
+        self.root.report_callback_exception = lambda *exc_info: self.errors.append(exc_info[1])
+        self.scheduler = IdleScheduler.of(self.root)
+        self.calls = []
+
+    def test_shared_per_root(self):
+        self.assertIs(IdleScheduler.of(self.root), self.scheduler)
+
+    def test_coalesced_in_order(self):
+        self.scheduler.schedule('a', lambda: self.calls.append('a1'))
+        self.scheduler.schedule('b', lambda: self.calls.append('b'))
+        self.scheduler.schedule('a', lambda: self.calls.append('a2'))
+        self.scheduler.schedule('c', lambda: self.calls.append('c'))
+        self.scheduler.cancel('c')
+        self.assertTrue(self.scheduler.is_pending('a'))
+        self.root.update()
+        # a replaced callback keeps the place of the one it replaces
+        self.assertEqual(self.calls, ['a2', 'b'])
+        self.assertFalse(self.scheduler.is_pending('a'))
+
+    def test_error_does_not_drop_batch(self):
+        def fail():
+            raise ValueError('bad note')
+
+        self.scheduler.schedule('a', lambda: self.calls.append('a'))
+        self.scheduler.schedule('b', fail)
+        self.scheduler.schedule('c', lambda: self.calls.append('c'))
+        self.scheduler.flush()
+        self.assertEqual(self.calls, ['a', 'c'])
+        self.assertEqual([str(e_) for e_ in self.errors], ['bad note'])
+        # the scheduler still runs later batches
+        self.scheduler.schedule('a', lambda: self.calls.append('again'))
+        self.root.update()
+        self.assertEqual(self.calls, ['a', 'c', 'again'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 
-from instrument import Distance, Force, Density
-from instrument.instrument_classes import note_name_to_number
+from interface.general_functions import note_name_to_number
+from interface.material_and_measures import Density, Distance, Force
 
 
 class MyTestCase(unittest.TestCase):
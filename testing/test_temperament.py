@@ -0,0 +1,76 @@
+import os
+import unittest
+
+import numpy
+
+from interface.batch import evaluate_temperaments
+from interface.calculation import NoteArrays
+from interface.temperament import EQUAL, Temperament
+from testing import designs
+
+
+def _design(temperament='Equal'):
+    return designs.design(9, 71, length=lambda n: 1000 - n * 10, diameter=0.5, material='1 Rose Iron', pitch=415.0,
+                          name='test', temperament=temperament)
+
+
+class TemperamentTestCase(unittest.TestCase):
+    def test_equal_matches_formula(self):
+        notes = numpy.arange(1, 89)
+        expected = 2 ** ((notes - 49) / 12) * 440
+        numpy.testing.assert_allclose(EQUAL.frequencies(notes, 440), expected)
+
+    def test_reference_note_is_exact(self):
+        for temperament in Temperament.temperament_list():
+            self.assertAlmostEqual(temperament.frequency(52, 256, reference_note=52), 256)
+            self.assertAlmostEqual(temperament.frequency(64, 256, reference_note=52), 512)
+
+    def test_quarter_comma_major_third_is_pure(self):
+        meantone = Temperament.get_by_name('Meantone 1/4 comma')
+        c, e = meantone.frequencies([40, 44], 440)
+        self.assertAlmostEqual(e / c, 5 / 4, places=4)
+
+    def test_custom_table_requires_12_entries(self):
+        with self.assertRaises(ValueError):
+            Temperament('broken', [0.0] * 11, register=False)
+        self.assertEqual(Temperament.from_text('ok', '0, -5 -3 ' + '0 ' * 9).cents[1], -5)
+        with self.assertRaises(ValueError):
+            Temperament.from_text('broken', '0 ' * 11 + 'x')
+
+    def test_saved_table_is_not_registered(self):
+        cents = [0.0, -8.0] + [0.0] * 10
+        data = dict(_design('Werckmeister VI'), temperament_cents=cents)
+        arrays = NoteArrays(data)
+        self.assertEqual(arrays.temperament.cents.tolist(), cents)
+        self.assertNotIn('Werckmeister VI', Temperament.name_list())
+
+    @unittest.skipUnless(os.environ.get('DISPLAY'), "needs a display")
+    def test_instrument_keeps_its_own_table(self):
+        import tkinter as tk
+        from interface.instrument_class import Instrument
+        root = tk.Tk()
+        self.addCleanup(root.destroy)
+        instrument = Instrument(root)
+        cents = [0.0, -8.0] + [0.0] * 10
+        instrument.state_import(dict(_design('Werckmeister VI'), temperament_cents=cents))
+        self.assertEqual(instrument.get_temperament().cents.tolist(), cents)
+        self.assertEqual(instrument._temperament_names()[-1], 'Werckmeister VI')
+        self.assertEqual(instrument.state_export()['temperament_cents'], cents)
+        # another design only offers an empty custom entry
+        instrument.state_import(_design())
+        self.assertEqual(instrument._temperament_names()[-1], 'Custom')
+        self.assertNotIn('Werckmeister VI', Temperament.name_list())
+
+    def test_evaluate_temperaments(self):
+        names, arrays, frequency, force = evaluate_temperaments(_design())
+        self.assertEqual(frequency.shape, (len(names), len(arrays)))
+        self.assertEqual(force.shape, frequency.shape)
+        for name, row in zip(names, frequency):
+            temperament = Temperament.get_by_name(name)
+            numpy.testing.assert_allclose(row, arrays.frequencies(temperament))
+        equal_force = force[names.index('Equal')]
+        numpy.testing.assert_allclose(equal_force, arrays.forces())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+import numpy
+
+from interface.calculation import NoteArrays
+from interface.streaming_statistics import StreamingHistogram
+from interface.tolerance import tolerance_analysis
+from testing import designs
+
+
+class ToleranceTestCase(unittest.TestCase):
+    def test_histogram_percentiles_match_numpy(self):
+        rng = numpy.random.default_rng(0)
+        values = rng.normal(10, 2, size=(50_000, 3)) * [1, 2, 3]
+        hist = StreamingHistogram(values.min(axis=0), values.max(axis=0), 3)
+        for chunk in numpy.array_split(values, 7):
+            hist.add(chunk)
+        q = (5, 50, 95)
+        numpy.testing.assert_allclose(hist.percentiles(q), numpy.percentile(values, q, axis=0), rtol=1e-3)
+
+    def test_zero_tolerance_gives_nominal(self):
+        arrays = NoteArrays(designs.design(20, 59, length=lambda n: 1500 - n * 20))
+        result = tolerance_analysis(arrays, samples=1000, diameter_sd_mm=0, length_sd_mm=0, density_sd=0)
+        for row in result.force:
+            numpy.testing.assert_allclose(row, result.nominal_force, rtol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import time
+import unittest
+
+from interface import archive_overlay, curve_fitting
+from interface.visualization_plotting import plot_result_dict, plot_state_dict
+from testing import designs
+
+
+class PlotStateTestCase(unittest.TestCase):
+    def test_state_follows_what_plots_read(self):
+        data = dict(inst_name='spinet', lowest_key='30', highest_key='40', pitch=415, notes={})
+        saved = curve_fitting.options
+        try:
+            before = plot_state_dict['Tension'](data)
+            curve_fitting.options = saved._replace(degree=saved.degree + 1)
+            self.assertNotEqual(plot_state_dict['Tension'](data), before)
+        finally:
+            curve_fitting.options = saved
+        self.assertIsNone(plot_state_dict['Archive Overlay Tension'](data))
+        archive_overlay.loaded['force'] = archive_overlay.ArchiveOverlay('force')
+        try:
+            self.assertEqual(plot_state_dict['Archive Overlay Tension'](data)[1], 0)
+        finally:
+            archive_overlay.loaded.clear()
+        self.assertIsNone(plot_state_dict['Pareto Front'](data))
+        self.assertEqual(set(plot_result_dict), {'Tolerance', 'Pitch Inference', 'Pitch Raise'})
+
+
+@unittest.skipUnless(os.environ.get('DISPLAY'), "needs a display")
+class PlotGalleryTestCase(unittest.TestCase):
+    def setUp(self):
+        import tkinter as tk
+        from interface import visualization_plotting
+        from interface.instrument_class import Instrument
+        self.root = tk.Tk()
+        self.instrument = Instrument(self.root)
+        self.instrument.state_import(designs.design(30, 40, length=lambda n: 1000 - 10 * n))
+        self.plots = visualization_plotting.plot_type_dict
+        self._saved = dict(self.plots)
+
+        def broken(instrument, fig_size_px=None):
+            raise KeyError('_diameter')
+
+        self.plots.clear()
+        self.plots['Broken'] = broken
+        self.plots['Tension'] = self._saved['Tension']
+        self.plots['Tolerance'] = self._saved['Tolerance']
+
+    def tearDown(self):
+        self.plots.clear()
+        self.plots.update(self._saved)
+        self.root.destroy()
+
+    def _wait(self, gallery, *names: str):
+        deadline = time.monotonic() + 10
+        while (gallery._rendering or gallery._computing or not all(n_ in gallery.images for n_ in names)) \
+                and time.monotonic() < deadline:
+            self.root.update()
+            time.sleep(0.01)
+
+    def test_failed_plot_leaves_others(self):
+        from interface import result_cache
+        from interface.visualization import PlotGallery
+        result_cache.cache.clear()
+        gallery = PlotGallery(self.root, self.instrument, lambda name: None)
+        self._wait(gallery, 'Tension', 'Tolerance')
+        self.assertIn('KeyError', gallery.buttons['Broken'].cget('text'))
+        self.assertIn('Tension', gallery.images)
+        # the tolerance analysis ran on a worker thread before the figure was built
+        self.assertIn('Tolerance', gallery.images)
+
+    def test_trend_options_redraw(self):
+        from interface.visualization import PlotGallery
+        gallery = PlotGallery(self.root, self.instrument, lambda name: None)
+        self._wait(gallery, 'Tension')
+        shown = dict(gallery._shown)
+        saved = curve_fitting.options
+        try:
+            curve_fitting.options = saved._replace(degree=saved.degree + 1)
+            gallery.refresh()
+            self._wait(gallery, 'Tension')
+        finally:
+            curve_fitting.options = saved
+        self.assertNotEqual(gallery._shown['Tension'], shown['Tension'])
+        self.assertEqual(gallery._shown['Tolerance'], shown['Tolerance'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import unittest
+
+
+@unittest.skipUnless(os.environ.get('DISPLAY'), "needs a display")
+class WorkspaceTestCase(unittest.TestCase):
+    def setUp(self):
+        import tkinter as tk
+        from interface.instrument_class import Instrument
+        from interface.workspace import Workspace
+        self.root = tk.Tk()
+        self.instrument = Instrument(self.root)
+        self.workspace = Workspace(self.root, self.instrument)
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def _select(self, index: int):
+        self.workspace.notebook.select(index)
+        self.root.update()
+
+    def test_blank_rows_export(self):
+        self.workspace.new_tab()
+        self.root.update()
+        note = self.instrument.state_export()['notes']['1']
+        self.assertEqual((note['_diameter'], note['_length']), ('', ''))
+
+    def test_new_switch_open_close(self):
+        self.workspace.new_tab()
+        self.root.update()
+        # the new tab has only blank rows, one row is part filled
+        self.instrument.notes[1]._length.set(1200)
+        self._select(0)
+        self.assertIs(self.workspace.active, self.workspace.documents[0])
+        self.assertEqual(self.workspace.documents[1].data['notes']['1']['_length'], 1200)
+        self._select(1)
+        self.assertEqual(self.instrument.notes[1].state_export()['_length'], 1200)
+
+        data = self.instrument.state_export()
+        data['inst_name'] = 'spinet'
+        self.workspace.open(data)
+        self.root.update()
+        self.assertEqual(len(self.workspace.documents), 3)
+        self.assertEqual(self.workspace.notebook.index('current'), 2)
+        self.assertEqual(self.instrument.inst_name.get(), 'spinet')
+
+        self.workspace.close_tab()
+        self.root.update()
+        self.assertEqual(len(self.workspace.documents), 2)
+        self.assertIs(self.workspace.active, self.workspace.documents[self.workspace.notebook.index('current')])
+        self.workspace.close_tab()
+        self.workspace.close_tab()
+        self.root.update()
+        # closing the last tab leaves a new instrument
+        self.assertEqual(len(self.workspace.documents), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
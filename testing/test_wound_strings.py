@@ -0,0 +1,34 @@
+import unittest
+
+import numpy
+
+from interface.wound_strings import equivalent_density, mass_per_length
+
+
+class WoundStringsTestCase(unittest.TestCase):
+    # 1mm core of 7.8g/cm³ wound with 0.5mm wire of 8.9g/cm³, worked by hand in cm:
+    # core π·0.1²/4·7.8 = 0.0612611g/cm
+    # layer 1, 20 turns per cm of π·(0.1 + 0.05) of wire with π·0.05²/4 section, 0.1646990g/cm
+    # layer 2 sits on 0.2, 20 turns per cm of π·(0.2 + 0.05), 0.2744984g/cm
+    core_area = numpy.pi * 0.1 ** 2 / 4
+
+    def test_one_layer(self):
+        self.assertAlmostEqual(float(mass_per_length(1.0, 7.8, 0.5, 8.9, 1)), 0.0612611 + 0.1646990, places=6)
+        self.assertAlmostEqual(float(equivalent_density(1.0, 7.8, 0.5, 8.9, 1)),
+                               (0.0612611 + 0.1646990) / self.core_area, places=4)
+
+    def test_two_layers(self):
+        self.assertAlmostEqual(float(mass_per_length(1.0, 7.8, 0.5, 8.9, 2)), 0.0612611 + 0.1646990 + 0.2744984,
+                               places=6)
+        self.assertAlmostEqual(float(equivalent_density(1.0, 7.8, 0.5, 8.9, 2)),
+                               (0.0612611 + 0.1646990 + 0.2744984) / self.core_area, places=4)
+
+    def test_plain_wire_keeps_core_density(self):
+        density = equivalent_density(numpy.array([1.0, 1.0]), numpy.array([7.8, 7.8]), numpy.array([0.0, 0.5]),
+                                     numpy.array([numpy.nan, 8.9]), numpy.array([0, 1]))
+        self.assertEqual(density[0], 7.8)
+        self.assertAlmostEqual(density[1], (0.0612611 + 0.1646990) / self.core_area, places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()